@@ -8,14 +8,18 @@ Discogs database and MESA Rights Vault system.
 """
 
 import os
+import re
 import json
 import logging
 import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Any, Optional, Union, Tuple
 from datetime import datetime
 
 from .discogs_connector import DiscogsConnector
 from .discogs_database import DiscogsDatabase
+from .entity_extractor import EntityExtractor
 
 # Configure logging
 logging.basicConfig(
@@ -25,6 +29,15 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Release fields used for metadata answers and MESA schema mapping, read from
+# the database's columns instead of the full release blob
+RELEASE_METADATA_FIELDS = [
+    "id", "title", "released", "country", "genres", "styles",
+    "artists", "extraartists", "labels", "identifiers", "tracklist"
+]
+
+_ENTITY_PUNCTUATION_PATTERN = re.compile(r"[^\w\s]")
+
 class DiscogsAIAgent:
     """
     AI Agent interface for retrieving and analyzing music rights data from 
@@ -49,11 +62,34 @@ class DiscogsAIAgent:
         self.config = self._load_config(config_path)
         
         # Initialize components
-        self.db = DiscogsDatabase()
-        self.connector = DiscogsConnector(config_path=config_path)
+        cache_config = self.config.get("query_cache", {})
+        self.cache_ttl = cache_config.get("ttl_seconds", 86400)
+        self.db = DiscogsDatabase(
+            query_cache_size=cache_config.get("memory_size", 1024),
+            cache_cleanup_interval=cache_config.get("cleanup_interval_seconds", 3600)
+        )
+        self.connector = DiscogsConnector(config_path=config_path, db=self.db)
+        
+        # Entity extraction, matching queries against the artists and labels stored locally
+        self.extractor = EntityExtractor.from_database(self.db, self.config.get("entity_gazetteer_limit", 200000))
+        
+        # Background API fetches that warm the database after partial local matches
+        self._prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="discogs-prefetch")
+        self._prefetch_lock = threading.Lock()
+        self._prefetching = set()
+        
+        # Whether the query being handled on this thread served partial
+        # results while a background fetch refreshes them
+        self._query_state = threading.local()
         
         logger.info("Discogs AI agent interface initialized")
     
+    def close(self):
+        """Stop background fetches and release the connector's and database's resources."""
+        self._prefetch_executor.shutdown(wait=True)
+        self.connector.close()
+        self.db.close()
+    
     def _load_config(self, config_path: str) -> Dict:
         """Load configuration from a JSON file."""
         try:
@@ -72,6 +108,33 @@ class DiscogsAIAgent:
         query_str = json.dumps(query, sort_keys=True)
         return hashlib.sha256(query_str.encode()).hexdigest()
     
+    def _normalize_entity(self, value: str) -> str:
+        """Normalize an extracted entity for cache keys (case, punctuation, spacing)."""
+        return " ".join(_ENTITY_PUNCTUATION_PATTERN.sub(" ", str(value).lower()).split())
+    
+    def _cache_key(self, query_type: str, entities: Dict, context: Dict = None) -> str:
+        """
+        Build a cache key from the query intent and its extracted entities.
+        
+        Paraphrases of the same request extract the same entities and so
+        share a cache entry.
+        """
+        normalized = {}
+        for key, values in entities.items():
+            if key == "identifiers":
+                normalized[key] = sorted({
+                    (identifier["type"], self._normalize_entity(identifier["value"]))
+                    for identifier in values
+                })
+            else:
+                normalized[key] = sorted({self._normalize_entity(value) for value in values} - {""})
+        
+        return self._hash_query({
+            "query_type": query_type,
+            "entities": normalized,
+            "context": context or {}
+        })
+    
     def process_query(self, query: str, context: Dict = None) -> Dict:
         """
         Process a natural language query about music rights.
@@ -83,8 +146,15 @@ class DiscogsAIAgent:
         Returns:
             Results and analysis
         """
-        # Check cache first
-        cached_result = self.db.get_cached_query(query)
+        # Extract key entities from query
+        entities = self._extract_entities(query)
+        
+        # Define query type
+        query_type = self._determine_query_type(query, entities)
+        
+        # Check cache, keyed on the intent rather than the exact wording
+        cache_key = self._cache_key(query_type, entities, context)
+        cached_result = self.db.get_cached_query(query, cache_key=cache_key)
         if cached_result:
             logger.info(f"Retrieved cached response for query: {query}")
             return {
@@ -93,13 +163,8 @@ class DiscogsAIAgent:
                 "timestamp": datetime.now().isoformat()
             }
         
-        # Extract key entities from query
-        entities = self._extract_entities(query)
-        
-        # Define query type
-        query_type = self._determine_query_type(query, entities)
-        
         # Process based on query type
+        self._query_state.refreshing = False
         if query_type == "search":
             response = self._handle_search_query(entities)
         elif query_type == "rights_verification":
@@ -119,8 +184,11 @@ class DiscogsAIAgent:
                 ]
             }
         
-        # Cache the response
-        self.db.cache_ai_query(query, response)
+        # Cache the response, unless it was built on partial search results
+        # that a background fetch is still refreshing; metadata lookups and
+        # the other handlers that search first are covered too
+        if not self._query_state.refreshing:
+            self.db.cache_ai_query(query, response, expiration_seconds=self.cache_ttl, cache_key=cache_key)
         
         return {
             "response": response,
@@ -138,67 +206,7 @@ class DiscogsAIAgent:
         Returns:
             Dictionary of extracted entities
         """
-        # This would ideally use a more sophisticated NLP approach
-        # For now, we'll use a simple keyword-based approach
-        entities = {
-            "artists": [],
-            "titles": [],
-            "years": [],
-            "labels": [],
-            "identifiers": []
-        }
-        
-        # Look for common patterns in the query
-        query_lower = query.lower()
-        
-        # Check for artist mentions
-        if "by " in query_lower:
-            parts = query_lower.split("by ")
-            if len(parts) > 1:
-                artist_part = parts[1].split("?")[0].split(",")[0].split(" in ")[0].strip()
-                entities["artists"].append(artist_part)
-        
-        # Check for title mentions
-        if '"' in query or "'" in query:
-            import re
-            # Find text in quotes
-            quoted = re.findall(r'["\'](.*?)["\']', query)
-            for title in quoted:
-                entities["titles"].append(title)
-        elif "called " in query_lower or "titled " in query_lower:
-            for prefix in ["called ", "titled "]:
-                if prefix in query_lower:
-                    parts = query_lower.split(prefix)
-                    if len(parts) > 1:
-                        title_part = parts[1].split("?")[0].split(",")[0].split(" by ")[0].strip()
-                        entities["titles"].append(title_part)
-        
-        # Check for years
-        import re
-        years = re.findall(r'\b(19|20)\d{2}\b', query)
-        entities["years"].extend(years)
-        
-        # Check for label mentions
-        if "on " in query_lower and " label" in query_lower:
-            parts = query_lower.split("on ")
-            if len(parts) > 1:
-                label_part = parts[1].split("label")[0].strip()
-                entities["labels"].append(label_part)
-        
-        # Check for identifiers like barcodes, ISRCs
-        if "barcode" in query_lower:
-            parts = query_lower.split("barcode")
-            if len(parts) > 1:
-                barcode_part = parts[1].strip().split()[0].strip()
-                entities["identifiers"].append({"type": "barcode", "value": barcode_part})
-        
-        if "isrc" in query_lower:
-            parts = query_lower.split("isrc")
-            if len(parts) > 1:
-                isrc_part = parts[1].strip().split()[0].strip()
-                entities["identifiers"].append({"type": "isrc", "value": isrc_part})
-        
-        return entities
+        return self.extractor.extract(query)
     
     def _determine_query_type(self, query: str, entities: Dict) -> str:
         """
@@ -211,29 +219,94 @@ class DiscogsAIAgent:
         Returns:
             Query type string
         """
-        query_lower = query.lower()
+        return self.extractor.query_type(query, entities)
+    
+    def extract_many(self, queries: List[str]) -> List[Dict]:
+        """
+        Extract the entities and query type of many queries, e.g. to replay a query log.
         
-        # Rights verification
-        if any(term in query_lower for term in ["who owns", "rights", "rightsholder", "copyright"]):
-            return "rights_verification"
+        Args:
+            queries: Natural language query strings
+            
+        Returns:
+            Dictionaries with each query, its query type and its entities
+        """
+        return self.extractor.extract_many(queries)
+    
+    def _plan_search(self, entities: Dict) -> Dict:
+        """
+        Turn extracted entities into search parameters.
         
-        # Royalty calculation
-        if any(term in query_lower for term in ["royalty", "royalties", "payment", "percentage", "earnings"]):
-            return "royalty_calculation"
+        Args:
+            entities: Extracted entities
+            
+        Returns:
+            Search parameters (title, artist, year, label) and identifiers
+        """
+        search_params = {}
+        for param, entity in (("title", "titles"), ("artist", "artists"),
+                              ("year", "years"), ("label", "labels")):
+            if entities[entity]:
+                search_params[param] = entities[entity][0]
         
-        # Metadata lookup
-        if any(term in query_lower for term in ["metadata", "information about", "details", "tell me about"]):
-            return "metadata_lookup"
+        return {
+            "search_params": search_params,
+            "identifiers": [{"type": identifier["type"], "value": identifier["value"]}
+                            for identifier in entities["identifiers"]]
+        }
+    
+    def _search_local(self, plan: Dict) -> List[Dict]:
+        """Run a search plan as a single ranked database query."""
+        search_params = plan["search_params"]
+        return self.db.search_releases_by_entities(
+            title=search_params.get("title"),
+            artist=search_params.get("artist"),
+            label=search_params.get("label"),
+            year=search_params.get("year"),
+            identifiers=plan["identifiers"],
+            limit=10
+        )
+    
+    def _fetch_from_api(self, plan: Dict):
+        """
+        Fetch a search plan's matches from the Discogs API.
         
-        # Default to search if entities were found
-        if any(entities[key] for key in entities):
-            return "search"
+        The connector writes every hydrated release through to the database,
+        so the matches are served by _search_local afterwards.
+        """
+        batch = list(plan["identifiers"])
+        if any(key in plan["search_params"] for key in ("title", "artist", "label")):
+            batch.append(plan["search_params"])
+        self.connector.find_rights_metadata_batch(batch)
+    
+    def _prefetch_from_api(self, plan: Dict):
+        """Fetch a search plan's matches from the API in the background, once at a time."""
+        key = self._hash_query(plan)
+        with self._prefetch_lock:
+            if key in self._prefetching:
+                return
+            self._prefetching.add(key)
+        
+        def fetch():
+            try:
+                self._fetch_from_api(plan)
+            except Exception as e:
+                logger.error(f"Error prefetching search results: {e}")
+            finally:
+                with self._prefetch_lock:
+                    self._prefetching.discard(key)
         
-        return "unknown"
+        self._prefetch_executor.submit(fetch)
     
     def _handle_search_query(self, entities: Dict) -> Dict:
         """
-        Handle a search-type query by searching the Discogs database.
+        Handle a search-type query, serving it from the local database first.
+        
+        The extracted entities are resolved in one ranked database query.
+        When no release matches every title, artist, label and identifier
+        given, the API is consulted and its results written through to the
+        database: synchronously if nothing matched locally, otherwise in the
+        background while the partial local matches are returned.
         
         Args:
             entities: Extracted entities
@@ -241,131 +314,46 @@ class DiscogsAIAgent:
         Returns:
             Search results
         """
-        results = []
-        
-        # Check for identifiers first (most specific)
-        if entities["identifiers"]:
-            for identifier in entities["identifiers"]:
-                db_results = self.db.search_by_identifier(identifier["type"], identifier["value"])
-                if db_results:
-                    results.extend(db_results)
-                else:
-                    # Try API if not in database
-                    search_params = {"type": identifier["type"], "value": identifier["value"]}
-                    api_results = self.connector.find_rights_metadata(search_params)
-                    for result in api_results.get("results", []):
-                        release_id = self._extract_release_id_from_reference(result["reference_id"])
-                        if release_id:
-                            # Store in database for future queries
-                            decrypted_data = self.connector._decrypt_data(result["encrypted_data"])
-                            discogs_data = self._convert_mesa_to_discogs(decrypted_data)
-                            self.db.save_release(discogs_data)
-                            
-                            # Add to results
-                            results.append({
-                                "id": release_id,
-                                "title": result["preview"]["title"],
-                                "artist": result["preview"]["artist"],
-                                "year": result["preview"]["year"],
-                                "label": result["preview"]["label"],
-                                "score": result["match_score"]
-                            })
-            
-            return {
-                "success": True,
-                "query_type": "identifier_search",
-                "result_count": len(results),
-                "results": results[:10]  # Limit to top 10
-            }
+        plan = self._plan_search(entities)
+        search_params = plan["search_params"]
         
-        # Search by artist and title
-        if entities["titles"] or entities["artists"]:
-            search_params = {}
-            
-            if entities["titles"]:
-                search_params["title"] = entities["titles"][0]
-            
-            if entities["artists"]:
-                search_params["artist"] = entities["artists"][0]
-            
-            if entities["years"]:
-                search_params["year"] = entities["years"][0]
-            
-            if entities["labels"]:
-                search_params["label"] = entities["labels"][0]
-            
-            # Try database first
-            db_results = []
-            if "title" in search_params:
-                db_results = self.db.search_releases(search_params["title"])
-            
-            if not db_results and "artist" in search_params:
-                artist_results = self.db.search_artists(search_params["artist"])
-                for artist in artist_results:
-                    releases = self.db.get_releases_by_artist(artist["id"])
-                    db_results.extend(releases)
-            
-            if db_results:
-                results.extend(db_results)
-            else:
-                # Try API if not in database
-                api_results = self.connector.find_rights_metadata(search_params)
-                for result in api_results.get("results", []):
-                    release_id = self._extract_release_id_from_reference(result["reference_id"])
-                    if release_id:
-                        # Add to results
-                        results.append({
-                            "id": release_id,
-                            "title": result["preview"]["title"],
-                            "artist": result["preview"]["artist"],
-                            "year": result["preview"]["year"],
-                            "label": result["preview"]["label"],
-                            "score": result["match_score"]
-                        })
-            
+        # Entities every complete match must satisfy; the year only ranks
+        required = len([key for key in ("title", "artist", "label") if key in search_params])
+        required += 1 if plan["identifiers"] else 0
+        
+        if not required:
             return {
-                "success": True,
-                "query_type": "metadata_search",
-                "search_params": search_params,
-                "result_count": len(results),
-                "results": self._deduplicate_results(results)[:10]  # Limit to top 10
+                "success": False,
+                "message": "Insufficient search criteria provided",
+                "query_type": "search",
+                "results": []
             }
         
-        return {
-            "success": False,
-            "message": "Insufficient search criteria provided",
-            "query_type": "search",
-            "results": []
-        }
-    
-    def _extract_release_id_from_reference(self, reference_id: str) -> Optional[int]:
-        """Extract a Discogs release ID from a reference ID if possible."""
-        # Reference IDs are hashes, but sometimes we can extract the original ID
-        # This is just a placeholder for now
-        return None
-    
-    def _convert_mesa_to_discogs(self, mesa_data: Dict) -> Dict:
-        """Convert MESA format data back to Discogs format."""
-        # This would be implemented to reverse the mapping done in the connector
-        # For now, return a minimal structure
-        return {
-            "id": mesa_data.get("source_id"),
-            "title": mesa_data.get("workTitle", ""),
-            "released": mesa_data.get("releaseDate", ""),
-            "country": mesa_data.get("territory", "")
-        }
-    
-    def _deduplicate_results(self, results: List[Dict]) -> List[Dict]:
-        """Remove duplicate entries from search results."""
-        seen_ids = set()
-        deduplicated = []
+        results = self._search_local(plan)
+        source = "database"
+        refreshing = False
         
-        for result in results:
-            if result["id"] not in seen_ids:
-                seen_ids.add(result["id"])
-                deduplicated.append(result)
+        if not any(result["matched"] >= required for result in results):
+            if results:
+                self._prefetch_from_api(plan)
+                refreshing = True
+            else:
+                self._fetch_from_api(plan)
+                results = self._search_local(plan)
+                source = "api"
         
-        return deduplicated
+        response = {
+            "success": True,
+            "query_type": "identifier_search" if plan["identifiers"] else "metadata_search",
+            "search_params": search_params,
+            "source": source,
+            "result_count": len(results),
+            "results": results
+        }
+        if refreshing:
+            response["refreshing"] = True
+            self._query_state.refreshing = True
+        return response
     
     def _handle_rights_verification(self, entities: Dict) -> Dict:
         """
@@ -557,7 +545,7 @@ class DiscogsAIAgent:
         release_id = top_match["id"]
         
         # Try to get from database first
-        release_data = self.db.get_release(release_id)
+        release_data = self.db.get_release_fields(release_id, RELEASE_METADATA_FIELDS)
         
         # If not in database, fetch from API
         if not release_data:
@@ -581,12 +569,15 @@ class DiscogsAIAgent:
         # Extract relevant metadata fields
         metadata = self._extract_metadata_fields(release_data)
         
-        return {
+        response = {
             "success": True,
             "query_type": "metadata_lookup",
             "release_id": release_id,
             "metadata": metadata
         }
+        if search_result.get("refreshing"):
+            response["refreshing"] = True
+        return response
     
     def _extract_metadata_fields(self, release_data: Dict) -> Dict:
         """Extract important metadata fields from release data."""
@@ -678,7 +669,7 @@ class DiscogsAIAgent:
                 }
             
             # If no rights information, provide metadata for context
-            release_data = self.db.get_release(release_id)
+            release_data = self.db.get_release_fields(release_id, RELEASE_METADATA_FIELDS)
             
             if not release_data:
                 try:
@@ -724,7 +715,7 @@ class DiscogsAIAgent:
             release_id = int(entity_id) if entity_id.isdigit() else entity_id
             
             # Verify the release exists
-            release_data = self.db.get_release(release_id)
+            release_data = self.db.get_release_fields(release_id, RELEASE_METADATA_FIELDS)
             
             if not release_data:
                 try:
@@ -1,15 +1,18 @@
 #!/usr/bin/env python3
 
 import os
-import time
 import json
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime
 
 import requests
 from requests.exceptions import RequestException
 
+from rate_limiter import get_rate_limiter
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -21,15 +24,82 @@ logging.basicConfig(
 )
 logger = logging.getLogger("discogs_collection")
 
+def embed_collection_releases(collection_data: Dict) -> Dict:
+    """
+    Reassemble crawled collection data in its original single-document shape
+    
+    Releases are read back from the collection's releases file into the
+    "releases" list of their folder, as collection data embedded them before
+    crawls wrote releases incrementally.
+    
+    Args:
+        collection_data: Collection data pointing to a releases file
+        
+    Returns:
+        Collection data with every folder's releases embedded
+    """
+    data = dict(collection_data)
+    releases_path = data.pop("releases_file", None)
+    
+    folders = []
+    folder_releases = {}
+    for folder in data["folders"]:
+        folder = {key: value for key, value in folder.items() if key != "release_count"}
+        folder["releases"] = folder_releases.setdefault(folder["id"], [])
+        folders.append(folder)
+    data["folders"] = folders
+    
+    if releases_path:
+        with open(releases_path, 'r') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                release = json.loads(line)
+                folder_id = release.pop("folder_id", None)
+                release.pop("folder_name", None)
+                folder_releases.setdefault(folder_id, []).append(release)
+    
+    return data
+
+def load_collection(path: str, embed_releases: bool = False) -> Dict:
+    """
+    Load collection data saved by crawl_collection
+    
+    Args:
+        path: Path to the saved collection JSON file
+        embed_releases: Embed each folder's releases from the releases file
+                        (see embed_collection_releases)
+        
+    Returns:
+        Collection data
+    """
+    with open(path, 'r') as f:
+        data = json.load(f)
+    if embed_releases and "releases_file" in data:
+        data = embed_collection_releases(data)
+    return data
+
 class DiscogsCollectionCrawler:
     """Crawler for Discogs user collections"""
     
     BASE_URL = "https://api.discogs.com"
     
-    def __init__(self, config_path: str):
-        """Initialize with configuration file"""
+    def __init__(self, config_path: str, max_workers: int = None):
+        """Initialize with configuration file and the number of concurrent requests"""
         self.config = self._load_config(config_path)
-        self.session = self._create_session()
+        self.max_workers = max_workers or self.config.get("crawl", {}).get("max_workers", 4)
+        
+        # Request budget shared with every other Discogs client
+        throttle = self.config["discogs"].get("throttle", {})
+        self.rate_limiter = get_rate_limiter(
+            throttle.get("state_path"),
+            requests_per_minute=throttle.get("calls_per_minute", 60),
+            burst=throttle.get("burst", 5)
+        )
+        
+        # One session per worker thread; this also validates the credentials
+        self._local = threading.local()
+        self.session
         
         # Create output directory if it doesn't exist
         os.makedirs(self.config["output"]["directory"], exist_ok=True)
@@ -44,6 +114,22 @@ class DiscogsCollectionCrawler:
             "start_time": datetime.now(),
             "end_time": None
         }
+        self._stats_lock = threading.Lock()
+    
+    @property
+    def session(self) -> requests.Session:
+        """This thread's authenticated session"""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._create_session()
+            self.rate_limiter.install(session)
+            self._local.session = session
+        return session
+    
+    def _count(self, stat: str, amount: int = 1):
+        """Increment a crawl statistic from any worker thread"""
+        with self._stats_lock:
+            self.stats[stat] += amount
     
     def _load_config(self, config_path: str) -> Dict:
         """Load configuration from JSON file"""
@@ -72,12 +158,9 @@ class DiscogsCollectionCrawler:
         return session
     
     def _rate_limit(self):
-        """Implement rate limiting"""
-        self.stats["total_requests"] += 1
-        if self.stats["total_requests"] % self.config["discogs"]["throttle"]["calls_per_minute"] == 0:
-            time.sleep(self.config["discogs"]["throttle"]["wait_time"])
-        else:
-            time.sleep(0.1)
+        """Wait for the shared rate limiter before a request"""
+        self._count("total_requests")
+        self.rate_limiter.acquire()
     
     def get_collection_folders(self, username: str) -> List[Dict]:
         """Get all folders in a user's collection"""
@@ -92,14 +175,14 @@ class DiscogsCollectionCrawler:
             data = response.json()
             folders = data.get("folders", [])
             
-            self.stats["successful_requests"] += 1
-            self.stats["folders_crawled"] += len(folders)
+            self._count("successful_requests")
+            self._count("folders_crawled", len(folders))
             
             logger.info(f"Found {len(folders)} folders")
             return folders
             
         except Exception as e:
-            self.stats["failed_requests"] += 1
+            self._count("failed_requests")
             logger.error(f"Error getting folders: {str(e)}")
             return []
     
@@ -131,14 +214,14 @@ class DiscogsCollectionCrawler:
             pagination = data.get("pagination", {})
             has_next = pagination.get("page", 0) < pagination.get("pages", 0)
             
-            self.stats["successful_requests"] += 1
-            self.stats["releases_crawled"] += len(releases)
+            self._count("successful_requests")
+            self._count("releases_crawled", len(releases))
             
             logger.info(f"Found {len(releases)} releases on page {page}")
             return releases, has_next
             
         except Exception as e:
-            self.stats["failed_requests"] += 1
+            self._count("failed_requests")
             logger.error(f"Error getting releases: {str(e)}")
             return [], False
     
@@ -162,12 +245,12 @@ class DiscogsCollectionCrawler:
                     instance["folder_name"] = folder["name"]
                     instances.append(instance)
             
-            self.stats["successful_requests"] += 1
+            self._count("successful_requests")
             logger.info(f"Found {len(instances)} instances")
             return instances
             
         except Exception as e:
-            self.stats["failed_requests"] += 1
+            self._count("failed_requests")
             logger.error(f"Error getting instances: {str(e)}")
             return []
     
@@ -184,12 +267,12 @@ class DiscogsCollectionCrawler:
             data = response.json()
             fields = data.get("fields", [])
             
-            self.stats["successful_requests"] += 1
+            self._count("successful_requests")
             logger.info(f"Found {len(fields)} custom fields")
             return fields
             
         except Exception as e:
-            self.stats["failed_requests"] += 1
+            self._count("failed_requests")
             logger.error(f"Error getting custom fields: {str(e)}")
             return []
     
@@ -203,11 +286,11 @@ class DiscogsCollectionCrawler:
             response = self.session.get(url)
             response.raise_for_status()
             
-            self.stats["successful_requests"] += 1
+            self._count("successful_requests")
             return response.json()
             
         except Exception as e:
-            self.stats["failed_requests"] += 1
+            self._count("failed_requests")
             logger.error(f"Error getting collection value: {str(e)}")
             return None
     
@@ -239,14 +322,32 @@ class DiscogsCollectionCrawler:
             logger.error(f"Error verifying user: {str(e)}")
             return False
     
-    def crawl_collection(self, username: str, sort: str = None, sort_order: str = "asc") -> Dict[str, Any]:
-        """Crawl entire collection for a user"""
+    def crawl_collection(self, username: str, sort: str = None, sort_order: str = "asc",
+                         embed_releases: bool = False) -> Dict[str, Any]:
+        """
+        Crawl entire collection for a user
+        
+        Folder pages and release instances are fetched concurrently under the
+        shared rate limit, with the next page prefetched while the current one
+        is processed. Releases are appended to a JSON Lines file as they
+        complete, and the returned collection data (also saved as JSON)
+        describes the folders and points to that file. With embed_releases
+        the returned and saved data instead embed every folder's releases,
+        as before crawls were incremental (the releases file is kept).
+        """
         logger.info(f"Starting collection crawl for user: {username}")
         
+        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+        releases_path = os.path.join(
+            self.config["output"]["directory"],
+            f"collection_{username}_{timestamp}.jsonl"
+        )
+        
         # Initialize collection data
         collection_data = {
             "username": username,
             "crawl_date": datetime.now().isoformat(),
+            "releases_file": releases_path,
             "folders": [],
             "custom_fields": [],
             "collection_value": None,
@@ -258,71 +359,48 @@ class DiscogsCollectionCrawler:
             if not self.verify_user(username):
                 raise ValueError(f"Unable to access collection for user: {username}")
             
-            # Get custom fields (only if authenticated as owner)
-            try:
-                collection_data["custom_fields"] = self.get_collection_fields(username)
-            except Exception as e:
-                logger.warning(f"Could not get custom fields (requires authentication as owner): {str(e)}")
-            
-            # Get collection value (only if authenticated as owner)
-            try:
-                collection_data["collection_value"] = self.get_collection_value(username)
-            except Exception as e:
-                logger.warning(f"Could not get collection value (requires authentication as owner): {str(e)}")
-            
-            # Get all folders
-            folders = self.get_collection_folders(username)
-            
-            # If no folders found but user exists, try to access the "All" folder (ID 0)
-            if not folders:
-                logger.info("No folders found, trying to access 'All' folder")
-                folders = [{
-                    "id": 0,
-                    "name": "All",
-                    "count": 0  # We'll update this as we fetch releases
-                }]
-            
-            # Crawl each folder
-            for folder in folders:
-                folder_data = {
-                    "id": folder["id"],
-                    "name": folder["name"],
-                    "count": folder["count"],
-                    "releases": []
-                }
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor, \
+                    open(releases_path, 'w') as releases_file:
+                # Owner-only lookups run alongside the folder listing
+                fields_future = executor.submit(self.get_collection_fields, username)
+                value_future = executor.submit(self.get_collection_value, username)
                 
-                # Get all releases in folder with pagination
-                page = 1
-                while True:
-                    releases, has_next = self.get_folder_releases(
-                        username, folder["id"], sort, sort_order, page
-                    )
-                    
-                    # Update folder count for "All" folder
-                    if folder["id"] == 0:
-                        folder_data["count"] += len(releases)
-                    
-                    # Get instances for each release
-                    for release in releases:
-                        try:
-                            release["instances"] = self.get_release_instances(
-                                username, release["id"]
-                            )
-                        except Exception as e:
-                            logger.warning(f"Could not get instances for release {release['id']}: {str(e)}")
-                            release["instances"] = []
-                        
-                        folder_data["releases"].append(release)
+                # Get all folders
+                folders = self.get_collection_folders(username)
+                
+                # If no folders found but user exists, try to access the "All" folder (ID 0)
+                if not folders:
+                    logger.info("No folders found, trying to access 'All' folder")
+                    folders = [{
+                        "id": 0,
+                        "name": "All",
+                        "count": 0  # We'll update this as we fetch releases
+                    }]
+                
+                # Crawl each folder
+                for folder in folders:
+                    folder_data = {
+                        "id": folder["id"],
+                        "name": folder["name"],
+                        "count": folder["count"],
+                        "release_count": 0
+                    }
+                    collection_data["folders"].append(folder_data)
                     
-                    if not has_next:
-                        break
-                    page += 1
+                    self._crawl_folder(executor, username, folder_data, sort, sort_order,
+                                       releases_file, collection_data)
                 
-                collection_data["folders"].append(folder_data)
-                collection_data["total_releases"] += len(folder_data["releases"])
+                # Get custom fields and collection value (only if authenticated as owner)
+                collection_data["custom_fields"] = fields_future.result()
+                collection_data["collection_value"] = value_future.result()
+            
+            self.stats["end_time"] = datetime.now()
+            
+            if embed_releases:
+                collection_data = embed_collection_releases(collection_data)
             
             # Save collection data
-            self._save_collection_data(username, collection_data)
+            self._save_collection_data(username, timestamp, collection_data)
             
             # Generate summary
             self._generate_crawl_summary(username, collection_data)
@@ -331,19 +409,64 @@ class DiscogsCollectionCrawler:
             
         except Exception as e:
             logger.error(f"Error crawling collection: {str(e)}")
-            # Still try to save what we got
+            # Releases are already on disk; still try to describe what we got
             if collection_data["folders"] or collection_data["total_releases"] > 0:
-                self._save_collection_data(username, collection_data)
+                self.stats["end_time"] = datetime.now()
+                if embed_releases and "releases_file" in collection_data:
+                    collection_data = embed_collection_releases(collection_data)
+                self._save_collection_data(username, timestamp, collection_data)
                 self._generate_crawl_summary(username, collection_data)
             raise
         finally:
             self.stats["end_time"] = datetime.now()
     
-    def _save_collection_data(self, username: str, data: Dict):
+    def _crawl_folder(self, executor: ThreadPoolExecutor, username: str, folder_data: Dict,
+                      sort: Optional[str], sort_order: str, releases_file, collection_data: Dict):
+        """Fetch every page of a folder, hydrating and writing releases as they complete"""
+        page = 1
+        page_future = executor.submit(
+            self.get_folder_releases, username, folder_data["id"], sort, sort_order, page
+        )
+        
+        while page_future is not None:
+            releases, has_next = page_future.result()
+            
+            # Prefetch the next page while this one is hydrated
+            page += 1
+            page_future = executor.submit(
+                self.get_folder_releases, username, folder_data["id"], sort, sort_order, page
+            ) if has_next else None
+            
+            # Update folder count for "All" folder
+            if folder_data["id"] == 0:
+                folder_data["count"] += len(releases)
+            
+            # Get instances for each release
+            instance_futures = [
+                (release, executor.submit(self.get_release_instances, username, release["id"]))
+                for release in releases
+            ]
+            
+            for release, future in instance_futures:
+                try:
+                    release["instances"] = future.result()
+                except Exception as e:
+                    logger.warning(f"Could not get instances for release {release['id']}: {str(e)}")
+                    release["instances"] = []
+                
+                record = dict(release, folder_id=folder_data["id"], folder_name=folder_data["name"])
+                releases_file.write(json.dumps(record) + "\n")
+                folder_data["release_count"] += 1
+                collection_data["total_releases"] += 1
+            
+            # Keep the file usable if the crawl is interrupted
+            releases_file.flush()
+    
+    def _save_collection_data(self, username: str, timestamp: str, data: Dict):
         """Save collection data to file"""
         output_path = os.path.join(
             self.config["output"]["directory"],
-            f"collection_{username}_{datetime.now().strftime('%Y%m%d%H%M%S')}.json"
+            f"collection_{username}_{timestamp}.json"
         )
         
         try:
@@ -384,7 +507,8 @@ class DiscogsCollectionCrawler:
         
         summary += "\n## Folders\n"
         for folder in data["folders"]:
-            summary += f"- **{folder['name']}**: {len(folder['releases'])} releases\n"
+            release_count = len(folder["releases"]) if "releases" in folder else folder["release_count"]
+            summary += f"- **{folder['name']}**: {release_count} releases\n"
         
         if data["custom_fields"]:
             summary += "\n## Custom Fields\n"
@@ -416,11 +540,14 @@ def main():
     parser.add_argument("--sort", help="Sort releases by field")
     parser.add_argument("--sort-order", default="asc", choices=["asc", "desc"],
                        help="Sort order (asc or desc)")
+    parser.add_argument("--workers", type=int, help="Number of concurrent requests")
+    parser.add_argument("--embed-releases", action="store_true",
+                       help="Embed releases in the saved collection JSON instead of pointing to the releases file")
     args = parser.parse_args()
     
     try:
-        crawler = DiscogsCollectionCrawler(args.config)
-        crawler.crawl_collection(args.username, args.sort, args.sort_order)
+        crawler = DiscogsCollectionCrawler(args.config, args.workers)
+        crawler.crawl_collection(args.username, args.sort, args.sort_order, args.embed_releases)
         return 0
     except Exception as e:
         logger.error(f"Crawl failed: {str(e)}")
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Durable crawl state for the Discogs bulk pull scripts
+This module records, in a small SQLite file, how far a bulk pull has paged
+through each category and which releases it has discovered and finished,
+so an interrupted pull can resume without repeating completed work or
+re-spending the rate budget on it.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+
+class CrawlState:
+    """
+    Per-category page checkpoints and the set of discovered releases.
+
+    A release is recorded when the page listing it is checkpointed and
+    marked processed once its output has been written. Releases recorded
+    but not processed are the ones an interrupted pull still owes.
+    """
+
+    def __init__(self, state_path: str):
+        """
+        Initialize the crawl state.
+
+        Args:
+            state_path: Path to the SQLite file holding the state
+        """
+        self.state_path = state_path
+        self._local = threading.local()
+
+        with self._transaction() as cursor:
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS crawl_progress (
+                category TEXT NOT NULL,
+                value TEXT NOT NULL,
+                last_page INTEGER NOT NULL DEFAULT 0,
+                items INTEGER NOT NULL DEFAULT 0,
+                completed INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (category, value)
+            )
+            ''')
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS crawl_releases (
+                release_id INTEGER PRIMARY KEY,
+                context TEXT,
+                processed INTEGER NOT NULL DEFAULT 0
+            )
+            ''')
+            cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_crawl_releases_pending
+            ON crawl_releases (processed)
+            ''')
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Get this thread's connection, reopening it after a fork."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.state_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Cursor]:
+        """Run the block as one write transaction."""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            yield cursor
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+
+    def get_progress(self, category: str, value: str) -> Dict[str, Any]:
+        """
+        Get the checkpoint of a category.
+
+        Args:
+            category: Kind of category, e.g. "genre"
+            value: Category value, e.g. "Rock"
+
+        Returns:
+            Dictionary with last_page, items and completed
+        """
+        cursor = self._get_connection().execute('''
+        SELECT last_page, items, completed
+        FROM crawl_progress
+        WHERE category = ? AND value = ?
+        ''', (category, str(value)))
+        row = cursor.fetchone()
+
+        if row is None:
+            return {"last_page": 0, "items": 0, "completed": False}
+        return {"last_page": row[0], "items": row[1], "completed": bool(row[2])}
+
+    def record_page(self, category: str, value: str, page: int, items: int,
+                    releases: Iterable[Tuple[int, Dict[str, Any]]] = ()) -> List[Tuple[int, Dict[str, Any]]]:
+        """
+        Checkpoint a page and record the releases it listed, atomically.
+
+        Args:
+            category: Kind of category
+            value: Category value
+            page: Page just handled
+            items: Items counted for the category so far
+            releases: (release_id, context) pairs listed on the page
+
+        Returns:
+            The pairs whose releases had not been recorded before
+        """
+        new_releases = []
+        with self._transaction() as cursor:
+            for release_id, context in releases:
+                cursor.execute('''
+                INSERT OR IGNORE INTO crawl_releases (release_id, context)
+                VALUES (?, ?)
+                ''', (release_id, json.dumps(context)))
+                if cursor.rowcount:
+                    new_releases.append((release_id, context))
+
+            cursor.execute('''
+            INSERT INTO crawl_progress (category, value, last_page, items, completed, updated_at)
+            VALUES (?, ?, ?, ?, 0, ?)
+            ON CONFLICT (category, value) DO UPDATE SET
+                last_page = excluded.last_page, items = excluded.items, updated_at = excluded.updated_at
+            ''', (category, str(value), page, items, time.time()))
+
+        return new_releases
+
+    def complete(self, category: str, value: str, items: int):
+        """
+        Mark a category as fully crawled.
+
+        Args:
+            category: Kind of category
+            value: Category value
+            items: Items counted for the category
+        """
+        with self._transaction() as cursor:
+            cursor.execute('''
+            INSERT INTO crawl_progress (category, value, items, completed, updated_at)
+            VALUES (?, ?, ?, 1, ?)
+            ON CONFLICT (category, value) DO UPDATE SET
+                items = excluded.items, completed = 1, updated_at = excluded.updated_at
+            ''', (category, str(value), items, time.time()))
+
+    def mark_processed(self, release_ids: Iterable[int]):
+        """
+        Mark releases whose output has been written.
+
+        Args:
+            release_ids: Discogs release IDs
+        """
+        with self._transaction() as cursor:
+            cursor.executemany('''
+            INSERT INTO crawl_releases (release_id, processed)
+            VALUES (?, 1)
+            ON CONFLICT (release_id) DO UPDATE SET processed = 1
+            ''', [(release_id,) for release_id in release_ids])
+
+    def pending_releases(self) -> List[Tuple[int, Dict[str, Any]]]:
+        """
+        Get the releases recorded but not yet processed.
+
+        Returns:
+            (release_id, context) pairs ordered by release ID
+        """
+        cursor = self._get_connection().execute('''
+        SELECT release_id, context
+        FROM crawl_releases
+        WHERE processed = 0
+        ORDER BY release_id
+        ''')
+        return [(release_id, json.loads(context) if context else {})
+                for release_id, context in cursor.fetchall()]
+
+    def processed_count(self) -> int:
+        """
+        Count the releases processed so far.
+
+        Returns:
+            Number of processed releases
+        """
+        cursor = self._get_connection().execute(
+            "SELECT COUNT(*) FROM crawl_releases WHERE processed = 1"
+        )
+        return cursor.fetchone()[0]
+
+    def reset(self):
+        """Forget all progress, so the next pull starts over."""
+        with self._transaction() as cursor:
+            cursor.execute("DELETE FROM crawl_progress")
+            cursor.execute("DELETE FROM crawl_releases")
+
+    def close(self):
+        """Close this thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
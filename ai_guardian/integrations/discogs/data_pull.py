@@ -21,16 +21,20 @@ Configuration is loaded from config.json and should include:
 - max_items_per_category: Maximum items to pull per category
 - output_directory: Directory to store the output data
 - privacy_settings: Configuration for privacy controls
+- crawl_state_path: Optional path of the checkpoint file (defaults to
+  crawl_state.db in the output directory)
+
+Progress is checkpointed after every page, so a pull interrupted part way
+can be resumed with --resume: releases already saved are not pulled again
+and each category continues after its last page.
 
 Usage:
-    python data_pull.py
+    python data_pull.py [config.json] [--resume]
 """
 
 import os
 import json
-import time
 import logging
-import random
 import hashlib
 import requests
 from datetime import datetime, timedelta
@@ -44,6 +48,8 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '../../..'))
 from ai_guardian.src.rights_guardian import RightsGuardian, MusicRight
 from ai_guardian.scripts.privacy_layer import PrivacyLayer
 from ai_guardian.scripts.zk_proofs import ZKProofSystem
+from ai_guardian.integrations.discogs.rate_limiter import get_rate_limiter
+from ai_guardian.integrations.discogs.crawl_state import CrawlState
 
 # Set up logging
 logging.basicConfig(
@@ -61,9 +67,10 @@ class DiscogsBulkDataPull:
     
     DISCOGS_API_BASE = "https://api.discogs.com"
     
-    def __init__(self, config_path: str = "config.json"):
-        """Initialize with path to configuration file."""
+    def __init__(self, config_path: str = "config.json", resume: bool = False):
+        """Initialize with path to configuration file, optionally resuming the last pull."""
         self.config_path = config_path
+        self.resume = resume
         self.config = self.load_config()
         self.token = self.config.get("discogs_token")
         self.session = requests.Session()
@@ -72,6 +79,10 @@ class DiscogsBulkDataPull:
             "Authorization": f"Discogs token={self.token}"
         })
         
+        # Request budget shared with every other Discogs client
+        self.rate_limiter = get_rate_limiter(self.config.get("rate_limit_state_path"))
+        self.rate_limiter.install(self.session)
+        
         # Initialize MESA Rights Vault components
         self.rights_guardian = RightsGuardian()
         self.privacy_layer = PrivacyLayer()
@@ -84,11 +95,18 @@ class DiscogsBulkDataPull:
         )
         os.makedirs(self.output_dir, exist_ok=True)
         
+        # Checkpoints of the pull, so it can be resumed
+        self.crawl_state = CrawlState(
+            self.config.get("crawl_state_path") or os.path.join(self.output_dir, "crawl_state.db")
+        )
+        
         # Stats tracking
         self.stats = {
             "total_api_calls": 0,
             "total_releases_processed": 0,
             "total_rights_entries_created": 0,
+            "resumed": resume,
+            "skipped_releases": 0,
             "genres_processed": {},
             "artists_processed": {},
             "years_processed": {},
@@ -111,6 +129,16 @@ class DiscogsBulkDataPull:
         try:
             logger.info("Starting Discogs data pull")
             
+            if self.resume:
+                # Finish releases an interrupted pull found but did not save
+                pending = self.crawl_state.pending_releases()
+                logger.info(f"Resuming pull with {len(pending)} pending releases")
+                for _, context in pending:
+                    self._process_releases_batch([context["release"]], metadata_category=context["category"],
+                                                 metadata_value=context["value"])
+            else:
+                self.crawl_state.reset()
+            
             # Pull by genres if configured
             if self.config.get("genres"):
                 self.pull_by_genres(self.config["genres"])
@@ -140,7 +168,12 @@ class DiscogsBulkDataPull:
         logger.info(f"Pulling data for {len(genres)} genres")
         
         for genre in genres:
-            self.stats["genres_processed"][genre] = 0
+            progress = self.crawl_state.get_progress("genre", genre)
+            self.stats["genres_processed"][genre] = progress["items"]
+            if progress["completed"]:
+                logger.info(f"Skipping genre {genre}, already pulled")
+                continue
+            
             logger.info(f"Processing genre: {genre}")
             
             try:
@@ -164,7 +197,12 @@ class DiscogsBulkDataPull:
         logger.info(f"Pulling data for {len(artists)} artists")
         
         for artist in artists:
-            self.stats["artists_processed"][artist] = 0
+            progress = self.crawl_state.get_progress("artist", artist)
+            self.stats["artists_processed"][artist] = progress["items"]
+            if progress["completed"]:
+                logger.info(f"Skipping artist {artist}, already pulled")
+                continue
+            
             logger.info(f"Processing artist: {artist}")
             
             try:
@@ -200,7 +238,12 @@ class DiscogsBulkDataPull:
         logger.info(f"Pulling data for {len(years)} years")
         
         for year in years:
-            self.stats["years_processed"][year] = 0
+            progress = self.crawl_state.get_progress("year", year)
+            self.stats["years_processed"][year] = progress["items"]
+            if progress["completed"]:
+                logger.info(f"Skipping year {year}, already pulled")
+                continue
+            
             logger.info(f"Processing year: {year}")
             
             try:
@@ -224,13 +267,8 @@ class DiscogsBulkDataPull:
         try:
             self.stats["total_api_calls"] += 1
             
-            # Check if we need to rate limit
-            if self.stats["total_api_calls"] > 1 and self.stats["total_api_calls"] % 25 == 0:
-                logger.info("Rate limiting: sleeping for 60 seconds")
-                time.sleep(60)
-            else:
-                # Small pause between requests
-                time.sleep(random.uniform(1.0, 2.0))
+            # Wait for the request budget shared with every other Discogs client
+            self.rate_limiter.acquire()
             
             response = self.session.get(url, params=params)
             response.raise_for_status()
@@ -239,24 +277,28 @@ class DiscogsBulkDataPull:
         except requests.RequestException as e:
             logger.error(f"API request error: {e}")
             
-            # Handle rate limiting
-            if hasattr(e, "response") and e.response and e.response.status_code == 429:
-                retry_after = int(e.response.headers.get("Retry-After", 60))
-                logger.info(f"Rate limited. Waiting for {retry_after} seconds")
-                time.sleep(retry_after)
+            # Handle rate limiting; the rate limiter has already paused for Retry-After
+            if getattr(e, "response", None) is not None and e.response.status_code == 429:
                 return self._make_api_request(url, params)
             
             return {}
 
     def _paginated_request(self, url: str, params: Dict[str, Any], category: str, category_value: str) -> List[Dict[str, Any]]:
-        """Make paginated requests to get all items up to max_items_per_category."""
+        """Make paginated requests to get the items not pulled before, up to max_items_per_category."""
         all_items = []
-        page = 1
         max_items = self.config.get("max_items_per_category", 100)
         
-        while len(all_items) < max_items:
+        # Continue after the last checkpointed page
+        progress = self.crawl_state.get_progress(category, category_value)
+        page = progress["last_page"] + 1
+        item_count = progress["items"]
+        exhausted = False
+        
+        while item_count < max_items:
             params["page"] = page
             response = self._make_api_request(url, params)
+            if not response:
+                break
             
             # Extract results based on response structure
             if "results" in response:
@@ -267,30 +309,40 @@ class DiscogsBulkDataPull:
                 items = []
             
             if not items:
+                exhausted = True
                 break
-                
-            all_items.extend(items)
+            
+            # Check if we've reached our limit
+            items = items[:max_items - item_count]
+            item_count += len(items)
+            
+            # Checkpoint the page, keeping only releases not seen before
+            listed = [(item["id"], {"category": category, "value": category_value, "release": item})
+                      for item in items if item.get("id")]
+            new_ids = {release_id for release_id, _ in
+                       self.crawl_state.record_page(category, category_value, page, item_count, listed)}
+            self.stats["skipped_releases"] += len(listed) - len(new_ids)
+            all_items.extend(item for item in items if not item.get("id") or item["id"] in new_ids)
             
             # Update category stats
             if category == "genre":
-                self.stats["genres_processed"][category_value] = len(all_items)
+                self.stats["genres_processed"][category_value] = item_count
             elif category == "artist":
-                self.stats["artists_processed"][category_value] = len(all_items)
+                self.stats["artists_processed"][category_value] = item_count
             elif category == "year":
-                self.stats["years_processed"][category_value] = len(all_items)
+                self.stats["years_processed"][category_value] = item_count
             
             # Check if there are more pages
             if not response.get("pagination", {}).get("urls", {}).get("next"):
+                exhausted = True
                 break
                 
             page += 1
-            
-            # Check if we've reached our limit
-            if len(all_items) >= max_items:
-                all_items = all_items[:max_items]
-                break
         
-        logger.info(f"Retrieved {len(all_items)} items for {category}: {category_value}")
+        if exhausted or item_count >= max_items:
+            self.crawl_state.complete(category, category_value, item_count)
+        
+        logger.info(f"Retrieved {len(all_items)} new items for {category}: {category_value}")
         return all_items
 
     def _process_releases_batch(self, releases: List[Dict[str, Any]], metadata_category: str, metadata_value: str):
@@ -310,8 +362,9 @@ class DiscogsBulkDataPull:
                 rights_entry = self._convert_to_rights_entry(release, metadata_category, metadata_value)
                 
                 if rights_entry:
-                    # Apply privacy controls
-                    self._apply_privacy_controls(rights_entry)
+                    # Apply privacy controls; a release whose entry was not saved stays pending
+                    if self._apply_privacy_controls(rights_entry) and release_id:
+                        self.crawl_state.mark_processed([release_id])
                     
                     self.stats["total_releases_processed"] += 1
                     self.stats["total_rights_entries_created"] += 1
@@ -464,8 +517,9 @@ class DiscogsBulkDataPull:
 
 if __name__ == "__main__":
     # Get configuration file path from command line or use default
-    config_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), "config.json")
+    args = [arg for arg in sys.argv[1:] if arg != "--resume"]
+    config_path = args[0] if args else os.path.join(os.path.dirname(__file__), "config.json")
     
-    # Initialize and run data pull
-    data_puller = DiscogsBulkDataPull(config_path)
+    # Initialize and run data pull, resuming the last one if asked to
+    data_puller = DiscogsBulkDataPull(config_path, resume="--resume" in sys.argv[1:])
     data_puller.pull_data() 
\ No newline at end of file
@@ -11,13 +11,20 @@ import os
 import json
 import time
 import logging
+import threading
 import requests
-from typing import Dict, List, Any, Optional, Union
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, List, Any, Optional, Union, Iterator, Tuple
 from datetime import datetime
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.primitives import padding, hashes
 from cryptography.hazmat.backends import default_backend
 
+try:
+    from .rate_limiter import get_rate_limiter
+except ImportError:
+    from rate_limiter import get_rate_limiter
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -33,9 +40,10 @@ class DiscogsConnector:
     """
     
     BASE_URL = "https://api.discogs.com"
-    RATE_LIMIT_WINDOW = 60  # Discogs rate limits per minute
+    MAX_RETRIES = 3  # Retries after a 429 response
     
-    def __init__(self, user_token: str = None, user_agent: str = None, config_path: str = None):
+    def __init__(self, user_token: str = None, user_agent: str = None, config_path: str = None,
+                 db=None, max_workers: int = None):
         """
         Initialize the Discogs connector with authentication details.
         
@@ -43,18 +51,31 @@ class DiscogsConnector:
             user_token: Personal access token for Discogs API
             user_agent: User-Agent string for API requests
             config_path: Path to configuration file
+            db: Optional DiscogsDatabase checked for releases before the API
+                and updated with the releases fetched from it
+            max_workers: Maximum number of concurrent API requests made by
+                         batch lookups
         """
         self.config = self._load_config(config_path)
         self.user_token = user_token or self.config.get("user_token")
         self.user_agent = user_agent or self.config.get("user_agent", "MESARightsVault/1.0")
-        self.request_count = 0
-        self.last_request_time = time.time()
-        self.session = requests.Session()
-        self.session.headers.update({
-            "User-Agent": self.user_agent,
-            "Authorization": f"Discogs token={self.user_token}",
-            "Content-Type": "application/json"
-        })
+        self.db = db
+        self.max_workers = max_workers or self.config.get("max_workers", 4)
+        
+        # Request budget shared with every other Discogs client
+        rate_limit_config = self.config.get("rate_limit", {})
+        self.rate_limiter = get_rate_limiter(
+            rate_limit_config.get("state_path"),
+            requests_per_minute=rate_limit_config.get("requests_per_minute", 60),
+            burst=rate_limit_config.get("burst", 5)
+        )
+        
+        # One session per thread, so batch lookups can share the connector
+        self._local = threading.local()
+        
+        # Worker pool shared by every batch lookup, created on first use
+        self._executor = None
+        self._executor_lock = threading.Lock()
         
         # Load mapping configuration
         self.field_mappings = self.config.get("field_mappings", {})
@@ -64,6 +85,36 @@ class DiscogsConnector:
         
         logger.info("Discogs connector initialized")
         
+    @property
+    def session(self) -> requests.Session:
+        """This thread's authenticated session."""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update({
+                "User-Agent": self.user_agent,
+                "Authorization": f"Discogs token={self.user_token}",
+                "Content-Type": "application/json"
+            })
+            self.rate_limiter.install(session)
+            self._local.session = session
+        return session
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Get the connector's worker pool, creating it on first use."""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix="discogs-connector")
+            return self._executor
+    
+    def close(self):
+        """Shut down the worker pool used by batch lookups."""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=True)
+    
     def _load_config(self, config_path: str = None) -> Dict:
         """Load configuration from a JSON file."""
         if not config_path:
@@ -83,25 +134,6 @@ class DiscogsConnector:
             logger.error(f"Error loading config: {e}")
             return {}
         
-    def _rate_limit_check(self):
-        """Handle rate limiting for Discogs API."""
-        current_time = time.time()
-        elapsed = current_time - self.last_request_time
-        
-        # If we've made requests in the current window, check timing
-        if self.request_count > 0 and elapsed < self.RATE_LIMIT_WINDOW:
-            # If approaching rate limit, sleep
-            if self.request_count >= 25:  # Discogs limit is 60 per minute for authenticated requests
-                sleep_time = self.RATE_LIMIT_WINDOW - elapsed + 1
-                logger.info(f"Rate limit approaching, sleeping for {sleep_time:.2f}s")
-                time.sleep(sleep_time)
-                self.request_count = 0
-                self.last_request_time = time.time()
-        # Reset counter if window has passed
-        elif elapsed >= self.RATE_LIMIT_WINDOW:
-            self.request_count = 0
-            self.last_request_time = current_time
-    
     def _make_request(self, endpoint: str, method: str = "GET", params: Dict = None, data: Dict = None) -> Dict:
         """
         Make a request to the Discogs API with rate limiting handling.
@@ -115,20 +147,23 @@ class DiscogsConnector:
         Returns:
             Dictionary containing the API response
         """
-        self._rate_limit_check()
-        
         url = f"{self.BASE_URL}/{endpoint.lstrip('/')}"
         try:
-            self.request_count += 1
-            
-            if method == "GET":
-                response = self.session.get(url, params=params)
-            elif method == "POST":
-                response = self.session.post(url, params=params, json=data)
-            elif method == "PUT":
-                response = self.session.put(url, params=params, json=data)
-            else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
+            for _ in range(self.MAX_RETRIES + 1):
+                # Waits out the shared bucket, including any 429 back-off
+                self.rate_limiter.acquire()
+                
+                if method == "GET":
+                    response = self.session.get(url, params=params)
+                elif method == "POST":
+                    response = self.session.post(url, params=params, json=data)
+                elif method == "PUT":
+                    response = self.session.put(url, params=params, json=data)
+                else:
+                    raise ValueError(f"Unsupported HTTP method: {method}")
+                
+                if response.status_code != 429:
+                    break
             
             response.raise_for_status()
             return response.json()
@@ -407,7 +442,125 @@ class DiscogsConnector:
         Returns:
             Dictionary with matching metadata and privacy-preserving references
         """
-        # Build query string
+        return self.find_rights_metadata_batch([search_params])[0]
+    
+    def find_rights_metadata_batch(self, search_params_list: List[Dict], limit: int = 5) -> List[Dict]:
+        """
+        Search for music rights metadata for many parameter sets at once.
+        
+        Args:
+            search_params_list: Search parameter dictionaries (title, artist, etc.)
+            limit: Maximum number of matches hydrated per search
+            
+        Returns:
+            One find_rights_metadata result per parameter set, in order
+        """
+        summaries = {}
+        results = {index: [] for index in range(len(search_params_list))}
+        
+        for index, rank, result in self._stream_rights_metadata(search_params_list, limit, summaries):
+            results[index].append((rank, result))
+        
+        batch = []
+        for index, search_params in enumerate(search_params_list):
+            query, total_results = summaries.get(index, (self._build_search_query(search_params), 0))
+            batch.append({
+                "query": query,
+                "total_results": total_results,
+                "results": [result for _, result in sorted(results[index], key=lambda item: item[0])]
+            })
+        return batch
+    
+    def iter_rights_metadata(self, search_params_list: List[Dict], limit: int = 5) -> Iterator[Tuple[int, Dict]]:
+        """
+        Stream rights metadata matches as soon as each one is hydrated.
+        
+        Args:
+            search_params_list: Search parameter dictionaries (title, artist, etc.)
+            limit: Maximum number of matches hydrated per search
+            
+        Yields:
+            Tuples of (index into search_params_list, match), in completion order
+        """
+        for index, _, result in self._stream_rights_metadata(search_params_list, limit, {}):
+            yield index, result
+    
+    def _stream_rights_metadata(self, search_params_list: List[Dict], limit: int,
+                                summaries: Dict) -> Iterator[Tuple[int, int, Dict]]:
+        """
+        Run searches and hydrate their matches concurrently.
+        
+        Searches and release lookups share the connector's bounded worker
+        pool, and every request goes through the shared rate limiter. Each
+        release is only hydrated once per batch, and releases already in the
+        database skip the API entirely. Matches are mapped and encrypted on the calling
+        thread as their release arrives.
+        
+        Args:
+            search_params_list: Search parameter dictionaries
+            limit: Maximum number of matches hydrated per search
+            summaries: Filled with (query, total results) per search index
+            
+        Yields:
+            Tuples of (search index, search rank, match) in completion order
+        """
+        executor = self._get_executor()
+        pending = {}
+        releases = {}
+        waiting = {}
+        
+        try:
+            for index, search_params in enumerate(search_params_list):
+                query = self._build_search_query(search_params)
+                summaries[index] = (query, 0)
+                pending[executor.submit(self.search_releases, query)] = ("search", index)
+            
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    kind, key = pending.pop(future)
+                    
+                    if kind == "search":
+                        try:
+                            search_results = future.result()
+                        except Exception as e:
+                            logger.error(f"Error searching for rights metadata: {e}")
+                            continue
+                        summaries[key] = (summaries[key][0],
+                                          search_results.get("pagination", {}).get("items", 0))
+                        
+                        hits = [hit.get("id") for hit in search_results.get("results", [])[:limit]]
+                        for rank, release_id in enumerate(hits):
+                            if not release_id:
+                                continue
+                            if release_id in releases:
+                                result = self._build_rights_result(releases[release_id], release_id,
+                                                                   search_params_list[key])
+                                yield key, rank, result
+                                continue
+                            if release_id not in waiting:
+                                waiting[release_id] = []
+                                pending[executor.submit(self._get_release_data, release_id)] = ("release", release_id)
+                            waiting[release_id].append((key, rank))
+                        continue
+                    
+                    try:
+                        releases[key] = future.result()
+                    except Exception as e:
+                        logger.error(f"Error hydrating release {key}: {e}")
+                        waiting.pop(key, None)
+                        continue
+                    
+                    for index, rank in waiting.pop(key):
+                        yield index, rank, self._build_rights_result(releases[key], key,
+                                                                     search_params_list[index])
+        finally:
+            # Stop outstanding work when the caller abandons the stream
+            for future in pending:
+                future.cancel()
+    
+    def _build_search_query(self, search_params: Dict) -> str:
+        """Build a Discogs search query string from search parameters."""
         query_parts = []
         
         if "title" in search_params:
@@ -421,44 +574,47 @@ class DiscogsConnector:
             
         if "year" in search_params:
             query_parts.append(f"year:{search_params['year']}")
-            
-        # Execute search
-        query = " ".join(query_parts)
-        search_results = self.search_releases(query)
-        
-        # Process results
-        processed_results = []
-        for result in search_results.get("results", [])[:5]:  # Limit to top 5 matches
-            release_id = result.get("id")
-            if release_id:
-                # Get detailed release data
-                release_data = self.get_release(release_id)
-                
-                # Map to MESA schema
-                mesa_data = self.map_to_mesa_schema(release_data, "release")
-                
-                # Create privacy-preserving references
-                reference_id = self._hash_identifier(f"discogs:release:{release_id}")
-                
-                # Encrypt full data for secure storage
-                encrypted_data = self._encrypt_data(mesa_data)
-                
-                processed_results.append({
-                    "reference_id": reference_id,
-                    "match_score": self._calculate_match_score(mesa_data, search_params),
-                    "preview": {
-                        "title": mesa_data.get("workTitle"),
-                        "artist": ", ".join([a.get("name", "") for a in mesa_data.get("artistParty", [])]),
-                        "year": mesa_data.get("releaseDate", "")[:4] if mesa_data.get("releaseDate") else "",
-                        "label": ", ".join([l.get("name", "") for l in mesa_data.get("publisherParty", [])])
-                    },
-                    "encrypted_data": encrypted_data
-                })
+        
+        # Identifier lookups (barcode, catalog number, ...)
+        if "value" in search_params:
+            query_parts.append(str(search_params["value"]))
+        
+        return " ".join(query_parts)
+    
+    def _get_release_data(self, release_id: int) -> Dict:
+        """Get release data from the database if present, otherwise from the API."""
+        if self.db is not None:
+            release_data = self.db.get_release(release_id)
+            if release_data:
+                return release_data
+        
+        release_data = self.get_release(release_id)
+        
+        if self.db is not None:
+            self.db.save_release(release_data)
+        return release_data
+    
+    def _build_rights_result(self, release_data: Dict, release_id: int, search_params: Dict) -> Dict:
+        """Map a hydrated release to a privacy-preserving rights metadata match."""
+        # Map to MESA schema
+        mesa_data = self.map_to_mesa_schema(release_data, "release")
+        
+        # Create privacy-preserving references
+        reference_id = self._hash_identifier(f"discogs:release:{release_id}")
+        
+        # Encrypt full data for secure storage
+        encrypted_data = self._encrypt_data(mesa_data)
         
         return {
-            "query": query,
-            "total_results": search_results.get("pagination", {}).get("items", 0),
-            "results": processed_results
+            "reference_id": reference_id,
+            "match_score": self._calculate_match_score(mesa_data, search_params),
+            "preview": {
+                "title": mesa_data.get("workTitle"),
+                "artist": ", ".join([a.get("name", "") for a in mesa_data.get("artistParty", [])]),
+                "year": mesa_data.get("releaseDate", "")[:4] if mesa_data.get("releaseDate") else "",
+                "label": ", ".join([l.get("name", "") for l in mesa_data.get("publisherParty", [])])
+            },
+            "encrypted_data": encrypted_data
         }
     
     def _calculate_match_score(self, mesa_data: Dict, search_params: Dict) -> int:
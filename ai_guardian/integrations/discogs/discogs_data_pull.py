@@ -9,16 +9,18 @@ Features:
 - Pulls data based on genres, artists, and/or years
 - Implements rate limiting to respect Discogs API limits
 - Applies privacy controls to the pulled data
-- Saves rights entries in JSON format with privacy metadata
+- Runs fetching, rights-entry generation and writing as a staged pipeline
+- Checkpoints its progress so an interrupted pull can be resumed
+- Saves rights entries as JSON Lines or SQLite with privacy metadata
 - Generates statistics about the data pull operation
 
 Dependencies:
 - requests: For API calls
-- tqdm: For progress bars
+- tqdm: For progress bars (optional)
 - Proper Discogs API token in config file
 
 Usage:
-    python discogs_data_pull.py --config config.json
+    python discogs_data_pull.py --config config.json [--resume]
 
 Configuration file (config.json) format:
 {
@@ -29,6 +31,14 @@ Configuration file (config.json) format:
     "batch_size": 100,
     "max_items_per_category": 1000,
     "output_dir": "discogs_data",
+    "pipeline": {
+        "fetch_workers": 2,
+        "transform_workers": 4,
+        "queue_size": 256,
+        "sink": "jsonl",
+        "sink_batch_size": 500,
+        "sink_flush_interval": 1.0
+    },
     "privacy_settings": {
         "enable_zk_proofs": true,
         "public_fields": ["rightId", "workTitle", "territory"],
@@ -39,6 +49,28 @@ Configuration file (config.json) format:
         }
     }
 }
+
+Pipeline:
+    Release ids found by the genre, artist and year searches flow through
+    three stages joined by bounded queues, so a slow stage holds back the
+    ones before it instead of buffering without limit:
+
+    1. fetch: fetch_workers threads download release details, sharing the
+       Discogs rate limit
+    2. transform: a pool of transform_workers processes builds and encrypts
+       the rights entries (0 runs this stage on a thread)
+    3. sink: one thread writes entries in batches to rights_entries.jsonl
+       ("jsonl") or rights_entries.db ("sqlite") in the output directory
+
+    Per-stage throughput is saved under "pipeline" in data_pull_stats.json.
+
+Resuming:
+    The last page pulled for each genre, artist and year, and every release
+    found and written, are checkpointed in crawl_state.db in the output
+    directory (or "crawl_state_path"). With --resume, releases found but not
+    yet written are pulled first, finished categories are skipped, the others
+    continue after their last page, and no release is pulled twice. Without
+    it the checkpoints are cleared and the pull starts over.
 """
 
 import os
@@ -46,14 +78,27 @@ import sys
 import json
 import time
 import uuid
+import queue
 import random
 import logging
+import sqlite3
 import argparse
 import datetime
+import threading
+import multiprocessing
 import requests
+from concurrent.futures import Future, ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Any, Tuple, Optional, Set
-from tqdm import tqdm
+from typing import Dict, List, Any, Tuple, Optional, Set, Iterator
+
+try:
+    from tqdm import tqdm
+    TQDM_AVAILABLE = True
+except ImportError:
+    TQDM_AVAILABLE = False
+
+from rate_limiter import get_rate_limiter
+from crawl_state import CrawlState
 
 # Add parent directory to path for importing privacy layer
 sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "scripts"))
@@ -77,12 +122,351 @@ logging.basicConfig(
 )
 logger = logging.getLogger("discogs_data_pull")
 
+DEFAULT_PIPELINE_SETTINGS = {
+    "fetch_workers": 2,
+    "transform_workers": None,  # One per CPU
+    "queue_size": 256,
+    "sink": "jsonl",
+    "sink_batch_size": 500,
+    "sink_flush_interval": 1.0
+}
+
+RIGHTS_JSONL_FILE = "rights_entries.jsonl"
+RIGHTS_DB_FILE = "rights_entries.db"
+
+# Queue item marking the end of a stage's input
+_STOP = None
+
+# Privacy state of a transform worker process, set by _init_transform_worker
+_worker_privacy_layer = None
+_worker_privacy_settings = {}
+
+class _SilentProgress:
+    """Stand-in for a tqdm progress bar when tqdm is not installed"""
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        return False
+    
+    def update(self, n: int = 1) -> None:
+        pass
+
+def _progress(total: int, initial: int, desc: str):
+    """Progress bar for a category pull"""
+    if TQDM_AVAILABLE:
+        return tqdm(total=total, initial=initial, desc=desc)
+    return _SilentProgress()
+
+def _init_transform_worker(privacy_settings: Dict[str, Any], master_key: Optional[bytes]) -> None:
+    """Set up a transform worker, sharing the parent's encryption key"""
+    global _worker_privacy_layer, _worker_privacy_settings
+    _worker_privacy_settings = privacy_settings or {}
+    _worker_privacy_layer = PrivacyLayer(master_key=master_key) if PRIVACY_AVAILABLE and master_key else None
+
+def _transform_release(release_data: Dict[str, Any], context: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], float]:
+    """Build the privacy-controlled rights entries of one release, returning them with the seconds spent"""
+    start_time = time.time()
+    
+    # Extract relevant information for rights entries
+    artists = [artist["name"] for artist in release_data.get("artists", [])]
+    title = release_data.get("title", "Unknown Title")
+    year = release_data.get("year", "Unknown")
+    genres = release_data.get("genres", [])
+    styles = release_data.get("styles", [])
+    labels = [label["name"] for label in release_data.get("labels", [])]
+    
+    # Create rights entries
+    entries = []
+    for artist in artists:
+        for label in labels or ["Unknown Label"]:
+            # Create a rights entry
+            right_entry = _create_rights_entry(
+                title=title,
+                artist=artist,
+                publisher=label,
+                year=year,
+                genres=genres + styles,
+                context=context
+            )
+            
+            # Apply privacy controls if available
+            if _worker_privacy_layer:
+                right_entry = _apply_privacy_controls(right_entry, _worker_privacy_layer, _worker_privacy_settings)
+            
+            entries.append(right_entry)
+    
+    return entries, time.time() - start_time
+
+def _create_rights_entry(title: str, artist: str, publisher: str,
+                         year: Any, genres: List[str], context: Dict[str, Any]) -> Dict[str, Any]:
+    """Create a rights entry in MESA Rights Vault format"""
+    # Generate a unique ID for this right
+    right_id = str(uuid.uuid4())
+    
+    # Get current date for effective date
+    current_date = datetime.datetime.now().strftime("%Y-%m-%d")
+    
+    # Generate an expiration date 5-70 years in the future
+    years_ahead = random.randint(5, 70)
+    expiration_date = (datetime.datetime.now() + datetime.timedelta(days=365 * years_ahead)).strftime("%Y-%m-%d")
+    
+    # Generate territories
+    territories = random.choice([
+        "Worldwide", "United States", "European Union", "Japan", 
+        "United Kingdom", "Australia", "North America"
+    ])
+    
+    # Generate rights type
+    rights_type = random.choice([
+        "Mechanical", "Performance", "Synchronization", "Print", 
+        "Digital Distribution", "Streaming", "Master Recording"
+    ])
+    
+    # Generate royalty information
+    royalty_info = {
+        "percentage": round(random.uniform(1.0, 25.0), 2),
+        "paymentFrequency": random.choice(["Monthly", "Quarterly", "Biannually", "Annually"]),
+        "minimumGuarantee": random.randint(0, 10000) if random.random() > 0.7 else 0
+    }
+    
+    # Create identifiers (ISWC, ISRC, etc.)
+    identifiers = {}
+    
+    # Simulate ISWC (International Standard Musical Work Code)
+    if random.random() > 0.3:  # 70% chance to have ISWC
+        identifiers["ISWC"] = f"T-{random.randint(100000, 999999)}-{random.randint(10, 99)}-{random.randint(1, 9)}"
+    
+    # Simulate ISRC (International Standard Recording Code)
+    if random.random() > 0.2:  # 80% chance to have ISRC
+        country_code = random.choice(["US", "GB", "JP", "DE", "FR", "CA", "AU"])
+        year_code = str(year)[-2:] if isinstance(year, int) else str(random.randint(0, 99)).zfill(2)
+        registrant = ''.join(random.choices('ABCDEFGHIJKLMNOPQRSTUVWXYZ', k=3))
+        designation = ''.join(random.choices('0123456789', k=5))
+        identifiers["ISRC"] = f"{country_code}{year_code}{registrant}{designation}"
+    
+    # Create the rights entry
+    rights_entry = {
+        "rightId": right_id,
+        "workTitle": title,
+        "artistParty": {
+            "name": artist,
+            "role": "Performer",
+            "contactInfo": {
+                "email": f"contact@{artist.lower().replace(' ', '')}.com"
+            }
+        },
+        "publisherParty": {
+            "name": publisher,
+            "role": "Publisher",
+            "contactInfo": {
+                "email": f"rights@{publisher.lower().replace(' ', '')}.com"
+            }
+        },
+        "rightsType": rights_type,
+        "territory": territories,
+        "term": {
+            "description": f"{years_ahead} years"
+        },
+        "royaltyInfo": royalty_info,
+        "effectiveDate": current_date,
+        "expirationDate": expiration_date,
+        "identifiers": identifiers,
+        "metadata": {
+            "source": "Discogs",
+            "genres": genres,
+            "year": year,
+            "context": context
+        }
+    }
+    
+    return rights_entry
+
+def _apply_privacy_controls(rights_entry: Dict[str, Any], privacy_layer: Any,
+                            privacy_settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply privacy controls to a rights entry"""
+    try:
+        # Determine which fields are public and which are private
+        public_fields = privacy_settings.get("public_fields", [])
+        private_fields = privacy_settings.get("private_fields", [])
+        
+        # Extract data to encrypt
+        private_data = {}
+        for field in private_fields:
+            if field in rights_entry:
+                private_data[field] = rights_entry[field]
+        
+        # If we have private data, encrypt it
+        if private_data:
+            encrypted_package = privacy_layer.encrypt_rights_data(private_data)
+            encryption_metadata = {key: value for key, value in encrypted_package.items()
+                                   if key != "encrypted_data"}
+            
+            # Add the privacy section to the rights entry
+            rights_entry["_privacy"] = {
+                "encryptedData": encrypted_package["encrypted_data"],
+                "encryptionMetadata": encryption_metadata,
+                "availableProofs": []
+            }
+            
+            # Generate selective disclosure proofs if enabled
+            if privacy_settings.get("enable_zk_proofs", True):
+                selectively_disclosed_fields = privacy_settings.get("selectively_disclosed_fields", {})
+                
+                for field, allowed_verifiers in selectively_disclosed_fields.items():
+                    if field in rights_entry:
+                        # Create a selective disclosure proof
+                        proof_data = {
+                            "type": "selective_disclosure",
+                            "field": field,
+                            "allowedVerifiers": allowed_verifiers,
+                            "proofParams": {
+                                "commitment": _simulate_proof_commitment(field, rights_entry.get(field))
+                            }
+                        }
+                        
+                        rights_entry["_privacy"]["availableProofs"].append(proof_data)
+            
+            # Remove private fields from the main object since they're now encrypted
+            for field in private_fields:
+                if field in rights_entry:
+                    del rights_entry[field]
+        
+        return rights_entry
+        
+    except Exception as e:
+        logger.error(f"Error applying privacy controls: {e}")
+        return rights_entry  # Return without privacy if there's an error
+
+def _simulate_proof_commitment(field: str, value: Any) -> str:
+    """Simulate a zero-knowledge proof commitment"""
+    # In a real implementation, this would create an actual ZK proof
+    # For this demo, we'll just create a placeholder hash
+    value_str = json.dumps(value) if isinstance(value, (dict, list)) else str(value)
+    return f"commit_{field}_{hash(value_str) % 10000000:07d}"
+
+class StageCounter:
+    """Thread-safe throughput counters for one pipeline stage"""
+    
+    def __init__(self, name: str):
+        """Initialize counters for the named stage"""
+        self.name = name
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self._lock = threading.Lock()
+    
+    def record(self, items: int, busy_seconds: float) -> None:
+        """Record items handled and the time spent working on them"""
+        with self._lock:
+            self.items += items
+            self.busy_seconds += busy_seconds
+    
+    def record_blocked(self, seconds: float) -> None:
+        """Record time spent waiting for room in the next stage's queue"""
+        with self._lock:
+            self.blocked_seconds += seconds
+    
+    def snapshot(self, elapsed: float) -> Dict[str, Any]:
+        """Get the counters and the stage's throughput over an elapsed time"""
+        with self._lock:
+            return {
+                "items": self.items,
+                "busy_seconds": round(self.busy_seconds, 3),
+                "blocked_seconds": round(self.blocked_seconds, 3),
+                "items_per_second": round(self.items / elapsed, 3) if elapsed > 0 else 0.0
+            }
+
+class JsonlRightsSink:
+    """Appends rights entries to a JSON Lines file"""
+    
+    def __init__(self, path: Path):
+        """Open the file for appending"""
+        self.path = path
+        self._file = open(path, 'a')
+    
+    def write(self, entries: List[Dict[str, Any]]) -> None:
+        """Write a batch of entries, one per line"""
+        self._file.write("".join(json.dumps(entry) + "\n" for entry in entries))
+        self._file.flush()
+    
+    def close(self) -> None:
+        """Close the file"""
+        self._file.close()
+
+class SqliteRightsSink:
+    """Stores rights entries in a SQLite database"""
+    
+    def __init__(self, path: Path):
+        """Open the database, creating the rights_entries table if needed"""
+        self.path = path
+        # Written only by the sink thread, after being opened on the caller's
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+        CREATE TABLE IF NOT EXISTS rights_entries (
+            right_id TEXT PRIMARY KEY,
+            work_title TEXT,
+            entry TEXT NOT NULL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        self._conn.commit()
+    
+    def write(self, entries: List[Dict[str, Any]]) -> None:
+        """Write a batch of entries in one transaction"""
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO rights_entries (right_id, work_title, entry) VALUES (?, ?, ?)",
+                [(entry["rightId"], entry.get("workTitle"), json.dumps(entry)) for entry in entries]
+            )
+    
+    def close(self) -> None:
+        """Close the database"""
+        self._conn.close()
+
+RIGHTS_SINKS = {
+    "jsonl": (JsonlRightsSink, RIGHTS_JSONL_FILE),
+    "sqlite": (SqliteRightsSink, RIGHTS_DB_FILE)
+}
+
+def iter_rights_entries(output_dir: str) -> Iterator[Dict[str, Any]]:
+    """Yield every rights entry stored in an output directory, whichever sink wrote it"""
+    output_dir = Path(output_dir)
+    
+    jsonl_path = output_dir / RIGHTS_JSONL_FILE
+    if jsonl_path.exists():
+        with open(jsonl_path, 'r') as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    logger.warning(f"Skipping malformed entry at {jsonl_path}:{line_number}: {e}")
+    
+    db_path = output_dir / RIGHTS_DB_FILE
+    if db_path.exists():
+        conn = sqlite3.connect(str(db_path))
+        try:
+            for (entry,) in conn.execute("SELECT entry FROM rights_entries ORDER BY rowid"):
+                yield json.loads(entry)
+        finally:
+            conn.close()
+    
+    # Entries written one file each by earlier versions of this script
+    for right_path in sorted(output_dir.glob("right_*.json")):
+        with open(right_path, 'r') as f:
+            yield json.load(f)
+
 class DiscogsBulkDataPull:
     """Class to bulk pull data from Discogs API and store it in MESA Rights Vault format"""
     
-    def __init__(self, config_path: str):
-        """Initialize with config file path"""
+    def __init__(self, config_path: str, resume: bool = False):
+        """Initialize with config file path, optionally resuming the last pull"""
         self.config = self._load_config(config_path)
+        self.resume = resume
         
         # Set up API parameters
         self.token = self.config["discogs_token"]
@@ -92,15 +476,24 @@ class DiscogsBulkDataPull:
             "Authorization": f"Discogs token={self.token}"
         }
         
+        # Request budget shared with every other Discogs client
+        self.rate_limiter = get_rate_limiter(self.config.get("rate_limit_state_path"))
+        
         # Set up output directory
         self.output_dir = Path(self.config.get("output_dir", "discogs_data"))
         self.output_dir.mkdir(exist_ok=True, parents=True)
         
+        # Checkpoints of the pull, so it can be resumed
+        self.crawl_state = CrawlState(self.config.get("crawl_state_path") or str(self.output_dir / "crawl_state.db"))
+        
         # Set up counters for statistics
         self.stats = {
             "total_api_calls": 0,
             "total_releases_processed": 0,
             "total_rights_entries_created": 0,
+            "resumed": resume,
+            "resumed_releases": 0,
+            "skipped_releases": 0,
             "errors": 0,
             "by_genre": {},
             "by_artist": {},
@@ -109,12 +502,22 @@ class DiscogsBulkDataPull:
             "end_time": None
         }
         
-        # Initialize privacy layer if available
+        self._stats_lock = threading.Lock()
+        
+        # Initialize privacy layer if available; transform workers share its key
         self.privacy_layer = PrivacyLayer() if PRIVACY_AVAILABLE else None
         
+        # Settings of the fetch -> transform -> sink pipeline
+        self.pipeline_settings = self.config["pipeline"]
+        
         logger.info(f"Initialized Discogs data puller with config from {config_path}")
         logger.info(f"Output directory: {self.output_dir}")
     
+    def _count(self, stat: str, amount: int = 1) -> None:
+        """Increment a statistics counter shared by the pipeline threads"""
+        with self._stats_lock:
+            self.stats[stat] += amount
+    
     def _load_config(self, config_path: str) -> Dict[str, Any]:
         """Load configuration from JSON file"""
         try:
@@ -140,6 +543,11 @@ class DiscogsBulkDataPull:
                 "private_fields": ["royaltyInfo", "publisherParty"],
                 "selectively_disclosed_fields": {}
             })
+            config["pipeline"] = {**DEFAULT_PIPELINE_SETTINGS, **config.get("pipeline", {})}
+            
+            if config["pipeline"]["sink"] not in RIGHTS_SINKS:
+                raise ValueError(f"Unknown pipeline sink '{config['pipeline']['sink']}', "
+                                 f"expected one of {', '.join(RIGHTS_SINKS)}")
             
             return config
             
@@ -152,20 +560,33 @@ class DiscogsBulkDataPull:
         logger.info("Starting data pull from Discogs API")
         
         try:
-            # Pull data by genres
-            if self.config["genres"]:
-                logger.info(f"Pulling data for {len(self.config['genres'])} genres")
-                self._pull_by_genres()
-            
-            # Pull data by artists
-            if self.config["artists"]:
-                logger.info(f"Pulling data for {len(self.config['artists'])} artists")
-                self._pull_by_artists()
+            if not self.resume:
+                self.crawl_state.reset()
             
-            # Pull data by years
-            if self.config["years"]:
-                logger.info(f"Pulling data for {len(self.config['years'])} year ranges")
-                self._pull_by_years()
+            self._start_pipeline()
+            try:
+                # Finish releases an interrupted pull found but did not write
+                if self.resume:
+                    self._resume_pending_releases()
+                
+                # Pull data by genres
+                if self.config["genres"]:
+                    logger.info(f"Pulling data for {len(self.config['genres'])} genres")
+                    self._pull_by_genres()
+                
+                # Pull data by artists
+                if self.config["artists"]:
+                    logger.info(f"Pulling data for {len(self.config['artists'])} artists")
+                    self._pull_by_artists()
+                
+                # Pull data by years
+                if self.config["years"]:
+                    logger.info(f"Pulling data for {len(self.config['years'])} year ranges")
+                    self._pull_by_years()
+            finally:
+                # Let the queued releases run through every stage
+                self._finish_pipeline()
+                self.crawl_state.close()
             
             # Save statistics
             self.stats["end_time"] = datetime.datetime.now().isoformat()
@@ -186,15 +607,22 @@ class DiscogsBulkDataPull:
     def _pull_by_genres(self) -> None:
         """Pull releases by genres"""
         for genre in self.config["genres"]:
+            progress = self.crawl_state.get_progress("genre", genre)
+            processed = progress["items"]
+            self.stats["by_genre"][genre] = processed
+            
+            if progress["completed"]:
+                logger.info(f"Skipping genre {genre}, already pulled")
+                continue
+            
             logger.info(f"Pulling releases for genre: {genre}")
             
-            self.stats["by_genre"][genre] = 0
-            page = 1
+            page = progress["last_page"] + 1
             per_page = min(100, self.config["batch_size"])
-            processed = 0
+            exhausted = False
             
             try:
-                with tqdm(total=self.config["max_items_per_category"], desc=f"Genre: {genre}") as pbar:
+                with _progress(self.config["max_items_per_category"], processed, f"Genre: {genre}") as pbar:
                     while processed < self.config["max_items_per_category"]:
                         # Search for releases with this genre
                         params = {
@@ -210,36 +638,45 @@ class DiscogsBulkDataPull:
                         
                         if len(response["results"]) == 0:
                             logger.info(f"No more results for genre: {genre}")
+                            exhausted = True
                             break
                         
-                        # Process each release
-                        for result in response["results"]:
-                            if "id" in result:
-                                self._process_release(result["id"], {"genre": genre})
-                                processed += 1
-                                self.stats["by_genre"][genre] += 1
-                                pbar.update(1)
-                            
-                            if processed >= self.config["max_items_per_category"]:
-                                break
+                        # Process each release, up to the category limit
+                        releases = [(result["id"], {"genre": genre})
+                                    for result in response["results"] if "id" in result]
+                        releases = releases[:self.config["max_items_per_category"] - processed]
+                        processed += len(releases)
+                        self._process_page("genre", genre, page, processed, releases)
+                        self.stats["by_genre"][genre] = processed
+                        pbar.update(len(releases))
                         
                         page += 1
                 
+                if exhausted or processed >= self.config["max_items_per_category"]:
+                    self.crawl_state.complete("genre", genre, processed)
+                
                 logger.info(f"Completed pulling for genre: {genre}. Processed {processed} releases")
                 
             except Exception as e:
                 logger.error(f"Error pulling data for genre {genre}: {e}")
-                self.stats["errors"] += 1
+                self._count("errors")
     
     def _pull_by_artists(self) -> None:
         """Pull releases by artists"""
         for artist in self.config["artists"]:
+            progress = self.crawl_state.get_progress("artist", artist)
+            processed = progress["items"]
+            self.stats["by_artist"][artist] = processed
+            
+            if progress["completed"]:
+                logger.info(f"Skipping artist {artist}, already pulled")
+                continue
+            
             logger.info(f"Pulling releases for artist: {artist}")
             
-            self.stats["by_artist"][artist] = 0
-            page = 1
+            page = progress["last_page"] + 1
             per_page = min(100, self.config["batch_size"])
-            processed = 0
+            exhausted = False
             
             try:
                 # First, search for the artist
@@ -259,7 +696,7 @@ class DiscogsBulkDataPull:
                 artist_id = response["results"][0]["id"]
                 
                 # Get releases by this artist
-                with tqdm(total=self.config["max_items_per_category"], desc=f"Artist: {artist}") as pbar:
+                with _progress(self.config["max_items_per_category"], processed, f"Artist: {artist}") as pbar:
                     while processed < self.config["max_items_per_category"]:
                         releases_params = {
                             "sort": "year",
@@ -274,26 +711,29 @@ class DiscogsBulkDataPull:
                         
                         if len(releases_response["releases"]) == 0:
                             logger.info(f"No more releases for artist: {artist}")
+                            exhausted = True
                             break
                         
-                        # Process each release
-                        for release in releases_response["releases"]:
-                            if "id" in release and release["type"] in ["master", "release"]:
-                                self._process_release(release["id"], {"artist": artist})
-                                processed += 1
-                                self.stats["by_artist"][artist] += 1
-                                pbar.update(1)
-                            
-                            if processed >= self.config["max_items_per_category"]:
-                                break
+                        # Process each release, up to the category limit
+                        releases = [(release_id, {"artist": artist})
+                                    for release_id in map(self._listed_release_id, releases_response["releases"])
+                                    if release_id]
+                        releases = releases[:self.config["max_items_per_category"] - processed]
+                        processed += len(releases)
+                        self._process_page("artist", artist, page, processed, releases)
+                        self.stats["by_artist"][artist] = processed
+                        pbar.update(len(releases))
                         
                         page += 1
                 
+                if exhausted or processed >= self.config["max_items_per_category"]:
+                    self.crawl_state.complete("artist", artist, processed)
+                
                 logger.info(f"Completed pulling for artist: {artist}. Processed {processed} releases")
                 
             except Exception as e:
                 logger.error(f"Error pulling data for artist {artist}: {e}")
-                self.stats["errors"] += 1
+                self._count("errors")
     
     def _pull_by_years(self) -> None:
         """Pull releases by year ranges"""
@@ -303,19 +743,27 @@ class DiscogsBulkDataPull:
                 start_year, end_year = map(int, year_range.split("-"))
                 range_key = f"{start_year}-{end_year}"
                 
-                logger.info(f"Pulling releases for years: {range_key}")
+                # Each year in the range is checkpointed separately
+                progress = {year: self.crawl_state.get_progress("year", year)
+                            for year in range(start_year, end_year + 1)}
+                processed = sum(year_progress["items"] for year_progress in progress.values())
+                self.stats["by_year"][range_key] = processed
                 
-                self.stats["by_year"][range_key] = 0
-                processed = 0
+                logger.info(f"Pulling releases for years: {range_key}")
                 
                 # Process each year in the range
-                with tqdm(total=self.config["max_items_per_category"], desc=f"Years: {range_key}") as pbar:
+                with _progress(self.config["max_items_per_category"], processed, f"Years: {range_key}") as pbar:
                     for year in range(start_year, end_year + 1):
                         if processed >= self.config["max_items_per_category"]:
                             break
                         
-                        page = 1
+                        if progress[year]["completed"]:
+                            continue
+                        
+                        page = progress[year]["last_page"] + 1
                         per_page = min(50, self.config["batch_size"])
+                        year_items = progress[year]["items"]
+                        exhausted = False
                         
                         while processed < self.config["max_items_per_category"]:
                             # Search for releases in this year
@@ -331,43 +779,58 @@ class DiscogsBulkDataPull:
                                 break
                             
                             if len(response["results"]) == 0:
+                                exhausted = True
                                 break
                             
-                            # Process each release
-                            for result in response["results"]:
-                                if "id" in result:
-                                    self._process_release(result["id"], {"year": year})
-                                    processed += 1
-                                    self.stats["by_year"][range_key] += 1
-                                    pbar.update(1)
-                                
-                                if processed >= self.config["max_items_per_category"]:
-                                    break
+                            # Process each release, up to the category limit
+                            releases = [(result["id"], {"year": year})
+                                        for result in response["results"] if "id" in result]
+                            releases = releases[:self.config["max_items_per_category"] - processed]
+                            processed += len(releases)
+                            year_items += len(releases)
+                            self._process_page("year", year, page, year_items, releases)
+                            self.stats["by_year"][range_key] = processed
+                            pbar.update(len(releases))
                             
                             page += 1
+                        
+                        if exhausted:
+                            self.crawl_state.complete("year", year, year_items)
                 
                 logger.info(f"Completed pulling for years {range_key}. Processed {processed} releases")
                 
             except Exception as e:
                 logger.error(f"Error pulling data for year range {year_range}: {e}")
-                self.stats["errors"] += 1
+                self._count("errors")
+    
+    @staticmethod
+    def _listed_release_id(listing: Dict[str, Any]) -> Optional[int]:
+        """
+        Get the release ID to fetch for an entry of an artist's release list
+        
+        Masters are listed with their own ID, which /releases/{id} does not
+        serve, so they are fetched as their main release instead.
+        """
+        if listing.get("type") == "master":
+            return listing.get("main_release")
+        if listing.get("type") == "release":
+            return listing.get("id")
+        return None
     
     def _make_api_request(self, endpoint: str, params: Dict[str, Any] = None) -> Optional[Dict[str, Any]]:
         """Make a request to the Discogs API with rate limiting"""
         url = f"{self.base_url}{endpoint}"
-        self.stats["total_api_calls"] += 1
+        self._count("total_api_calls")
         
         try:
-            # Add a small delay to respect rate limits (60 requests per minute)
-            time.sleep(1.1)  # Just over 1 second to stay under the limit
+            # Wait for the request budget shared with every other Discogs client
+            self.rate_limiter.acquire()
             
             response = requests.get(url, headers=self.headers, params=params)
+            self.rate_limiter.record_response(response.status_code, response.headers)
             
-            # Check if we're hitting rate limits
+            # Check if we're hitting rate limits; the rate limiter pauses for Retry-After
             if response.status_code == 429:
-                retry_after = int(response.headers.get("Retry-After", 60))
-                logger.warning(f"Rate limit hit. Waiting for {retry_after} seconds")
-                time.sleep(retry_after + 1)
                 return self._make_api_request(endpoint, params)  # Retry
             
             # Check for other errors
@@ -382,208 +845,240 @@ class DiscogsBulkDataPull:
             return None
     
     def _process_release(self, release_id: int, context: Dict[str, Any]) -> None:
-        """Process a single release and create rights entries"""
-        try:
-            # Get release details
-            release_data = self._make_api_request(f"/releases/{release_id}")
-            if not release_data:
-                return
-            
-            self.stats["total_releases_processed"] += 1
-            
-            # Extract relevant information for rights entries
-            artists = [artist["name"] for artist in release_data.get("artists", [])]
-            title = release_data.get("title", "Unknown Title")
-            year = release_data.get("year", "Unknown")
-            genres = release_data.get("genres", [])
-            styles = release_data.get("styles", [])
-            labels = [label["name"] for label in release_data.get("labels", [])]
-            
-            # Create rights entries
-            for artist in artists:
-                for label in labels or ["Unknown Label"]:
-                    # Create a rights entry
-                    right_entry = self._create_rights_entry(
-                        title=title,
-                        artist=artist,
-                        publisher=label,
-                        year=year,
-                        genres=genres + styles,
-                        context=context
-                    )
-                    
-                    # Apply privacy controls if available
-                    if PRIVACY_AVAILABLE and self.privacy_layer:
-                        right_entry = self._apply_privacy_controls(right_entry)
-                    
-                    # Save the rights entry
-                    right_id = right_entry["rightId"]
-                    right_path = self.output_dir / f"right_{right_id}.json"
-                    with open(right_path, 'w') as f:
-                        json.dump(right_entry, f, indent=2)
-                    
-                    self.stats["total_rights_entries_created"] += 1
-            
-        except Exception as e:
-            logger.error(f"Error processing release {release_id}: {e}")
-            self.stats["errors"] += 1
-    
-    def _create_rights_entry(self, title: str, artist: str, publisher: str, 
-                            year: Any, genres: List[str], context: Dict[str, Any]) -> Dict[str, Any]:
-        """Create a rights entry in MESA Rights Vault format"""
-        # Generate a unique ID for this right
-        right_id = str(uuid.uuid4())
-        
-        # Get current date for effective date
-        current_date = datetime.datetime.now().strftime("%Y-%m-%d")
-        
-        # Generate an expiration date 5-70 years in the future
-        years_ahead = random.randint(5, 70)
-        expiration_date = (datetime.datetime.now() + datetime.timedelta(days=365 * years_ahead)).strftime("%Y-%m-%d")
-        
-        # Generate territories
-        territories = random.choice([
-            "Worldwide", "United States", "European Union", "Japan", 
-            "United Kingdom", "Australia", "North America"
-        ])
-        
-        # Generate rights type
-        rights_type = random.choice([
-            "Mechanical", "Performance", "Synchronization", "Print", 
-            "Digital Distribution", "Streaming", "Master Recording"
-        ])
-        
-        # Generate royalty information
-        royalty_info = {
-            "percentage": round(random.uniform(1.0, 25.0), 2),
-            "paymentFrequency": random.choice(["Monthly", "Quarterly", "Biannually", "Annually"]),
-            "minimumGuarantee": random.randint(0, 10000) if random.random() > 0.7 else 0
-        }
+        """Queue a release for the pipeline, blocking while the fetch stage is full"""
+        self._fetch_queue.put((release_id, context))
+    
+    def _process_page(self, category: str, value: Any, page: int, items: int,
+                      releases: List[Tuple[int, Dict[str, Any]]]) -> None:
+        """Checkpoint a page of search results and queue its releases not seen before"""
+        new_releases = self.crawl_state.record_page(category, value, page, items, releases)
         
-        # Create identifiers (ISWC, ISRC, etc.)
-        identifiers = {}
-        
-        # Simulate ISWC (International Standard Musical Work Code)
-        if random.random() > 0.3:  # 70% chance to have ISWC
-            identifiers["ISWC"] = f"T-{random.randint(100000, 999999)}-{random.randint(10, 99)}-{random.randint(1, 9)}"
-        
-        # Simulate ISRC (International Standard Recording Code)
-        if random.random() > 0.2:  # 80% chance to have ISRC
-            country_code = random.choice(["US", "GB", "JP", "DE", "FR", "CA", "AU"])
-            year_code = str(year)[-2:] if isinstance(year, int) else str(random.randint(0, 99)).zfill(2)
-            registrant = ''.join(random.choices('ABCDEFGHIJKLMNOPQRSTUVWXYZ', k=3))
-            designation = ''.join(random.choices('0123456789', k=5))
-            identifiers["ISRC"] = f"{country_code}{year_code}{registrant}{designation}"
-        
-        # Create the rights entry
-        rights_entry = {
-            "rightId": right_id,
-            "workTitle": title,
-            "artistParty": {
-                "name": artist,
-                "role": "Performer",
-                "contactInfo": {
-                    "email": f"contact@{artist.lower().replace(' ', '')}.com"
-                }
-            },
-            "publisherParty": {
-                "name": publisher,
-                "role": "Publisher",
-                "contactInfo": {
-                    "email": f"rights@{publisher.lower().replace(' ', '')}.com"
-                }
-            },
-            "rightsType": rights_type,
-            "territory": territories,
-            "term": {
-                "description": f"{years_ahead} years"
-            },
-            "royaltyInfo": royalty_info,
-            "effectiveDate": current_date,
-            "expirationDate": expiration_date,
-            "identifiers": identifiers,
-            "metadata": {
-                "source": "Discogs",
-                "genres": genres,
-                "year": year,
-                "context": context
-            }
+        skipped = len(releases) - len(new_releases)
+        if skipped:
+            self._count("skipped_releases", skipped)
+        
+        for release_id, context in new_releases:
+            self._process_release(release_id, context)
+    
+    def _resume_pending_releases(self) -> None:
+        """Queue the releases an interrupted pull found but did not write"""
+        pending = self.crawl_state.pending_releases()
+        logger.info(f"Resuming pull with {len(pending)} pending releases "
+                    f"and {self.crawl_state.processed_count()} already processed")
+        
+        self.stats["resumed_releases"] = len(pending)
+        for release_id, context in pending:
+            self._process_release(release_id, context)
+    
+    def _start_pipeline(self) -> None:
+        """Start the fetch, transform and sink stages"""
+        settings = self.pipeline_settings
+        queue_size = max(1, int(settings["queue_size"]))
+        
+        # Bounded queues between stages provide the backpressure
+        self._fetch_queue = queue.Queue(maxsize=queue_size)
+        self._transform_queue = queue.Queue(maxsize=queue_size)
+        self._pending_queue = queue.Queue(maxsize=queue_size)  # Transforms in flight
+        self._sink_queue = queue.Queue(maxsize=queue_size)
+        
+        self._stage_counters = {name: StageCounter(name) for name in ("fetch", "transform", "sink")}
+        self._executor = self._create_executor()
+        
+        # Opened here so a bad output path fails before anything is fetched
+        sink_class, filename = RIGHTS_SINKS[settings["sink"]]
+        self._sink = sink_class(self.output_dir / filename)
+        
+        self._fetch_threads = [
+            threading.Thread(target=self._fetch_loop, name=f"discogs-fetch-{i}", daemon=True)
+            for i in range(max(1, int(settings["fetch_workers"])))
+        ]
+        self._stage_threads = [
+            threading.Thread(target=self._submit_loop, name="discogs-transform-submit", daemon=True),
+            threading.Thread(target=self._collect_loop, name="discogs-transform-collect", daemon=True),
+            threading.Thread(target=self._sink_loop, name="discogs-sink", daemon=True)
+        ]
+        
+        self._pipeline_start_time = time.time()
+        for thread in self._fetch_threads + self._stage_threads:
+            thread.start()
+    
+    def _finish_pipeline(self) -> None:
+        """Drain every stage in order, then record per-stage throughput"""
+        for _ in self._fetch_threads:
+            self._fetch_queue.put(_STOP)
+        for thread in self._fetch_threads:
+            thread.join()
+        
+        self._transform_queue.put(_STOP)
+        for thread in self._stage_threads:
+            thread.join()
+        
+        if self._executor:
+            self._executor.shutdown()
+        
+        elapsed = time.time() - self._pipeline_start_time
+        self.stats["pipeline"] = {
+            "sink": self.pipeline_settings["sink"],
+            "transform_processes": (self.pipeline_settings["transform_workers"] or os.cpu_count()) if self._executor else 0,
+            "elapsed_seconds": round(elapsed, 3),
+            "stages": {name: counter.snapshot(elapsed) for name, counter in self._stage_counters.items()}
         }
         
-        return rights_entry
+        for name, counter in self.stats["pipeline"]["stages"].items():
+            logger.info(f"Stage {name}: {counter['items']} items, {counter['items_per_second']}/s, "
+                        f"blocked {counter['blocked_seconds']}s")
     
-    def _apply_privacy_controls(self, rights_entry: Dict[str, Any]) -> Dict[str, Any]:
-        """Apply privacy controls to a rights entry"""
-        try:
-            # Get privacy settings from config
-            privacy_settings = self.config.get("privacy_settings", {})
+    def _create_executor(self) -> Optional[ProcessPoolExecutor]:
+        """Create the transform process pool, or None to transform on a thread"""
+        workers = self.pipeline_settings["transform_workers"]
+        master_key = self.privacy_layer.master_key if self.privacy_layer else None
+        initargs = (self.config["privacy_settings"], master_key)
+        
+        if workers != 0:
+            try:
+                # Workers are started on demand, once the fetch and sink
+                # threads are running, so they are spawned rather than forked
+                return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                           initializer=_init_transform_worker, initargs=initargs)
+            except (NotImplementedError, OSError) as e:
+                logger.warning(f"Process pool unavailable, transforming releases on a thread: {e}")
+        
+        _init_transform_worker(*initargs)
+        return None
+    
+    def _put(self, stage_queue: queue.Queue, item: Any, stage: str) -> None:
+        """Hand an item to the next stage, counting time blocked by backpressure"""
+        start_time = time.time()
+        stage_queue.put(item)
+        self._stage_counters[stage].record_blocked(time.time() - start_time)
+    
+    def _fetch_loop(self) -> None:
+        """Fetch stage: download release details"""
+        while True:
+            item = self._fetch_queue.get()
+            if item is _STOP:
+                return
+            
+            release_id, context = item
+            try:
+                start_time = time.time()
+                release_data = self._make_api_request(f"/releases/{release_id}")
+                self._stage_counters["fetch"].record(1, time.time() - start_time)
+                if not release_data:
+                    continue
+                
+                self._count("total_releases_processed")
+                self._put(self._transform_queue, (release_id, release_data, context), "fetch")
+                
+            except Exception as e:
+                logger.error(f"Error fetching release {release_id}: {e}")
+                self._count("errors")
+    
+    def _submit_loop(self) -> None:
+        """Transform stage: hand fetched releases to the process pool"""
+        while True:
+            item = self._transform_queue.get()
+            if item is _STOP:
+                self._pending_queue.put(_STOP)
+                return
             
-            # Determine which fields are public and which are private
-            public_fields = privacy_settings.get("public_fields", [])
-            private_fields = privacy_settings.get("private_fields", [])
+            # Keyed by the queued ID, which is what the crawl state recorded
+            release_id, release_data, context = item
+            if self._executor:
+                try:
+                    future = self._executor.submit(_transform_release, release_data, context)
+                except Exception as e:
+                    future = Future()
+                    future.set_exception(e)
+            else:
+                future = Future()
+                try:
+                    future.set_result(_transform_release(release_data, context))
+                except Exception as e:
+                    future.set_exception(e)
             
-            # Extract data to encrypt
-            private_data = {}
-            for field in private_fields:
-                if field in rights_entry:
-                    private_data[field] = rights_entry[field]
+            # Blocks while queue_size transforms are already in flight
+            self._put(self._pending_queue, (release_id, future), "transform")
+    
+    def _collect_loop(self) -> None:
+        """Transform stage: pass finished transforms on to the sink, in order"""
+        while True:
+            item = self._pending_queue.get()
+            if item is _STOP:
+                self._sink_queue.put(_STOP)
+                return
             
-            # If we have private data, encrypt it
-            if private_data:
-                encrypted_data, encryption_metadata = self.privacy_layer.encrypt_rights_data(private_data)
+            release_id, future = item
+            try:
+                entries, seconds = future.result()
+            except Exception as e:
+                logger.error(f"Error processing release {release_id}: {e}")
+                self._count("errors")
+                continue
+            
+            self._stage_counters["transform"].record(1, seconds)
+            # Passed on even without entries, so the release is checkpointed
+            self._put(self._sink_queue, (release_id, entries), "transform")
+    
+    def _sink_loop(self) -> None:
+        """Sink stage: write rights entries in batches, then checkpoint their releases"""
+        batch_size = max(1, int(self.pipeline_settings["sink_batch_size"]))
+        flush_interval = self.pipeline_settings["sink_flush_interval"]
+        
+        batch = []
+        release_ids = []
+        last_flush = time.time()
+        try:
+            while True:
+                try:
+                    item = self._sink_queue.get(timeout=flush_interval)
+                except queue.Empty:
+                    item = []
                 
-                # Add the privacy section to the rights entry
-                rights_entry["_privacy"] = {
-                    "encryptedData": encrypted_data,
-                    "encryptionMetadata": encryption_metadata,
-                    "availableProofs": []
-                }
+                # Write when the batch is full or has waited flush_interval
+                if item is not _STOP:
+                    if item:
+                        release_id, entries = item
+                        release_ids.append(release_id)
+                        batch.extend(entries)
+                    if len(batch) < batch_size and time.time() - last_flush < flush_interval:
+                        continue
                 
-                # Generate selective disclosure proofs if enabled
-                if privacy_settings.get("enable_zk_proofs", True):
-                    selectively_disclosed_fields = privacy_settings.get("selectively_disclosed_fields", {})
-                    
-                    for field, allowed_verifiers in selectively_disclosed_fields.items():
-                        if field in rights_entry:
-                            # Create a selective disclosure proof
-                            proof_data = {
-                                "type": "selective_disclosure",
-                                "field": field,
-                                "allowedVerifiers": allowed_verifiers,
-                                "proofParams": {
-                                    "commitment": self._simulate_proof_commitment(field, rights_entry.get(field))
-                                }
-                            }
-                            
-                            rights_entry["_privacy"]["availableProofs"].append(proof_data)
+                if release_ids:
+                    self._write_batch(self._sink, batch, release_ids)
+                    batch = []
+                    release_ids = []
+                last_flush = time.time()
                 
-                # Remove private fields from the main object since they're now encrypted
-                for field in private_fields:
-                    if field in rights_entry:
-                        del rights_entry[field]
-            
-            return rights_entry
-            
+                if item is _STOP:
+                    return
+        finally:
+            self._sink.close()
+            self.crawl_state.close()
+    
+    def _write_batch(self, sink: Any, batch: List[Dict[str, Any]], release_ids: List[int]) -> None:
+        """Write one batch to the sink and mark its releases processed"""
+        try:
+            start_time = time.time()
+            if batch:
+                sink.write(batch)
+            self.crawl_state.mark_processed(release_ids)
+            self._stage_counters["sink"].record(len(batch), time.time() - start_time)
+            self._count("total_rights_entries_created", len(batch))
         except Exception as e:
-            logger.error(f"Error applying privacy controls: {e}")
-            return rights_entry  # Return without privacy if there's an error
+            logger.error(f"Error writing {len(batch)} rights entries: {e}")
+            self._count("errors")
     
-    def _simulate_proof_commitment(self, field: str, value: Any) -> str:
-        """Simulate a zero-knowledge proof commitment"""
-        # In a real implementation, this would create an actual ZK proof
-        # For this demo, we'll just create a placeholder hash
-        value_str = json.dumps(value) if isinstance(value, (dict, list)) else str(value)
-        return f"commit_{field}_{hash(value_str) % 10000000:07d}"
-
 def main():
     """Main function to run the script"""
     parser = argparse.ArgumentParser(description="Pull data from Discogs API and store in MESA Rights Vault format")
     parser.add_argument("--config", default="config.json", help="Path to configuration file")
+    parser.add_argument("--resume", action="store_true", help="Resume the last interrupted pull")
     args = parser.parse_args()
     
     try:
         # Create and run the data puller
-        data_puller = DiscogsBulkDataPull(args.config)
+        data_puller = DiscogsBulkDataPull(args.config, resume=args.resume)
         data_puller.pull_data()
         
     except Exception as e:
@@ -8,12 +8,30 @@ for integration with the MESA Rights Vault AI agent.
 """
 
 import os
+import re
 import json
+import hashlib
 import time
 import logging
 import sqlite3
-from typing import Dict, List, Any, Optional, Union, Tuple
-from datetime import datetime
+import threading
+import zlib
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional, Union, Tuple, Iterator, Iterable
+from datetime import datetime, timedelta
+
+try:
+    from .query_cache import QueryCache
+    from .request_counter import RequestCounter
+except ImportError:
+    from query_cache import QueryCache
+    from request_counter import RequestCounter
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
 
 # Configure logging
 logging.basicConfig(
@@ -23,19 +41,137 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Connection tuning applied to every pooled connection
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -64000,  # 64 MB
+    "mmap_size": 268435456,  # 256 MB
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000  # milliseconds
+}
+
+# FTS5 tokenizers for the search index: word tokens with prefix queries, or
+# trigrams for fuzzy substring search
+FTS_TOKENIZERS = {
+    "unicode61": "unicode61 remove_diacritics 2",
+    "trigram": "trigram"
+}
+
+# Full-text indexes: FTS table -> (content table, indexed columns)
+FTS_TABLES = {
+    "releases_fts": ("releases", ["title"]),
+    "artists_fts": ("artists", ["name", "realname"]),
+    "labels_fts": ("labels", ["name"]),
+    "tracks_fts": ("tracks", ["title"])
+}
+
+# Weight applied to track title matches when ranking releases
+TRACK_MATCH_WEIGHT = 0.5
+
+# Per-entity candidate caps for search_releases_by_entities
+ENTITY_CANDIDATE_LIMIT = 1000
+ENTITY_MATCH_LIMIT = 20
+
+# Bulk-saved entity tables: table -> {column: default for missing values}
+ENTITY_COLUMNS = {
+    "artists": {"name": "", "realname": None},
+    "labels": {"name": ""},
+    "masters": {"title": "", "main_release": None, "year": None}
+}
+
+# Artist and label IDs remembered as stored before the sets are reset, so
+# long bulk imports don't grow them without bound
+KNOWN_ID_LIMIT = 100000
+
+# Release side tables rewritten whenever a release is saved
+RELEASE_SIDE_TABLES = (
+    "release_artists", "release_labels", "identifiers", "release_genres",
+    "release_styles", "release_formats", "tracks"
+)
+
+# Release fields served from real columns by get_release_fields
+RELEASE_COLUMN_FIELDS = ["id", "title", "released", "country", "year", "master_id"]
+
+# Release fields served from side tables by get_release_fields
+RELEASE_SIDE_FIELDS = [
+    "artists", "extraartists", "labels", "identifiers", "genres", "styles", "formats", "tracklist"
+]
+
+# Columns added since the first schema version: table -> [(column, declaration)]
+SCHEMA_MIGRATIONS = {
+    "releases": [("year", "INTEGER")],
+    "release_artists": [("name", "TEXT"), ("position", "INTEGER")],
+    "ai_agent_cache": [("expires_at", "INTEGER NOT NULL DEFAULT 0")]
+}
+
+BLOB_COMPRESSIONS = ["zlib", "zstd", "none"]
+
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+_YEAR_PATTERN = re.compile(r"^\d{4}")
+_SEARCH_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def _parse_year(released: str) -> Optional[int]:
+    """Get the year from a Discogs release date like 1999-03-00."""
+    match = _YEAR_PATTERN.match(released or "")
+    return int(match.group()) if match else None
+
+
+def _decode_blob(value: Union[bytes, str, None]) -> Any:
+    """Decode a data column written as zstd, zlib or plain JSON text."""
+    if value is None:
+        return None
+    if isinstance(value, bytes):
+        if value.startswith(_ZSTD_MAGIC):
+            if not ZSTD_AVAILABLE:
+                raise RuntimeError("zstandard is required to read zstd-compressed data")
+            value = zstandard.ZstdDecompressor().decompress(value)
+        else:
+            value = zlib.decompress(value)
+    return json.loads(value)
+
+
 class DiscogsDatabase:
     """
     Database interface for caching and storing Discogs data structured for 
     the MESA Rights Vault AI agent.
     """
     
-    def __init__(self, db_path: str = None, schema_path: str = None):
+    def __init__(self, db_path: str = None, schema_path: str = None, pragmas: Dict = None,
+                 fts_tokenizer: str = "unicode61", compression: str = "zlib",
+                 query_cache_size: int = 1024, cache_cleanup_interval: float = 3600,
+                 api_log_flush_interval: float = 1.0, api_log_batch_size: int = 500,
+                 api_log_retention_days: float = 30, api_count_window: int = 3600):
         """
         Initialize the Discogs database interface.
         
+        Each thread gets its own long-lived connection, tuned with WAL mode
+        and the given pragmas, and reuses prepared statements through the
+        connection's statement cache.
+        
         Args:
             db_path: Path to the SQLite database file
             schema_path: Path to the database schema definition
+            pragmas: SQLite pragma overrides (see DEFAULT_PRAGMAS)
+            fts_tokenizer: Tokenizer for the full-text search index,
+                           "unicode61" or "trigram" (see FTS_TOKENIZERS)
+            compression: Compression for stored JSON blobs, "zlib", "zstd"
+                         (needs the zstandard package) or "none"
+            query_cache_size: Number of AI query results kept in memory in
+                              front of the ai_agent_cache table
+            cache_cleanup_interval: Seconds between background removals of
+                                    expired cached queries and of API log
+                                    entries past retention (0 disables)
+            api_log_flush_interval: Seconds between background flushes of
+                                    buffered API request log entries (0
+                                    writes each entry immediately)
+            api_log_batch_size: Buffered API log entries that trigger an
+                                early flush
+            api_log_retention_days: Days API log entries are kept (0 keeps
+                                    them forever)
+            api_count_window: Seconds of API request counts kept in memory
+                              for get_api_request_count
         """
         # Set default paths if not provided
         if not db_path:
@@ -52,6 +188,44 @@ class DiscogsDatabase:
             
         self.db_path = db_path
         self.schema_path = schema_path
+        self.pragmas = dict(DEFAULT_PRAGMAS)
+        self.pragmas.update(pragmas or {})
+        
+        if fts_tokenizer not in FTS_TOKENIZERS:
+            raise ValueError(f"Unknown FTS tokenizer: {fts_tokenizer}")
+        self.fts_tokenizer = fts_tokenizer
+        self.fts_enabled = False
+        
+        if compression not in BLOB_COMPRESSIONS:
+            raise ValueError(f"Unknown blob compression: {compression}")
+        if compression == "zstd" and not ZSTD_AVAILABLE:
+            logger.warning("zstandard not installed, compressing blobs with zlib")
+            compression = "zlib"
+        self.compression = compression
+        
+        # Per-thread connection pool: (owning thread, connection) pairs, so
+        # connections of threads that have exited can be closed
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        
+        # Artist and label IDs known to be stored, so bulk imports skip them
+        # (at most KNOWN_ID_LIMIT of each)
+        self._known_artist_ids = set()
+        self._known_label_ids = set()
+        
+        # Hot tier of the AI query cache
+        self.query_cache = QueryCache(query_cache_size)
+        self.cache_cleanup_interval = cache_cleanup_interval
+        
+        # Buffered API request log and in-memory rolling counts
+        self.api_log_flush_interval = api_log_flush_interval
+        self.api_log_batch_size = max(1, api_log_batch_size)
+        self.api_log_retention_days = api_log_retention_days
+        self.request_counter = RequestCounter(api_count_window)
+        self._api_log_buffer = []
+        self._api_log_lock = threading.Lock()
+        self._api_log_flush_lock = threading.Lock()
         
         # Load schema
         self.schema = self._load_schema()
@@ -59,6 +233,19 @@ class DiscogsDatabase:
         # Initialize database
         self._init_db()
         
+        self._cleanup_stop = threading.Event()
+        self._cleanup_thread = None
+        if cache_cleanup_interval > 0:
+            self._cleanup_thread = threading.Thread(target=self._cleanup_loop, daemon=True)
+            self._cleanup_thread.start()
+        
+        self._api_log_wakeup = threading.Event()
+        self._api_log_stop = threading.Event()
+        self._api_log_thread = None
+        if api_log_flush_interval > 0:
+            self._api_log_thread = threading.Thread(target=self._api_log_flush_loop, daemon=True)
+            self._api_log_thread.start()
+        
         logger.info(f"Discogs database initialized at {db_path}")
     
     def _load_schema(self) -> Dict:
@@ -74,315 +261,769 @@ class DiscogsDatabase:
             logger.error(f"Error loading schema: {e}")
             return {}
     
+    def _get_connection(self) -> sqlite3.Connection:
+        """Get this thread's pooled connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode; transactions are managed by transaction()
+            conn = sqlite3.connect(
+                self.db_path,
+                isolation_level=None,
+                check_same_thread=False,
+                cached_statements=256
+            )
+            conn.row_factory = sqlite3.Row
+            for pragma, value in self.pragmas.items():
+                conn.execute(f"PRAGMA {pragma} = {value}")
+            
+            self._local.conn = conn
+            self._local.depth = 0
+            with self._connections_lock:
+                self._connections.append((threading.current_thread(), conn))
+            self.prune_connections()
+        return conn
+    
+    def prune_connections(self) -> int:
+        """
+        Close the pooled connections of threads that have exited.
+        
+        Called whenever a thread opens a connection and by the cleanup
+        thread, so callers using short-lived threads don't leak file
+        descriptors until close().
+        
+        Returns:
+            Number of connections closed
+        """
+        with self._connections_lock:
+            dead = [conn for thread, conn in self._connections if not thread.is_alive()]
+            if not dead:
+                return 0
+            self._connections = [(thread, conn) for thread, conn in self._connections
+                                 if thread.is_alive()]
+        
+        for conn in dead:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                logger.warning(f"Error closing connection: {e}")
+        return len(dead)
+    
+    def connection_count(self) -> int:
+        """
+        Count the open pooled connections.
+        
+        Returns:
+            Number of pooled connections
+        """
+        with self._connections_lock:
+            return len(self._connections)
+    
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Cursor]:
+        """
+        Group writes into a single transaction on this thread's connection.
+        
+        Transactions nest: inner blocks join the outermost one, which
+        commits on success and rolls back if an exception escapes.
+        
+        Yields:
+            A cursor on the pooled connection
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        if self._local.depth == 0:
+            # Take the write lock up front so concurrent writers wait on
+            # busy_timeout instead of failing when a read upgrades to a write
+            cursor.execute("BEGIN IMMEDIATE")
+        self._local.depth += 1
+        
+        try:
+            yield cursor
+        except BaseException:
+            self._local.depth -= 1
+            if self._local.depth == 0:
+                conn.rollback()
+            raise
+        else:
+            self._local.depth -= 1
+            if self._local.depth == 0:
+                conn.commit()
+    
+    def close(self):
+        """Stop background work, flush the API log and close every pooled connection."""
+        self._cleanup_stop.set()
+        if self._cleanup_thread:
+            self._cleanup_thread.join(timeout=5)
+            self._cleanup_thread = None
+        
+        self._api_log_stop.set()
+        self._api_log_wakeup.set()
+        if self._api_log_thread:
+            self._api_log_thread.join(timeout=5)
+            self._api_log_thread = None
+        self.flush_api_log()
+        
+        with self._connections_lock:
+            for _, conn in self._connections:
+                try:
+                    conn.close()
+                except sqlite3.Error as e:
+                    logger.warning(f"Error closing connection: {e}")
+            self._connections = []
+        self._local = threading.local()
+    
+    def _encode_blob(self, data: Any) -> Union[bytes, str]:
+        """Serialize a JSON blob with the configured compression."""
+        raw = json.dumps(data, separators=(",", ":"))
+        if self.compression == "zlib":
+            return zlib.compress(raw.encode(), 6)
+        if self.compression == "zstd":
+            return zstandard.ZstdCompressor(level=3).compress(raw.encode())
+        return raw
+    
     def _init_db(self):
         """Initialize the database schema if it doesn't exist."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self.transaction() as cursor:
+                # Columns added by later schema versions, checked before the
+                # tables are created so older databases can be upgraded
+                missing_columns = self._missing_columns(cursor)
             
-            # Create tables if they don't exist
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS releases (
-                id INTEGER PRIMARY KEY,
-                title TEXT NOT NULL,
-                released TEXT,
-                country TEXT,
-                master_id INTEGER,
-                data TEXT NOT NULL,
-                imported_at TEXT NOT NULL,
-                last_updated TEXT NOT NULL
-            )
-            ''')
+                # Create tables if they don't exist
+                cursor.execute('''
+                CREATE TABLE IF NOT EXISTS releases (
+                    id INTEGER PRIMARY KEY,
+                    title TEXT NOT NULL,
+                    released TEXT,
+                    country TEXT,
+                    master_id INTEGER,
+                    year INTEGER,
+                    data TEXT NOT NULL,
+                    imported_at TEXT NOT NULL,
+                    last_updated TEXT NOT NULL
+                )
+                ''')
             
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS artists (
-                id INTEGER PRIMARY KEY,
-                name TEXT NOT NULL,
-                realname TEXT,
-                data TEXT NOT NULL,
-                imported_at TEXT NOT NULL,
-                last_updated TEXT NOT NULL
-            )
-            ''')
+                cursor.execute('''
+                CREATE TABLE IF NOT EXISTS artists (
+                    id INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    realname TEXT,
+                    data TEXT NOT NULL,
+                    imported_at TEXT NOT NULL,
+                    last_updated TEXT NOT NULL
+                )
+                ''')
             
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS labels (
-                id INTEGER PRIMARY KEY,
-                name TEXT NOT NULL,
-                data TEXT NOT NULL,
-                imported_at TEXT NOT NULL,
-                last_updated TEXT NOT NULL
-            )
-            ''')
+                cursor.execute('''
+                CREATE TABLE IF NOT EXISTS labels (
+                    id INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    imported_at TEXT NOT NULL,
+                    last_updated TEXT NOT NULL
+                )
+                ''')
             
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS release_artists (
-                release_id INTEGER NOT NULL,
-                artist_id INTEGER NOT NULL,
-                role TEXT,
-                PRIMARY KEY (release_id, artist_id, role),
-                FOREIGN KEY (release_id) REFERENCES releases (id),
-                FOREIGN KEY (artist_id) REFERENCES artists (id)
-            )
-            ''')
+                cursor.execute('''
+                CREATE TABLE IF NOT EXISTS release_artists (
+                    release_id INTEGER NOT NULL,
+                    artist_id INTEGER NOT NULL,
+                    role TEXT,
+                    name TEXT,
+                    position INTEGER,
+                    PRIMARY KEY (release_id, artist_id, role),
+                    FOREIGN KEY (release_id) REFERENCES releases (id),
+                    FOREIGN KEY (artist_id) REFERENCES artists (id)
+                )
+                ''')
             
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS release_labels (
-                release_id INTEGER NOT NULL,
-                label_id INTEGER NOT NULL,
-                catno TEXT,
-                PRIMARY KEY (release_id, label_id, catno),
-                FOREIGN KEY (release_id) REFERENCES releases (id),
-                FOREIGN KEY (label_id) REFERENCES labels (id)
-            )
-            ''')
+                cursor.execute('''
+                CREATE TABLE IF NOT EXISTS release_labels (
+                    release_id INTEGER NOT NULL,
+                    label_id INTEGER NOT NULL,
+                    catno TEXT,
+                    PRIMARY KEY (release_id, label_id, catno),
+                    FOREIGN KEY (release_id) REFERENCES releases (id),
+                    FOREIGN KEY (label_id) REFERENCES labels (id)
+                )
+                ''')
             
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS identifiers (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                release_id INTEGER NOT NULL,
-                type TEXT NOT NULL,
-                value TEXT NOT NULL,
-                FOREIGN KEY (release_id) REFERENCES releases (id),
-                UNIQUE(release_id, type, value)
-            )
-            ''')
+                cursor.execute('''
+                CREATE TABLE IF NOT EXISTS identifiers (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    release_id INTEGER NOT NULL,
+                    type TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    FOREIGN KEY (release_id) REFERENCES releases (id),
+                    UNIQUE(release_id, type, value)
+                )
+                ''')
             
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tracks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                release_id INTEGER NOT NULL,
-                position TEXT,
-                title TEXT NOT NULL,
-                duration TEXT,
-                data TEXT,
-                FOREIGN KEY (release_id) REFERENCES releases (id)
-            )
-            ''')
+                cursor.execute('''
+                CREATE TABLE IF NOT EXISTS tracks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    release_id INTEGER NOT NULL,
+                    position TEXT,
+                    title TEXT NOT NULL,
+                    duration TEXT,
+                    data TEXT,
+                    FOREIGN KEY (release_id) REFERENCES releases (id)
+                )
+                ''')
             
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS mesa_rights (
-                id TEXT PRIMARY KEY,
-                discogs_release_id INTEGER,
-                reference_id TEXT NOT NULL,
-                public_data TEXT,
-                encrypted_data TEXT NOT NULL,
-                privacy_settings TEXT,
-                created_at TEXT NOT NULL,
-                updated_at TEXT NOT NULL,
-                FOREIGN KEY (discogs_release_id) REFERENCES releases (id)
-            )
-            ''')
+                cursor.execute('''
+                CREATE TABLE IF NOT EXISTS release_genres (
+                    release_id INTEGER NOT NULL,
+                    genre TEXT NOT NULL,
+                    PRIMARY KEY (release_id, genre),
+                    FOREIGN KEY (release_id) REFERENCES releases (id)
+                )
+                ''')
             
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS ai_agent_cache (
-                query_hash TEXT PRIMARY KEY,
-                query TEXT NOT NULL,
-                result TEXT NOT NULL,
-                timestamp TEXT NOT NULL,
-                expiration TEXT NOT NULL
-            )
-            ''')
+                cursor.execute('''
+                CREATE TABLE IF NOT EXISTS release_styles (
+                    release_id INTEGER NOT NULL,
+                    style TEXT NOT NULL,
+                    PRIMARY KEY (release_id, style),
+                    FOREIGN KEY (release_id) REFERENCES releases (id)
+                )
+                ''')
             
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS api_requests (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                endpoint TEXT NOT NULL,
-                params TEXT,
-                response_code INTEGER,
-                timestamp TEXT NOT NULL
-            )
-            ''')
+                cursor.execute('''
+                CREATE TABLE IF NOT EXISTS release_formats (
+                    release_id INTEGER NOT NULL,
+                    position INTEGER NOT NULL,
+                    name TEXT,
+                    qty TEXT,
+                    text TEXT,
+                    descriptions TEXT,
+                    PRIMARY KEY (release_id, position),
+                    FOREIGN KEY (release_id) REFERENCES releases (id)
+                )
+                ''')
             
-            # Create indices for faster searches
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_releases_title ON releases (title)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_artists_name ON artists (name)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_labels_name ON labels (name)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_identifiers_value ON identifiers (value)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_mesa_rights_reference ON mesa_rights (reference_id)')
+                cursor.execute('''
+                CREATE TABLE IF NOT EXISTS mesa_rights (
+                    id TEXT PRIMARY KEY,
+                    discogs_release_id INTEGER,
+                    reference_id TEXT NOT NULL,
+                    public_data TEXT,
+                    encrypted_data TEXT NOT NULL,
+                    privacy_settings TEXT,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    FOREIGN KEY (discogs_release_id) REFERENCES releases (id)
+                )
+                ''')
             
-            conn.commit()
-            conn.close()
+                cursor.execute('''
+                CREATE TABLE IF NOT EXISTS ai_agent_cache (
+                    query_hash TEXT PRIMARY KEY,
+                    query TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    expiration TEXT NOT NULL,
+                    expires_at INTEGER NOT NULL DEFAULT 0
+                )
+                ''')
+            
+                cursor.execute('''
+                CREATE TABLE IF NOT EXISTS api_requests (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    endpoint TEXT NOT NULL,
+                    params TEXT,
+                    response_code INTEGER,
+                    timestamp TEXT NOT NULL
+                )
+                ''')
+            
+                cursor.execute('''
+                CREATE TABLE IF NOT EXISTS masters (
+                    id INTEGER PRIMARY KEY,
+                    title TEXT NOT NULL,
+                    main_release INTEGER,
+                    year INTEGER,
+                    data TEXT NOT NULL,
+                    imported_at TEXT NOT NULL,
+                    last_updated TEXT NOT NULL
+                )
+                ''')
+            
+                for table, columns in missing_columns.items():
+                    for column, declaration in columns:
+                        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+            
+                # Create indices for faster searches
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_releases_title ON releases (title)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_artists_name ON artists (name)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_labels_name ON labels (name)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_identifiers_value ON identifiers (value)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_mesa_rights_reference ON mesa_rights (reference_id)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_tracks_release ON tracks (release_id)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_release_artists_artist ON release_artists (artist_id)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_release_labels_label ON release_labels (label_id)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_release_genres_genre ON release_genres (genre)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_release_styles_style ON release_styles (style)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_releases_year ON releases (year)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_ai_agent_cache_expires ON ai_agent_cache (expires_at)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_api_requests_timestamp ON api_requests (timestamp)')
+                
+                # Older releases are backfilled from their blobs; older cached
+                # queries get expires_at 0 and are simply treated as expired
+                if "releases" in missing_columns or "release_artists" in missing_columns:
+                    self._backfill_release_columns(cursor)
+                
+                self._init_fts(cursor)
+                
+                # Seed the rolling counts with requests logged by earlier runs
+                since = datetime.now() - timedelta(seconds=self.request_counter.window_seconds)
+                cursor.execute('SELECT timestamp FROM api_requests WHERE timestamp > ?', (since.isoformat(),))
+                self.request_counter.record_many(
+                    datetime.fromisoformat(row["timestamp"]).timestamp() for row in cursor
+                )
             
         except Exception as e:
             logger.error(f"Database initialization error: {e}")
             raise
     
+    def _missing_columns(self, cursor) -> Dict[str, List[Tuple[str, str]]]:
+        """Find SCHEMA_MIGRATIONS columns missing from existing tables."""
+        missing = {}
+        for table, columns in SCHEMA_MIGRATIONS.items():
+            cursor.execute(f"PRAGMA table_info({table})")
+            existing = {row["name"] for row in cursor.fetchall()}
+            # Tables that don't exist yet are created with every column
+            if not existing:
+                continue
+            absent = [(column, declaration) for column, declaration in columns if column not in existing]
+            if absent:
+                missing[table] = absent
+        return missing
+    
+    def _init_fts(self, cursor):
+        """
+        Create the FTS5 search index and the triggers keeping it in sync.
+        
+        The index is (re)built from the content tables when it is first
+        created or when the configured tokenizer changes. Searches fall back
+        to LIKE scans if this SQLite build lacks FTS5.
+        """
+        tokenizer = FTS_TOKENIZERS[self.fts_tokenizer]
+        
+        for fts_table, (content_table, columns) in FTS_TABLES.items():
+            cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (fts_table,))
+            row = cursor.fetchone()
+            if row and f"tokenize = '{tokenizer}'" in row[0]:
+                continue
+            
+            if row:
+                logger.info(f"Rebuilding {fts_table} with the {self.fts_tokenizer} tokenizer")
+                cursor.execute(f"DROP TABLE {fts_table}")
+            
+            column_list = ", ".join(columns)
+            try:
+                cursor.execute(f'''
+                CREATE VIRTUAL TABLE {fts_table} USING fts5(
+                    {column_list}, content = '{content_table}', content_rowid = 'id',
+                    tokenize = '{tokenizer}'
+                )
+                ''')
+            except sqlite3.OperationalError as e:
+                logger.warning(f"Full-text search unavailable, falling back to LIKE scans: {e}")
+                return
+            cursor.execute(f"INSERT INTO {fts_table} ({fts_table}) VALUES ('rebuild')")
+        
+        for fts_table, (content_table, columns) in FTS_TABLES.items():
+            column_list = ", ".join(columns)
+            new_values = ", ".join(f"new.{column}" for column in columns)
+            old_values = ", ".join(f"old.{column}" for column in columns)
+            changed = " OR ".join(f"old.{column} IS NOT new.{column}" for column in columns)
+            
+            cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {fts_table}_insert AFTER INSERT ON {content_table} BEGIN
+                INSERT INTO {fts_table} (rowid, {column_list}) VALUES (new.id, {new_values});
+            END
+            ''')
+            cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {fts_table}_delete AFTER DELETE ON {content_table} BEGIN
+                INSERT INTO {fts_table} ({fts_table}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+            END
+            ''')
+            cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {fts_table}_update AFTER UPDATE ON {content_table}
+            WHEN {changed} BEGIN
+                INSERT INTO {fts_table} ({fts_table}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+                INSERT INTO {fts_table} (rowid, {column_list}) VALUES (new.id, {new_values});
+            END
+            ''')
+        
+        self.fts_enabled = True
+    
+    def _fts_query(self, query: str) -> Optional[str]:
+        """
+        Build an FTS5 MATCH expression for a user query.
+        
+        With the word tokenizer every term is matched as a prefix; with the
+        trigram tokenizer the whole query is matched as a substring.
+        
+        Returns:
+            The MATCH expression, or None if the index can't serve the query
+        """
+        if not self.fts_enabled:
+            return None
+        
+        if self.fts_tokenizer == "trigram":
+            text = query.strip()
+            # Trigrams can't match anything shorter than three characters
+            if len(text) < 3:
+                return None
+            return '"' + text.replace('"', '""') + '"'
+        
+        tokens = _SEARCH_TOKEN_PATTERN.findall(query)
+        if not tokens:
+            return None
+        return " ".join(f'"{token}"*' for token in tokens)
+    
     def save_release(self, release_data: Dict) -> int:
         """
         Save a Discogs release to the database.
         
         Args:
             release_data: Complete release data from Discogs API
-            
+        
         Returns:
             The release ID
         """
+        release_id = release_data.get("id")
+        if not release_id:
+            logger.error("Error saving release: Release data must include an ID")
+            raise ValueError("Release data must include an ID")
+        
+        self._save_release_batch([release_data])
+        
+        logger.info(f"Saved release {release_id}: {release_data.get('title', '')}")
+        return release_id
+    
+    def save_releases(self, releases: Iterable[Dict], batch_size: int = 1000) -> int:
+        """
+        Save many releases, committing once per batch.
+        
+        Rows are written with executemany upserts, and artists and labels
+        recently stored by this instance are not written again. A release
+        repeated within a batch is saved once, from its last occurrence.
+        
+        Args:
+            releases: Iterable of Discogs release data (may be a generator)
+            batch_size: Number of releases written per transaction
+        
+        Returns:
+            Number of distinct releases saved per batch
+        """
+        saved = 0
+        batch = []
+        
+        for release_data in releases:
+            if not release_data.get("id"):
+                logger.warning("Skipping release without an ID")
+                continue
+            batch.append(release_data)
+            if len(batch) >= batch_size:
+                saved += self._save_release_batch(batch)
+                batch = []
+        
+        if batch:
+            saved += self._save_release_batch(batch)
+        
+        logger.info(f"Saved {saved} releases")
+        return saved
+    
+    def _release_rows(self, release_data: Dict, timestamp: str, rows: Dict[str, List]):
+        """
+        Split a release into its row and the rows of its side tables.
+        
+        Args:
+            release_data: Discogs release data
+            timestamp: Import timestamp
+            rows: Row lists keyed by table, appended to in place
+        """
+        release_id = release_data["id"]
+        released = release_data.get("released") or ""
+        year = release_data.get("year") or _parse_year(released)
+        
+        rows["releases"].append((
+            release_id, release_data.get("title", ""), released, release_data.get("country", ""),
+            release_data.get("master_id"), year, self._encode_blob(release_data), timestamp, timestamp
+        ))
+        
+        credits = [(artist, "primary") for artist in release_data.get("artists", [])]
+        credits += [(artist, artist.get("role") or "contributor")
+                    for artist in release_data.get("extraartists", [])]
+        for position, (artist, role) in enumerate(credits):
+            artist_id = artist.get("id")
+            if not artist_id:
+                continue
+            if artist_id not in self._known_artist_ids and artist_id not in rows["artists"]:
+                rows["artists"][artist_id] = (artist_id, artist.get("name", ""), artist.get("realname", ""),
+                                              self._encode_blob(artist), timestamp, timestamp)
+            rows["release_artists"].append((release_id, artist_id, role, artist.get("name", ""), position))
+        
+        for label in release_data.get("labels", []):
+            label_id = label.get("id")
+            if not label_id:
+                continue
+            if label_id not in self._known_label_ids and label_id not in rows["labels"]:
+                rows["labels"][label_id] = (label_id, label.get("name", ""), self._encode_blob(label),
+                                            timestamp, timestamp)
+            rows["release_labels"].append((release_id, label_id, label.get("catno", "")))
+        
+        for identifier in release_data.get("identifiers", []):
+            id_type = identifier.get("type", "").lower()
+            id_value = identifier.get("value", "")
+            if id_type and id_value:
+                rows["identifiers"].append((release_id, id_type, id_value))
+        
+        for genre in release_data.get("genres", []):
+            rows["release_genres"].append((release_id, genre))
+        for style in release_data.get("styles", []):
+            rows["release_styles"].append((release_id, style))
+        
+        for position, fmt in enumerate(release_data.get("formats", [])):
+            rows["release_formats"].append((
+                release_id, position, fmt.get("name", ""), str(fmt.get("qty", "")),
+                fmt.get("text", ""), json.dumps(fmt.get("descriptions", []))
+            ))
+        
+        for track in release_data.get("tracklist", []):
+            if track.get("title"):
+                rows["tracks"].append((release_id, track.get("position", ""), track["title"],
+                                       track.get("duration", ""), self._encode_blob(track)))
+    
+    def _write_release_rows(self, cursor, rows: Dict[str, List]):
+        """Upsert releases and replace their side-table rows."""
+        cursor.executemany('''
+        INSERT INTO releases (id, title, released, country, master_id, year, data, imported_at, last_updated)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (id) DO UPDATE SET
+            title = excluded.title, released = excluded.released, country = excluded.country,
+            master_id = excluded.master_id, year = excluded.year, data = excluded.data,
+            last_updated = excluded.last_updated
+        ''', rows["releases"])
+        
+        cursor.executemany('''
+        INSERT INTO artists (id, name, realname, data, imported_at, last_updated)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (id) DO NOTHING
+        ''', rows["artists"].values())
+        
+        cursor.executemany('''
+        INSERT INTO labels (id, name, data, imported_at, last_updated)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (id) DO NOTHING
+        ''', rows["labels"].values())
+        
+        # Replace side-table rows so a re-imported release doesn't keep stale
+        # credits or duplicate its tracks
+        release_ids = [(row[0],) for row in rows["releases"]]
+        for table in RELEASE_SIDE_TABLES:
+            cursor.executemany(f"DELETE FROM {table} WHERE release_id = ?", release_ids)
+        
+        cursor.executemany('''
+        INSERT INTO release_artists (release_id, artist_id, role, name, position) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT DO NOTHING
+        ''', rows["release_artists"])
+        
+        cursor.executemany('''
+        INSERT INTO release_labels (release_id, label_id, catno) VALUES (?, ?, ?)
+        ON CONFLICT DO NOTHING
+        ''', rows["release_labels"])
+        
+        cursor.executemany('''
+        INSERT INTO identifiers (release_id, type, value) VALUES (?, ?, ?)
+        ON CONFLICT DO NOTHING
+        ''', rows["identifiers"])
+        
+        cursor.executemany('''
+        INSERT INTO release_genres (release_id, genre) VALUES (?, ?)
+        ON CONFLICT DO NOTHING
+        ''', rows["release_genres"])
+        
+        cursor.executemany('''
+        INSERT INTO release_styles (release_id, style) VALUES (?, ?)
+        ON CONFLICT DO NOTHING
+        ''', rows["release_styles"])
+        
+        cursor.executemany('''
+        INSERT INTO release_formats (release_id, position, name, qty, text, descriptions)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ''', rows["release_formats"])
+        
+        cursor.executemany('''
+        INSERT INTO tracks (release_id, position, title, duration, data)
+        VALUES (?, ?, ?, ?, ?)
+        ''', rows["tracks"])
+    
+    @staticmethod
+    def _empty_release_rows() -> Dict[str, Any]:
+        """Row containers for _release_rows (artists and labels keyed by ID)."""
+        rows = {table: [] for table in ("releases",) + RELEASE_SIDE_TABLES}
+        rows["artists"] = {}
+        rows["labels"] = {}
+        return rows
+    
+    def _save_release_batch(self, batch: List[Dict]) -> int:
+        """Write one batch of releases in a single transaction."""
+        timestamp = datetime.now().isoformat()
+        rows = self._empty_release_rows()
+        
+        # Keep the last occurrence of a repeated release, whose side-table
+        # rows would otherwise be inserted once per occurrence
+        latest = {release_data["id"]: release_data for release_data in batch}
+        for release_data in latest.values():
+            self._release_rows(release_data, timestamp, rows)
+        
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            release_id = release_data.get("id")
-            if not release_id:
-                raise ValueError("Release data must include an ID")
-            
-            # Check if release already exists
-            cursor.execute("SELECT id FROM releases WHERE id = ?", (release_id,))
-            exists = cursor.fetchone()
-            
-            timestamp = datetime.now().isoformat()
-            
-            # Format data for insertion
-            release_json = json.dumps(release_data)
-            title = release_data.get("title", "")
-            released = release_data.get("released", "")
-            country = release_data.get("country", "")
-            master_id = release_data.get("master_id")
-            
-            if exists:
-                # Update existing record
-                cursor.execute('''
-                UPDATE releases 
-                SET title = ?, released = ?, country = ?, master_id = ?,
-                    data = ?, last_updated = ?
-                WHERE id = ?
-                ''', (title, released, country, master_id, release_json, timestamp, release_id))
-            else:
-                # Insert new record
-                cursor.execute('''
-                INSERT INTO releases (id, title, released, country, master_id, data, imported_at, last_updated)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (release_id, title, released, country, master_id, release_json, timestamp, timestamp))
-            
-            # Process artists
-            if "artists" in release_data:
-                for artist in release_data["artists"]:
-                    artist_id = artist.get("id")
-                    if artist_id:
-                        # Save artist data if not already saved
-                        self._save_artist_if_needed(cursor, artist_id, artist, timestamp)
-                        
-                        # Link artist to release
-                        role = "primary"
-                        try:
-                            cursor.execute('''
-                            INSERT OR REPLACE INTO release_artists (release_id, artist_id, role)
-                            VALUES (?, ?, ?)
-                            ''', (release_id, artist_id, role))
-                        except sqlite3.IntegrityError:
-                            pass
-            
-            # Process extraartists
-            if "extraartists" in release_data:
-                for artist in release_data["extraartists"]:
-                    artist_id = artist.get("id")
-                    if artist_id:
-                        # Save artist data if not already saved
-                        self._save_artist_if_needed(cursor, artist_id, artist, timestamp)
-                        
-                        # Link artist to release with role
-                        role = artist.get("role", "contributor")
-                        try:
-                            cursor.execute('''
-                            INSERT OR REPLACE INTO release_artists (release_id, artist_id, role)
-                            VALUES (?, ?, ?)
-                            ''', (release_id, artist_id, role))
-                        except sqlite3.IntegrityError:
-                            pass
-            
-            # Process labels
-            if "labels" in release_data:
-                for label in release_data["labels"]:
-                    label_id = label.get("id")
-                    if label_id:
-                        # Save label data if not already saved
-                        self._save_label_if_needed(cursor, label_id, label, timestamp)
-                        
-                        # Link label to release
-                        catno = label.get("catno", "")
-                        try:
-                            cursor.execute('''
-                            INSERT OR REPLACE INTO release_labels (release_id, label_id, catno)
-                            VALUES (?, ?, ?)
-                            ''', (release_id, label_id, catno))
-                        except sqlite3.IntegrityError:
-                            pass
-            
-            # Process identifiers
-            if "identifiers" in release_data:
-                for identifier in release_data["identifiers"]:
-                    id_type = identifier.get("type", "").lower()
-                    id_value = identifier.get("value", "")
-                    
-                    if id_type and id_value:
-                        try:
-                            cursor.execute('''
-                            INSERT OR REPLACE INTO identifiers (release_id, type, value)
-                            VALUES (?, ?, ?)
-                            ''', (release_id, id_type, id_value))
-                        except sqlite3.IntegrityError:
-                            pass
-            
-            # Process tracks
-            if "tracklist" in release_data:
-                for track in release_data["tracklist"]:
-                    position = track.get("position", "")
-                    title = track.get("title", "")
-                    duration = track.get("duration", "")
-                    
-                    if title:  # Only insert if there's a title
-                        track_json = json.dumps(track)
-                        try:
-                            cursor.execute('''
-                            INSERT INTO tracks (release_id, position, title, duration, data)
-                            VALUES (?, ?, ?, ?, ?)
-                            ''', (release_id, position, title, duration, track_json))
-                        except sqlite3.IntegrityError:
-                            pass
-            
-            conn.commit()
-            conn.close()
-            
-            logger.info(f"Saved release {release_id}: {title}")
-            return release_id
-            
+            with self.transaction() as cursor:
+                self._write_release_rows(cursor, rows)
         except Exception as e:
-            if conn:
-                conn.rollback()
-                conn.close()
-            logger.error(f"Error saving release: {e}")
+            logger.error(f"Error saving release batch: {e}")
             raise
+        
+        # Only remember IDs once they are committed
+        self._remember_ids(self._known_artist_ids, rows["artists"])
+        self._remember_ids(self._known_label_ids, rows["labels"])
+        
+        return len(rows["releases"])
+    
+    @staticmethod
+    def _remember_ids(known_ids: set, ids: Iterable):
+        """Add committed IDs to a known-ID set, resetting it past KNOWN_ID_LIMIT."""
+        ids = list(ids)
+        known_ids.update(ids)
+        if len(known_ids) > KNOWN_ID_LIMIT:
+            known_ids.clear()
+            known_ids.update(ids[-KNOWN_ID_LIMIT:])
+    
+    def _backfill_release_columns(self, cursor, batch_size: int = 1000):
+        """
+        Populate the columnar fields and side tables of releases saved
+        before they existed, compressing their blobs along the way.
+        """
+        cursor.execute("SELECT COUNT(*) FROM releases")
+        total = cursor.fetchone()[0]
+        if not total:
+            return
+        
+        logger.info(f"Extracting columnar fields for {total} existing releases")
+        last_id = None
+        timestamp = datetime.now().isoformat()
+        
+        while True:
+            if last_id is None:
+                cursor.execute("SELECT id, data, imported_at FROM releases ORDER BY id LIMIT ?", (batch_size,))
+            else:
+                cursor.execute("SELECT id, data, imported_at FROM releases WHERE id > ? ORDER BY id LIMIT ?",
+                               (last_id, batch_size))
+            fetched = cursor.fetchall()
+            if not fetched:
+                break
+            
+            rows = self._empty_release_rows()
+            for row in fetched:
+                self._release_rows(_decode_blob(row["data"]), timestamp, rows)
+                # Keep the original import time
+                rows["releases"][-1] = rows["releases"][-1][:7] + (row["imported_at"], timestamp)
+            self._write_release_rows(cursor, rows)
+            last_id = fetched[-1]["id"]
     
-    def _save_artist_if_needed(self, cursor, artist_id: int, artist_data: Dict, timestamp: str):
-        """Save artist data if it doesn't already exist in the database."""
-        cursor.execute("SELECT id FROM artists WHERE id = ?", (artist_id,))
-        exists = cursor.fetchone()
+    def save_artists(self, artists: Iterable[Dict], batch_size: int = 1000) -> int:
+        """
+        Save many full artist records, replacing any stub rows.
         
-        if not exists:
-            # Only have basic info, insert what we have
-            name = artist_data.get("name", "")
-            realname = artist_data.get("realname", "")
+        Args:
+            artists: Iterable of Discogs artist data
+            batch_size: Number of artists written per transaction
             
-            artist_json = json.dumps(artist_data)
-            cursor.execute('''
-            INSERT INTO artists (id, name, realname, data, imported_at, last_updated)
-            VALUES (?, ?, ?, ?, ?, ?)
-            ''', (artist_id, name, realname, artist_json, timestamp, timestamp))
+        Returns:
+            Number of artists saved
+        """
+        return self._save_entities("artists", artists, batch_size)
     
-    def _save_label_if_needed(self, cursor, label_id: int, label_data: Dict, timestamp: str):
-        """Save label data if it doesn't already exist in the database."""
-        cursor.execute("SELECT id FROM labels WHERE id = ?", (label_id,))
-        exists = cursor.fetchone()
+    def save_labels(self, labels: Iterable[Dict], batch_size: int = 1000) -> int:
+        """
+        Save many full label records, replacing any stub rows.
         
-        if not exists:
-            # Only have basic info, insert what we have
-            name = label_data.get("name", "")
+        Args:
+            labels: Iterable of Discogs label data
+            batch_size: Number of labels written per transaction
             
-            label_json = json.dumps(label_data)
-            cursor.execute('''
-            INSERT INTO labels (id, name, data, imported_at, last_updated)
-            VALUES (?, ?, ?, ?, ?)
-            ''', (label_id, name, label_json, timestamp, timestamp))
+        Returns:
+            Number of labels saved
+        """
+        return self._save_entities("labels", labels, batch_size)
+    
+    def save_masters(self, masters: Iterable[Dict], batch_size: int = 1000) -> int:
+        """
+        Save many master release records.
+        
+        Args:
+            masters: Iterable of Discogs master data
+            batch_size: Number of masters written per transaction
+            
+        Returns:
+            Number of masters saved
+        """
+        return self._save_entities("masters", masters, batch_size)
+    
+    def _save_entities(self, table: str, entities: Iterable[Dict], batch_size: int) -> int:
+        """Upsert entities into an ENTITY_COLUMNS table, one transaction per batch."""
+        columns = ENTITY_COLUMNS[table]
+        column_list = ", ".join(["id"] + list(columns) + ["data", "imported_at", "last_updated"])
+        placeholders = ", ".join("?" * (len(columns) + 4))
+        updates = ", ".join(f"{column} = excluded.{column}" for column in list(columns) + ["data", "last_updated"])
+        sql = f'''
+        INSERT INTO {table} ({column_list}) VALUES ({placeholders})
+        ON CONFLICT (id) DO UPDATE SET {updates}
+        '''
+        known_ids = {"artists": self._known_artist_ids, "labels": self._known_label_ids}.get(table)
+        
+        saved = 0
+        batch = []
+        
+        def flush():
+            timestamp = datetime.now().isoformat()
+            rows = [
+                (entity["id"],) + tuple(
+                    entity.get(column) if entity.get(column) is not None else default
+                    for column, default in columns.items()
+                ) + (self._encode_blob(entity), timestamp, timestamp)
+                for entity in batch
+            ]
+            try:
+                with self.transaction() as cursor:
+                    cursor.executemany(sql, rows)
+            except Exception as e:
+                logger.error(f"Error saving {table} batch: {e}")
+                raise
+            if known_ids is not None:
+                self._remember_ids(known_ids, (row[0] for row in rows))
+            return len(rows)
+        
+        for entity in entities:
+            if not entity.get("id"):
+                logger.warning(f"Skipping {table[:-1]} without an ID")
+                continue
+            batch.append(entity)
+            if len(batch) >= batch_size:
+                saved += flush()
+                batch = []
+        
+        if batch:
+            saved += flush()
+        
+        logger.info(f"Saved {saved} {table}")
+        return saved
     
     def save_mesa_right(self, right_data: Dict) -> str:
         """
@@ -395,60 +1036,52 @@ class DiscogsDatabase:
             The right ID
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            right_id = right_data.get("right_id")
-            if not right_id:
-                raise ValueError("Rights data must include a right_id")
-            
-            reference_id = right_data.get("reference_id")
-            if not reference_id:
-                raise ValueError("Rights data must include a reference_id")
-            
-            discogs_release_id = None
-            if "discogs_release_id" in right_data:
-                discogs_release_id = right_data["discogs_release_id"]
-            
-            # Check if right already exists
-            cursor.execute("SELECT id FROM mesa_rights WHERE id = ?", (right_id,))
-            exists = cursor.fetchone()
-            
-            timestamp = datetime.now().isoformat()
-            
-            # Format data for insertion
-            public_data = json.dumps(right_data.get("public_data", {}))
-            encrypted_data = right_data.get("encrypted_data", "")
-            privacy_settings = json.dumps(right_data.get("privacy_settings", {}))
-            
-            if exists:
-                # Update existing record
-                cursor.execute('''
-                UPDATE mesa_rights 
-                SET discogs_release_id = ?, reference_id = ?, public_data = ?,
-                    encrypted_data = ?, privacy_settings = ?, updated_at = ?
-                WHERE id = ?
-                ''', (discogs_release_id, reference_id, public_data, 
-                      encrypted_data, privacy_settings, timestamp, right_id))
-            else:
-                # Insert new record
-                cursor.execute('''
-                INSERT INTO mesa_rights (id, discogs_release_id, reference_id, public_data,
-                                       encrypted_data, privacy_settings, created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (right_id, discogs_release_id, reference_id, public_data,
-                      encrypted_data, privacy_settings, timestamp, timestamp))
-            
-            conn.commit()
-            conn.close()
+            with self.transaction() as cursor:
+                right_id = right_data.get("right_id")
+                if not right_id:
+                    raise ValueError("Rights data must include a right_id")
+            
+                reference_id = right_data.get("reference_id")
+                if not reference_id:
+                    raise ValueError("Rights data must include a reference_id")
+            
+                discogs_release_id = None
+                if "discogs_release_id" in right_data:
+                    discogs_release_id = right_data["discogs_release_id"]
+            
+                # Check if right already exists
+                cursor.execute("SELECT id FROM mesa_rights WHERE id = ?", (right_id,))
+                exists = cursor.fetchone()
+            
+                timestamp = datetime.now().isoformat()
+            
+                # Format data for insertion
+                public_data = json.dumps(right_data.get("public_data", {}))
+                encrypted_data = right_data.get("encrypted_data", "")
+                privacy_settings = json.dumps(right_data.get("privacy_settings", {}))
+            
+                if exists:
+                    # Update existing record
+                    cursor.execute('''
+                    UPDATE mesa_rights 
+                    SET discogs_release_id = ?, reference_id = ?, public_data = ?,
+                        encrypted_data = ?, privacy_settings = ?, updated_at = ?
+                    WHERE id = ?
+                    ''', (discogs_release_id, reference_id, public_data, 
+                          encrypted_data, privacy_settings, timestamp, right_id))
+                else:
+                    # Insert new record
+                    cursor.execute('''
+                    INSERT INTO mesa_rights (id, discogs_release_id, reference_id, public_data,
+                                           encrypted_data, privacy_settings, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ''', (right_id, discogs_release_id, reference_id, public_data,
+                          encrypted_data, privacy_settings, timestamp, timestamp))
             
             logger.info(f"Saved MESA right {right_id}")
             return right_id
             
         except Exception as e:
-            if conn:
-                conn.rollback()
-                conn.close()
             logger.error(f"Error saving MESA right: {e}")
             raise
     
@@ -463,25 +1096,156 @@ class DiscogsDatabase:
             Release data or None if not found
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            cursor = self._get_connection().cursor()
             
             cursor.execute("SELECT data FROM releases WHERE id = ?", (release_id,))
             row = cursor.fetchone()
             
-            conn.close()
-            
             if row:
-                return json.loads(row["data"])
+                return _decode_blob(row["data"])
             return None
             
         except Exception as e:
             logger.error(f"Error retrieving release: {e}")
-            if conn:
-                conn.close()
             return None
     
+    def get_release_fields(self, release_id: int, fields: List[str]) -> Optional[Dict]:
+        """
+        Retrieve selected fields of a release without decoding its blob.
+        
+        Args:
+            release_id: Discogs release ID
+            fields: Fields to fetch (see RELEASE_COLUMN_FIELDS and
+                    RELEASE_SIDE_FIELDS)
+        
+        Returns:
+            Partial release data in the API shape, or None if not found
+        """
+        return self.get_releases_fields([release_id], fields).get(release_id)
+    
+    def get_releases_fields(self, release_ids: List[int], fields: List[str]) -> Dict[int, Dict]:
+        """
+        Retrieve selected fields of many releases.
+        
+        Each requested side-table field costs one query for the whole list
+        of releases, so callers only pay for the fields they ask for.
+        
+        Args:
+            release_ids: Discogs release IDs
+            fields: Fields to fetch (see RELEASE_COLUMN_FIELDS and
+                    RELEASE_SIDE_FIELDS)
+        
+        Returns:
+            Partial release data keyed by release ID (missing releases omitted)
+        """
+        unknown = set(fields) - set(RELEASE_COLUMN_FIELDS) - set(RELEASE_SIDE_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown release fields: {', '.join(sorted(unknown))}")
+        
+        columns = ["id"] + [field for field in RELEASE_COLUMN_FIELDS if field in fields and field != "id"]
+        side_fields = [field for field in RELEASE_SIDE_FIELDS if field in fields]
+        results = {}
+        
+        try:
+            cursor = self._get_connection().cursor()
+            
+            # Stay well under SQLite's bound parameter limit
+            ids = list(dict.fromkeys(release_ids))
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                
+                cursor.execute(f"SELECT {', '.join(columns)} FROM releases WHERE id IN ({placeholders})", chunk)
+                found = {}
+                for row in cursor.fetchall():
+                    release = {column: row[column] for column in columns}
+                    for field in side_fields:
+                        release[field] = []
+                    found[row["id"]] = release
+                
+                if found and side_fields:
+                    self._fetch_side_fields(cursor, found, side_fields)
+                results.update(found)
+            
+            return results
+        
+        except Exception as e:
+            logger.error(f"Error retrieving release fields: {e}")
+            return {}
+    
+    def _fetch_side_fields(self, cursor, releases: Dict[int, Dict], fields: List[str]):
+        """Fill side-table fields of releases keyed by ID in place."""
+        ids = list(releases)
+        placeholders = ", ".join("?" * len(ids))
+        
+        if "artists" in fields or "extraartists" in fields:
+            cursor.execute(f'''
+            SELECT ra.release_id, ra.artist_id, COALESCE(ra.name, a.name) AS name, ra.role
+            FROM release_artists ra LEFT JOIN artists a ON a.id = ra.artist_id
+            WHERE ra.release_id IN ({placeholders})
+            ORDER BY ra.release_id, ra.position
+            ''', ids)
+            for row in cursor.fetchall():
+                release = releases[row["release_id"]]
+                if row["role"] == "primary":
+                    if "artists" in fields:
+                        release["artists"].append({"id": row["artist_id"], "name": row["name"]})
+                elif "extraartists" in fields:
+                    release["extraartists"].append({"id": row["artist_id"], "name": row["name"],
+                                                    "role": row["role"]})
+        
+        if "labels" in fields:
+            cursor.execute(f'''
+            SELECT rl.release_id, rl.label_id, l.name, rl.catno
+            FROM release_labels rl LEFT JOIN labels l ON l.id = rl.label_id
+            WHERE rl.release_id IN ({placeholders})
+            ORDER BY rl.rowid
+            ''', ids)
+            for row in cursor.fetchall():
+                releases[row["release_id"]]["labels"].append(
+                    {"id": row["label_id"], "name": row["name"], "catno": row["catno"]}
+                )
+        
+        if "identifiers" in fields:
+            cursor.execute(f'''
+            SELECT release_id, type, value FROM identifiers
+            WHERE release_id IN ({placeholders}) ORDER BY id
+            ''', ids)
+            for row in cursor.fetchall():
+                releases[row["release_id"]]["identifiers"].append({"type": row["type"], "value": row["value"]})
+        
+        for field, table, column in (("genres", "release_genres", "genre"), ("styles", "release_styles", "style")):
+            if field in fields:
+                cursor.execute(f'''
+                SELECT release_id, {column} FROM {table}
+                WHERE release_id IN ({placeholders}) ORDER BY rowid
+                ''', ids)
+                for row in cursor.fetchall():
+                    releases[row["release_id"]][field].append(row[column])
+        
+        if "formats" in fields:
+            cursor.execute(f'''
+            SELECT release_id, name, qty, text, descriptions FROM release_formats
+            WHERE release_id IN ({placeholders}) ORDER BY release_id, position
+            ''', ids)
+            for row in cursor.fetchall():
+                releases[row["release_id"]]["formats"].append({
+                    "name": row["name"],
+                    "qty": row["qty"],
+                    "text": row["text"],
+                    "descriptions": json.loads(row["descriptions"] or "[]")
+                })
+        
+        if "tracklist" in fields:
+            cursor.execute(f'''
+            SELECT release_id, position, title, duration FROM tracks
+            WHERE release_id IN ({placeholders}) ORDER BY release_id, id
+            ''', ids)
+            for row in cursor.fetchall():
+                releases[row["release_id"]]["tracklist"].append(
+                    {"position": row["position"], "title": row["title"], "duration": row["duration"]}
+                )
+    
     def get_artist(self, artist_id: int) -> Optional[Dict]:
         """
         Retrieve an artist by ID.
@@ -493,23 +1257,17 @@ class DiscogsDatabase:
             Artist data or None if not found
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            cursor = self._get_connection().cursor()
             
             cursor.execute("SELECT data FROM artists WHERE id = ?", (artist_id,))
             row = cursor.fetchone()
             
-            conn.close()
-            
             if row:
-                return json.loads(row["data"])
+                return _decode_blob(row["data"])
             return None
             
         except Exception as e:
             logger.error(f"Error retrieving artist: {e}")
-            if conn:
-                conn.close()
             return None
     
     def get_label(self, label_id: int) -> Optional[Dict]:
@@ -523,25 +1281,43 @@ class DiscogsDatabase:
             Label data or None if not found
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            cursor = self._get_connection().cursor()
             
             cursor.execute("SELECT data FROM labels WHERE id = ?", (label_id,))
             row = cursor.fetchone()
             
-            conn.close()
-            
             if row:
-                return json.loads(row["data"])
+                return _decode_blob(row["data"])
             return None
             
         except Exception as e:
             logger.error(f"Error retrieving label: {e}")
-            if conn:
-                conn.close()
             return None
     
+    def iter_entity_names(self, table: str, limit: int = None) -> Iterator[str]:
+        """
+        Stream the names of stored artists or labels.
+        
+        Args:
+            table: "artists" or "labels"
+            limit: Maximum number of names
+        
+        Yields:
+            Entity names
+        """
+        if table not in ("artists", "labels"):
+            raise ValueError(f"Unknown entity table: {table}")
+        
+        try:
+            cursor = self._get_connection().cursor()
+            cursor.execute(f"SELECT name FROM {table} WHERE name != '' LIMIT ?",
+                           (limit if limit is not None else -1,))
+            for row in cursor:
+                yield row["name"]
+        
+        except Exception as e:
+            logger.error(f"Error reading {table} names: {e}")
+    
     def get_mesa_right(self, right_id: str) -> Optional[Dict]:
         """
         Retrieve MESA rights data by ID.
@@ -553,9 +1329,7 @@ class DiscogsDatabase:
             Rights data or None if not found
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            cursor = self._get_connection().cursor()
             
             cursor.execute('''
             SELECT id, discogs_release_id, reference_id, public_data, 
@@ -564,7 +1338,6 @@ class DiscogsDatabase:
             ''', (right_id,))
             
             row = cursor.fetchone()
-            conn.close()
             
             if row:
                 return {
@@ -581,37 +1354,59 @@ class DiscogsDatabase:
             
         except Exception as e:
             logger.error(f"Error retrieving MESA right: {e}")
-            if conn:
-                conn.close()
             return None
     
     def search_releases(self, query: str, limit: int = 10) -> List[Dict]:
         """
-        Search for releases by title.
+        Search for releases by title or track title.
+        
+        Results are ranked by BM25, with release title matches ranked above
+        track title matches.
         
         Args:
             query: Search query
             limit: Maximum number of results
-            
+        
         Returns:
             List of matching releases
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            cursor = self._get_connection().cursor()
             
-            search_pattern = f"%{query}%"
-            cursor.execute('''
-            SELECT id, title, released, country 
-            FROM releases 
-            WHERE title LIKE ? 
-            ORDER BY released DESC
-            LIMIT ?
-            ''', (search_pattern, limit))
+            match = self._fts_query(query)
+            if match:
+                cursor.execute('''
+                WITH hits AS (
+                    SELECT * FROM (
+                        SELECT rowid AS release_id, rank AS score
+                        FROM releases_fts WHERE releases_fts MATCH ?
+                        ORDER BY rank LIMIT ?
+                    )
+                    UNION ALL
+                    SELECT * FROM (
+                        SELECT t.release_id, tracks_fts.rank * ? AS score
+                        FROM tracks_fts JOIN tracks t ON t.id = tracks_fts.rowid
+                        WHERE tracks_fts MATCH ?
+                        ORDER BY tracks_fts.rank LIMIT ?
+                    )
+                )
+                SELECT r.id, r.title, r.released, r.country, MIN(h.score) AS score
+                FROM hits h JOIN releases r ON r.id = h.release_id
+                GROUP BY r.id
+                ORDER BY score
+                LIMIT ?
+                ''', (match, limit, TRACK_MATCH_WEIGHT, match, limit * 5, limit))
+            else:
+                search_pattern = f"%{query}%"
+                cursor.execute('''
+                SELECT id, title, released, country
+                FROM releases
+                WHERE title LIKE ?
+                ORDER BY released DESC
+                LIMIT ?
+                ''', (search_pattern, limit))
             
             rows = cursor.fetchall()
-            conn.close()
             
             result = []
             for row in rows:
@@ -626,8 +1421,6 @@ class DiscogsDatabase:
             
         except Exception as e:
             logger.error(f"Error searching releases: {e}")
-            if conn:
-                conn.close()
             return []
     
     def search_by_identifier(self, id_type: str, id_value: str) -> List[Dict]:
@@ -642,9 +1435,7 @@ class DiscogsDatabase:
             List of matching releases
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            cursor = self._get_connection().cursor()
             
             cursor.execute('''
             SELECT r.id, r.title, r.released, r.country 
@@ -654,7 +1445,6 @@ class DiscogsDatabase:
             ''', (id_type.lower(), id_value))
             
             rows = cursor.fetchall()
-            conn.close()
             
             result = []
             for row in rows:
@@ -669,36 +1459,41 @@ class DiscogsDatabase:
             
         except Exception as e:
             logger.error(f"Error searching by identifier: {e}")
-            if conn:
-                conn.close()
             return []
     
     def search_artists(self, query: str, limit: int = 10) -> List[Dict]:
         """
-        Search for artists by name.
+        Search for artists by name or real name, ranked by BM25.
         
         Args:
             query: Search query
             limit: Maximum number of results
-            
+        
         Returns:
             List of matching artists
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            cursor = self._get_connection().cursor()
             
-            search_pattern = f"%{query}%"
-            cursor.execute('''
-            SELECT id, name, realname
-            FROM artists 
-            WHERE name LIKE ? OR realname LIKE ?
-            LIMIT ?
-            ''', (search_pattern, search_pattern, limit))
+            match = self._fts_query(query)
+            if match:
+                cursor.execute('''
+                SELECT a.id, a.name, a.realname
+                FROM artists_fts JOIN artists a ON a.id = artists_fts.rowid
+                WHERE artists_fts MATCH ?
+                ORDER BY artists_fts.rank
+                LIMIT ?
+                ''', (match, limit))
+            else:
+                search_pattern = f"%{query}%"
+                cursor.execute('''
+                SELECT id, name, realname
+                FROM artists
+                WHERE name LIKE ? OR realname LIKE ?
+                LIMIT ?
+                ''', (search_pattern, search_pattern, limit))
             
             rows = cursor.fetchall()
-            conn.close()
             
             result = []
             for row in rows:
@@ -709,13 +1504,218 @@ class DiscogsDatabase:
                 })
             
             return result
-            
+        
         except Exception as e:
             logger.error(f"Error searching artists: {e}")
-            if conn:
-                conn.close()
             return []
     
+    def search_labels(self, query: str, limit: int = 10) -> List[Dict]:
+        """
+        Search for labels by name, ranked by BM25.
+        
+        Args:
+            query: Search query
+            limit: Maximum number of results
+        
+        Returns:
+            List of matching labels
+        """
+        try:
+            cursor = self._get_connection().cursor()
+            
+            match = self._fts_query(query)
+            if match:
+                cursor.execute('''
+                SELECT l.id, l.name
+                FROM labels_fts JOIN labels l ON l.id = labels_fts.rowid
+                WHERE labels_fts MATCH ?
+                ORDER BY labels_fts.rank
+                LIMIT ?
+                ''', (match, limit))
+            else:
+                cursor.execute('''
+                SELECT id, name
+                FROM labels
+                WHERE name LIKE ?
+                LIMIT ?
+                ''', (f"%{query}%", limit))
+            
+            return [{"id": row["id"], "name": row["name"]} for row in cursor.fetchall()]
+        
+        except Exception as e:
+            logger.error(f"Error searching labels: {e}")
+            return []
+    
+    def search_releases_by_entities(self, title: str = None, artist: str = None, label: str = None,
+                                    year: Union[int, str] = None, identifiers: List[Dict] = None,
+                                    limit: int = 10) -> List[Dict]:
+        """
+        Find releases matching any combination of extracted query entities.
+        
+        All entities are resolved in one query: each given entity produces a
+        set of candidate releases (title and track title, artist, label or
+        identifier matches), and candidates are ranked by how many entities
+        they match, then by their combined BM25 score. The year only boosts
+        releases that match another entity.
+        
+        Args:
+            title: Release or track title
+            artist: Artist name or real name
+            label: Label name
+            year: Release year
+            identifiers: Identifiers as dicts with "type" and "value"
+            limit: Maximum number of results
+        
+        Returns:
+            List of matching releases with primary artists, labels, the
+            number of entities matched and the combined score
+        """
+        hit_queries = []
+        for kind, value in (("title", title), ("artist", artist), ("label", label)):
+            if value and str(value).strip():
+                hit_queries.append(self._entity_hits_sql(kind, str(value)))
+        if identifiers:
+            hit_queries.append(self._entity_hits_sql("identifiers", identifiers))
+        
+        if not hit_queries:
+            return []
+        
+        ctes = []
+        params = []
+        for i, (sql, hit_params) in enumerate(hit_queries):
+            ctes.append(f"h{i} AS ({sql})")
+            params.extend(hit_params)
+        
+        candidates = " UNION ".join(f"SELECT release_id FROM h{i}" for i in range(len(hit_queries)))
+        joins = "\n".join(f"LEFT JOIN h{i} ON h{i}.release_id = c.release_id" for i in range(len(hit_queries)))
+        matched = " + ".join(f"(h{i}.release_id IS NOT NULL)" for i in range(len(hit_queries)))
+        score = " + ".join(f"COALESCE(h{i}.score, 0)" for i in range(len(hit_queries)))
+        
+        year_value = _parse_year(str(year)) if year else None
+        if year_value:
+            matched += " + (r.year IS ?)"
+        
+        try:
+            cursor = self._get_connection().cursor()
+            
+            cursor.execute(f'''
+            WITH {", ".join(ctes)},
+            candidates AS ({candidates})
+            SELECT r.id, r.title, r.released, r.country, r.year,
+                (SELECT group_concat(name, ', ') FROM (
+                    SELECT COALESCE(ra.name, a.name) AS name
+                    FROM release_artists ra LEFT JOIN artists a ON a.id = ra.artist_id
+                    WHERE ra.release_id = r.id AND ra.role = 'primary'
+                    ORDER BY ra.position
+                )) AS artist,
+                (SELECT group_concat(name, ', ') FROM (
+                    SELECT DISTINCT l.name
+                    FROM release_labels rl JOIN labels l ON l.id = rl.label_id
+                    WHERE rl.release_id = r.id
+                )) AS label,
+                {matched} AS matched,
+                {score} AS score
+            FROM candidates c
+            JOIN releases r ON r.id = c.release_id
+            {joins}
+            ORDER BY matched DESC, score, r.id
+            LIMIT ?
+            ''', params + ([year_value] if year_value else []) + [limit])
+            
+            return [{
+                "id": row["id"],
+                "title": row["title"],
+                "artist": row["artist"] or "",
+                "label": row["label"] or "",
+                "year": row["year"],
+                "released": row["released"],
+                "country": row["country"],
+                "matched": row["matched"],
+                "score": row["score"]
+            } for row in cursor.fetchall()]
+        
+        except Exception as e:
+            logger.error(f"Error searching releases by entities: {e}")
+            return []
+    
+    def _entity_hits_sql(self, kind: str, value: Union[str, List[Dict]]) -> Tuple[str, List]:
+        """
+        Build the candidate query for one entity of search_releases_by_entities.
+        
+        Args:
+            kind: "title", "artist", "label" or "identifiers"
+            value: Search text, or identifier dicts for "identifiers"
+        
+        Returns:
+            SQL selecting (release_id, score) and its parameters
+        """
+        if kind == "identifiers":
+            conditions = " OR ".join("(type = ? AND value = ?)" for _ in value)
+            params = []
+            for identifier in value:
+                params.extend([identifier["type"].lower(), str(identifier["value"])])
+            return f"SELECT DISTINCT release_id, 0 AS score FROM identifiers WHERE {conditions}", params
+        
+        match = self._fts_query(value)
+        pattern = f"%{value}%"
+        
+        if kind == "title":
+            if match:
+                return '''
+                SELECT release_id, MIN(score) AS score FROM (
+                    SELECT * FROM (
+                        SELECT rowid AS release_id, rank AS score
+                        FROM releases_fts WHERE releases_fts MATCH ?
+                        ORDER BY rank LIMIT ?
+                    )
+                    UNION ALL
+                    SELECT * FROM (
+                        SELECT t.release_id, tracks_fts.rank * ? AS score
+                        FROM tracks_fts JOIN tracks t ON t.id = tracks_fts.rowid
+                        WHERE tracks_fts MATCH ?
+                        ORDER BY tracks_fts.rank LIMIT ?
+                    )
+                ) GROUP BY release_id
+                ''', [match, ENTITY_CANDIDATE_LIMIT, TRACK_MATCH_WEIGHT, match, ENTITY_CANDIDATE_LIMIT]
+            return '''
+            SELECT id AS release_id, 0 AS score FROM releases WHERE title LIKE ?
+            UNION
+            SELECT release_id, 0 AS score FROM tracks WHERE title LIKE ?
+            ''', [pattern, pattern]
+        
+        if kind == "artist":
+            if match:
+                return '''
+                SELECT ra.release_id, MIN(m.score) AS score
+                FROM (
+                    SELECT rowid AS artist_id, rank AS score
+                    FROM artists_fts WHERE artists_fts MATCH ?
+                    ORDER BY rank LIMIT ?
+                ) m JOIN release_artists ra ON ra.artist_id = m.artist_id
+                GROUP BY ra.release_id
+                ''', [match, ENTITY_MATCH_LIMIT]
+            return '''
+            SELECT DISTINCT ra.release_id, 0 AS score
+            FROM artists a JOIN release_artists ra ON ra.artist_id = a.id
+            WHERE a.name LIKE ? OR a.realname LIKE ?
+            ''', [pattern, pattern]
+        
+        if match:
+            return '''
+            SELECT rl.release_id, MIN(m.score) AS score
+            FROM (
+                SELECT rowid AS label_id, rank AS score
+                FROM labels_fts WHERE labels_fts MATCH ?
+                ORDER BY rank LIMIT ?
+            ) m JOIN release_labels rl ON rl.label_id = m.label_id
+            GROUP BY rl.release_id
+            ''', [match, ENTITY_MATCH_LIMIT]
+        return '''
+        SELECT DISTINCT rl.release_id, 0 AS score
+        FROM labels l JOIN release_labels rl ON rl.label_id = l.id
+        WHERE l.name LIKE ?
+        ''', [pattern]
+    
     def get_releases_by_artist(self, artist_id: int, limit: int = 20) -> List[Dict]:
         """
         Get releases by a specific artist.
@@ -728,9 +1728,7 @@ class DiscogsDatabase:
             List of releases
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            cursor = self._get_connection().cursor()
             
             cursor.execute('''
             SELECT r.id, r.title, r.released, r.country, ra.role
@@ -742,7 +1740,6 @@ class DiscogsDatabase:
             ''', (artist_id, limit))
             
             rows = cursor.fetchall()
-            conn.close()
             
             result = []
             for row in rows:
@@ -758,175 +1755,239 @@ class DiscogsDatabase:
             
         except Exception as e:
             logger.error(f"Error getting releases by artist: {e}")
-            if conn:
-                conn.close()
             return []
     
     def log_api_request(self, endpoint: str, params: Dict = None, response_code: int = 200):
         """
         Log an API request for monitoring and rate limiting.
         
+        The request is counted in memory immediately and buffered for the
+        api_requests table, which is written in batches by a background
+        thread.
+        
         Args:
             endpoint: API endpoint
             params: Request parameters
             response_code: HTTP response code
         """
+        now = time.time()
+        self.request_counter.record(now)
+        
+        params_json = json.dumps(params) if params else None
+        row = (endpoint, params_json, response_code, datetime.fromtimestamp(now).isoformat())
+        
+        with self._api_log_lock:
+            self._api_log_buffer.append(row)
+            buffered = len(self._api_log_buffer)
+        
+        if self._api_log_thread is None:
+            self.flush_api_log()
+        elif buffered >= self.api_log_batch_size:
+            self._api_log_wakeup.set()
+    
+    def flush_api_log(self) -> int:
+        """
+        Write buffered API request log entries to the database.
+        
+        Returns:
+            Number of entries written
+        """
+        # Serialize flushes so batches are written in the order they were logged
+        with self._api_log_flush_lock:
+            with self._api_log_lock:
+                rows, self._api_log_buffer = self._api_log_buffer, []
+            
+            if not rows:
+                return 0
+            
+            try:
+                with self.transaction() as cursor:
+                    cursor.executemany('''
+                    INSERT INTO api_requests (endpoint, params, response_code, timestamp)
+                    VALUES (?, ?, ?, ?)
+                    ''', rows)
+                return len(rows)
+            
+            except Exception as e:
+                logger.error(f"Error logging {len(rows)} API requests: {e}")
+                return 0
+    
+    def _api_log_flush_loop(self):
+        """Flush the API request log in the background until stopped."""
+        while not self._api_log_stop.is_set():
+            self._api_log_wakeup.wait(self.api_log_flush_interval)
+            self._api_log_wakeup.clear()
+            self.flush_api_log()
+    
+    def prune_api_requests(self) -> int:
+        """
+        Remove API log entries older than the retention period.
+        
+        Returns:
+            Number of entries removed
+        """
+        if self.api_log_retention_days <= 0:
+            return 0
+        
+        cutoff = (datetime.now() - timedelta(days=self.api_log_retention_days)).isoformat()
+        
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            timestamp = datetime.now().isoformat()
-            params_json = json.dumps(params) if params else None
-            
-            cursor.execute('''
-            INSERT INTO api_requests (endpoint, params, response_code, timestamp)
-            VALUES (?, ?, ?, ?)
-            ''', (endpoint, params_json, response_code, timestamp))
-            
-            conn.commit()
-            conn.close()
+            with self.transaction() as cursor:
+                cursor.execute('DELETE FROM api_requests WHERE timestamp < ?', (cutoff,))
+                deleted_count = cursor.rowcount
             
+            if deleted_count:
+                logger.info(f"Pruned {deleted_count} API log entries")
+            return deleted_count
+        
         except Exception as e:
-            logger.error(f"Error logging API request: {e}")
-            if conn:
-                conn.rollback()
-                conn.close()
+            logger.error(f"Error pruning API log: {e}")
+            return 0
     
-    def cache_ai_query(self, query: str, result: Dict, expiration_seconds: int = 86400):
+    def cache_ai_query(self, query: str, result: Dict, expiration_seconds: int = 86400,
+                       cache_key: str = None):
         """
         Cache an AI agent query result for faster responses.
         
+        The result is kept both in the in-memory hot tier and in the
+        ai_agent_cache table.
+        
         Args:
             query: Original query string
             result: Query result
             expiration_seconds: Cache expiration in seconds
+            cache_key: Key to cache under (defaults to a hash of the query)
         """
-        import hashlib
+        query_hash = cache_key or hashlib.sha256(query.encode()).hexdigest()
+        now = time.time()
+        expires_at = int(now + expiration_seconds)
+        
+        self.query_cache.put(query_hash, result, expires_at)
         
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Create a hash of the query for efficient lookup
-            query_hash = hashlib.sha256(query.encode()).hexdigest()
-            
-            timestamp = datetime.now().isoformat()
-            expiration = datetime.now().timestamp() + expiration_seconds
-            expiration_iso = datetime.fromtimestamp(expiration).isoformat()
-            
-            result_json = json.dumps(result)
-            
-            # Check if query already exists
-            cursor.execute("SELECT query_hash FROM ai_agent_cache WHERE query_hash = ?", (query_hash,))
-            exists = cursor.fetchone()
-            
-            if exists:
-                # Update existing record
-                cursor.execute('''
-                UPDATE ai_agent_cache 
-                SET result = ?, timestamp = ?, expiration = ?
-                WHERE query_hash = ?
-                ''', (result_json, timestamp, expiration_iso, query_hash))
-            else:
-                # Insert new record
+            with self.transaction() as cursor:
                 cursor.execute('''
-                INSERT INTO ai_agent_cache (query_hash, query, result, timestamp, expiration)
-                VALUES (?, ?, ?, ?, ?)
-                ''', (query_hash, query, result_json, timestamp, expiration_iso))
-            
-            conn.commit()
-            conn.close()
-            
+                INSERT INTO ai_agent_cache (query_hash, query, result, timestamp, expiration, expires_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (query_hash) DO UPDATE SET
+                    query = excluded.query, result = excluded.result, timestamp = excluded.timestamp,
+                    expiration = excluded.expiration, expires_at = excluded.expires_at
+                ''', (query_hash, query, json.dumps(result), datetime.fromtimestamp(now).isoformat(),
+                      datetime.fromtimestamp(expires_at).isoformat(), expires_at))
+        
         except Exception as e:
             logger.error(f"Error caching AI query: {e}")
-            if conn:
-                conn.rollback()
-                conn.close()
     
-    def get_cached_query(self, query: str) -> Optional[Dict]:
+    def get_cached_query(self, query: str, cache_key: str = None) -> Optional[Dict]:
         """
         Retrieve a cached AI agent query result.
         
+        The in-memory hot tier is checked first; results found only in the
+        ai_agent_cache table are promoted into it. Results from the hot tier
+        are shared, so callers must not modify them.
+        
         Args:
             query: Original query string
-            
+            cache_key: Key the result was cached under (defaults to a hash
+                       of the query)
+        
         Returns:
             Cached result or None if not found or expired
         """
-        import hashlib
+        query_hash = cache_key or hashlib.sha256(query.encode()).hexdigest()
+        
+        result = self.query_cache.get(query_hash)
+        if result is not None:
+            return result
         
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            # Create a hash of the query for efficient lookup
-            query_hash = hashlib.sha256(query.encode()).hexdigest()
+            cursor = self._get_connection().cursor()
             
             cursor.execute('''
-            SELECT result, expiration 
-            FROM ai_agent_cache 
-            WHERE query_hash = ?
-            ''', (query_hash,))
+            SELECT result, expires_at
+            FROM ai_agent_cache
+            WHERE query_hash = ? AND expires_at > ?
+            ''', (query_hash, int(time.time())))
             
             row = cursor.fetchone()
-            conn.close()
             
             if row:
-                # Check if cache has expired
-                expiration = datetime.fromisoformat(row["expiration"])
-                if datetime.now() < expiration:
-                    return json.loads(row["result"])
+                result = json.loads(row["result"])
+                self.query_cache.put(query_hash, result, row["expires_at"])
+                return result
             
             return None
-            
+        
         except Exception as e:
             logger.error(f"Error retrieving cached query: {e}")
-            if conn:
-                conn.close()
             return None
     
-    def cleanup_expired_cache(self):
-        """Remove expired entries from the cache."""
+    def cleanup_expired_cache(self) -> int:
+        """
+        Remove expired entries from both cache tiers.
+        
+        Returns:
+            Number of expired entries removed from the ai_agent_cache table
+        """
+        self.query_cache.prune_expired()
+        
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            now = datetime.now().isoformat()
-            
-            cursor.execute('''
-            DELETE FROM ai_agent_cache 
-            WHERE expiration < ?
-            ''', (now,))
-            
-            deleted_count = cursor.rowcount
-            conn.commit()
-            conn.close()
-            
-            logger.info(f"Cleaned up {deleted_count} expired cache entries")
-            
+            with self.transaction() as cursor:
+                cursor.execute('''
+                DELETE FROM ai_agent_cache
+                WHERE expires_at <= ?
+                ''', (int(time.time()),))
+                
+                deleted_count = cursor.rowcount
+            
+            if deleted_count:
+                logger.info(f"Cleaned up {deleted_count} expired cache entries")
+            return deleted_count
+        
         except Exception as e:
             logger.error(f"Error cleaning up cache: {e}")
-            if conn:
-                conn.rollback()
-                conn.close()
+            return 0
+    
+    def get_query_cache_stats(self) -> Dict:
+        """
+        Get statistics for the in-memory query cache tier.
+        
+        Returns:
+            Size, hit/miss counters and hit rate
+        """
+        return self.query_cache.stats()
+    
+    def _cleanup_loop(self):
+        """Periodically expire cached queries and old API log entries in the background."""
+        while not self._cleanup_stop.wait(self.cache_cleanup_interval):
+            self.cleanup_expired_cache()
+            self.prune_api_requests()
+            self.prune_connections()
     
     def get_api_request_count(self, minutes: int = 60) -> int:
         """
         Get the number of API requests in the last X minutes.
         
+        Windows up to api_count_window are answered from memory; longer ones
+        flush the buffered log and count in the api_requests table.
+        
         Args:
             minutes: Time window in minutes
             
         Returns:
             Number of requests
         """
+        seconds = int(minutes * 60)
+        if seconds <= self.request_counter.window_seconds:
+            return self.request_counter.count(seconds)
+        
+        self.flush_api_log()
+        
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            cursor = self._get_connection().cursor()
             
             # Calculate timestamp for X minutes ago
-            time_ago = (datetime.now() - datetime.timedelta(minutes=minutes)).isoformat()
+            time_ago = (datetime.now() - timedelta(minutes=minutes)).isoformat()
             
             cursor.execute('''
             SELECT COUNT(*) as count
@@ -935,7 +1996,6 @@ class DiscogsDatabase:
             ''', (time_ago,))
             
             result = cursor.fetchone()
-            conn.close()
             
             if result:
                 return result[0]
@@ -943,11 +2003,8 @@ class DiscogsDatabase:
             
         except Exception as e:
             logger.error(f"Error getting API request count: {e}")
-            if conn:
-                conn.close()
             return 0
 
-
 def main():
     """Test the database implementation."""
     db = DiscogsDatabase()
@@ -988,6 +2045,5 @@ def main():
     for result in search_results:
         print(f"- {result['title']} ({result['released']})")
 
-
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -6,9 +6,9 @@ import sys
 from pathlib import Path
 import discogs_client
 from datetime import datetime
-from time import sleep
 import logging
 from discogs_auth import authenticate, load_config
+from rate_limiter import get_rate_limiter
 
 # Set up logging
 logging.basicConfig(
@@ -30,6 +30,20 @@ class DiscogsImporter:
             user_token=tokens['token']
         )
         
+        # Route every request, including lazily fetched result pages, through
+        # the shared rate limiter. discogs_client does not expose response
+        # headers, so only 429 status codes feed back into it.
+        self.rate_limiter = get_rate_limiter()
+        fetch = self.client._fetcher.fetch
+        
+        def rate_limited_fetch(*args, **kwargs):
+            self.rate_limiter.acquire()
+            content, status_code = fetch(*args, **kwargs)
+            self.rate_limiter.record_response(status_code)
+            return content, status_code
+        
+        self.client._fetcher.fetch = rate_limited_fetch
+        
     def setup_output_dir(self):
         output_dir = Path(self.config['output_directory'])
         output_dir.mkdir(parents=True, exist_ok=True)
@@ -38,7 +52,6 @@ class DiscogsImporter:
     def search_releases(self, params):
         try:
             results = self.client.search(**params)
-            sleep(self.config['discogs']['throttle_seconds'])
             return results
         except Exception as e:
             logger.error(f"Search failed with params {params}: {str(e)}")
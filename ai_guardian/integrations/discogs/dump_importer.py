@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Discogs Data Dump Importer for MESA Rights Vault
+This module streams the monthly Discogs XML data dumps (releases, artists,
+labels and masters) into the DiscogsDatabase without going through the
+rate-limited REST API.
+
+Usage:
+    python dump_importer.py discogs_20240101_labels.xml.gz discogs_20240101_releases.xml.gz
+"""
+
+import os
+import gzip
+import json
+import logging
+import argparse
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+
+try:
+    from .discogs_database import DiscogsDatabase
+except ImportError:
+    from discogs_database import DiscogsDatabase
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S"
+)
+logger = logging.getLogger(__name__)
+
+# Dump kinds in the order they should be imported, so releases find their
+# artists and labels already stored with full data
+DUMP_KINDS = ["labels", "artists", "masters", "releases"]
+
+
+def _text(elem: ET.Element, tag: str) -> str:
+    """Get the stripped text of a child element, or an empty string."""
+    child = elem.find(tag)
+    if child is None or child.text is None:
+        return ""
+    return child.text.strip()
+
+
+def _int(value: Optional[str]) -> Optional[int]:
+    """Parse an integer field, returning None if it is missing or malformed."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _texts(elem: ET.Element, path: str) -> List[str]:
+    """Get the text of every element matching a path."""
+    return [child.text.strip() for child in elem.findall(path) if child.text]
+
+
+def _named_refs(elem: ET.Element, path: str) -> List[Dict]:
+    """Parse <name id="..">..</name> style references."""
+    return [
+        {"id": _int(child.get("id")), "name": (child.text or "").strip()}
+        for child in elem.findall(path)
+    ]
+
+
+def _artist_credits(elem: ET.Element, path: str) -> List[Dict]:
+    """Parse the artist credits of a release, track or master."""
+    credits = []
+    for artist in elem.findall(path):
+        credit = {
+            "id": _int(_text(artist, "id")),
+            "name": _text(artist, "name"),
+            "anv": _text(artist, "anv"),
+            "join": _text(artist, "join")
+        }
+        role = _text(artist, "role")
+        if role:
+            credit["role"] = role
+        tracks = _text(artist, "tracks")
+        if tracks:
+            credit["tracks"] = tracks
+        credits.append(credit)
+    return credits
+
+
+def parse_release(elem: ET.Element) -> Dict:
+    """Convert a <release> element into the shape returned by the REST API."""
+    released = _text(elem, "released")
+    master = elem.find("master_id")
+
+    return {
+        "id": _int(elem.get("id")),
+        "status": elem.get("status"),
+        "title": _text(elem, "title"),
+        "artists": _artist_credits(elem, "artists/artist"),
+        "extraartists": _artist_credits(elem, "extraartists/artist"),
+        "labels": [
+            {"id": _int(label.get("id")), "name": label.get("name", ""), "catno": label.get("catno", "")}
+            for label in elem.findall("labels/label")
+        ],
+        "formats": [
+            {
+                "name": fmt.get("name", ""),
+                "qty": fmt.get("qty", ""),
+                "text": fmt.get("text", ""),
+                "descriptions": _texts(fmt, "descriptions/description")
+            }
+            for fmt in elem.findall("formats/format")
+        ],
+        "genres": _texts(elem, "genres/genre"),
+        "styles": _texts(elem, "styles/style"),
+        "country": _text(elem, "country"),
+        "released": released,
+        "year": _int(released[:4]),
+        "notes": _text(elem, "notes"),
+        "data_quality": _text(elem, "data_quality"),
+        "master_id": _int(master.text) if master is not None else None,
+        "tracklist": [
+            {
+                "position": _text(track, "position"),
+                "title": _text(track, "title"),
+                "duration": _text(track, "duration"),
+                "artists": _artist_credits(track, "artists/artist"),
+                "extraartists": _artist_credits(track, "extraartists/artist")
+            }
+            for track in elem.findall("tracklist/track")
+        ],
+        "identifiers": [
+            {
+                "type": identifier.get("type", ""),
+                "value": identifier.get("value", ""),
+                "description": identifier.get("description", "")
+            }
+            for identifier in elem.findall("identifiers/identifier")
+        ],
+        "companies": [
+            {
+                "id": _int(_text(company, "id")),
+                "name": _text(company, "name"),
+                "catno": _text(company, "catno"),
+                "entity_type_name": _text(company, "entity_type_name")
+            }
+            for company in elem.findall("companies/company")
+        ]
+    }
+
+
+def parse_artist(elem: ET.Element) -> Dict:
+    """Convert an <artist> element into the shape returned by the REST API."""
+    return {
+        "id": _int(_text(elem, "id")),
+        "name": _text(elem, "name"),
+        "realname": _text(elem, "realname"),
+        "profile": _text(elem, "profile"),
+        "data_quality": _text(elem, "data_quality"),
+        "urls": _texts(elem, "urls/url"),
+        "namevariations": _texts(elem, "namevariations/name"),
+        "aliases": _named_refs(elem, "aliases/name"),
+        "members": _named_refs(elem, "members/name"),
+        "groups": _named_refs(elem, "groups/name")
+    }
+
+
+def parse_label(elem: ET.Element) -> Dict:
+    """Convert a <label> element into the shape returned by the REST API."""
+    parent = elem.find("parentLabel")
+    return {
+        "id": _int(_text(elem, "id")),
+        "name": _text(elem, "name"),
+        "contact_info": _text(elem, "contactinfo"),
+        "profile": _text(elem, "profile"),
+        "data_quality": _text(elem, "data_quality"),
+        "urls": _texts(elem, "urls/url"),
+        "sublabels": _named_refs(elem, "sublabels/label"),
+        "parent_label": (
+            {"id": _int(parent.get("id")), "name": (parent.text or "").strip()}
+            if parent is not None else None
+        )
+    }
+
+
+def parse_master(elem: ET.Element) -> Dict:
+    """Convert a <master> element into the shape returned by the REST API."""
+    return {
+        "id": _int(elem.get("id")),
+        "main_release": _int(_text(elem, "main_release")),
+        "title": _text(elem, "title"),
+        "year": _int(_text(elem, "year")),
+        "artists": _artist_credits(elem, "artists/artist"),
+        "genres": _texts(elem, "genres/genre"),
+        "styles": _texts(elem, "styles/style"),
+        "data_quality": _text(elem, "data_quality")
+    }
+
+
+# Dump kind -> (record element tag, parser)
+DUMP_PARSERS = {
+    "releases": ("release", parse_release),
+    "artists": ("artist", parse_artist),
+    "labels": ("label", parse_label),
+    "masters": ("master", parse_master)
+}
+
+
+class DiscogsDumpImporter:
+    """
+    Streams Discogs XML data dumps into a DiscogsDatabase.
+
+    Records are parsed incrementally and discarded as soon as they are
+    converted, so memory use stays flat regardless of dump size. Progress is
+    checkpointed after every committed batch, and an interrupted import
+    resumes after the last committed record.
+    """
+
+    def __init__(self, db: DiscogsDatabase = None, checkpoint_path: str = None,
+                 batch_size: int = 1000):
+        """
+        Initialize the dump importer.
+
+        Args:
+            db: Database to import into (a default DiscogsDatabase if not given)
+            checkpoint_path: Path to the JSON checkpoint file (defaults to one
+                             next to the database)
+            batch_size: Number of records written per transaction
+        """
+        self.db = db or DiscogsDatabase()
+        self.batch_size = batch_size
+        self.checkpoint_path = checkpoint_path or f"{self.db.db_path}.import_checkpoint.json"
+        self.checkpoints = self._load_checkpoints()
+
+        self.savers = {
+            "releases": self.db.save_releases,
+            "artists": self.db.save_artists,
+            "labels": self.db.save_labels,
+            "masters": self.db.save_masters
+        }
+
+    def _load_checkpoints(self) -> Dict:
+        """Load saved import progress."""
+        if not os.path.exists(self.checkpoint_path):
+            return {}
+        try:
+            with open(self.checkpoint_path, "r") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            logger.warning(f"Ignoring unreadable checkpoint file {self.checkpoint_path}: {e}")
+            return {}
+
+    def _save_checkpoints(self):
+        """Persist import progress atomically."""
+        temp_path = f"{self.checkpoint_path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.checkpoints, f, indent=2)
+        os.replace(temp_path, self.checkpoint_path)
+
+    def _checkpoint_for(self, dump_path: str) -> Dict:
+        """Get the checkpoint for a dump, discarding it if the file has changed."""
+        stat = os.stat(dump_path)
+        key = os.path.abspath(dump_path)
+        checkpoint = self.checkpoints.get(key)
+
+        if (not checkpoint or "parsed" not in checkpoint
+                or checkpoint.get("size") != stat.st_size or checkpoint.get("mtime") != stat.st_mtime):
+            checkpoint = {
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+                "parsed": 0,
+                "imported": 0,
+                "complete": False
+            }
+            self.checkpoints[key] = checkpoint
+        return checkpoint
+
+    @staticmethod
+    def detect_kind(dump_path: str) -> Optional[str]:
+        """Detect the dump kind from a file name like discogs_20240101_releases.xml.gz."""
+        name = os.path.basename(dump_path).lower()
+        for kind in DUMP_KINDS:
+            if kind in name:
+                return kind
+        return None
+
+    @staticmethod
+    def _open(dump_path: str):
+        """Open a dump for binary reading, transparently handling gzip."""
+        if dump_path.endswith(".gz"):
+            return gzip.open(dump_path, "rb")
+        return open(dump_path, "rb")
+
+    def iter_dump(self, dump_path: str, skip: int = 0) -> Iterator[Tuple[str, Dict]]:
+        """
+        Stream the records of a dump.
+
+        Args:
+            dump_path: Path to the dump (.xml or .xml.gz)
+            skip: Number of leading records to skip without converting them
+
+        Yields:
+            (dump kind, record) tuples
+        """
+        with self._open(dump_path) as f:
+            root = None
+            kind = None
+            record_tag = None
+            parser = None
+            depth = 0
+            position = 0
+
+            for event, elem in ET.iterparse(f, events=("start", "end")):
+                if event == "start":
+                    depth += 1
+                    if root is None:
+                        root = elem
+                        kind = elem.tag if elem.tag in DUMP_PARSERS else self.detect_kind(dump_path)
+                        if kind not in DUMP_PARSERS:
+                            raise ValueError(f"Unrecognized Discogs dump: {dump_path}")
+                        record_tag, parser = DUMP_PARSERS[kind]
+                    continue
+
+                depth -= 1
+                # Only top-level records; labels nest <label> in <sublabels>
+                if depth != 1 or elem.tag != record_tag:
+                    continue
+
+                if position >= skip:
+                    yield kind, parser(elem)
+                position += 1
+
+                # Drop the parsed record so the tree never grows
+                root.clear()
+
+    def import_dump(self, dump_path: str) -> int:
+        """
+        Import one dump, resuming from its checkpoint.
+
+        The checkpoint keeps two counts: "parsed" is the number of dump
+        records read so far and is where a resumed import continues, while
+        "imported" is the number the database actually saved (records
+        without an ID, for example, are parsed but skipped).
+
+        Args:
+            dump_path: Path to the dump (.xml or .xml.gz)
+
+        Returns:
+            Number of records saved by this call
+        """
+        checkpoint = self._checkpoint_for(dump_path)
+        if checkpoint["complete"]:
+            logger.info(f"Skipping {dump_path}: already imported ({checkpoint['imported']} records)")
+            return 0
+
+        if checkpoint["parsed"]:
+            logger.info(f"Resuming {dump_path} after {checkpoint['parsed']} parsed records")
+
+        start_time = datetime.now()
+        parsed = 0
+        imported = 0
+        batch = []
+        saver = None
+
+        def flush():
+            nonlocal parsed, imported
+            saved = saver(batch, batch_size=len(batch))
+            parsed += len(batch)
+            imported += saved
+            checkpoint["parsed"] += len(batch)
+            checkpoint["imported"] += saved
+            self._save_checkpoints()
+
+        for kind, record in self.iter_dump(dump_path, skip=checkpoint["parsed"]):
+            if saver is None:
+                saver = self.savers[kind]
+                checkpoint["kind"] = kind
+
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                flush()
+                batch = []
+
+                if parsed % (self.batch_size * 100) == 0:
+                    rate = parsed / max((datetime.now() - start_time).total_seconds(), 1e-6)
+                    logger.info(f"{dump_path}: {checkpoint['parsed']} records parsed, "
+                                f"{checkpoint['imported']} imported ({rate:.0f}/s)")
+
+        if batch:
+            flush()
+
+        checkpoint["complete"] = True
+        self._save_checkpoints()
+
+        elapsed = (datetime.now() - start_time).total_seconds()
+        skipped = parsed - imported
+        logger.info(f"Imported {imported} records from {dump_path} in {elapsed:.1f}s"
+                    + (f" ({skipped} skipped)" if skipped else ""))
+        return imported
+
+    def import_dumps(self, dump_paths: List[str]) -> Dict[str, int]:
+        """
+        Import several dumps, labels and artists before masters and releases.
+
+        Args:
+            dump_paths: Paths to the dumps
+
+        Returns:
+            Number of records imported per dump
+        """
+        def order(path):
+            kind = self.detect_kind(path)
+            return DUMP_KINDS.index(kind) if kind else len(DUMP_KINDS)
+
+        results = {}
+        for dump_path in sorted(dump_paths, key=order):
+            results[dump_path] = self.import_dump(dump_path)
+        return results
+
+
+def main():
+    """Import Discogs data dumps from the command line."""
+    parser = argparse.ArgumentParser(description="Import Discogs XML data dumps into the Discogs database")
+    parser.add_argument("dumps", nargs="+", help="Dump files (.xml or .xml.gz)")
+    parser.add_argument("--db", help="Path to the SQLite database")
+    parser.add_argument("--checkpoint", help="Path to the checkpoint file")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Records per transaction")
+    args = parser.parse_args()
+
+    db = DiscogsDatabase(db_path=args.db)
+    importer = DiscogsDumpImporter(db, checkpoint_path=args.checkpoint, batch_size=args.batch_size)
+    try:
+        results = importer.import_dumps(args.dumps)
+    finally:
+        db.close()
+
+    for dump_path, count in results.items():
+        print(f"{dump_path}: {count} records")
+
+
+if __name__ == "__main__":
+    main()
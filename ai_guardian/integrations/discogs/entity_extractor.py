@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Entity extraction for the Discogs AI agent
+This module turns natural language queries into the entities and intent
+DiscogsAIAgent acts on. Patterns are compiled once, intent keywords are
+matched with an Aho-Corasick automaton, and artist and label names known
+to DiscogsDatabase are recognised through a token trie.
+"""
+
+import re
+import logging
+from collections import deque
+from typing import Dict, List, Any, Iterable, Iterator, Tuple
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S"
+)
+logger = logging.getLogger(__name__)
+
+# Intent keywords, highest priority first; a query takes the first intent
+# any of whose keywords it contains
+INTENT_KEYWORDS = [
+    ("rights_verification", ["who owns", "rights", "rightsholder", "copyright"]),
+    ("royalty_calculation", ["royalty", "royalties", "payment", "percentage", "earnings"]),
+    ("metadata_lookup", ["metadata", "information about", "details", "tell me about"])
+]
+
+_ARTIST_PATTERN = re.compile(r"\bby\s+(.+?)\s*(?=\?|,| in |$)")
+_QUOTED_PATTERN = re.compile(r"[\"'](.*?)[\"']")
+_TITLED_PATTERN = re.compile(r"\b(?:called|titled)\s+(.+?)\s*(?=\?|,| by |$)")
+_YEAR_PATTERN = re.compile(r"\b(?:19|20)\d{2}\b")
+_LABEL_PATTERN = re.compile(r"\bon\s+(.+?)\s*label")
+_IDENTIFIER_PATTERN = re.compile(r"\b(barcode|isrc)\b\s*[:#]?\s*([^\s?,]+)")
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# Discogs disambiguates duplicate names with a numeric suffix, e.g. "Queen (2)"
+_DISAMBIGUATION_PATTERN = re.compile(r"\s*\(\d+\)$")
+
+# Gazetteer names shorter than this are too ambiguous to match in free text
+MIN_GAZETTEER_NAME_LENGTH = 3
+
+# Single-word names that are everyday query words are left out of gazetteers
+GAZETTEER_STOPWORDS = {
+    "a", "about", "album", "an", "and", "by", "called", "details", "find", "for", "in",
+    "information", "is", "label", "me", "metadata", "of", "on", "owns", "release",
+    "releases", "rights", "royalties", "royalty", "song", "tell", "the", "titled", "to",
+    "track", "what", "who"
+}
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton finding every keyword occurrence in one pass.
+    """
+
+    def __init__(self):
+        """Initialize an empty automaton."""
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        self._built = True
+
+    def add(self, keyword: str, payload: Any = None):
+        """
+        Add a keyword.
+
+        Args:
+            keyword: Text to find
+            payload: Value reported with every occurrence
+        """
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][char] = next_state
+            state = next_state
+        self._output[state].append((len(keyword), payload))
+        self._built = False
+
+    def _build(self):
+        """Compute failure links breadth first."""
+        queue = deque(self._goto[0].values())
+        for state in queue:
+            self._fail[state] = 0
+
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+        self._built = True
+
+    def find(self, text: str) -> Iterator[Tuple[int, int, Any]]:
+        """
+        Find every keyword occurrence, overlapping ones included.
+
+        Args:
+            text: Text to scan
+
+        Yields:
+            Tuples of (start, end, payload) in order of their end position
+        """
+        if not self._built:
+            self._build()
+
+        state = 0
+        for i, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for length, payload in self._output[state]:
+                yield i + 1 - length, i + 1, payload
+
+
+class Gazetteer:
+    """
+    Token trie of known entity names, matched longest first.
+    """
+
+    def __init__(self):
+        """Initialize an empty gazetteer."""
+        self._root = {}
+        self.size = 0
+
+    def add(self, name: str):
+        """
+        Add a name, ignoring Discogs disambiguation suffixes.
+
+        Args:
+            name: Entity name as stored in Discogs
+        """
+        name = _DISAMBIGUATION_PATTERN.sub("", name or "").strip()
+        tokens = _TOKEN_PATTERN.findall(name.lower())
+        if not tokens or len(name) < MIN_GAZETTEER_NAME_LENGTH:
+            return
+        if len(tokens) == 1 and tokens[0] in GAZETTEER_STOPWORDS:
+            return
+
+        node = self._root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        if None not in node:
+            node[None] = name
+            self.size += 1
+
+    def match(self, tokens: List[Tuple[str, int, int]]) -> List[Tuple[str, int, int]]:
+        """
+        Find known names in a tokenized text, without overlaps.
+
+        Args:
+            tokens: Lowercased tokens as (token, start, end)
+
+        Returns:
+            Tuples of (name, start, end) for the longest name at each position
+        """
+        matches = []
+        i = 0
+        while i < len(tokens):
+            node = self._root
+            longest = None
+            j = i
+            while j < len(tokens) and tokens[j][0] in node:
+                node = node[tokens[j][0]]
+                j += 1
+                if None in node:
+                    longest = (node[None], j)
+
+            if longest:
+                name, end = longest
+                matches.append((name, tokens[i][1], tokens[end - 1][2]))
+                i = end
+            else:
+                i += 1
+        return matches
+
+
+class EntityExtractor:
+    """
+    Extracts entities and intent from natural language music rights queries.
+    """
+
+    def __init__(self, artists: Iterable[str] = (), labels: Iterable[str] = ()):
+        """
+        Initialize the extractor.
+
+        Args:
+            artists: Known artist names
+            labels: Known label names
+        """
+        self.intents = KeywordAutomaton()
+        self._intent_priority = {}
+        for priority, (intent, keywords) in enumerate(INTENT_KEYWORDS):
+            self._intent_priority[intent] = priority
+            for keyword in keywords:
+                self.intents.add(keyword, intent)
+
+        self.artists = Gazetteer()
+        self.labels = Gazetteer()
+        for name in artists:
+            self.artists.add(name)
+        for name in labels:
+            self.labels.add(name)
+
+    @classmethod
+    def from_database(cls, db, limit: int = None) -> "EntityExtractor":
+        """
+        Build an extractor whose gazetteers hold the names stored in a database.
+
+        Args:
+            db: DiscogsDatabase to read artist and label names from
+            limit: Maximum number of names loaded per entity type
+
+        Returns:
+            EntityExtractor instance
+        """
+        extractor = cls(db.iter_entity_names("artists", limit), db.iter_entity_names("labels", limit))
+        logger.info(f"Entity gazetteer loaded with {extractor.artists.size} artists "
+                    f"and {extractor.labels.size} labels")
+        return extractor
+
+    def extract(self, query: str) -> Dict:
+        """
+        Extract entities like artist names, song titles from a query.
+
+        Args:
+            query: Natural language query string
+
+        Returns:
+            Dictionary of extracted entities
+        """
+        entities = {
+            "artists": [],
+            "titles": [],
+            "years": [],
+            "labels": [],
+            "identifiers": []
+        }
+
+        query_lower = query.lower()
+
+        # Check for artist mentions
+        match = _ARTIST_PATTERN.search(query_lower)
+        if match and match.group(1):
+            entities["artists"].append(match.group(1))
+
+        # Check for title mentions, in quotes or after "called"/"titled"
+        quoted_spans = []
+        for match in _QUOTED_PATTERN.finditer(query):
+            entities["titles"].append(match.group(1))
+            quoted_spans.append(match.span())
+        if not quoted_spans:
+            entities["titles"].extend(_TITLED_PATTERN.findall(query_lower))
+
+        # Check for years
+        entities["years"].extend(_YEAR_PATTERN.findall(query))
+
+        # Check for label mentions
+        match = _LABEL_PATTERN.search(query_lower)
+        if match and match.group(1):
+            entities["labels"].append(match.group(1))
+
+        # Check for identifiers like barcodes, ISRCs
+        for id_type, id_value in _IDENTIFIER_PATTERN.findall(query_lower):
+            entities["identifiers"].append({"type": id_type, "value": id_value})
+
+        # Add known artists and labels named outside quoted titles
+        if self.artists.size or self.labels.size:
+            tokens = [(match.group(), match.start(), match.end())
+                      for match in _TOKEN_PATTERN.finditer(query_lower)
+                      if not any(start <= match.start() < end for start, end in quoted_spans)]
+            for key, gazetteer in (("artists", self.artists), ("labels", self.labels)):
+                known = {value.lower() for value in entities[key]}
+                for name, _, _ in gazetteer.match(tokens):
+                    if name.lower() not in known:
+                        entities[key].append(name)
+                        known.add(name.lower())
+
+        return entities
+
+    def query_type(self, query: str, entities: Dict) -> str:
+        """
+        Determine the type of query being asked.
+
+        Args:
+            query: Natural language query string
+            entities: Extracted entities
+
+        Returns:
+            Query type string
+        """
+        best = None
+        for _, _, intent in self.intents.find(query.lower()):
+            if best is None or self._intent_priority[intent] < self._intent_priority[best]:
+                best = intent
+                if self._intent_priority[best] == 0:
+                    break
+
+        if best:
+            return best
+
+        # Default to search if entities were found
+        if any(entities[key] for key in entities):
+            return "search"
+
+        return "unknown"
+
+    def analyze(self, query: str) -> Dict:
+        """
+        Extract the entities and query type of a query.
+
+        Args:
+            query: Natural language query string
+
+        Returns:
+            Dictionary with the query, its query type and its entities
+        """
+        entities = self.extract(query)
+        return {
+            "query": query,
+            "query_type": self.query_type(query, entities),
+            "entities": entities
+        }
+
+    def extract_many(self, queries: Iterable[str]) -> List[Dict]:
+        """
+        Analyze many queries, e.g. when replaying a query log.
+
+        Args:
+            queries: Natural language query strings
+
+        Returns:
+            One analyze() result per query, in order
+        """
+        return [self.analyze(query) for query in queries]
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+In-memory query cache for the Discogs integration
+This module provides the bounded hot tier that sits in front of the
+ai_agent_cache table in DiscogsDatabase.
+"""
+
+import os
+import sys
+import time
+from typing import Dict, Any, Optional, Hashable
+
+try:
+    from ai_guardian.models.royalty_auditor.lru_cache import LRUCache
+except ImportError:
+    # Run from this directory: make the repository root importable
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../..'))
+    from ai_guardian.models.royalty_auditor.lru_cache import LRUCache
+
+
+class QueryCache:
+    """
+    Bounded, thread-safe LRU cache whose entries expire at a given time.
+
+    Entries are kept in the royalty auditor's LRUCache; the absolute expiry
+    times stored in the ai_agent_cache table are turned into its per-entry
+    time-to-live.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        """
+        Initialize the cache.
+
+        Args:
+            maxsize: Maximum number of entries kept before the least recently
+                     used one is evicted
+        """
+        self.maxsize = maxsize
+        self._entries = LRUCache(maxsize)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Look up an entry, marking it as recently used.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            The cached value, or None if missing or expired
+        """
+        return self._entries.get(key)
+
+    def put(self, key: Hashable, value: Any, expires_at: float):
+        """
+        Store an entry until an expiry time.
+
+        Args:
+            key: Cache key
+            value: Value to cache
+            expires_at: Unix time after which the entry is stale
+        """
+        ttl = expires_at - time.time()
+        if ttl > 0:
+            self._entries.put(key, value, ttl=ttl)
+
+    def invalidate(self, key: Hashable):
+        """Drop an entry if present."""
+        self._entries.invalidate(key)
+
+    def prune_expired(self) -> int:
+        """
+        Drop every expired entry.
+
+        Returns:
+            Number of entries dropped
+        """
+        return self._entries.prune_expired()
+
+    def clear(self):
+        """Drop every entry and reset the counters."""
+        self._entries.clear()
+
+    def stats(self) -> Dict:
+        """
+        Get cache statistics.
+
+        Returns:
+            Size, hit/miss counters and hit rate
+        """
+        return self._entries.stats()
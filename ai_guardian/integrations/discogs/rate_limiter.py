@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Shared rate limiter for the Discogs API
+This module provides a token bucket whose state lives in a small SQLite
+file, so every Discogs client in every thread and process on the machine
+draws from the same request budget. The bucket is corrected from the
+X-Discogs-Ratelimit response headers and backs off after 429 responses.
+"""
+
+import os
+import time
+import logging
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, Mapping, Optional, Iterator
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S"
+)
+logger = logging.getLogger(__name__)
+
+# Discogs allows 60 authenticated requests per moving 60 second window
+DEFAULT_REQUESTS_PER_MINUTE = 60
+DEFAULT_BURST = 5
+RATE_LIMIT_WINDOW = 60
+
+# Wait after a 429 response that carries no Retry-After header
+DEFAULT_RETRY_AFTER = 60
+
+# File name of the shared bucket in the user's cache directory
+DEFAULT_STATE_FILE = "discogs_ratelimit.db"
+
+RATE_LIMIT_HEADER = "X-Discogs-Ratelimit"
+RATE_LIMIT_REMAINING_HEADER = "X-Discogs-Ratelimit-Remaining"
+
+_shared_limiters = {}
+_shared_limiters_lock = threading.Lock()
+
+
+def _default_state_path() -> str:
+    """Locate the shared bucket in the user's cache directory, or the temp directory."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    for directory in (os.path.join(cache_home, "mesa_rights_vault"),
+                      os.path.join(tempfile.gettempdir(), "mesa_rights_vault")):
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError:
+            continue
+        if os.access(directory, os.W_OK):
+            return os.path.join(directory, DEFAULT_STATE_FILE)
+    return os.path.join(tempfile.gettempdir(), DEFAULT_STATE_FILE)
+
+
+def _int_header(headers: Mapping, name: str) -> Optional[int]:
+    """Read an integer response header, if present and valid."""
+    value = headers.get(name) if headers else None
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class DiscogsRateLimiter:
+    """
+    Token bucket shared across threads and processes through SQLite.
+
+    Tokens refill at the current request limit per minute, up to the burst
+    size. Because the bucket refills at the same rate Discogs' moving window
+    drains, it never admits more requests than the window allows.
+    """
+
+    def __init__(self, state_path: str = None, bucket: str = "default",
+                 requests_per_minute: int = DEFAULT_REQUESTS_PER_MINUTE, burst: int = DEFAULT_BURST):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            state_path: Path to the SQLite file holding the shared bucket
+                        (defaults to discogs_ratelimit.db in the user's cache
+                        directory)
+            bucket: Name of the bucket, so separate tokens can be limited
+                    separately
+            requests_per_minute: Request limit used until Discogs reports one
+            burst: Maximum number of requests sent back to back after an
+                   idle period
+        """
+        if not state_path:
+            state_path = _default_state_path()
+
+        self.state_path = state_path
+        self.bucket = bucket
+        self.requests_per_minute = requests_per_minute
+        self.burst = max(1, burst)
+
+        self._local = threading.local()
+
+        with self._transaction() as cursor:
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS rate_limit (
+                bucket TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                request_limit INTEGER NOT NULL,
+                blocked_until REAL NOT NULL
+            )
+            ''')
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Get this thread's connection, reopening it after a fork."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.state_path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Cursor]:
+        """Hold the bucket's write lock for the duration of the block."""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            yield cursor
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+
+    def _load_state(self, cursor, now: float) -> Dict:
+        """Read the bucket, refilled up to now."""
+        cursor.execute('''
+        SELECT tokens, updated_at, request_limit, blocked_until
+        FROM rate_limit
+        WHERE bucket = ?
+        ''', (self.bucket,))
+        row = cursor.fetchone()
+
+        if row is None:
+            return {"tokens": float(self.burst), "updated_at": now,
+                    "request_limit": self.requests_per_minute, "blocked_until": 0.0}
+
+        tokens, updated_at, request_limit, blocked_until = row
+        rate = request_limit / RATE_LIMIT_WINDOW
+        # updated_at is in the future while blocked after a 429
+        tokens = min(float(self.burst), tokens + max(0.0, now - updated_at) * rate)
+        return {"tokens": tokens, "updated_at": max(now, updated_at),
+                "request_limit": request_limit, "blocked_until": blocked_until}
+
+    def _save_state(self, cursor, state: Dict):
+        """Write the bucket back."""
+        cursor.execute('''
+        INSERT INTO rate_limit (bucket, tokens, updated_at, request_limit, blocked_until)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (bucket) DO UPDATE SET
+            tokens = excluded.tokens, updated_at = excluded.updated_at,
+            request_limit = excluded.request_limit, blocked_until = excluded.blocked_until
+        ''', (self.bucket, state["tokens"], state["updated_at"], state["request_limit"],
+              state["blocked_until"]))
+
+    def _try_acquire(self) -> float:
+        """
+        Take a token if one is available.
+
+        Returns:
+            0 if a token was taken, otherwise seconds until one may be
+        """
+        with self._transaction() as cursor:
+            now = time.time()
+            state = self._load_state(cursor, now)
+
+            if now < state["blocked_until"]:
+                wait = state["blocked_until"] - now
+            elif state["tokens"] >= 1:
+                state["tokens"] -= 1
+                wait = 0.0
+            else:
+                wait = (1 - state["tokens"]) * RATE_LIMIT_WINDOW / max(1, state["request_limit"])
+
+            self._save_state(cursor, state)
+            return wait
+
+    def acquire(self) -> float:
+        """
+        Block until a request may be sent.
+
+        Returns:
+            Seconds spent waiting
+        """
+        start_time = time.time()
+        while True:
+            wait = self._try_acquire()
+            if wait <= 0:
+                return time.time() - start_time
+            time.sleep(wait)
+
+    def record_response(self, status_code: int, headers: Mapping = None):
+        """
+        Correct the bucket from a Discogs response.
+
+        The reported limit sets the refill rate and the reported remaining
+        count caps the tokens, which accounts for requests made by clients
+        outside this limiter. A 429 empties the bucket until Retry-After.
+
+        Args:
+            status_code: HTTP status code
+            headers: Response headers
+        """
+        limit = _int_header(headers, RATE_LIMIT_HEADER)
+        remaining = _int_header(headers, RATE_LIMIT_REMAINING_HEADER)
+        if status_code != 429 and limit is None and remaining is None:
+            return
+
+        with self._transaction() as cursor:
+            now = time.time()
+            state = self._load_state(cursor, now)
+
+            if limit:
+                state["request_limit"] = limit
+            if remaining is not None:
+                state["tokens"] = min(state["tokens"], float(remaining))
+
+            if status_code == 429:
+                retry_after = _int_header(headers, "Retry-After") or DEFAULT_RETRY_AFTER
+                state["blocked_until"] = max(state["blocked_until"], now + retry_after)
+                state["tokens"] = 0.0
+                state["updated_at"] = state["blocked_until"]
+                logger.warning(f"Discogs rate limit hit, pausing requests for {retry_after}s")
+
+            self._save_state(cursor, state)
+
+    def response_hook(self, response, *args, **kwargs):
+        """requests response hook that feeds every response to record_response."""
+        self.record_response(response.status_code, response.headers)
+
+    def install(self, session):
+        """
+        Correct the bucket from every response received by a requests session.
+
+        Args:
+            session: requests.Session used for Discogs calls
+        """
+        session.hooks["response"].append(self.response_hook)
+
+
+def get_rate_limiter(state_path: str = None, bucket: str = "default", **kwargs) -> DiscogsRateLimiter:
+    """
+    Get the process-wide limiter for a state file and bucket.
+
+    Args:
+        state_path: Path to the SQLite file holding the shared bucket
+        bucket: Name of the bucket
+        **kwargs: DiscogsRateLimiter options, used when the limiter is created
+
+    Returns:
+        Shared DiscogsRateLimiter instance
+    """
+    key = (os.path.abspath(state_path) if state_path else None, bucket)
+    with _shared_limiters_lock:
+        limiter = _shared_limiters.get(key)
+        if limiter is None:
+            limiter = DiscogsRateLimiter(state_path, bucket, **kwargs)
+            _shared_limiters[key] = limiter
+        return limiter
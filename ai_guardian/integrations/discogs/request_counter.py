@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Rolling API request counter for the Discogs integration
+This module provides the in-memory ring buffer DiscogsDatabase uses to
+answer request-count queries without reading the api_requests table.
+"""
+
+import time
+import threading
+from typing import Iterable
+
+
+class RequestCounter:
+    """
+    Thread-safe ring buffer of per-second request counts.
+    """
+
+    def __init__(self, window_seconds: int = 3600):
+        """
+        Initialize the counter.
+
+        Args:
+            window_seconds: Longest time window, in seconds, the counter can
+                            answer for
+        """
+        self.window_seconds = max(1, int(window_seconds))
+        self._counts = [0] * self.window_seconds
+        # Second each slot currently counts, so stale slots can be detected
+        self._seconds = [-1] * self.window_seconds
+        self._lock = threading.Lock()
+
+    def record(self, timestamp: float = None, count: int = 1):
+        """
+        Record requests made at a given time.
+
+        Args:
+            timestamp: Unix time of the requests (defaults to now)
+            count: Number of requests
+        """
+        second = int(time.time() if timestamp is None else timestamp)
+        if second <= int(time.time()) - self.window_seconds:
+            return
+
+        slot = second % self.window_seconds
+        with self._lock:
+            if self._seconds[slot] != second:
+                self._seconds[slot] = second
+                self._counts[slot] = 0
+            self._counts[slot] += count
+
+    def record_many(self, timestamps: Iterable[float]):
+        """
+        Record one request at each of the given times.
+
+        Args:
+            timestamps: Unix times of the requests
+        """
+        for timestamp in timestamps:
+            self.record(timestamp)
+
+    def count(self, seconds: int) -> int:
+        """
+        Count the requests made in the last few seconds.
+
+        Args:
+            seconds: Time window, capped at window_seconds
+
+        Returns:
+            Number of requests in the window
+        """
+        now = int(time.time())
+        seconds = min(int(seconds), self.window_seconds)
+        if seconds <= 0:
+            return 0
+
+        total = 0
+        with self._lock:
+            for second in range(now - seconds + 1, now + 1):
+                slot = second % self.window_seconds
+                if self._seconds[slot] == second:
+                    total += self._counts[slot]
+        return total
@@ -9,11 +9,12 @@ while respecting privacy controls. It shows three main functionalities:
 3. Generating a summary report of imported data
 
 Usage:
-    python run_discogs_import.py --config config.json [--analyze]
+    python run_discogs_import.py --config config.json [--analyze] [--resume]
 
 Options:
     --config CONFIG       Path to configuration file (default: config.json)
     --analyze             Run data analysis after import
+    --resume              Resume an interrupted data pull from its checkpoints
 
 Example configuration file (config.json):
 {
@@ -43,6 +44,7 @@ import time
 import glob
 import logging
 import argparse
+import itertools
 import subprocess
 from pathlib import Path
 from typing import Dict, List, Any, Optional
@@ -70,9 +72,10 @@ def check_dependencies() -> bool:
         logger.info("Please install required dependencies: pip install requests tqdm")
         return False
 
-def run_data_pull(config_path: str) -> Dict[str, Any]:
-    """Run the Discogs data pull script with the provided configuration"""
-    logger.info(f"Starting Discogs data pull with config from {config_path}")
+def load_data_pull_module():
+    """Import the Discogs data pull script as a module"""
+    if "discogs_data_pull" in sys.modules:
+        return sys.modules["discogs_data_pull"]
     
     # Check if the data pull script exists
     data_pull_script = Path(__file__).parent / "discogs_data_pull.py"
@@ -81,15 +84,27 @@ def run_data_pull(config_path: str) -> Dict[str, Any]:
         logger.error(f"Data pull script not found at {data_pull_script}")
         raise FileNotFoundError(f"Data pull script not found at {data_pull_script}")
     
+    spec = importlib.util.spec_from_file_location("discogs_data_pull", str(data_pull_script))
+    data_pull_module = importlib.util.module_from_spec(spec)
+    # Registered before running so the transform process pool can pickle its functions
+    sys.modules["discogs_data_pull"] = data_pull_module
     try:
-        # Option 1: Import and run the script directly
-        script_path = str(data_pull_script)
-        spec = importlib.util.spec_from_file_location("discogs_data_pull", script_path)
-        data_pull_module = importlib.util.module_from_spec(spec)
         spec.loader.exec_module(data_pull_module)
+    except Exception:
+        del sys.modules["discogs_data_pull"]
+        raise
+    return data_pull_module
+
+def run_data_pull(config_path: str, resume: bool = False) -> Dict[str, Any]:
+    """Run the Discogs data pull script with the provided configuration, optionally resuming the last pull"""
+    logger.info(f"Starting Discogs data pull with config from {config_path}")
+    
+    try:
+        # Option 1: Import and run the script directly
+        data_pull_module = load_data_pull_module()
         
         # Create and run data puller
-        data_puller = data_pull_module.DiscogsBulkDataPull(config_path)
+        data_puller = data_pull_module.DiscogsBulkDataPull(config_path, resume=resume)
         stats = data_puller.pull_data()
         
         logger.info(f"Data pull completed successfully")
@@ -110,25 +125,20 @@ def demonstrate_data_access(output_dir: str) -> None:
     """Demonstrate how to access pulled data with privacy controls"""
     logger.info("Demonstrating data access with privacy controls")
     
-    # Get all rights files
-    rights_files = list(Path(output_dir).glob("right_*.json"))
+    # Load a sample of rights entries (up to 5)
+    rights_entries = load_data_pull_module().iter_rights_entries(output_dir)
+    sample_entries = list(itertools.islice(rights_entries, 5))
     
-    if not rights_files:
-        logger.warning(f"No rights files found in {output_dir}")
+    if not sample_entries:
+        logger.warning(f"No rights entries found in {output_dir}")
         return
     
-    logger.info(f"Found {len(rights_files)} rights entries")
+    logger.info(f"Showing {len(sample_entries)} rights entries")
     
-    # Load a sample of rights entries (up to 5)
-    sample_size = min(5, len(rights_files))
-    sample_files = rights_files[:sample_size]
-    
-    for idx, file_path in enumerate(sample_files, 1):
+    for idx, rights_entry in enumerate(sample_entries, 1):
+        right_id = rights_entry.get("rightId", "unknown")
         try:
-            with open(file_path, 'r') as f:
-                rights_entry = json.load(f)
-            
-            logger.info(f"\nAccess Demonstration #{idx}: {file_path.name}")
+            logger.info(f"\nAccess Demonstration #{idx}: {right_id}")
             
             # 1. Public access (only public fields)
             logger.info("PUBLIC ACCESS (available to anyone):")
@@ -163,22 +173,15 @@ def demonstrate_data_access(output_dir: str) -> None:
                         logger.info(f"  Field '{field}' can be selectively disclosed to: {', '.join(verifiers)}")
         
         except Exception as e:
-            logger.error(f"Error demonstrating access for {file_path}: {e}")
+            logger.error(f"Error demonstrating access for {right_id}: {e}")
 
 def analyze_pulled_data(output_dir: str) -> Dict[str, Any]:
     """Analyze the pulled data and generate a summary report"""
     logger.info(f"Analyzing pulled data in {output_dir}")
     
-    # Get all rights files
-    rights_files = list(Path(output_dir).glob("right_*.json"))
-    
-    if not rights_files:
-        logger.warning(f"No rights files found in {output_dir}")
-        return {"error": "No data found"}
-    
     # Initialize analysis data
     analysis = {
-        "total_entries": len(rights_files),
+        "total_entries": 0,
         "rights_types": {},
         "territories": {},
         "genres": {},
@@ -192,12 +195,10 @@ def analyze_pulled_data(output_dir: str) -> Dict[str, Any]:
         }
     }
     
-    # Process each file
-    for file_path in rights_files:
+    # Process each entry
+    for entry in load_data_pull_module().iter_rights_entries(output_dir):
+        analysis["total_entries"] += 1
         try:
-            with open(file_path, 'r') as f:
-                entry = json.load(f)
-            
             # Count rights types
             rights_type = entry.get("rightsType")
             if rights_type:
@@ -246,10 +247,14 @@ def analyze_pulled_data(output_dir: str) -> Dict[str, Any]:
                 analysis["identifiers"]["ISRC"] += 1
                 
         except Exception as e:
-            logger.error(f"Error analyzing {file_path}: {e}")
+            logger.error(f"Error analyzing {entry.get('rightId', 'unknown')}: {e}")
+    
+    if not analysis["total_entries"]:
+        logger.warning(f"No rights entries found in {output_dir}")
+        return {"error": "No data found"}
     
     # Calculate percentages
-    total = len(rights_files)
+    total = analysis["total_entries"]
     analysis["privacy_percentage"] = round((analysis["has_privacy"] / total) * 100, 2) if total > 0 else 0
     analysis["isrc_percentage"] = round((analysis["identifiers"]["ISRC"] / total) * 100, 2) if total > 0 else 0
     analysis["iswc_percentage"] = round((analysis["identifiers"]["ISWC"] / total) * 100, 2) if total > 0 else 0
@@ -281,6 +286,7 @@ def main():
     parser = argparse.ArgumentParser(description="Demonstrate Discogs data import for MESA Rights Vault")
     parser.add_argument("--config", default="config.json", help="Path to configuration file")
     parser.add_argument("--analyze", action="store_true", help="Run data analysis after import")
+    parser.add_argument("--resume", action="store_true", help="Resume an interrupted data pull from its checkpoints")
     args = parser.parse_args()
     
     try:
@@ -291,7 +297,7 @@ def main():
         
         # Run data pull
         logger.info("Running Discogs data pull...")
-        result = run_data_pull(args.config)
+        result = run_data_pull(args.config, resume=args.resume)
         output_dir = result["output_dir"]
         
         # Demonstrate data access
@@ -25,8 +25,8 @@ if [ ! -f "config.json" ]; then
             },
             "user_agent": "MESA_Rights_Vault/1.0",
             "throttle": {
-                "calls_per_minute": 25,
-                "wait_time": 2.5
+                "calls_per_minute": 60,
+                "burst": 5
             }
         },
         "output": {
@@ -2,13 +2,23 @@
 
 import json
 import logging
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Callable, Dict, List, Optional, Tuple, Any
+
+from .metadata_matcher import MetadataMatcher
+from .pro_integration import PROIntegration
+from .statement_parser import StatementParser
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+_IDENTIFIER_PATTERN = re.compile(r'[^A-Z0-9]')
+
 class RoyaltyAuditor:
     """
     AI Royalty Auditor Agent
@@ -38,54 +48,222 @@ class RoyaltyAuditor:
             "matching_threshold": 0.85,
             "supported_pro_formats": ["ascap", "bmi", "sesac", "soundexchange"],
             "metadata_fields": ["artist", "title", "isrc", "iswc", "writer", "publisher"],
+            "catalog_analysis": {
+                "workers": os.cpu_count() or 1,
+                "shard_size": 500,
+                "progress_interval": 10,  # seconds
+                "pro_credentials_path": None,
+                # Yearly royalties assumed for works that don't state annual_royalties
+                "default_annual_value": 1000.0,
+                # Opportunity confidence counted as a priority action
+                "priority_confidence": 0.85
+            },
             "ai_model_settings": {
                 "use_fuzzy_matching": True,
                 "nlp_extraction_confidence": 0.75
             }
         }
     
-    def audit_royalty_statement(self, statement_file: str, rights_data: Dict) -> Dict:
+    def audit_royalty_statement(self, statement_file: str, rights_data: Dict,
+                                pro: Optional[str] = None) -> Dict:
         """
         Audit a royalty statement against verified rights data
         
+        The statement is streamed line by line, so its size is not limited by
+        memory. Each line is matched to a work by ISRC/ISWC/work ID, falling
+        back to fuzzy title and writer matching, and compared field by field.
+        
         Args:
             statement_file: Path to royalty statement file
             rights_data: Verified rights data from MESA Rights Vault
+            pro: PRO that issued the statement (detected when not given)
             
         Returns:
             Dict containing audit results with discrepancies found
         """
         logger.info(f"Auditing royalty statement: {statement_file}")
         
-        # TODO: Implement actual statement parsing logic
-        # This would use OCR/NLP to extract data from various statement formats
+        parser = StatementParser(self.config.get("statement_parser"))
+        match_fields = ["title", "writer"]
+        matcher = MetadataMatcher({
+            "similarity_threshold": self.config.get("matching_threshold", 0.85),
+            "fuzzy_match_fields": match_fields
+        })
+        max_unmatched = self.config.get("max_reported_unmatched_lines", 100)
+        
+        works = rights_data.get("works", [])
+        records = [self._work_to_record(work) for work in works]
+        matcher.build_index(records, match_fields)
+        
+        identifier_lookup = {}
+        for record in records:
+            for id_field in ("isrc", "iswc", "id"):
+                if record.get(id_field):
+                    identifier_lookup[self._normalize_identifier(record[id_field])] = record
+        
+        discrepancies = {}
+        unmatched_lines = []
+        paid_work_ids = set()
+        lines_parsed = 0
+        lines_matched = 0
+        unmatched_count = 0
+        total_paid = 0.0
+        at_risk_value = 0.0
+        
+        for item in parser.iter_line_items(statement_file, pro=pro):
+            lines_parsed += 1
+            total_paid += item["amount"]
+            
+            work, confidence = self._match_line_item(item, identifier_lookup, matcher)
+            
+            if work is None:
+                unmatched_count += 1
+                if len(unmatched_lines) < max_unmatched:
+                    unmatched_lines.append({
+                        "type": "unmatched_line",
+                        "details": f"Statement line {item['line_number']} ('{item['title']}') matches no work in the rights data",
+                        "line_number": item["line_number"],
+                        "statement_value": item["title"],
+                        "amount": f"${item['amount']:,.2f}",
+                        "confidence": round(confidence, 2)
+                    })
+                continue
+            
+            lines_matched += 1
+            paid_work_ids.add(work["id"])
+            
+            line_has_mismatch = False
+            for field, correct_value, similarity in self._compare_line_item(item, work, matcher):
+                line_has_mismatch = True
+                key = (work["id"], field, item[field])
+                
+                if key not in discrepancies:
+                    discrepancies[key] = {
+                        "type": "metadata_mismatch",
+                        "work_id": work["id"],
+                        "field": field,
+                        "details": f"{field.capitalize()} for '{work['title']}' does not match the rights data",
+                        "correct_value": correct_value,
+                        "statement_value": item[field],
+                        "line_numbers": [],
+                        "amount_affected": 0.0,
+                        "similarity": round(similarity, 2),
+                        "confidence": round(confidence, 2)
+                    }
+                
+                discrepancy = discrepancies[key]
+                if len(discrepancy["line_numbers"]) < max_unmatched:
+                    discrepancy["line_numbers"].append(item["line_number"])
+                discrepancy["amount_affected"] += item["amount"]
+            
+            if line_has_mismatch:
+                at_risk_value += item["amount"]
+        
+        results = list(discrepancies.values())
+        for discrepancy in results:
+            discrepancy["amount_affected"] = f"${discrepancy['amount_affected']:,.2f}"
+        
+        for record in records:
+            if record["id"] not in paid_work_ids:
+                results.append({
+                    "type": "missing_work",
+                    "work_id": record["id"],
+                    "details": f"Song '{record['title']}' is in the rights data but not in the statement",
+                    "confidence": 1.0
+                })
+        
+        results.extend(unmatched_lines)
+        
+        logger.info(f"Audited {lines_parsed} statement lines, found {len(results)} discrepancies")
         
-        # For demonstration, return mock discrepancies
         return {
             "status": "completed",
             "statement_file": statement_file,
-            "discrepancies": [
-                {
-                    "type": "missing_work",
-                    "details": "Song 'Example Title' appears in usage but not in payments",
-                    "potential_value": "$120.50",
-                    "confidence": 0.92
-                },
-                {
-                    "type": "metadata_mismatch",
-                    "details": "Writer credit for 'Another Song' has incorrect spelling",
-                    "correct_value": "John A. Smith",
-                    "statement_value": "John Smith",
-                    "confidence": 0.89
-                }
-            ],
+            "discrepancies": results,
             "summary": {
-                "total_works_checked": 128,
-                "discrepancies_found": 2,
-                "estimated_recovery_value": "$120.50"
+                "total_works_checked": len(records),
+                "statement_lines_parsed": lines_parsed,
+                "statement_lines_matched": lines_matched,
+                "unmatched_lines": unmatched_count,
+                "total_paid": f"${total_paid:,.2f}",
+                "discrepancies_found": len(results),
+                # Payments credited against mismatched metadata
+                "estimated_recovery_value": f"${at_risk_value:,.2f}"
             }
         }
     
+    def _work_to_record(self, work: Dict) -> Dict:
+        """Flatten a rights data work into a matchable record"""
+        writers = [w.get("name", "") if isinstance(w, dict) else str(w) for w in work.get("writers", [])]
+        if not writers and work.get("writer"):
+            writers = [work["writer"]]
+        
+        return {
+            "id": work.get("id") or work.get("work_id") or work.get("title", "unknown"),
+            "title": work.get("title", ""),
+            "writer": writers[0] if writers else "",
+            "writers": writers,
+            "publisher": work.get("publisher", ""),
+            "isrc": work.get("isrc", ""),
+            "iswc": work.get("iswc", "")
+        }
+    
+    def _normalize_identifier(self, value: str) -> str:
+        """Normalize an ISRC/ISWC/work ID for exact lookup"""
+        return _IDENTIFIER_PATTERN.sub("", str(value).upper())
+    
+    def _match_line_item(self, item: Dict, identifier_lookup: Dict,
+                         matcher: MetadataMatcher) -> Tuple[Optional[Dict], float]:
+        """Match a statement line to a work by identifier, then by metadata"""
+        for id_field in ("isrc", "iswc", "work_id"):
+            if item.get(id_field):
+                work = identifier_lookup.get(self._normalize_identifier(item[id_field]))
+                if work is not None:
+                    return work, 1.0
+        
+        query_record = {field: item[field] for field in ("title", "writer") if item.get(field)}
+        if not query_record:
+            return None, 0.0
+        
+        matches = matcher.query(query_record, top_k=1)
+        if not matches:
+            return None, 0.0
+        
+        work, score = matches[0]
+        if score >= matcher.config.get("similarity_threshold", 0.85):
+            return work, score
+        return None, score
+    
+    def _compare_line_item(self, item: Dict, work: Dict,
+                           matcher: MetadataMatcher) -> List[Tuple[str, str, float]]:
+        """
+        Compare a statement line with its matched work
+        
+        Returns:
+            List of (field, correct value, similarity) for mismatched fields
+        """
+        mismatches = []
+        
+        for field in ("title", "writer", "publisher"):
+            statement_value = item.get(field)
+            if not statement_value:
+                continue
+            
+            candidates = work["writers"] if field == "writer" else [work.get(field)]
+            candidates = [c for c in candidates if c]
+            if not candidates:
+                continue
+            
+            correct_value, similarity = max(
+                ((c, matcher.calculate_similarity(statement_value, c)) for c in candidates),
+                key=lambda pair: pair[1]
+            )
+            
+            if similarity < 1.0:
+                mismatches.append((field, correct_value, similarity))
+        
+        return mismatches
+    
     def fix_metadata(self, work_id: str, corrections: Dict) -> Dict:
         """
         Generate corrected metadata for submission to PROs
@@ -139,41 +317,237 @@ class RoyaltyAuditor:
             "estimated_recovery": discrepancy_data.get("potential_value", "Unknown")
         }
     
-    def analyze_catalog(self, catalog_data: Dict) -> Dict:
+    def analyze_catalog(self, catalog_data: Dict,
+                        progress_callback: Optional[Callable[[Dict], None]] = None) -> Dict:
         """
         Analyze a full catalog for potential black box recovery opportunities
         
+        Works are split into shards and checked on a process pool. Each
+        worker process keeps one PRO client and matcher for all of its
+        shards, runs the registration, metadata and black box checks and
+        the results are merged as shards complete.
+        
+        Registration and metadata issues are valued from the work's
+        annual_royalties (or the configured default_annual_value), split
+        evenly across the checked PROs. PRO lookups that fail are listed
+        under failed_checks and don't stop the analysis.
+        
         Args:
             catalog_data: Complete catalog data
+            progress_callback: Called with progress statistics as shards complete
             
         Returns:
             Dict with analysis results
         """
-        logger.info(f"Analyzing catalog with {len(catalog_data.get('works', []))} works")
+        works = catalog_data.get("works", [])
+        logger.info(f"Analyzing catalog with {len(works)} works")
         
-        # TODO: Implement actual catalog analysis
+        settings = self.config.get("catalog_analysis", {})
+        shard_size = max(1, settings.get("shard_size", 500))
+        workers = max(1, settings.get("workers", os.cpu_count() or 1))
+        progress_interval = settings.get("progress_interval", 10)
+        credentials_path = settings.get("pro_credentials_path")
+        annual_value = settings.get("default_annual_value", 1000.0)
+        priority_confidence = settings.get("priority_confidence", 0.85)
         
-        return {
-            "catalog_size": len(catalog_data.get("works", [])),
-            "recovery_opportunities": [
-                {
-                    "work_id": "WORK123",
-                    "issue": "Unregistered with SoundExchange",
-                    "estimated_value": "$1,240.00",
-                    "confidence": 0.95,
-                    "actions": ["register_work", "submit_claim"]
-                },
-                {
-                    "work_id": "WORK456",
-                    "issue": "Metadata mismatch at ASCAP",
-                    "estimated_value": "$520.00",
-                    "confidence": 0.88,
-                    "actions": ["correct_metadata", "request_audit"]
+        shards = [works[i:i + shard_size] for i in range(0, len(works), shard_size)]
+        pros = self.config.get("supported_pro_formats", [])
+        threshold = self.config.get("matching_threshold", 0.85)
+        
+        opportunities = []
+        errors = []
+        works_done = 0
+        start_time = time.time()
+        last_report = start_time
+        
+        def record_shard(shard_size_done: int, shard_result: Tuple[List[Dict], List[Dict]]):
+            nonlocal works_done, last_report
+            works_done += shard_size_done
+            opportunities.extend(shard_result[0])
+            errors.extend(shard_result[1])
+            
+            now = time.time()
+            elapsed = now - start_time
+            progress = {
+                "works_done": works_done,
+                "works_total": len(works),
+                "elapsed_seconds": elapsed,
+                "works_per_second": works_done / elapsed if elapsed else 0.0
+            }
+            if progress_callback:
+                progress_callback(progress)
+            if now - last_report >= progress_interval or works_done == len(works):
+                last_report = now
+                logger.info(f"Catalog analysis: {works_done}/{len(works)} works "
+                            f"({progress['works_per_second']:.1f} works/s)")
+        
+        if workers == 1 or len(shards) <= 1:
+            # Not worth starting a pool
+            pro_integration = PROIntegration(credentials_path)
+            matcher = MetadataMatcher()
+            for shard in shards:
+                record_shard(len(shard), _analyze_work_shard(shard, pros, threshold, annual_value,
+                                                             pro_integration, matcher))
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(shards)), initializer=_init_shard_worker,
+                                     initargs=(credentials_path,)) as executor:
+                futures = {
+                    executor.submit(_analyze_work_shard, shard, pros, threshold, annual_value): len(shard)
+                    for shard in shards
                 }
-            ],
+                for future in as_completed(futures):
+                    record_shard(futures[future], future.result())
+        
+        # Keep the merged result independent of shard completion order
+        opportunities.sort(key=lambda o: (-_parse_dollars(o["estimated_value"]), o["work_id"], o["issue"]))
+        errors.sort(key=lambda e: (e["work_id"], e["pro"], e["check"]))
+        
+        elapsed = time.time() - start_time
+        total_recovery = sum(_parse_dollars(o["estimated_value"]) for o in opportunities)
+        
+        return {
+            "catalog_size": len(works),
+            "recovery_opportunities": opportunities,
+            "failed_checks": errors,
             "summary": {
-                "total_estimated_recovery": "$1,760.00",
-                "priority_actions": 2,
-                "recommended_timeline": "30 days"
+                "total_estimated_recovery": f"${total_recovery:,.2f}",
+                "priority_actions": sum(1 for o in opportunities if o["confidence"] >= priority_confidence),
+                "works_with_issues": len({o["work_id"] for o in opportunities}),
+                "failed_checks": len(errors),
+                "elapsed_seconds": round(elapsed, 2),
+                "works_per_second": round(len(works) / elapsed, 1) if elapsed else 0.0
             }
-        } 
\ No newline at end of file
+        }
+
+
+def _parse_dollars(value: str) -> float:
+    """Parse a dollar amount such as "$1,240.00" """
+    try:
+        return float(str(value).replace("$", "").replace(",", ""))
+    except ValueError:
+        return 0.0
+
+
+# PRO client and matcher of a shard worker process, set by _init_shard_worker
+_worker_pro_integration = None
+_worker_matcher = None
+
+def _init_shard_worker(credentials_path: Optional[str] = None) -> None:
+    """Set up a shard worker with one PRO client and matcher for all its shards"""
+    global _worker_pro_integration, _worker_matcher
+    _worker_pro_integration = PROIntegration(credentials_path)
+    _worker_matcher = MetadataMatcher()
+
+
+def _analyze_work_shard(works: List[Dict], pros: List[str], threshold: float,
+                        annual_value: float = 1000.0, pro_integration: Optional[PROIntegration] = None,
+                        matcher: Optional[MetadataMatcher] = None) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Run the per-work catalog checks for one shard of works
+    
+    A failed PRO lookup is recorded and the remaining checks continue.
+    
+    Args:
+        works: Works in this shard
+        pros: PROs to check
+        threshold: Similarity below which registered metadata is a mismatch
+        annual_value: Yearly royalties assumed for works without annual_royalties
+        pro_integration: PRO client (defaults to the one set up by _init_shard_worker)
+        matcher: Metadata matcher (defaults to the one set up by _init_shard_worker)
+        
+    Returns:
+        Recovery opportunities found in the shard and the failed lookups
+    """
+    if pro_integration is None or matcher is None:
+        if _worker_pro_integration is None:
+            _init_shard_worker()
+        pro_integration = pro_integration or _worker_pro_integration
+        matcher = matcher or _worker_matcher
+    opportunities = []
+    errors = []
+    
+    def record_error(work_id: str, pro: str, check: str, error: Any):
+        logger.error(f"Catalog {check} check of {work_id} at {pro} failed: {error}")
+        errors.append({"work_id": work_id, "pro": pro, "check": check, "error": str(error)})
+    
+    for work in works:
+        work_id = work.get("id") or work.get("work_id") or "unknown"
+        identifier_value = work.get("iswc") or work.get("isrc") or work_id
+        writer_names = [w.get("name", "") if isinstance(w, dict) else str(w) for w in work.get("writers", [])]
+        
+        # Each PRO is assumed to collect an even share of the work's royalties
+        pro_value = _parse_dollars(work.get("annual_royalties", annual_value)) / max(1, len(pros))
+        
+        for pro in pros:
+            try:
+                opportunity = _check_registration(work, work_id, identifier_value, writer_names, pro,
+                                                  pro_value, threshold, pro_integration, matcher)
+                if opportunity:
+                    opportunities.append(opportunity)
+            except Exception as e:
+                record_error(work_id, pro, "registration", e)
+            
+            # Black box check for each recording/composition identifier
+            for id_type in ("isrc", "iswc"):
+                if not work.get(id_type):
+                    continue
+                try:
+                    black_box = pro_integration.check_black_box_funds({"type": id_type, "value": work[id_type]}, pro)
+                except Exception as e:
+                    record_error(work_id, pro, "black_box", e)
+                    continue
+                if "error" in black_box:
+                    record_error(work_id, pro, "black_box", black_box["error"])
+                elif black_box.get("has_unclaimed_funds"):
+                    opportunities.append({
+                        "work_id": work_id,
+                        "issue": f"Unclaimed black box funds at {pro.upper()} ({id_type.upper()})",
+                        "pro": pro,
+                        "estimated_value": black_box.get("estimated_amount", "$0.00"),
+                        "confidence": 0.9 if black_box.get("claim_eligibility") == "eligible" else 0.6,
+                        "actions": ["submit_claim"]
+                    })
+    
+    return opportunities, errors
+
+
+def _check_registration(work: Dict, work_id: str, identifier_value: str, writer_names: List[str], pro: str,
+                        pro_value: float, threshold: float, pro_integration: PROIntegration,
+                        matcher: MetadataMatcher) -> Optional[Dict]:
+    """Check a work's registration and registered metadata at one PRO, returning any opportunity"""
+    registration = pro_integration.query_work_registration(identifier_value, pro)
+    if "error" in registration:
+        raise RuntimeError(registration["error"])
+    
+    if registration.get("registration_status") != "registered":
+        return {
+            "work_id": work_id,
+            "issue": f"Unregistered with {pro.upper()}",
+            "pro": pro,
+            "estimated_value": f"${pro_value:,.2f}",
+            "confidence": 0.95,
+            "actions": ["register_work", "submit_claim"]
+        }
+    
+    # Metadata check against the registered record
+    registered = registration.get("metadata", {})
+    similarities = []
+    if work.get("title") and registered.get("title"):
+        similarities.append(matcher.calculate_similarity(work["title"], registered["title"]))
+    registered_writers = [w.get("name", "") for w in registered.get("writers", [])]
+    for name in writer_names:
+        if registered_writers:
+            similarities.append(max(matcher.calculate_similarity(name, r) for r in registered_writers))
+    
+    if not similarities or min(similarities) >= threshold:
+        return None
+    
+    # The less the registration matches, the more of the PRO's share is at risk
+    return {
+        "work_id": work_id,
+        "issue": f"Metadata mismatch at {pro.upper()}",
+        "pro": pro,
+        "estimated_value": f"${pro_value * (1 - min(similarities)):,.2f}",
+        "confidence": round(1 - min(similarities), 2),
+        "actions": ["correct_metadata", "request_audit"]
+    }
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".jsonl"
+INDEX_FILE = "index.json"
+
+class DiscoveryLog:
+    """
+    Segmented append-only log of session discoveries
+
+    Records are appended as JSON lines to numbered segment files, so a long
+    session produces a handful of files instead of one file per discovery.
+    Writes are buffered and flushed in batches, and fsynced on an interval.
+    An in-memory offset index maps each record key to the location of its
+    latest version, and sealed segments are periodically compacted down to
+    the latest version of each record. The index is persisted when a segment
+    is sealed, after compaction and on close; on open, records appended to
+    the active segment since the last save are re-read from its tail.
+    """
+
+    def __init__(self, log_dir: str, segment_size: int = 64 * 1024 * 1024,
+                 batch_size: int = 1000, flush_interval: float = 1.0,
+                 fsync_interval: float = 5.0, compact_segments: int = 8):
+        """
+        Open (or create) a discovery log
+
+        Args:
+            log_dir: Directory holding the segment files
+            segment_size: Size in bytes after which a new segment is started
+            batch_size: Number of buffered records that triggers a flush
+            flush_interval: Seconds between background flushes (0 disables
+                            the background flusher)
+            fsync_interval: Minimum seconds between fsyncs
+            compact_segments: Number of sealed segments that triggers compaction
+        """
+        self.log_dir = Path(log_dir)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.segment_size = segment_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.compact_segments = compact_segments
+
+        self._lock = threading.RLock()
+        self._buffer: List[Tuple[str, Dict]] = []
+        self._index: Dict[str, Tuple[str, int, int]] = {}
+        self._last_fsync = time.time()
+        self._dirty = False
+
+        # Drop leftovers of an interrupted compaction
+        for leftover in self.log_dir.glob(f"{SEGMENT_PREFIX}*.compact"):
+            leftover.unlink()
+
+        self._segments = self._list_segments(self.log_dir)
+        self._load_index()
+
+        if self._segments and self._segment_path(self._segments[-1]).stat().st_size < segment_size:
+            self._active_name = self._segments[-1]
+        else:
+            self._active_name = self._new_segment_name()
+            self._segments.append(self._active_name)
+        self._active = open(self._segment_path(self._active_name), "ab")
+
+        self._closed = threading.Event()
+        self._flusher = None
+        if flush_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+            self._flusher.start()
+
+    @staticmethod
+    def _list_segments(log_dir: Path) -> List[str]:
+        """List segment file names in log order"""
+        return sorted(p.name for p in log_dir.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}"))
+
+    def _segment_path(self, name: str) -> Path:
+        return self.log_dir / name
+
+    def _new_segment_name(self) -> str:
+        number = int(self._segments[-1][len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]) + 1 if self._segments else 1
+        return f"{SEGMENT_PREFIX}{number:06d}{SEGMENT_SUFFIX}"
+
+    def _load_index(self):
+        """Load the persisted offset index and replay the active segment's tail"""
+        index_path = self.log_dir / INDEX_FILE
+        sizes = {name: self._segment_path(name).stat().st_size for name in self._segments}
+
+        self._index = {}
+        to_scan = [(name, 0) for name in self._segments]
+
+        if index_path.exists() and self._segments:
+            try:
+                with open(index_path, "r") as f:
+                    saved = json.load(f)
+                saved_sizes = saved["segment_sizes"]
+                last = self._segments[-1]
+                # Sealed segments never change; only the last one may have grown
+                if (set(saved_sizes) == set(sizes)
+                        and all(saved_sizes[name] == sizes[name] for name in self._segments[:-1])
+                        and saved_sizes[last] <= sizes[last]):
+                    self._index = {key: tuple(location) for key, location in saved["index"].items()}
+                    to_scan = [(last, saved_sizes[last])]
+            except (json.JSONDecodeError, KeyError, TypeError):
+                pass
+
+        end = 0
+        for name, start in to_scan:
+            end = start
+            for key, offset, length, _ in self._scan_segment(self._segment_path(name), start):
+                self._index[key] = (name, offset, length)
+                end = offset + length
+
+        # Drop a record torn by a crash so new appends start on a clean line
+        if self._segments and end < sizes[self._segments[-1]]:
+            logger.warning(f"Truncating torn record at the end of {self._segments[-1]}")
+            os.truncate(self._segment_path(self._segments[-1]), end)
+
+    def _save_index(self):
+        """Persist the offset index alongside the segments"""
+        index_path = self.log_dir / INDEX_FILE
+        temp_path = index_path.with_suffix(".tmp")
+        with open(temp_path, "w") as f:
+            json.dump({
+                "segment_sizes": {name: self._segment_path(name).stat().st_size for name in self._segments},
+                "index": self._index
+            }, f)
+        os.replace(temp_path, index_path)
+
+    @staticmethod
+    def _scan_segment(path: Path, start: int = 0) -> Iterator[Tuple[str, int, int, Dict]]:
+        """Yield (key, offset, length, record) for each complete line of a segment from start"""
+        offset = start
+        with open(path, "rb") as f:
+            f.seek(start)
+            for line in f:
+                length = len(line)
+                if line.endswith(b"\n"):
+                    try:
+                        entry = json.loads(line)
+                        yield entry["key"], offset, length, entry["record"]
+                    except (json.JSONDecodeError, KeyError):
+                        logger.warning(f"Skipping corrupt record in {path.name} at offset {offset}")
+                offset += length
+
+    def append(self, key: str, record: Dict):
+        """
+        Append a record (a newer version replaces an older one with the same key)
+
+        Args:
+            key: Record key (discovery or fund ID)
+            record: Record data
+        """
+        with self._lock:
+            if self._closed.is_set():
+                raise ValueError("Discovery log is closed")
+            self._buffer.append((key, record))
+            if len(self._buffer) >= self.batch_size:
+                self.flush()
+
+    def flush(self, fsync: bool = False):
+        """
+        Write buffered records to the active segment
+
+        Args:
+            fsync: Force an fsync even if the fsync interval has not elapsed
+        """
+        with self._lock:
+            if self._buffer:
+                for key, record in self._buffer:
+                    line = (json.dumps({"key": key, "record": record}) + "\n").encode()
+                    offset = self._active.tell()
+                    self._active.write(line)
+                    self._index[key] = (self._active_name, offset, len(line))
+
+                    if offset + len(line) >= self.segment_size:
+                        self._rotate()
+                self._buffer = []
+                self._active.flush()
+                self._dirty = True
+
+            if self._dirty and (fsync or time.time() - self._last_fsync >= self.fsync_interval):
+                os.fsync(self._active.fileno())
+                self._last_fsync = time.time()
+                self._dirty = False
+
+    def _rotate(self):
+        """Seal the active segment and start a new one"""
+        self._active.flush()
+        os.fsync(self._active.fileno())
+        self._active.close()
+
+        self._active_name = self._new_segment_name()
+        self._segments.append(self._active_name)
+        self._active = open(self._segment_path(self._active_name), "ab")
+
+        if len(self._segments) - 1 >= self.compact_segments:
+            self.compact()
+        else:
+            self._save_index()
+
+    def compact(self):
+        """
+        Rewrite the sealed segments down to the latest version of each record
+
+        The compacted segment replaces the newest sealed segment, so if the
+        process stops part way any remaining older segments still sort
+        before it and cannot shadow newer records.
+        """
+        with self._lock:
+            sealed = self._segments[:-1]
+            if len(sealed) < 2:
+                return
+
+            sealed_set = set(sealed)
+            target = sealed[-1]
+            temp_path = self._segment_path(target).with_suffix(".compact")
+            new_locations = {}
+
+            with open(temp_path, "wb") as out:
+                for key, (name, offset, length) in self._index.items():
+                    if name not in sealed_set:
+                        continue
+                    line = self._read_line(name, offset, length)
+                    new_locations[key] = (target, out.tell(), len(line))
+                    out.write(line)
+                out.flush()
+                os.fsync(out.fileno())
+
+            os.replace(temp_path, self._segment_path(target))
+            for name in sealed[:-1]:
+                self._segment_path(name).unlink()
+
+            self._index.update(new_locations)
+            self._segments = [target, self._active_name]
+            self._save_index()
+
+            logger.info(f"Compacted {len(sealed)} discovery log segments into {target}")
+
+    def _read_line(self, name: str, offset: int, length: int) -> bytes:
+        with open(self._segment_path(name), "rb") as f:
+            f.seek(offset)
+            return f.read(length)
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Get the latest version of a record
+
+        Args:
+            key: Record key
+
+        Returns:
+            Record data or None if not found
+        """
+        with self._lock:
+            for buffered_key, record in reversed(self._buffer):
+                if buffered_key == key:
+                    return record
+
+            location = self._index.get(key)
+            if location is None:
+                return None
+            if location[0] == self._active_name:
+                self._active.flush()
+            return json.loads(self._read_line(*location))["record"]
+
+    def iter_records(self) -> Iterator[Dict]:
+        """Yield the latest version of every record"""
+        self.flush()
+        with self._lock:
+            locations = list(self._index.values())
+
+        for location in locations:
+            yield json.loads(self._read_line(*location))["record"]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(set(self._index) | {key for key, _ in self._buffer})
+
+    def _flush_loop(self):
+        """Background flusher for buffered records"""
+        while not self._closed.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing discovery log: {str(e)}")
+
+    @property
+    def closed(self) -> bool:
+        """Whether the log has been closed"""
+        return self._closed.is_set()
+
+    def close(self):
+        """Flush, fsync and close the log"""
+        with self._lock:
+            if self._closed.is_set():
+                return
+            self.flush(fsync=True)
+            self._save_index()
+            self._closed.set()
+            self._active.close()
+
+        if self._flusher:
+            self._flusher.join(timeout=self.flush_interval + 1)
+
+    @classmethod
+    def read_directory(cls, log_dir: str) -> Iterator[Dict]:
+        """
+        Read the latest version of every record from a log directory
+
+        Also yields records from the one-JSON-file-per-discovery layout used
+        by older sessions.
+
+        Args:
+            log_dir: Directory holding the segment files
+
+        Yields:
+            Record data
+        """
+        log_dir = Path(log_dir)
+
+        latest = {}
+        for name in cls._list_segments(log_dir):
+            for key, _, _, record in cls._scan_segment(log_dir / name):
+                latest[key] = record
+        yield from latest.values()
+
+        for legacy_file in sorted(log_dir.glob("*.json")):
+            if legacy_file.name == INDEX_FILE:
+                continue
+            try:
+                with open(legacy_file, "r") as f:
+                    yield json.load(f)
+            except json.JSONDecodeError:
+                logger.warning(f"Error parsing discovery file: {legacy_file.name}")
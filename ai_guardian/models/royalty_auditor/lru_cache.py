@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class LRUCache:
+    """
+    Bounded, thread-safe least-recently-used cache with hit/miss counters
+    
+    Used to intern normalized strings and memoize similarity scores so the
+    same names are not reprocessed on every comparison. Entries can
+    optionally expire after a time-to-live.
+    """
+    
+    def __init__(self, maxsize: int = 10000, ttl: Optional[float] = None):
+        """
+        Initialize the cache
+        
+        Args:
+            maxsize: Maximum number of entries kept before evicting the
+                     least recently used one
+            ttl: Default time-to-live in seconds (None keeps entries until
+                 evicted)
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._expiry = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Look up a cached value, marking it as recently used
+        
+        Args:
+            key: Cache key
+            default: Value returned when the key is not cached
+            
+        Returns:
+            Cached value or default
+        """
+        with self._lock:
+            if key in self._entries:
+                expires_at = self._expiry.get(key)
+                if expires_at is not None and expires_at <= time.time():
+                    del self._entries[key]
+                    del self._expiry[key]
+                    self.expirations += 1
+                    self.misses += 1
+                    return default
+                
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            
+            self.misses += 1
+            return default
+    
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """
+        Store a value, evicting the least recently used entry if full
+        
+        Args:
+            key: Cache key
+            value: Value to cache
+            ttl: Time-to-live in seconds for this entry (defaults to the
+                 cache ttl)
+        """
+        if self.maxsize <= 0:
+            return
+        
+        ttl = ttl if ttl is not None else self.ttl
+            
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if ttl is not None:
+                self._expiry[key] = time.time() + ttl
+            else:
+                self._expiry.pop(key, None)
+            
+            while len(self._entries) > self.maxsize:
+                evicted_key, _ = self._entries.popitem(last=False)
+                self._expiry.pop(evicted_key, None)
+                self.evictions += 1
+    
+    def invalidate(self, key: Hashable):
+        """Remove a single entry if present"""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._expiry.pop(key, None)
+    
+    def prune_expired(self) -> int:
+        """
+        Remove every expired entry
+        
+        Returns:
+            Number of entries removed
+        """
+        now = time.time()
+        with self._lock:
+            expired = [key for key, expires_at in self._expiry.items() if expires_at <= now]
+            for key in expired:
+                del self._entries[key]
+                del self._expiry[key]
+            self.expirations += len(expired)
+            return len(expired)
+    
+    def clear(self):
+        """Remove all entries and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self._expiry.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.expirations = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+    
+    def stats(self) -> Dict:
+        """
+        Get cache usage statistics
+        
+        Returns:
+            Dictionary with size, hits, misses, evictions, expirations
+            and hit rate
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
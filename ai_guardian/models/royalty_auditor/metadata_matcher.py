@@ -3,13 +3,40 @@
 import logging
 from typing import Dict, List, Tuple, Optional, Any
 import json
+import random
 import re
+import zlib
+import heapq
+from collections import Counter, defaultdict
 from difflib import SequenceMatcher
 
+from .lru_cache import LRUCache
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Precompiled normalization patterns
+_SPECIAL_CHARS_PATTERN = re.compile(r'[^\w\s]')
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# Fixed MinHash permutations so clustering is reproducible across runs,
+# all drawn from one seeded stream so the (a, b) pairs are independent
+_MINHASH_PRIME = (1 << 61) - 1
+_MINHASH_SEED = 0x5EED
+_minhash_rng = random.Random(_MINHASH_SEED)
+_MINHASH_PARAMS = [
+    (_minhash_rng.randrange(1, _MINHASH_PRIME), _minhash_rng.randrange(0, _MINHASH_PRIME))
+    for _ in range(128)
+]
+del _minhash_rng
+
 class MetadataMatcher:
     """
     AI-powered metadata matching and correction system
@@ -32,6 +59,13 @@ class MetadataMatcher:
             "fuzzy_match_fields": ["artist", "writer", "title", "publisher"]
         }
         
+        # Candidate index built by build_index()
+        self._index = None
+        
+        # Interned normalized strings and memoized pairwise similarity scores
+        self.normalization_cache = LRUCache(self.config.get("normalization_cache_size", 100000))
+        self.similarity_cache = LRUCache(self.config.get("similarity_cache_size", 500000))
+        
         logger.info("Initialized metadata matcher")
     
     def calculate_similarity(self, str1: str, str2: str) -> float:
@@ -52,25 +86,53 @@ class MetadataMatcher:
         str1 = self._normalize_string(str1)
         str2 = self._normalize_string(str2)
         
-        # Calculate similarity
-        return SequenceMatcher(None, str1, str2).ratio()
+        # Reuse the score if this normalized pair was already compared
+        pair = (str1, str2)
+        similarity = self.similarity_cache.get(pair)
+        if similarity is None:
+            similarity = SequenceMatcher(None, str1, str2).ratio()
+            self.similarity_cache.put(pair, similarity)
+        
+        return similarity
     
     def _normalize_string(self, input_str: str) -> str:
         """Normalize string for comparison"""
         if not input_str:
             return ""
+        
+        cached = self.normalization_cache.get(input_str)
+        if cached is not None:
+            return cached
             
         # Convert to lowercase
         result = input_str.lower()
         
         # Remove special characters
-        result = re.sub(r'[^\w\s]', '', result)
+        result = _SPECIAL_CHARS_PATTERN.sub('', result)
         
         # Normalize whitespace
-        result = re.sub(r'\s+', ' ', result).strip()
+        result = _WHITESPACE_PATTERN.sub(' ', result).strip()
         
+        self.normalization_cache.put(input_str, result)
         return result
     
+    def get_cache_stats(self) -> Dict:
+        """
+        Get hit/miss statistics for the normalization and similarity caches
+        
+        Returns:
+            Dictionary with statistics for each cache
+        """
+        return {
+            "normalization": self.normalization_cache.stats(),
+            "similarity": self.similarity_cache.stats()
+        }
+    
+    def clear_caches(self):
+        """Clear the normalization and similarity caches"""
+        self.normalization_cache.clear()
+        self.similarity_cache.clear()
+    
     def find_matching_record(self, query_record: Dict, candidate_records: List[Dict], 
                             match_fields: Optional[List[str]] = None) -> Tuple[Optional[Dict], float]:
         """
@@ -102,6 +164,335 @@ class MetadataMatcher:
         else:
             return None, best_score
     
+    def build_index(self, records: List[Dict], match_fields: Optional[List[str]] = None) -> Dict:
+        """
+        Build a blocking index over a catalog so queries only score a shortlist
+        
+        Each record is indexed under character trigram and sorted-token keys
+        of its normalized match fields. The index is kept on the matcher and
+        used by query().
+        
+        Args:
+            records: Catalog records to index
+            match_fields: Fields to use for matching
+            
+        Returns:
+            Index statistics
+        """
+        match_fields = list(match_fields or self.config.get("fuzzy_match_fields"))
+        records = list(records)
+        postings = self._build_postings(records, match_fields)
+        
+        self._index = {
+            "records": records,
+            "fields": match_fields,
+            "postings": postings
+        }
+        
+        logger.info(f"Built candidate index over {len(records)} records with {len(postings)} blocking keys")
+        
+        return {
+            "records": len(records),
+            "blocking_keys": len(postings),
+            "fields": match_fields
+        }
+    
+    def query(self, query_record: Dict, top_k: int = 1) -> List[Tuple[Dict, float]]:
+        """
+        Find the best matching records using the index built by build_index()
+        
+        Only candidates sharing the most blocking keys with the query are
+        scored, using the same record similarity as find_matching_record().
+        Ties are broken by catalog order. Because the shortlist is capped
+        (index_shortlist_size) and very common keys are skipped
+        (index_max_block_size), the true best match can fall outside it; if
+        no shortlisted record reaches the similarity threshold, a wider
+        shortlist (index_fallback_shortlist_size) is scored as well. Setting
+        index_full_scan_fallback scores the whole catalog instead, which
+        gives the brute-force result at brute-force cost. A match above the
+        threshold is returned as is, even if an unlisted record would score
+        higher.
+        
+        Args:
+            query_record: Record to find matches for
+            top_k: Number of matches to return
+            
+        Returns:
+            List of (record, score) tuples, best match first
+        """
+        if self._index is None:
+            raise RuntimeError("No candidate index built, call build_index() first")
+        
+        records = self._index["records"]
+        fields = self._index["fields"]
+        shortlist_size = max(top_k, self.config.get("index_shortlist_size", 50))
+        
+        shortlist = self._shortlist(query_record, fields, self._index["postings"], shortlist_size)
+        
+        scored = [
+            (position, self._calculate_record_similarity(query_record, records[position], fields))
+            for position in shortlist
+        ]
+        
+        threshold = self.config.get("similarity_threshold", 0.85)
+        if not any(score >= threshold for _, score in scored):
+            scored.extend(
+                (position, self._calculate_record_similarity(query_record, records[position], fields))
+                for position in self._fallback_positions(query_record, fields, self._index["postings"],
+                                                         shortlist, len(records))
+            )
+        
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        
+        return [(records[position], score) for position, score in scored[:top_k] if score > 0]
+    
+    def _build_postings(self, records: List[Dict], fields: List[str]) -> Dict[str, List[int]]:
+        """Map each blocking key to the positions of the records that have it"""
+        postings = defaultdict(list)
+        for position, record in enumerate(records):
+            for key in self._blocking_keys(record, fields):
+                postings[key].append(position)
+        return dict(postings)
+    
+    def _shortlist(self, query_record: Dict, fields: List[str], postings: Dict[str, List[int]],
+                   shortlist_size: int) -> List[int]:
+        """Get the positions sharing the most blocking keys with a record, in catalog order on ties"""
+        max_block_size = self.config.get("index_max_block_size", 10000)
+        
+        blocks = [postings[key] for key in self._blocking_keys(query_record, fields) if key in postings]
+        
+        # Very common keys (e.g. "the") say little about a match, skip them
+        # unless they are all we have
+        selective_blocks = [block for block in blocks if len(block) <= max_block_size]
+        if not selective_blocks and blocks:
+            selective_blocks = [min(blocks, key=len)]
+        
+        shared_keys = Counter()
+        for block in selective_blocks:
+            shared_keys.update(block)
+        
+        return heapq.nsmallest(shortlist_size, shared_keys, key=lambda position: (-shared_keys[position], position))
+    
+    def _fallback_positions(self, query_record: Dict, fields: List[str], postings: Dict[str, List[int]],
+                            shortlist: List[int], record_count: int) -> List[int]:
+        """Get the extra positions to score when a shortlist has no match above the threshold"""
+        shortlisted = set(shortlist)
+        if self.config.get("index_full_scan_fallback", False):
+            positions = range(record_count)
+        else:
+            fallback_size = self.config.get("index_fallback_shortlist_size", 500)
+            positions = self._shortlist(query_record, fields, postings, fallback_size)
+        return [position for position in positions if position not in shortlisted]
+    
+    def _blocking_keys(self, record: Dict, fields: List[str]) -> set:
+        """Generate trigram and sorted-token blocking keys for a record"""
+        keys = set()
+        
+        for field in fields:
+            if field not in record:
+                continue
+                
+            normalized = self._normalize_string(str(record[field]))
+            if not normalized:
+                continue
+            
+            # Sorted tokens catch reordered names ("Smith John" / "John Smith")
+            keys.add(f"{field}|tokens|{' '.join(sorted(normalized.split()))}")
+            
+            padded = f" {normalized} "
+            for i in range(len(padded) - 2):
+                keys.add(f"{field}|{padded[i:i + 3]}")
+        
+        return keys
+    
+    def match_many(self, queries: List[Dict], candidates: List[Dict],
+                   match_fields: Optional[List[str]] = None) -> List[Tuple[Optional[Dict], float]]:
+        """
+        Find the best matching candidate for every query record in one batch
+        
+        The catalog gets a blocking index like build_index(), and each query
+        keeps the batch_shortlist_size candidates sharing the most blocking
+        keys with it. For a block of queries only the union of their
+        shortlists is encoded as hashed character trigram TF-IDF vectors,
+        and each query is scored against its own shortlist, so memory grows
+        with the shortlists rather than the catalog. The best few candidates
+        per query are rescored with the exact record similarity so results
+        and thresholds agree with find_matching_record(). A query whose
+        shortlist has no match above the threshold falls back exactly like
+        query(): the wider index_fallback_shortlist_size shortlist, or the
+        whole catalog with index_full_scan_fallback, is scored with the
+        exact record similarity. A match that shares too few keys to be in
+        the wider shortlist is missed.
+        
+        Args:
+            queries: Records to find matches for (e.g. statement lines)
+            candidates: List of potential matching records (e.g. the catalog)
+            match_fields: Fields to use for matching
+            
+        Returns:
+            List of (best matching record, confidence score) tuples, one per query
+        """
+        match_fields = match_fields or self.config.get("fuzzy_match_fields")
+        
+        if not NUMPY_AVAILABLE:
+            logger.warning("NumPy not available, falling back to per-record matching")
+            return [self.find_matching_record(query, candidates, match_fields) for query in queries]
+        
+        if not queries:
+            return []
+        if not candidates or not match_fields:
+            return [(None, 0.0) for _ in queries]
+        
+        threshold = self.config.get("similarity_threshold", 0.85)
+        chunk_size = self.config.get("batch_chunk_size", 256)
+        shortlist_size = self.config.get("batch_shortlist_size", 50)
+        rescore_size = self.config.get("batch_rescore_size", 5)
+        
+        postings = self._build_postings(candidates, match_fields)
+        
+        # Inverse document frequencies come from the whole catalog
+        idfs = {field: self._field_idf([c.get(field) for c in candidates]) for field in match_fields}
+        
+        results = []
+        for start in range(0, len(queries), chunk_size):
+            chunk = queries[start:start + chunk_size]
+            shortlists = [self._shortlist(query, match_fields, postings, shortlist_size) for query in chunk]
+            
+            # Encode the union of the chunk's shortlists once per field
+            positions = sorted(set().union(*shortlists))
+            column = {position: col for col, position in enumerate(positions)}
+            encoded_fields = []
+            for field in match_fields:
+                encoded_fields.append((
+                    self._encode_field_values([candidates[p].get(field) for p in positions], idfs[field]),
+                    np.array([field in candidates[p] for p in positions], dtype=bool),
+                    self._encode_field_values([q.get(field) for q in chunk], idfs[field]),
+                    [field in q for q in chunk]
+                ))
+            
+            for row, query in enumerate(chunk):
+                shortlist = sorted(shortlists[row])
+                best_position, best_score = self._best_in_shortlist(
+                    query, shortlist, column, encoded_fields, row, candidates, match_fields, rescore_size)
+                
+                if best_score < threshold:
+                    for position in self._fallback_positions(query, match_fields, postings,
+                                                             shortlist, len(candidates)):
+                        score = self._calculate_record_similarity(query, candidates[position], match_fields)
+                        if score > best_score:
+                            best_score = score
+                            best_position = position
+                
+                if best_position is not None and best_score >= threshold:
+                    results.append((candidates[best_position], best_score))
+                else:
+                    results.append((None, best_score))
+        
+        return results
+    
+    def _best_in_shortlist(self, query: Dict, shortlist: List[int], column: Dict[int, int],
+                           encoded_fields: List[Tuple], row: int, candidates: List[Dict],
+                           match_fields: List[str], rescore_size: int) -> Tuple[Optional[int], float]:
+        """Score a query's shortlist with the encoded vectors, rescoring the best few exactly"""
+        if not shortlist:
+            return None, 0.0
+        
+        cols = np.array([column[position] for position in shortlist], dtype=np.intp)
+        total = np.zeros(len(cols), dtype=np.float32)
+        counts = np.zeros(len(cols), dtype=np.float32)
+        
+        for candidate_matrix, candidate_present, query_matrix, query_present in encoded_fields:
+            if not query_present[row]:
+                continue
+            present = candidate_present[cols]
+            total += (candidate_matrix[cols] @ query_matrix[row]) * present
+            counts += present
+        
+        scores = total / np.maximum(counts, 1)
+        
+        if not rescore_size:
+            # Use the vector scores directly
+            best = int(np.argmax(scores))
+            return shortlist[best], float(scores[best])
+        
+        keep = min(rescore_size, len(shortlist))
+        best_position = None
+        best_score = 0.0
+        
+        for index in sorted(np.argpartition(-scores, keep - 1)[:keep]):
+            position = shortlist[index]
+            score = self._calculate_record_similarity(query, candidates[position], match_fields)
+            if score > best_score:
+                best_score = score
+                best_position = position
+        
+        return best_position, best_score
+    
+    def _trigram_buckets(self, text: str, dimension: int) -> List[int]:
+        """Hash the character trigrams of a normalized value into vector buckets"""
+        normalized = self._normalize_string(text)
+        padded = f" {normalized} " if normalized else ""
+        return [zlib.crc32(padded[i:i + 3].encode()) % dimension for i in range(len(padded) - 2)]
+    
+    def _field_idf(self, values: List[Any]) -> Any:
+        """
+        Compute trigram bucket inverse document frequencies of a field
+        
+        Args:
+            values: Raw field values of the whole catalog (None for a missing field)
+            
+        Returns:
+            idf vector
+        """
+        dimension = self.config.get("batch_vector_dimension", 512)
+        
+        # Count each distinct value's buckets once, weighted by how often it occurs
+        value_counts = Counter(str(value) for value in values if value is not None)
+        document_frequency = np.zeros(dimension, dtype=np.int64)
+        for text, count in value_counts.items():
+            buckets = np.unique(np.array(self._trigram_buckets(text, dimension), dtype=np.intp))
+            document_frequency[buckets] += count
+        
+        return (np.log((1 + len(values)) / (1 + document_frequency)) + 1).astype(np.float32)
+    
+    def _encode_field_values(self, values: List[Any], idf: Any) -> Any:
+        """
+        Encode field values as L2-normalized hashed trigram TF-IDF rows
+        
+        Args:
+            values: Raw field values (None for a missing field)
+            idf: Inverse document frequencies from _field_idf()
+            
+        Returns:
+            Matrix with one row per value
+        """
+        dimension = len(idf)
+        
+        # Normalize and hash each distinct value only once
+        encoded_values = {}
+        rows = []
+        cols = []
+        for row, value in enumerate(values):
+            if value is None:
+                continue
+            
+            text = str(value)
+            if text not in encoded_values:
+                encoded_values[text] = self._trigram_buckets(text, dimension)
+            
+            buckets = encoded_values[text]
+            rows.extend([row] * len(buckets))
+            cols.extend(buckets)
+        
+        matrix = np.zeros((len(values), dimension), dtype=np.float32)
+        np.add.at(matrix, (np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)), 1.0)
+        
+        matrix *= idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.maximum(norms, 1e-12)
+        
+        return matrix
+    
     def _calculate_record_similarity(self, record1: Dict, record2: Dict, 
                                    fields: List[str]) -> float:
         """
@@ -172,18 +563,39 @@ class MetadataMatcher:
         confidences = [c.get("confidence", 0) for c in corrections.values()]
         return sum(confidences) / max(1, len(confidences))
     
-    def analyze_name_variations(self, names: List[str]) -> Dict:
+    def analyze_name_variations(self, names: List[str], mode: str = "greedy") -> Dict:
         """
         Analyze variations of a name to identify potential matches
         
         Args:
             names: List of name variations
+            mode: "greedy" compares each name against the existing groups in
+                  input order; "cluster" uses cluster_names() and also
+                  returns every cluster
             
         Returns:
             Analysis results with potential canonical form
         """
         if not names:
             return {"canonical": None, "variations": []}
+        
+        if mode == "cluster":
+            clusters = self.cluster_names(names)
+            largest = clusters[0]
+            
+            variations = []
+            for cluster in clusters[1:]:
+                variations.extend(cluster["names"])
+            
+            return {
+                "canonical": largest["canonical"],
+                "variations": variations,
+                "confidence": largest["size"] / len(names),
+                "clusters": clusters
+            }
+        
+        if mode != "greedy":
+            raise ValueError(f"Unknown name variation mode: {mode}")
             
         # Simple implementation - in a real system this would use more sophisticated
         # name matching algorithms with knowledge of name formats, abbreviations, etc.
@@ -223,6 +635,107 @@ class MetadataMatcher:
             "confidence": len(largest_group) / len(names)
         }
     
+    def cluster_names(self, names: List[str], threshold: Optional[float] = None) -> List[Dict]:
+        """
+        Group name variants into clusters in near-linear time
+        
+        Names with the same sorted tokens are merged directly; other
+        candidate pairs come from MinHash LSH buckets over character
+        trigrams, are verified with the same ratio as calculate_similarity()
+        and merged with union-find. The result only
+        depends on the set of names, not their order.
+        
+        Args:
+            names: Names to cluster
+            threshold: Similarity above which two names are merged
+                       (defaults to the name_similarity_threshold config)
+            
+        Returns:
+            List of clusters, largest first, each with its canonical form,
+            member names and size
+        """
+        if threshold is None:
+            threshold = self.config.get("name_similarity_threshold", 0.8)
+        bands = self.config.get("lsh_bands", 8)
+        rows = self.config.get("lsh_rows", 4)
+        bucket_window = self.config.get("lsh_bucket_window", 10)
+        
+        # Identical normalized forms are always the same cluster
+        names_by_form = defaultdict(list)
+        for name in names:
+            names_by_form[self._normalize_string(name)].append(name)
+        forms = sorted(names_by_form)
+        
+        parent = list(range(len(forms)))
+        
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+        
+        def union(i: int, j: int):
+            root_i, root_j = find(i), find(j)
+            if root_i != root_j:
+                parent[max(root_i, root_j)] = min(root_i, root_j)
+        
+        # Reordered tokens ("Smith, John" / "John Smith") are the same name
+        token_keys = {}
+        for position, form in enumerate(forms):
+            token_key = " ".join(sorted(form.split()))
+            if token_key in token_keys:
+                union(token_keys[token_key], position)
+            else:
+                token_keys[token_key] = position
+        
+        buckets = defaultdict(list)
+        for position, form in enumerate(forms):
+            signature = self._minhash_signature(form, bands * rows)
+            for band in range(bands):
+                buckets[(band, tuple(signature[band * rows:(band + 1) * rows]))].append(position)
+        
+        compared = set()
+        for members in buckets.values():
+            for offset, i in enumerate(members):
+                # Large buckets only compare neighbours in sorted order
+                for j in members[offset + 1:offset + 1 + bucket_window]:
+                    if (i, j) in compared or find(i) == find(j):
+                        continue
+                    compared.add((i, j))
+                    
+                    # Cheap upper bounds rule out most pairs before ratio()
+                    matcher = SequenceMatcher(None, forms[i], forms[j])
+                    if (matcher.real_quick_ratio() > threshold and matcher.quick_ratio() > threshold
+                            and matcher.ratio() > threshold):
+                        union(i, j)
+        
+        clustered = defaultdict(list)
+        for position, form in enumerate(forms):
+            clustered[find(position)].extend(names_by_form[form])
+        
+        clusters = []
+        for members in clustered.values():
+            members.sort()
+            clusters.append({
+                "canonical": max(members, key=lambda name: (len(name), [-ord(c) for c in name])),
+                "names": members,
+                "size": len(members)
+            })
+        
+        clusters.sort(key=lambda cluster: (-cluster["size"], cluster["canonical"]))
+        return clusters
+    
+    def _minhash_signature(self, text: str, num_hashes: int) -> List[int]:
+        """Compute a deterministic MinHash signature over character trigrams"""
+        padded = f" {text} "
+        grams = {padded[i:i + 3] for i in range(len(padded) - 2)} or {padded}
+        gram_hashes = [zlib.crc32(gram.encode()) for gram in grams]
+        
+        return [
+            min(((a * h + b) % _MINHASH_PRIME) for h in gram_hashes)
+            for a, b in _MINHASH_PARAMS[:num_hashes]
+        ]
+    
     def extract_isrc_iswc(self, text: str) -> Dict:
         """
         Extract ISRC and ISWC codes from text
@@ -1,10 +1,17 @@
 #!/usr/bin/env python3
 
+import asyncio
 import logging
+import time
 import requests
-from typing import Dict, List, Optional, Any
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Any, Tuple
 import json
 from pathlib import Path
+from urllib.parse import quote
+
+from .response_cache import ResponseCache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -16,14 +23,41 @@ class PROIntegration:
     Mechanical Rights Organizations for data collection and submission
     """
     
-    def __init__(self, credentials_path: Optional[str] = None):
+    def __init__(self, credentials_path: Optional[str] = None, mock_server_url: Optional[str] = None,
+                 settings: Optional[Dict] = None):
         """
         Initialize PRO integration
         
         Args:
             credentials_path: Path to API credentials file
+            mock_server_url: Base URL of a local mock PRO server used for
+                             PROs without credentials (e.g. http://localhost:8765)
+            settings: Request settings (concurrency, retries, timeouts)
         """
         self.credentials = self._load_credentials(credentials_path)
+        self.mock_server_url = mock_server_url.rstrip("/") if mock_server_url else None
+        self.settings = {
+            "max_concurrency_per_pro": 8,
+            "max_retries": 3,
+            "retry_backoff": 0.5,  # seconds, doubled after each attempt
+            "request_timeout": 30,  # seconds
+            "cache_enabled": True,
+            "cache_size": 10000,
+            "cache_db_path": None,  # SQLite file for a persistent cache
+            "registration_ttl": 6 * 3600,  # seconds
+            "black_box_ttl": 3600  # seconds
+        }
+        self.settings.update(settings or {})
+        self.cache = None
+        if self.settings["cache_enabled"]:
+            self.cache = ResponseCache(
+                ttls={
+                    "registration": self.settings["registration_ttl"],
+                    "black_box": self.settings["black_box_ttl"]
+                },
+                maxsize=self.settings["cache_size"],
+                db_path=self.settings["cache_db_path"]
+            )
         self.api_clients = {}
         self._initialize_clients()
         logger.info("Initialized PRO integration")
@@ -48,11 +82,113 @@ class PROIntegration:
         """Initialize API clients for each PRO"""
         # In a real implementation, these would be actual API client instances
         for pro, creds in self.credentials.items():
-            self.api_clients[pro] = {
-                "name": pro,
-                "has_credentials": bool(creds),
-                "mock_mode": not bool(creds)
-            }
+            self._initialize_client(pro, creds)
+    
+    def _initialize_client(self, pro: str, creds: Dict) -> Dict:
+        """Initialize the API client for a single PRO"""
+        base_url = creds.get("base_url")
+        if not base_url and self.mock_server_url:
+            base_url = f"{self.mock_server_url}/{pro}"
+        
+        self.api_clients[pro] = {
+            "name": pro,
+            "has_credentials": bool(creds),
+            "mock_mode": not bool(creds),
+            "base_url": base_url,
+            "max_concurrency": creds.get("max_concurrency", self.settings["max_concurrency_per_pro"]),
+            "session": None
+        }
+        return self.api_clients[pro]
+    
+    def _get_client(self, pro: str) -> Dict:
+        """Get the API client for a PRO, creating a mock-mode client if unknown"""
+        return self.api_clients.get(pro) or self._initialize_client(pro, {})
+    
+    def _get_session(self, client: Dict) -> requests.Session:
+        """Get the pooled HTTP session for a PRO client"""
+        if client["session"] is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=client["max_concurrency"]
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            
+            creds = self.credentials.get(client["name"], {})
+            if creds.get("api_key"):
+                session.headers["Authorization"] = f"Bearer {creds['api_key']}"
+            
+            client["session"] = session
+        return client["session"]
+    
+    def _request(self, pro: str, path: str, params: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        Make a GET request to a PRO API with retry and exponential backoff
+        
+        Args:
+            pro: PRO to query
+            path: Path relative to the PRO base URL
+            params: Query parameters
+            
+        Returns:
+            Decoded JSON response, or None if the PRO has no API endpoint
+            configured (mock mode)
+        """
+        client = self._get_client(pro)
+        if not client["base_url"]:
+            return None
+        
+        session = self._get_session(client)
+        url = f"{client['base_url']}/{path}"
+        max_retries = self.settings["max_retries"]
+        
+        for attempt in range(max_retries + 1):
+            try:
+                response = session.get(url, params=params, timeout=self.settings["request_timeout"])
+                
+                # Retry throttling and server errors, fail fast on other client errors
+                if response.status_code == 429 or response.status_code >= 500:
+                    raise requests.HTTPError(f"{response.status_code} from {pro}", response=response)
+                response.raise_for_status()
+                return response.json()
+            
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                retryable = not isinstance(e, requests.HTTPError) or e.response is None or \
+                    e.response.status_code == 429 or e.response.status_code >= 500
+                if not retryable or attempt == max_retries:
+                    raise
+                
+                delay = self.settings["retry_backoff"] * (2 ** attempt)
+                logger.warning(f"Request to {pro} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+    
+    def _lookup(self, pro: str, path: str, params: Optional[Dict], context: Dict,
+                not_found: Dict) -> Optional[Dict]:
+        """
+        Make a PRO API lookup that reports failures instead of raising
+        
+        Args:
+            pro: PRO to query
+            path: Path relative to the PRO base URL
+            params: Query parameters
+            context: Fields identifying the lookup, included in every result
+            not_found: Result fields used when the PRO answers 404
+            
+        Returns:
+            Decoded JSON response, the not-found result, a result with an
+            "error" key if the request failed, or None in mock mode
+        """
+        try:
+            return self._request(pro, path, params)
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                return {**context, **not_found}
+            logger.error(f"Error querying {pro}: {str(e)}")
+            return {**context, "error": str(e)}
+        except requests.RequestException as e:
+            logger.error(f"Error querying {pro}: {str(e)}")
+            return {**context, "error": str(e)}
     
     def query_work_registration(self, work_id: str, pro: str) -> Dict:
         """
@@ -63,14 +199,34 @@ class PROIntegration:
             pro: PRO to query (ascap, bmi, etc.)
         
         Returns:
-            Registration details
+            Registration details; a work the PRO doesn't know has
+            registration_status "not_registered", and a failed lookup
+            carries an "error" key and is not cached
         """
+        if self.cache:
+            cached = self.cache.get("registration", pro, "work", work_id)
+            if cached is not None:
+                return cached
+        
         logger.info(f"Querying {pro} for work {work_id}")
         
-        # TODO: Implement actual API calls to PROs
-        # This would use appropriate authentication and API endpoints
+        response = self._lookup(
+            pro, f"works/{quote(work_id, safe='')}/registration", None,
+            context={"work_id": work_id, "pro": pro},
+            not_found={"registration_status": "not_registered"}
+        )
+        if response is None:
+            response = self.mock_work_registration(work_id, pro)
+        elif "error" in response:
+            return response
         
-        # For demonstration, return mock data
+        if self.cache:
+            self.cache.put("registration", pro, "work", work_id, response)
+        return response
+    
+    @staticmethod
+    def mock_work_registration(work_id: str, pro: str) -> Dict:
+        """Mock registration response used when no PRO API is configured"""
         return {
             "work_id": work_id,
             "pro": pro,
@@ -104,6 +260,9 @@ class PROIntegration:
         
         # TODO: Implement actual API calls to PROs
         
+        # The registration on file is about to change
+        self.invalidate_cache(work_id, pro)
+        
         # For demonstration, return mock response
         return {
             "work_id": work_id,
@@ -122,16 +281,36 @@ class PROIntegration:
             pro: PRO to query
             
         Returns:
-            Black box status information
+            Black box status information; a failed lookup carries an
+            "error" key and is not cached
         """
         id_type = identifier.get("type", "unknown")
         id_value = identifier.get("value", "")
         
+        if self.cache:
+            cached = self.cache.get("black_box", pro, id_type, id_value)
+            if cached is not None:
+                return cached
+        
         logger.info(f"Checking {pro} black box for {id_type}: {id_value}")
         
-        # TODO: Implement actual API calls to PROs
+        response = self._lookup(
+            pro, "black-box", {"type": id_type, "value": id_value},
+            context={"identifier": identifier, "pro": pro},
+            not_found={"has_unclaimed_funds": False}
+        )
+        if response is None:
+            response = self.mock_black_box_funds(identifier, pro)
+        elif "error" in response:
+            return response
         
-        # For demonstration, return mock data
+        if self.cache:
+            self.cache.put("black_box", pro, id_type, id_value, response)
+        return response
+    
+    @staticmethod
+    def mock_black_box_funds(identifier: Dict, pro: str) -> Dict:
+        """Mock black box response used when no PRO API is configured"""
         return {
             "identifier": identifier,
             "pro": pro,
@@ -142,6 +321,102 @@ class PROIntegration:
             "claim_deadline": "2023-12-31"
         }
     
+    def invalidate_cache(self, id_value: str, pro: Optional[str] = None):
+        """
+        Drop cached responses for an identifier
+        
+        Args:
+            id_value: Work identifier or ISRC/ISWC value
+            pro: Only drop responses from this PRO (default: all PROs)
+        """
+        if not self.cache:
+            return
+        
+        for cached_pro in ([pro] if pro else list(self.api_clients)):
+            self.cache.invalidate(cached_pro, id_value)
+    
+    def get_cache_stats(self) -> Dict:
+        """Get hit-rate statistics for the response cache"""
+        if not self.cache:
+            return {"enabled": False}
+        return {"enabled": True, **self.cache.stats()}
+    
+    def query_many(self, work_ids: List[str], pros: List[str]) -> List[Dict]:
+        """
+        Query registration status for many works across many PROs concurrently
+        
+        Args:
+            work_ids: Work identifiers (ISWC, ISRC, or internal ID)
+            pros: PROs to query
+            
+        Returns:
+            Registration details for every (work, PRO) pair, work-major in
+            input order; failed lookups carry an "error" key
+        """
+        return asyncio.run(self.query_many_async(work_ids, pros))
+    
+    async def query_many_async(self, work_ids: List[str], pros: List[str]) -> List[Dict]:
+        """Async form of query_many() for callers already in an event loop"""
+        calls = [
+            (pro, self.query_work_registration, (work_id, pro), {"work_id": work_id, "pro": pro})
+            for work_id in work_ids
+            for pro in pros
+        ]
+        return await self._run_batch(calls)
+    
+    def check_black_box_many(self, identifiers: List[Dict], pros: List[str]) -> List[Dict]:
+        """
+        Check black box funds for many identifiers across many PROs concurrently
+        
+        Args:
+            identifiers: Dictionaries with identifier type and value
+            pros: PROs to query
+            
+        Returns:
+            Black box status for every (identifier, PRO) pair,
+            identifier-major in input order; failed lookups carry an
+            "error" key
+        """
+        return asyncio.run(self.check_black_box_many_async(identifiers, pros))
+    
+    async def check_black_box_many_async(self, identifiers: List[Dict], pros: List[str]) -> List[Dict]:
+        """Async form of check_black_box_many() for callers already in an event loop"""
+        calls = [
+            (pro, self.check_black_box_funds, (identifier, pro), {"identifier": identifier, "pro": pro})
+            for identifier in identifiers
+            for pro in pros
+        ]
+        return await self._run_batch(calls)
+    
+    async def _run_batch(self, calls: List[Tuple[str, Callable, Tuple, Dict]]) -> List[Dict]:
+        """
+        Run blocking PRO calls concurrently with a concurrency limit per PRO
+        
+        Args:
+            calls: (pro, function, args, error context) tuples
+            
+        Returns:
+            Results in the order of calls
+        """
+        if not calls:
+            return []
+        
+        pros = {pro for pro, _, _, _ in calls}
+        limits = {pro: self._get_client(pro)["max_concurrency"] for pro in pros}
+        semaphores = {pro: asyncio.Semaphore(limit) for pro, limit in limits.items()}
+        loop = asyncio.get_running_loop()
+        
+        async def run(pro: str, func: Callable, args: Tuple, context: Dict) -> Dict:
+            async with semaphores[pro]:
+                try:
+                    return await loop.run_in_executor(executor, func, *args)
+                except Exception as e:
+                    logger.error(f"Error querying {pro}: {str(e)}")
+                    return {**context, "error": str(e)}
+        
+        with ThreadPoolExecutor(max_workers=sum(limits.values())) as executor:
+            return await asyncio.gather(*(run(*call) for call in calls))
+    
     def get_pro_submission_template(self, pro: str, template_type: str) -> Dict:
         """
         Get submission template for a specific PRO
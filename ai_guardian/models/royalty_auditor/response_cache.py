@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from .lru_cache import LRUCache
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+class ResponseCache:
+    """
+    Two-level cache for PRO API responses
+
+    Responses are keyed by (kind, pro, id type, id value) and kept in an
+    in-memory LRU, optionally backed by a SQLite file so repeated scans
+    across restarts are served locally. Each kind of response (e.g.
+    registration, black box) has its own time-to-live.
+    """
+
+    def __init__(self, ttls: Dict[str, float], maxsize: int = 10000, db_path: Optional[str] = None):
+        """
+        Initialize the response cache
+
+        Args:
+            ttls: Time-to-live in seconds per response kind
+            maxsize: Maximum number of responses kept in memory
+            db_path: Path to a SQLite file for the disk cache (optional)
+        """
+        self.ttls = ttls
+        self.memory = LRUCache(maxsize)
+        self.disk_hits = 0
+        self.disk_misses = 0
+
+        self.db_path = db_path
+        self._db = None
+        self._db_lock = threading.Lock()
+        if db_path:
+            self._initialize_db()
+
+    def _initialize_db(self):
+        """Open the disk cache and create its table"""
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute('''
+        CREATE TABLE IF NOT EXISTS pro_response_cache (
+            kind TEXT NOT NULL,
+            pro TEXT NOT NULL,
+            id_type TEXT NOT NULL,
+            id_value TEXT NOT NULL,
+            response TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            PRIMARY KEY (kind, pro, id_type, id_value)
+        )
+        ''')
+        self._db.commit()
+
+    def get(self, kind: str, pro: str, id_type: str, id_value: str) -> Optional[Dict]:
+        """
+        Look up a cached response
+
+        Args:
+            kind: Response kind (registration, black_box)
+            pro: PRO the response came from
+            id_type: Identifier type (work, isrc, iswc, ...)
+            id_value: Identifier value
+
+        Returns:
+            Cached response or None if missing or expired
+        """
+        key = (kind, pro, id_type, id_value)
+        response = self.memory.get(key)
+        if response is not None or self._db is None:
+            return response
+
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT response, expires_at FROM pro_response_cache "
+                "WHERE kind = ? AND pro = ? AND id_type = ? AND id_value = ?",
+                key
+            ).fetchone()
+
+        remaining = row[1] - time.time() if row else 0
+        if remaining <= 0:
+            self.disk_misses += 1
+            return None
+
+        self.disk_hits += 1
+        response = json.loads(row[0])
+        self.memory.put(key, response, ttl=remaining)
+        return response
+
+    def put(self, kind: str, pro: str, id_type: str, id_value: str, response: Dict):
+        """
+        Cache a response using the time-to-live for its kind
+
+        Args:
+            kind: Response kind (registration, black_box)
+            pro: PRO the response came from
+            id_type: Identifier type
+            id_value: Identifier value
+            response: Response to cache
+        """
+        ttl = self.ttls.get(kind)
+        if not ttl:
+            return
+
+        key = (kind, pro, id_type, id_value)
+        self.memory.put(key, response, ttl=ttl)
+
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO pro_response_cache "
+                    "(kind, pro, id_type, id_value, response, expires_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    key + (json.dumps(response), time.time() + ttl)
+                )
+                self._db.commit()
+
+    def invalidate(self, pro: str, id_value: str, kind: Optional[str] = None, id_type: Optional[str] = None):
+        """
+        Drop cached responses for an identifier
+
+        Args:
+            pro: PRO whose responses to drop
+            id_value: Identifier value
+            kind: Only drop this response kind (default: all kinds)
+            id_type: Only drop this identifier type (default: all types)
+        """
+        kinds = [kind] if kind else list(self.ttls)
+        id_types = [id_type] if id_type else ["work", "isrc", "iswc"]
+
+        for k in kinds:
+            for t in id_types:
+                self.memory.invalidate((k, pro, t, id_value))
+
+        if self._db is not None:
+            query = "DELETE FROM pro_response_cache WHERE pro = ? AND id_value = ?"
+            params: Tuple = (pro, id_value)
+            if kind:
+                query += " AND kind = ?"
+                params += (kind,)
+            if id_type:
+                query += " AND id_type = ?"
+                params += (id_type,)
+
+            with self._db_lock:
+                self._db.execute(query, params)
+                self._db.commit()
+
+    def prune_expired(self) -> int:
+        """
+        Delete expired responses from the disk cache
+
+        Returns:
+            Number of responses deleted
+        """
+        if self._db is None:
+            return 0
+
+        with self._db_lock:
+            cursor = self._db.execute("DELETE FROM pro_response_cache WHERE expires_at <= ?", (time.time(),))
+            self._db.commit()
+            return cursor.rowcount
+
+    def clear(self):
+        """Remove all cached responses and reset the counters"""
+        self.memory.clear()
+        self.disk_hits = 0
+        self.disk_misses = 0
+
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM pro_response_cache")
+                self._db.commit()
+
+    def stats(self) -> Dict:
+        """
+        Get cache hit-rate statistics
+
+        Returns:
+            Dictionary with memory and disk statistics and the overall hit rate
+        """
+        memory_stats = self.memory.stats()
+        hits = memory_stats["hits"] + self.disk_hits
+        lookups = memory_stats["hits"] + memory_stats["misses"]
+
+        return {
+            "memory": memory_stats,
+            "disk": {
+                "enabled": self._db is not None,
+                "hits": self.disk_hits,
+                "misses": self.disk_misses
+            },
+            "hits": hits,
+            "misses": lookups - hits,
+            "hit_rate": hits / lookups if lookups else 0.0
+        }
+
+    def close(self):
+        """Close the disk cache"""
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+            self._db = None
@@ -5,17 +5,20 @@ import logging
 import time
 import uuid
 import threading
-import schedule
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, List, Optional, Any, Set, Tuple
 import os
 import hashlib
+import heapq
+from collections import Counter
 
 # Local imports
 from .auditor import RoyaltyAuditor
 from .pro_integration import PROIntegration
 from .metadata_matcher import MetadataMatcher
+from .discovery_log import DiscoveryLog
+from .task_scheduler import TaskScheduler
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -56,13 +59,24 @@ class SessionCollector:
         self.search_history = []  # History of all searches and their results
         self.fund_discoveries = {}  # Discovered funds with detailed provenance
         
+        # Running aggregates so reports don't rescan the registries. The lock
+        # also guards the registries, since scheduled jobs run concurrently
+        self._aggregate_lock = threading.Lock()
+        self._discovery_counts = Counter()  # Discoveries by type
+        self._total_fund_value = 0.0  # Sum of numeric_value over all funds
+        self._top_funds_size = self.config.get("top_discoveries_count", 5)
+        self._top_funds = []  # Min-heap of (numeric_value, -sequence, fund_id)
+        self._fund_sequence = 0
+        
+        # Append-only on-disk log of discoveries and funds
+        self.discovery_log = self._open_discovery_log()
+        
         # Scheduling
-        self.scheduler = schedule.Scheduler()
+        self.scheduler = TaskScheduler(workers=self.config.get("scheduler_workers", 4))
         self._setup_scheduled_tasks()
         
         # Session state
         self.is_running = False
-        self.collection_thread = None
         
         logger.info(f"Session collector initialized with ID: {self.session_id}")
     
@@ -111,6 +125,16 @@ class SessionCollector:
             ],
             # Timing parameters
             "search_timeout": 300,  # seconds
+            "job_timeouts": {  # seconds
+                "quick_scan": 300,
+                "detailed_scan": 3600,
+                "deep_analysis": 6 * 3600,
+                "attribution_report": 600
+            },
+            "scheduler_workers": 4,
+            # Identifiers the quick scan checks against every monitored PRO
+            # API; without any, the quick scan simulates its checks
+            "quick_scan_identifiers": [],
             "retry_interval": 60,  # seconds
             "max_retries": 3,
             # Attribution parameters
@@ -119,27 +143,61 @@ class SessionCollector:
             "fund_verification_required": True,
             # Reporting
             "generate_interim_reports": True,
-            "report_interval": 1440  # minutes (daily)
+            "report_interval": 1440,  # minutes (daily)
+            "top_discoveries_count": 5,
+            # Discovery log (see DiscoveryLog)
+            "discovery_log": {
+                "segment_size": 64 * 1024 * 1024,  # bytes
+                "batch_size": 1000,
+                "flush_interval": 1.0,  # seconds
+                "fsync_interval": 5.0,  # seconds
+                "compact_segments": 8
+            }
         }
     
+    def _open_discovery_log(self) -> DiscoveryLog:
+        """Open the session's discovery log"""
+        return DiscoveryLog(
+            self.session_dir / "discoveries",
+            **self.config.get("discovery_log", {})
+        )
+    
     def _setup_scheduled_tasks(self):
         """Set up scheduled collection tasks based on configuration"""
+        intervals = self.config["collection_intervals"]
+        timeouts = self.config.get("job_timeouts", {})
+        default_timeout = self.config.get("search_timeout")
+        
+        # Lower priority values run first when jobs are waiting for a worker
+        
         # Quick scans
-        quick_interval = self.config["collection_intervals"]["quick_scan"]
-        schedule.every(quick_interval).minutes.do(self.run_quick_scan)
+        self.scheduler.register(
+            "quick_scan", self.run_quick_scan,
+            interval=intervals["quick_scan"] * 60, priority=0,
+            timeout=timeouts.get("quick_scan", default_timeout)
+        )
         
         # Detailed scans
-        detailed_interval = self.config["collection_intervals"]["detailed_scan"]
-        schedule.every(detailed_interval).minutes.do(self.run_detailed_scan)
+        self.scheduler.register(
+            "detailed_scan", self.run_detailed_scan,
+            interval=intervals["detailed_scan"] * 60, priority=2,
+            timeout=timeouts.get("detailed_scan", default_timeout)
+        )
         
         # Deep analysis
-        deep_interval = self.config["collection_intervals"]["deep_analysis"]
-        schedule.every(deep_interval).minutes.do(self.run_deep_analysis)
+        self.scheduler.register(
+            "deep_analysis", self.run_deep_analysis,
+            interval=intervals["deep_analysis"] * 60, priority=3,
+            timeout=timeouts.get("deep_analysis", default_timeout)
+        )
         
         # Reporting
         if self.config["generate_interim_reports"]:
-            report_interval = self.config["report_interval"]
-            schedule.every(report_interval).minutes.do(self.generate_attribution_report)
+            self.scheduler.register(
+                "attribution_report", self.generate_attribution_report,
+                interval=self.config["report_interval"] * 60, priority=1,
+                timeout=timeouts.get("attribution_report", default_timeout)
+            )
     
     def start_collection(self, run_immediately=True):
         """Start the collection process in a background thread"""
@@ -149,14 +207,16 @@ class SessionCollector:
         
         self.is_running = True
         
+        # Reopen the discovery log if an earlier stop closed it
+        if self.discovery_log.closed:
+            self.discovery_log = self._open_discovery_log()
+        
         # Run immediate scans if requested
         if run_immediately:
             self.run_quick_scan()
         
-        # Start the scheduler in a background thread
-        self.collection_thread = threading.Thread(target=self._collection_loop)
-        self.collection_thread.daemon = True
-        self.collection_thread.start()
+        # Start the scheduler's dispatcher and worker threads
+        self.scheduler.start()
         
         logger.info(f"Collection started in session {self.session_id}")
     
@@ -167,19 +227,19 @@ class SessionCollector:
             return
         
         self.is_running = False
-        if self.collection_thread:
-            self.collection_thread.join(timeout=10)
+        self.scheduler.stop(timeout=10)
         
         logger.info(f"Collection stopped in session {self.session_id}")
         
         # Generate final report
         self.generate_attribution_report(is_final=True)
+        
+        # Make sure every discovery is durable and the index is saved
+        self.discovery_log.close()
     
-    def _collection_loop(self):
-        """Main collection loop that runs scheduled tasks"""
-        while self.is_running:
-            self.scheduler.run_pending()
-            time.sleep(1)
+    def get_scheduler_metrics(self) -> Dict:
+        """Get queue lag, duration and overlap metrics for the scheduled jobs"""
+        return self.scheduler.metrics()
     
     def _generate_discovery_id(self, discovery_data: Dict) -> str:
         """Generate a unique ID for a discovery based on its content"""
@@ -203,44 +263,40 @@ class SessionCollector:
         """
         discovery_id = self._generate_discovery_id(discovery_data)
         
-        # Check if this is already discovered
-        if discovery_id in self.discovery_registry:
-            logger.debug(f"Discovery {discovery_id} already registered, updating")
-            # Update existing record
-            self.discovery_registry[discovery_id]["last_seen"] = datetime.now().isoformat()
-            self.discovery_registry[discovery_id]["seen_count"] += 1
-            return discovery_id
-        
-        # Register new discovery
-        self.discovery_registry[discovery_id] = {
-            "id": discovery_id,
-            "type": discovery_type,
-            "source": source,
-            "first_discovered": datetime.now().isoformat(),
-            "last_seen": datetime.now().isoformat(),
-            "seen_count": 1,
-            "session_id": self.session_id,
-            "agency_identifier": self.config["agency_identifier"],
-            "confidence": confidence,
-            "data": discovery_data
-        }
+        with self._aggregate_lock:
+            # Check if this is already discovered
+            if discovery_id in self.discovery_registry:
+                logger.debug(f"Discovery {discovery_id} already registered, updating")
+                # Update existing record
+                self.discovery_registry[discovery_id]["last_seen"] = datetime.now().isoformat()
+                self.discovery_registry[discovery_id]["seen_count"] += 1
+                return discovery_id
+            
+            # Register new discovery
+            record = {
+                "id": discovery_id,
+                "type": discovery_type,
+                "source": source,
+                "first_discovered": datetime.now().isoformat(),
+                "last_seen": datetime.now().isoformat(),
+                "seen_count": 1,
+                "session_id": self.session_id,
+                "agency_identifier": self.config["agency_identifier"],
+                "confidence": confidence,
+                "data": discovery_data
+            }
+            self.discovery_registry[discovery_id] = record
+            self._discovery_counts[discovery_type] += 1
         
         # Save discovery to disk
-        self._save_discovery(discovery_id)
+        self._save_discovery(discovery_id, record)
         
         logger.info(f"New {discovery_type} discovery registered: {discovery_id} from {source}")
         return discovery_id
     
-    def _save_discovery(self, discovery_id: str):
-        """Save a discovery to disk"""
-        if discovery_id not in self.discovery_registry:
-            return
-        
-        discovery = self.discovery_registry[discovery_id]
-        discovery_file = self.session_dir / "discoveries" / f"{discovery_id}.json"
-        
-        with open(discovery_file, 'w') as f:
-            json.dump(discovery, f, indent=2)
+    def _save_discovery(self, discovery_id: str, record: Dict):
+        """Append a discovery to the discovery log"""
+        self._append_to_log(discovery_id, record)
     
     def run_quick_scan(self):
         """
@@ -258,7 +314,28 @@ class SessionCollector:
             "discoveries": []
         }
         
-        # Run quick check on each monitored PRO
+        identifiers = self.config.get("quick_scan_identifiers", [])
+        if identifiers:
+            scan_results["discoveries"] = self._quick_scan_identifiers(identifiers)
+        else:
+            scan_results["discoveries"] = self._simulate_quick_scan()
+        
+        # Complete the scan
+        scan_end_time = datetime.now()
+        scan_results["end_time"] = scan_end_time.isoformat()
+        scan_results["duration_seconds"] = (scan_end_time - scan_start_time).total_seconds()
+        
+        # Save scan results
+        scan_file = self.session_dir / "scans" / f"{scan_results['scan_id']}.json"
+        with open(scan_file, 'w') as f:
+            json.dump(scan_results, f, indent=2)
+        
+        logger.info(f"Quick scan completed with {len(scan_results['discoveries'])} potential discoveries")
+        return scan_results
+    
+    def _simulate_quick_scan(self) -> List[str]:
+        """Simulate the quick check of each monitored PRO, returning discovery IDs"""
+        discoveries = []
         for pro in self.config["monitored_pros"]:
             try:
                 logger.debug(f"Quick scanning {pro}")
@@ -282,23 +359,55 @@ class SessionCollector:
                         confidence=0.75 + (hash(pro) % 20) / 100
                     )
                     
-                    scan_results["discoveries"].append(discovery_id)
+                    discoveries.append(discovery_id)
             
             except Exception as e:
                 logger.error(f"Error scanning {pro}: {str(e)}")
         
-        # Complete the scan
-        scan_end_time = datetime.now()
-        scan_results["end_time"] = scan_end_time.isoformat()
-        scan_results["duration_seconds"] = (scan_end_time - scan_start_time).total_seconds()
+        return discoveries
+    
+    def _quick_scan_identifiers(self, identifiers: List[Dict]) -> List[str]:
+        """
+        Check identifiers against every monitored PRO in one batch
         
-        # Save scan results
-        scan_file = self.session_dir / "scans" / f"{scan_results['scan_id']}.json"
-        with open(scan_file, 'w') as f:
-            json.dump(scan_results, f, indent=2)
+        Args:
+            identifiers: Dictionaries with identifier type and value
+            
+        Returns:
+            IDs of the discoveries registered
+        """
+        pros = list(self.config["monitored_pros"])
+        logger.debug(f"Quick scanning {len(identifiers)} identifiers across {len(pros)} PROs")
+        results = self.pro_integration.check_black_box_many(identifiers, pros)
+        
+        # Results come back identifier-major in input order
+        discoveries = []
+        pairs = [(identifier, pro) for identifier in identifiers for pro in pros]
+        for (identifier, pro), result in zip(pairs, results):
+            if "error" in result:
+                logger.error(f"Error scanning {pro}: {result['error']}")
+                continue
+            if not result.get("has_unclaimed_funds"):
+                continue
+            
+            discovery_data = {
+                "pro": pro,
+                "identifier": identifier,
+                "potential_funds": True,
+                "usage_periods": result.get("usage_periods", []),
+                "estimated_amount": result.get("estimated_amount")
+            }
+            
+            discovery_id = self._register_discovery(
+                discovery_type="black_box_quick",
+                source=pro,
+                discovery_data=discovery_data,
+                confidence=0.75 + (hash(pro) % 20) / 100
+            )
+            
+            discoveries.append(discovery_id)
         
-        logger.info(f"Quick scan completed with {len(scan_results['discoveries'])} potential discoveries")
-        return scan_results
+        return discoveries
     
     def run_detailed_scan(self):
         """
@@ -491,15 +600,10 @@ class SessionCollector:
         """
         fund_id = f"FUND-{discovery_id}"
         
-        if fund_id in self.fund_discoveries:
-            # Update existing record
-            self.fund_discoveries[fund_id]["last_updated"] = datetime.now().isoformat()
-            return fund_id
-            
         # Create new fund tracking record
         numeric_value = float(estimated_value.replace("$", "").replace(",", ""))
         
-        self.fund_discoveries[fund_id] = {
+        record = {
             "fund_id": fund_id,
             "discovery_id": discovery_id,
             "source": source,
@@ -525,22 +629,50 @@ class SessionCollector:
             }
         }
         
+        with self._aggregate_lock:
+            if fund_id in self.fund_discoveries:
+                # Update existing record
+                self.fund_discoveries[fund_id]["last_updated"] = datetime.now().isoformat()
+                return fund_id
+            
+            self.fund_discoveries[fund_id] = record
+            self._update_fund_aggregates(fund_id, numeric_value)
+        
         # Save to disk
-        self._save_fund_discovery(fund_id)
+        self._save_fund_discovery(fund_id, record)
         
         logger.info(f"New potential fund tracked: {fund_id} worth {estimated_value} from {source}")
         return fund_id
     
-    def _save_fund_discovery(self, fund_id: str):
-        """Save a fund discovery to disk"""
-        if fund_id not in self.fund_discoveries:
-            return
-            
-        fund = self.fund_discoveries[fund_id]
-        fund_file = self.session_dir / "discoveries" / f"{fund_id}.json"
+    def _update_fund_aggregates(self, fund_id: str, numeric_value: float):
+        """Add a new fund to the running total and the top-N heap (caller holds the lock)"""
+        self._total_fund_value += numeric_value
+        
+        # Earlier funds win ties, matching a stable sort by value
+        self._fund_sequence += 1
+        entry = (numeric_value, -self._fund_sequence, fund_id)
+        if len(self._top_funds) < self._top_funds_size:
+            heapq.heappush(self._top_funds, entry)
+        elif entry > self._top_funds[0]:
+            heapq.heapreplace(self._top_funds, entry)
+    
+    def _save_fund_discovery(self, fund_id: str, record: Dict):
+        """Append a fund discovery to the discovery log"""
+        self._append_to_log(fund_id, record)
+    
+    def _append_to_log(self, key: str, record: Dict):
+        """
+        Append a record to the discovery log
         
-        with open(fund_file, 'w') as f:
-            json.dump(fund, f, indent=2)
+        A job still running after stop_collection() closed the log keeps
+        its record in memory only.
+        """
+        try:
+            self.discovery_log.append(key, record)
+        except ValueError:
+            if not self.discovery_log.closed:
+                raise
+            logger.warning(f"Discovery log closed, {key} kept in memory only")
     
     def generate_attribution_report(self, is_final=False):
         """
@@ -555,12 +687,14 @@ class SessionCollector:
             
         logger.info(f"Generating {report_id} attribution report")
         
-        # Gather all discoveries and funds
-        all_discoveries = list(self.discovery_registry.values())
-        all_funds = list(self.fund_discoveries.values())
-        
-        # Calculate statistics
-        total_potential_value = sum(fund["numeric_value"] for fund in all_funds)
+        # Statistics come from the running aggregates
+        with self._aggregate_lock:
+            total_potential_value = self._total_fund_value
+            total_discoveries = len(self.discovery_registry)
+            total_funds = len(self.fund_discoveries)
+            if is_final:
+                all_discoveries = list(self.discovery_registry.values())
+                all_funds = list(self.fund_discoveries.values())
         
         # Generate the report
         report = {
@@ -572,13 +706,13 @@ class SessionCollector:
             "session_duration_hours": (datetime.now() - self.session_start_time).total_seconds() / 3600,
             "agency_identifier": self.config["agency_identifier"],
             "statistics": {
-                "total_discoveries": len(all_discoveries),
-                "total_potential_funds": len(all_funds),
+                "total_discoveries": total_discoveries,
+                "total_potential_funds": total_funds,
                 "total_potential_value": f"${total_potential_value:,.2f}",
                 "discovery_counts_by_type": self._count_discoveries_by_type(),
                 "sources_monitored": list(self.config["monitored_pros"]) + list(self.config["monitored_platforms"])
             },
-            "highest_value_discoveries": self._get_top_discoveries(5),
+            "highest_value_discoveries": self._get_top_discoveries(self._top_funds_size),
             "agency_attribution": {
                 "agency": self.config["agency_identifier"],
                 "discovery_method": "MESA Rights Vault AI Royalty Auditor",
@@ -603,23 +737,23 @@ class SessionCollector:
     
     def _count_discoveries_by_type(self) -> Dict[str, int]:
         """Count discoveries by type"""
-        counts = {}
-        for discovery in self.discovery_registry.values():
-            discovery_type = discovery["type"]
-            counts[discovery_type] = counts.get(discovery_type, 0) + 1
-        return counts
+        with self._aggregate_lock:
+            return dict(self._discovery_counts)
     
     def _get_top_discoveries(self, count: int) -> List[Dict]:
         """Get the top N discoveries by value"""
-        # Sort funds by numeric value
-        sorted_funds = sorted(
-            self.fund_discoveries.values(),
-            key=lambda x: x["numeric_value"],
-            reverse=True
-        )
-        
-        # Return the top N
-        return sorted_funds[:count]
+        with self._aggregate_lock:
+            if count > self._top_funds_size:
+                # More than the heap tracks, fall back to a full sort
+                sorted_funds = sorted(
+                    self.fund_discoveries.values(),
+                    key=lambda x: x["numeric_value"],
+                    reverse=True
+                )
+                return sorted_funds[:count]
+            
+            top_entries = sorted(self._top_funds, reverse=True)[:count]
+            return [self.fund_discoveries[fund_id] for _, _, fund_id in top_entries]
     
     def _generate_attribution_signature(self) -> str:
         """Generate a digital signature for attribution"""
@@ -693,15 +827,18 @@ class SessionCollector:
 
     def get_session_summary(self) -> Dict:
         """Get a summary of the current session"""
-        total_value = sum(fund["numeric_value"] for fund in self.fund_discoveries.values())
+        with self._aggregate_lock:
+            total_value = self._total_fund_value
+            total_discoveries = len(self.discovery_registry)
+            total_funds = len(self.fund_discoveries)
         
         return {
             "session_id": self.session_id,
             "start_time": self.session_start_time.isoformat(),
             "current_time": datetime.now().isoformat(),
             "duration_hours": (datetime.now() - self.session_start_time).total_seconds() / 3600,
-            "total_discoveries": len(self.discovery_registry),
-            "total_funds": len(self.fund_discoveries),
+            "total_discoveries": total_discoveries,
+            "total_funds": total_funds,
             "total_value": f"${total_value:,.2f}",
             "is_running": self.is_running,
             "sources_monitored": list(self.config["monitored_pros"]) + list(self.config["monitored_platforms"]),
@@ -0,0 +1,528 @@
+#!/usr/bin/env python3
+
+import csv
+import gzip
+import io
+import json
+import logging
+import re
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Normalized line item fields produced by the parser
+LINE_ITEM_FIELDS = [
+    "title", "writer", "publisher", "artist", "isrc", "iswc",
+    "work_id", "period", "usage_type", "plays", "amount"
+]
+
+# Header aliases shared by all PRO formats (keys are normalized header names)
+COMMON_HEADER_ALIASES = {
+    "title": "title",
+    "work_title": "title",
+    "song_title": "title",
+    "track_title": "title",
+    "writer": "writer",
+    "writer_name": "writer",
+    "composer": "writer",
+    "publisher": "publisher",
+    "publisher_name": "publisher",
+    "artist": "artist",
+    "performer": "artist",
+    "isrc": "isrc",
+    "iswc": "iswc",
+    "work_id": "work_id",
+    "work_number": "work_id",
+    "period": "period",
+    "performance_period": "period",
+    "usage_type": "usage_type",
+    "use_type": "usage_type",
+    "plays": "plays",
+    "performances": "plays",
+    "amount": "amount",
+    "royalty": "amount",
+    "royalty_amount": "amount",
+}
+
+# PRO-specific header aliases layered on top of the common ones
+PRO_HEADER_ALIASES = {
+    "ascap": {
+        "ascap_work_id": "work_id",
+        "member_name": "writer",
+        "dollars": "amount",
+        "credits": "plays",
+        "survey_type": "usage_type",
+        "distribution_period": "period",
+    },
+    "bmi": {
+        "title_name": "title",
+        "participant_name": "writer",
+        "bmi_work_number": "work_id",
+        "perf_count": "plays",
+        "current_activity_amt": "amount",
+        "perf_period": "period",
+        "use_code": "usage_type",
+    },
+    "sesac": {
+        "song_number": "work_id",
+        "affiliate_name": "writer",
+        "royalty_payable": "amount",
+        "quarter": "period",
+    },
+    "soundexchange": {
+        "sound_recording_title": "title",
+        "featured_artist": "artist",
+        "rights_owner": "publisher",
+        "service_type": "usage_type",
+        "royalty_earned": "amount",
+        "period_of_use": "period",
+    },
+}
+
+# Default fixed-width layouts: field -> (start, end) character offsets.
+# Real layouts vary by statement vintage and can be overridden in config.
+FIXED_WIDTH_LAYOUTS = {
+    "ascap": {
+        "skip_lines": 1,
+        "fields": {
+            "work_id": (0, 12),
+            "title": (12, 72),
+            "writer": (72, 112),
+            "period": (112, 120),
+            "plays": (120, 130),
+            "amount": (130, 145),
+        }
+    },
+    "bmi": {
+        "skip_lines": 1,
+        "fields": {
+            "work_id": (0, 10),
+            "title": (10, 70),
+            "writer": (70, 110),
+            "publisher": (110, 150),
+            "period": (150, 156),
+            "plays": (156, 166),
+            "amount": (166, 180),
+        }
+    },
+    "sesac": {
+        "skip_lines": 1,
+        "fields": {
+            "work_id": (0, 10),
+            "title": (10, 60),
+            "writer": (60, 100),
+            "period": (100, 107),
+            "amount": (107, 120),
+        }
+    },
+    "soundexchange": {
+        "skip_lines": 1,
+        "fields": {
+            "isrc": (0, 12),
+            "title": (12, 72),
+            "artist": (72, 122),
+            "period": (122, 129),
+            "plays": (129, 141),
+            "amount": (141, 155),
+        }
+    },
+}
+
+SUPPORTED_PROS = ["ascap", "bmi", "sesac", "soundexchange"]
+
+# Characters read to detect a statement's format
+FIRST_LINE_LIMIT = 64 * 1024
+
+# Keys under which JSON statements hold their line items
+JSON_LINE_ITEM_KEYS = ("payments", "line_items")
+
+_HEADER_PATTERN = re.compile(r'[^a-z0-9]+')
+_AMOUNT_PATTERN = re.compile(r'[^0-9.\-]')
+_JSON_WHITESPACE_PATTERN = re.compile(r'\s*')
+_JSON_NUMBER_TAIL_PATTERN = re.compile(r'[0-9.eE+\-]*')
+
+
+class _JsonStream:
+    """
+    Incremental reader of JSON values from a text file
+
+    Decodes one value at a time with json.JSONDecoder.raw_decode() over a
+    buffer refilled in chunks, so arrays are walked element by element
+    without loading the whole document.
+    """
+
+    def __init__(self, f, prefix: str = "", chunk_size: int = 64 * 1024):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = prefix
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+        self.reads = 0  # Tokens consumed, to tell whether a member value was read
+
+    def _fill(self) -> bool:
+        """Append the next chunk to the buffer, returning False at end of file"""
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character ("" at end of file)"""
+        while True:
+            self.pos = _JSON_WHITESPACE_PATTERN.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def take(self, expected: str) -> str:
+        """Consume the next character, which must be one of expected"""
+        char = self.peek()
+        if not char or char not in expected:
+            raise ValueError(f"Malformed JSON statement: expected {expected!r}, found {char!r}")
+        self.pos += 1
+        self.reads += 1
+        return char
+
+    def value(self):
+        """Decode the next complete JSON value"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number at the end of the buffer may continue in the next chunk
+            if (isinstance(value, (int, float)) and not isinstance(value, bool) and not self.eof
+                    and _JSON_NUMBER_TAIL_PATTERN.fullmatch(self.buffer, end) and self._fill()):
+                continue
+            self.pos = end
+            self.reads += 1
+            return value
+
+    def items(self) -> Iterator:
+        """Yield the elements of the array at the current position"""
+        self.take("[")
+        if self.peek() == "]":
+            self.take("]")
+            return
+        while True:
+            yield self.value()
+            if self.take(",]") == "]":
+                return
+
+    def members(self) -> Iterator[Tuple[str, "_JsonStream"]]:
+        """
+        Yield (key, stream) for each member of the object at the current position
+
+        The caller must consume the member's value from the stream before
+        asking for the next member; values left unread are skipped.
+        """
+        self.take("{")
+        if self.peek() == "}":
+            self.take("}")
+            return
+        while True:
+            key = self.value()
+            self.take(":")
+            reads = self.reads
+            yield key, self
+            if self.reads == reads:
+                self.value()
+            if self.take(",}") == "}":
+                return
+
+
+class StatementParser:
+    """
+    Streaming parser for PRO royalty statements
+
+    Reads ASCAP, BMI, SESAC and SoundExchange statements in CSV,
+    fixed-width or JSON form one line item at a time and yields normalized
+    line items, so statements of any size are parsed in bounded memory.
+    """
+
+    def __init__(self, config: Optional[Dict] = None):
+        """
+        Initialize statement parser
+
+        Args:
+            config: Configuration dictionary (optional header aliases and
+                    fixed-width layouts per PRO)
+        """
+        self.config = config or {}
+        self.fixed_width_layouts = dict(FIXED_WIDTH_LAYOUTS)
+        self.fixed_width_layouts.update(self.config.get("fixed_width_layouts", {}))
+
+    def iter_line_items(self, statement_file: str, pro: Optional[str] = None,
+                        statement_format: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Yield normalized line items from a royalty statement
+
+        Args:
+            statement_file: Path to the statement (.csv, .tsv, .txt, .json,
+                            .jsonl, optionally gzipped)
+            pro: PRO that issued the statement (detected from the file name
+                 or header when not given)
+            statement_format: "csv", "fixed_width" or "json" (detected when
+                              not given)
+
+        Yields:
+            Line item dictionaries with the LINE_ITEM_FIELDS keys plus
+            line_number and pro
+        """
+        path = Path(statement_file)
+        pro = pro or self.detect_pro(path)
+
+        with self._open(path) as f:
+            # Bounded, so a minified JSON statement is not read whole here
+            first_line = f.readline(FIRST_LINE_LIMIT)
+            statement_format = statement_format or self.detect_format(path, first_line)
+            if statement_format != "json" and not first_line.endswith("\n"):
+                first_line += f.readline()
+
+            if statement_format == "csv":
+                items = self._iter_csv(f, first_line, pro)
+            elif statement_format == "fixed_width":
+                items = self._iter_fixed_width(f, first_line, pro)
+            elif statement_format == "json":
+                items = self._iter_json(f, first_line, path)
+            else:
+                raise ValueError(f"Unsupported statement format: {statement_format}")
+
+            for line_number, raw_item in items:
+                try:
+                    item = self._normalize_item(raw_item)
+                except ValueError as e:
+                    logger.warning(f"Skipping malformed statement line {line_number}: {e}")
+                    continue
+                if item is None:
+                    continue
+                item["line_number"] = line_number
+                item["pro"] = pro or "unknown"
+                yield item
+
+    def detect_pro(self, path: Path) -> Optional[str]:
+        """Detect the issuing PRO from the statement file name"""
+        name = path.name.lower()
+        # Check longer names first so "soundexchange" is not read as "sesac"
+        for pro in sorted(SUPPORTED_PROS, key=len, reverse=True):
+            if pro in name:
+                return pro
+        return None
+
+    def detect_format(self, path: Path, first_line: str) -> str:
+        """Detect the statement format from its extension and first line"""
+        suffixes = [s.lower() for s in path.suffixes if s.lower() != ".gz"]
+        suffix = suffixes[-1] if suffixes else ""
+
+        if suffix in (".json", ".jsonl", ".ndjson") or first_line.lstrip().startswith(("{", "[")):
+            return "json"
+        if suffix in (".csv", ".tsv") or "," in first_line or "\t" in first_line:
+            return "csv"
+        return "fixed_width"
+
+    def _open(self, path: Path):
+        """Open a statement as text, transparently handling gzip"""
+        if path.suffix.lower() == ".gz":
+            return io.TextIOWrapper(gzip.open(path, "rb"), encoding="utf-8-sig", errors="replace", newline="")
+        return open(path, "r", encoding="utf-8-sig", errors="replace", newline="")
+
+    def _iter_csv(self, f, header_line: str, pro: Optional[str]) -> Iterator[Tuple[int, Dict]]:
+        """Iterate CSV/TSV rows as (line number, raw item) pairs"""
+        delimiter = "\t" if header_line.count("\t") > header_line.count(",") else ","
+        header = next(csv.reader([header_line], delimiter=delimiter), [])
+        columns = self._map_header(header, pro)
+
+        if not any(columns):
+            logger.warning(f"No recognized columns in statement header: {header}")
+
+        for line_number, row in enumerate(csv.reader(f, delimiter=delimiter), start=2):
+            yield line_number, {
+                field: row[i]
+                for i, field in enumerate(columns)
+                if field and i < len(row)
+            }
+
+    def _iter_fixed_width(self, f, first_line: str, pro: Optional[str]) -> Iterator[Tuple[int, Dict]]:
+        """Iterate fixed-width records as (line number, raw item) pairs"""
+        layout = self.fixed_width_layouts.get(pro)
+        if not layout:
+            raise ValueError(f"No fixed-width layout configured for PRO: {pro}")
+
+        skip_lines = layout.get("skip_lines", 0)
+        fields = layout["fields"]
+
+        def lines():
+            yield first_line
+            yield from f
+
+        for line_number, line in enumerate(lines(), start=1):
+            if line_number <= skip_lines or not line.strip():
+                continue
+            yield line_number, {
+                field: line[start:end]
+                for field, (start, end) in fields.items()
+            }
+
+    def _iter_json(self, f, first_line: str, path: Path) -> Iterator[Tuple[int, Dict]]:
+        """
+        Iterate line items from a JSON statement
+
+        Accepts JSON Lines (one line item object per line), a top-level
+        array of line items, or an object holding them under "payments" or
+        "line_items" (the first of those that has items is used). Arrays
+        are streamed element by element.
+        """
+        if self._is_json_lines(first_line, path):
+            yield from self._iter_json_lines(f, first_line)
+            return
+
+        stream = _JsonStream(f, first_line)
+        if stream.peek() == "[":
+            entries = stream.items()
+        elif stream.peek() == "{":
+            entries = self._iter_json_object_items(stream)
+        else:
+            return
+
+        for position, entry in enumerate(entries, start=1):
+            yield position, self._map_json_entry(entry)
+
+    def _is_json_lines(self, first_line: str, path: Path) -> bool:
+        """Tell JSON Lines from a JSON document"""
+        suffixes = [s.lower() for s in path.suffixes if s.lower() != ".gz"]
+        if suffixes and suffixes[-1] in (".jsonl", ".ndjson"):
+            return True
+
+        # A whole line item object on the first line
+        try:
+            first = json.loads(first_line)
+        except json.JSONDecodeError:
+            return False
+        return isinstance(first, dict) and not any(key in first for key in JSON_LINE_ITEM_KEYS)
+
+    def _iter_json_lines(self, f, first_line: str) -> Iterator[Tuple[int, Dict]]:
+        """Iterate JSON Lines records as (line number, raw item) pairs"""
+        if not first_line.endswith("\n"):
+            first_line += f.readline()
+
+        def lines():
+            yield first_line
+            yield from f
+
+        for line_number, line in enumerate(lines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping malformed JSON statement line {line_number}")
+                continue
+            if isinstance(entry, dict):
+                yield line_number, self._map_json_entry(entry)
+
+    def _iter_json_object_items(self, stream: _JsonStream) -> Iterator[Dict]:
+        """Stream the line items of a statement object"""
+        found = False
+        for key, member in stream.members():
+            if found or key not in JSON_LINE_ITEM_KEYS or member.peek() != "[":
+                continue
+            for entry in member.items():
+                found = True
+                yield entry
+
+    def _map_json_entry(self, entry: Dict) -> Dict:
+        """Map JSON line item keys onto normalized line item fields"""
+        return {
+            COMMON_HEADER_ALIASES.get(self._normalize_header(key), key): value
+            for key, value in entry.items()
+        }
+
+    def _map_header(self, header: List[str], pro: Optional[str]) -> List[Optional[str]]:
+        """Map statement column names onto normalized line item fields"""
+        aliases = dict(COMMON_HEADER_ALIASES)
+        if pro:
+            aliases.update(PRO_HEADER_ALIASES.get(pro, {}))
+        aliases.update(self.config.get("header_aliases", {}))
+
+        columns = []
+        seen = set()
+        for name in header:
+            field = aliases.get(self._normalize_header(name))
+            # Keep the first column mapped to each field
+            if field in seen:
+                field = None
+            seen.add(field)
+            columns.append(field)
+        return columns
+
+    def _normalize_header(self, name: str) -> str:
+        """Normalize a column name for alias lookup"""
+        return _HEADER_PATTERN.sub("_", str(name).strip().lower()).strip("_")
+
+    def _normalize_item(self, raw_item: Dict) -> Optional[Dict]:
+        """
+        Normalize raw field values, returning None for blank lines
+
+        Raises:
+            ValueError: If a field holds a nested JSON object or array
+        """
+        item = {}
+        for field in LINE_ITEM_FIELDS:
+            value = raw_item.get(field)
+            if isinstance(value, (dict, list)):
+                raise ValueError(f"unexpected {type(value).__name__} value for {field}")
+            # JSON statements may give identifiers and titles as numbers
+            if value is not None and field not in ("plays", "amount"):
+                value = str(value)
+            if isinstance(value, str):
+                value = value.strip()
+            item[field] = value if value not in ("", None) else None
+
+        if not any(item[field] for field in ("title", "isrc", "iswc", "work_id")):
+            return None
+
+        item["amount"] = self._parse_amount(item["amount"])
+        item["plays"] = self._parse_int(item["plays"])
+        if item["isrc"]:
+            item["isrc"] = item["isrc"].upper()
+        if item["iswc"]:
+            item["iswc"] = item["iswc"].upper()
+
+        return item
+
+    def _parse_amount(self, value) -> float:
+        """Parse a currency amount such as "$1,234.50" or "(12.00)" """
+        if value is None:
+            return 0.0
+        if isinstance(value, (int, float)):
+            return float(value)
+
+        text = str(value).strip()
+        negative = text.startswith("(") and text.endswith(")")
+        try:
+            amount = float(_AMOUNT_PATTERN.sub("", text) or 0)
+        except ValueError:
+            return 0.0
+        return -amount if negative else amount
+
+    def _parse_int(self, value) -> Optional[int]:
+        """Parse an integer count such as "15,000" """
+        if value is None:
+            return None
+        if isinstance(value, (int, float)):
+            return int(value)
+        try:
+            return int(float(str(value).replace(",", "")))
+        except ValueError:
+            return None
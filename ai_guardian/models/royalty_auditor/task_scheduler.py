@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+
+import heapq
+import itertools
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from typing import Callable, Dict, List, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+class ScheduledJob:
+    """A recurring job registered with the TaskScheduler"""
+
+    def __init__(self, name: str, func: Callable, interval: float, priority: int,
+                 timeout: Optional[float]):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.priority = priority
+        self.timeout = timeout
+        self.running = False
+
+        # Metrics
+        self.starts = 0
+        self.runs = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.skipped_overlaps = 0
+        self.total_duration = 0.0
+        self.last_duration = None
+        self.total_lag = 0.0
+        self.last_lag = None
+        self.max_lag = 0.0
+
+    def metrics(self) -> Dict:
+        """Get run, duration and queue lag metrics for this job"""
+        return {
+            "interval_seconds": self.interval,
+            "priority": self.priority,
+            "running": self.running,
+            "runs": self.runs,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "skipped_overlaps": self.skipped_overlaps,
+            "last_duration_seconds": self.last_duration,
+            "avg_duration_seconds": self.total_duration / self.runs if self.runs else None,
+            "last_queue_lag_seconds": self.last_lag,
+            "avg_queue_lag_seconds": self.total_lag / self.starts if self.starts else None,
+            "max_queue_lag_seconds": self.max_lag
+        }
+
+
+class TaskScheduler:
+    """
+    Priority work-queue scheduler for recurring collection jobs
+
+    A dispatcher thread enqueues jobs onto a priority queue when they fall
+    due, and a pool of workers runs them, so a slow job never holds up the
+    cadence of the others. A job is never queued while a previous run of it
+    is still in progress, and runs exceeding their timeout are reported and
+    release their worker.
+    """
+
+    def __init__(self, workers: int = 4):
+        """
+        Initialize the scheduler
+
+        Args:
+            workers: Number of worker threads
+        """
+        self.workers = max(1, workers)
+        self.jobs: Dict[str, ScheduledJob] = {}
+
+        self._lock = threading.Lock()
+        self._queue = queue.PriorityQueue()
+        self._due = []  # Heap of (next run time, job name)
+        self._sequence = itertools.count()
+        self._wakeup = threading.Condition(self._lock)
+        self._stopped = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._executor = None
+        self._in_flight = set()  # Futures of runs that haven't returned
+
+    def register(self, name: str, func: Callable, interval: float, priority: int = 10,
+                 timeout: Optional[float] = None):
+        """
+        Register a recurring job
+
+        Args:
+            name: Unique job name (one run per name at a time)
+            func: Callable run without arguments
+            interval: Seconds between runs; the first run is one interval
+                      after start()
+            priority: Lower values are run first when jobs are waiting
+            timeout: Seconds after which a run is reported as timed out
+        """
+        with self._lock:
+            self.jobs[name] = ScheduledJob(name, func, interval, priority, timeout)
+            if self._threads:
+                heapq.heappush(self._due, (time.time() + interval, name))
+                self._wakeup.notify()
+
+    def start(self):
+        """Start the dispatcher and worker threads"""
+        if self._threads:
+            return
+
+        self._stopped.clear()
+        # Each job runs at most once at a time, so this bounds the running jobs
+        self._executor = ThreadPoolExecutor(max_workers=max(1, len(self.jobs)) + self.workers,
+                                            thread_name_prefix="scheduled-job")
+
+        now = time.time()
+        with self._lock:
+            self._due = [(now + job.interval, name) for name, job in self.jobs.items()]
+            heapq.heapify(self._due)
+
+        self._threads.append(threading.Thread(target=self._dispatch_loop, name="scheduler-dispatch", daemon=True))
+        for i in range(self.workers):
+            self._threads.append(threading.Thread(target=self._worker_loop, name=f"scheduler-worker-{i}", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float = 10):
+        """
+        Stop dispatching jobs and wait for the running jobs to finish
+
+        Runs that outlive the timeout, such as runs that already timed
+        out, are left running in the background.
+
+        Args:
+            timeout: Seconds to wait for each thread, and then for the
+                     running jobs
+        """
+        if not self._threads:
+            return
+
+        self._stopped.set()
+        with self._lock:
+            self._wakeup.notify_all()
+        for _ in range(self.workers):
+            self._queue.put((float("-inf"), 0, None, 0.0))
+
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+        with self._lock:
+            in_flight = set(self._in_flight)
+        _, still_running = wait(in_flight, timeout=timeout)
+        if still_running:
+            logger.warning(f"{len(still_running)} jobs still running after stop")
+
+        self._executor.shutdown(wait=False)
+        self._executor = None
+
+        # Drop anything still queued so it can be dispatched again after a restart
+        while not self._queue.empty():
+            _, _, name, _ = self._queue.get_nowait()
+            if name is not None:
+                with self._lock:
+                    self.jobs[name].running = False
+
+    def _dispatch_loop(self):
+        """Move jobs onto the work queue as they fall due"""
+        with self._lock:
+            while not self._stopped.is_set():
+                now = time.time()
+                if not self._due:
+                    self._wakeup.wait()
+                    continue
+
+                run_at, name = self._due[0]
+                if run_at > now:
+                    self._wakeup.wait(run_at - now)
+                    continue
+
+                heapq.heappop(self._due)
+                job = self.jobs.get(name)
+                if job is None:
+                    continue
+
+                # Keep the cadence anchored to the schedule, skipping missed slots
+                next_run = run_at + job.interval
+                if next_run <= now:
+                    next_run = now + job.interval
+                heapq.heappush(self._due, (next_run, name))
+
+                if job.running:
+                    job.skipped_overlaps += 1
+                    logger.warning(f"Skipping {name}: previous run still in progress")
+                    continue
+
+                job.running = True
+                self._queue.put((job.priority, next(self._sequence), name, run_at))
+
+    def _worker_loop(self):
+        """Run queued jobs"""
+        while not self._stopped.is_set():
+            _, _, name, scheduled_at = self._queue.get()
+            if name is None:
+                break
+
+            job = self.jobs[name]
+            start_time = time.time()
+            lag = max(0.0, start_time - scheduled_at)
+
+            future = self._executor.submit(job.func)
+            with self._lock:
+                self._in_flight.add(future)
+            future.add_done_callback(lambda f, job=job, start_time=start_time: self._finish(job, f, start_time))
+
+            with self._lock:
+                job.starts += 1
+                job.last_lag = lag
+                job.total_lag += lag
+                job.max_lag = max(job.max_lag, lag)
+
+            try:
+                future.result(timeout=job.timeout)
+            except FutureTimeoutError:
+                with self._lock:
+                    job.timeouts += 1
+                logger.error(f"Job {name} exceeded its {job.timeout}s timeout, releasing worker")
+            except Exception:
+                # Recorded by _finish
+                pass
+
+    def _finish(self, job: ScheduledJob, future, start_time: float):
+        """Record the outcome of a job run and allow it to be queued again"""
+        duration = time.time() - start_time
+        error = future.exception()
+
+        with self._lock:
+            self._in_flight.discard(future)
+            job.runs += 1
+            job.last_duration = duration
+            job.total_duration += duration
+            if error is not None:
+                job.failures += 1
+            job.running = False
+
+        if error is not None:
+            logger.error(f"Job {job.name} failed: {str(error)}")
+
+    def metrics(self) -> Dict:
+        """
+        Get scheduler metrics
+
+        Returns:
+            Queue depth and per-job run, duration and queue lag metrics
+        """
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_size": self._queue.qsize(),
+                "jobs": {name: job.metrics() for name, job in self.jobs.items()}
+            }
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Import the modules the same way the scripts do: models.* from the
+# ai_guardian directory and the Discogs modules from their own directory
+AI_GUARDIAN_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(AI_GUARDIAN_DIR))
+sys.path.insert(0, str(AI_GUARDIAN_DIR / "integrations" / "discogs"))
+
+
+class FakeClock:
+    """Stand-in for the time module whose clock only moves when advanced"""
+
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+    def sleep(self, seconds: float):
+        self.advance(seconds)
+
+
+@pytest.fixture
+def fake_clock():
+    """A FakeClock to monkeypatch over a module's time import"""
+    return FakeClock()
+
+
+@pytest.fixture
+def clock(request, monkeypatch, fake_clock):
+    """fake_clock patched over the time import of each module in the test module's CLOCK_MODULES"""
+    for module in request.module.CLOCK_MODULES:
+        monkeypatch.setattr(module, "time", fake_clock)
+    return fake_clock
+
+
+@pytest.fixture
+def collector(tmp_path):
+    """A SessionCollector writing to a temporary session directory"""
+    from models.royalty_auditor.session_collector import SessionCollector
+
+    session = SessionCollector(session_dir=str(tmp_path))
+    yield session
+    if session.is_running:
+        session.stop_collection()
+    session.discovery_log.close()
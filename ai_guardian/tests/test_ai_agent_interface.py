@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+
+import functools
+
+import pytest
+
+import integrations.discogs.ai_agent_interface as agent_module
+from integrations.discogs.discogs_database import DiscogsDatabase
+
+
+class FakeConnector:
+    """Connector whose API fetches find nothing new"""
+    
+    def __init__(self):
+        self.batches = []
+    
+    def find_rights_metadata_batch(self, batch):
+        self.batches.append(batch)
+    
+    def get_release(self, release_id):
+        return None
+    
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def agent(tmp_path, monkeypatch):
+    database = functools.partial(DiscogsDatabase, db_path=str(tmp_path / "discogs.db"), cache_cleanup_interval=0)
+    monkeypatch.setattr(agent_module, "DiscogsDatabase", database)
+    
+    db = database()
+    db.save_release({
+        "id": 1,
+        "title": "Blue Night",
+        "year": 1999,
+        "artists": [{"id": 5, "name": "John Smith"}],
+        "labels": [{"id": 7, "name": "Acme"}],
+        "tracklist": []
+    })
+    db.close()
+    
+    agent = agent_module.DiscogsAIAgent()
+    agent.connector = FakeConnector()
+    yield agent
+    agent.close()
+
+
+def test_partial_metadata_lookup_is_not_cached(agent):
+    query = 'What metadata is available for "Blue Night" by Jane Doe?'
+    
+    first = agent.process_query(query)
+    agent._prefetch_executor.submit(lambda: None).result()
+    second = agent.process_query(query)
+    
+    assert first["response"]["success"]
+    assert first["response"]["refreshing"]
+    assert second["source"] == "discogs_ai_agent"
+    assert agent.connector.batches
+
+
+def test_complete_metadata_lookup_is_cached(agent):
+    query = 'What metadata is available for "Blue Night" by John Smith?'
+    
+    first = agent.process_query(query)
+    second = agent.process_query(query)
+    
+    assert first["response"]["metadata"]["title"] == "Blue Night"
+    assert second["source"] == "cache"
+    assert not agent.connector.batches
+
+
+class WriteThroughConnector(FakeConnector):
+    """Connector whose API fetches write the releases they find to the database"""
+    
+    def __init__(self, db, releases):
+        super().__init__()
+        self.db = db
+        self.releases = releases
+    
+    def find_rights_metadata_batch(self, batch):
+        super().find_rights_metadata_batch(batch)
+        for release in self.releases:
+            self.db.save_release(release)
+
+
+def _entities(titles=(), artists=()):
+    return {"titles": list(titles), "artists": list(artists), "years": [], "labels": [], "identifiers": []}
+
+
+def test_local_miss_is_fetched_and_written_through(agent):
+    agent.connector = WriteThroughConnector(agent.db, [{
+        "id": 2, "title": "Red Morning", "artists": [{"id": 6, "name": "Jane Doe"}], "tracklist": []
+    }])
+    
+    response = agent._handle_search_query(_entities(titles=["Red Morning"], artists=["Jane Doe"]))
+    
+    assert agent.connector.batches == [[{"title": "Red Morning", "artist": "Jane Doe"}]]
+    assert response["source"] == "api"
+    assert [result["id"] for result in response["results"]] == [2]
+    
+    # The written-through release is served locally from now on
+    again = agent._handle_search_query(_entities(titles=["Red Morning"], artists=["Jane Doe"]))
+    assert again["source"] == "database"
+    assert len(agent.connector.batches) == 1
+
+
+def test_complete_local_match_skips_the_api(agent):
+    response = agent._handle_search_query(_entities(titles=["Blue Night"], artists=["John Smith"]))
+    
+    assert response["source"] == "database"
+    assert [result["id"] for result in response["results"]] == [1]
+    assert not agent.connector.batches
+
+
+def test_api_miss_returns_no_results(agent):
+    response = agent._handle_search_query(_entities(titles=["Nowhere"]))
+    
+    assert response["success"]
+    assert response["source"] == "api"
+    assert response["result_count"] == 0
+    assert agent.connector.batches == [[{"title": "Nowhere"}]]
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+import time
+
+import request_counter
+from discogs_database import DiscogsDatabase
+from request_counter import RequestCounter
+
+CLOCK_MODULES = [request_counter]
+
+
+def _open(path, **kwargs):
+    return DiscogsDatabase(db_path=str(path), cache_cleanup_interval=0, **kwargs)
+
+
+def _logged_rows(db):
+    with db.transaction() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM api_requests")
+        return cursor.fetchone()[0]
+
+
+def test_counts_requests_within_the_window(clock):
+    counter = RequestCounter(window_seconds=60)
+    counter.record()
+    clock.advance(10)
+    counter.record(count=2)
+
+    assert counter.count(5) == 2
+    assert counter.count(60) == 3
+    # Windows are capped at the counter's window
+    assert counter.count(3600) == 3
+
+    clock.advance(51)
+    assert counter.count(60) == 2
+
+
+def test_requests_older_than_the_window_are_ignored(clock):
+    counter = RequestCounter(window_seconds=60)
+    counter.record_many([clock.now - 120, clock.now - 30, clock.now])
+
+    assert counter.count(60) == 2
+
+
+def test_slots_are_reset_when_the_clock_wraps_around(clock):
+    counter = RequestCounter(window_seconds=10)
+    counter.record(count=5)
+    clock.advance(10)
+    counter.record()
+
+    # Both seconds map to the same slot; the old count is not carried over
+    assert counter.count(10) == 1
+    clock.advance(3)
+    assert counter.count(10) == 1
+    assert counter.count(2) == 0
+
+
+def test_zero_flush_interval_writes_each_entry(tmp_path):
+    db = _open(tmp_path / "discogs.db", api_log_flush_interval=0)
+    try:
+        db.log_api_request("/releases/1", {"page": 1})
+        assert _logged_rows(db) == 1
+        assert db.get_api_request_count(1) == 1
+    finally:
+        db.close()
+
+
+def test_buffered_entries_are_flushed_on_close(tmp_path):
+    path = tmp_path / "discogs.db"
+    db = _open(path, api_log_flush_interval=60, api_log_batch_size=100)
+    for release_id in range(3):
+        db.log_api_request(f"/releases/{release_id}")
+
+    # Counted in memory at once, written to the table later
+    assert db.get_api_request_count(1) == 3
+    assert _logged_rows(db) == 0
+    db.close()
+
+    reopened = _open(path, api_log_flush_interval=0)
+    try:
+        assert _logged_rows(reopened) == 3
+        # The in-memory counts are seeded from the table
+        assert reopened.get_api_request_count(1) == 3
+    finally:
+        reopened.close()
+
+
+def test_full_batch_wakes_the_flush_thread(tmp_path):
+    db = _open(tmp_path / "discogs.db", api_log_flush_interval=60, api_log_batch_size=2)
+    try:
+        db.log_api_request("/releases/1")
+        db.log_api_request("/releases/2")
+
+        deadline = time.time() + 5
+        while _logged_rows(db) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        assert _logged_rows(db) == 2
+    finally:
+        db.close()
+
+
+def test_windows_past_the_counter_are_counted_in_the_table(tmp_path):
+    db = _open(tmp_path / "discogs.db", api_log_flush_interval=60, api_count_window=60)
+    try:
+        db.log_api_request("/releases/1")
+        db.log_api_request("/releases/2")
+
+        assert db.get_api_request_count(5) == 2
+        assert _logged_rows(db) == 2
+    finally:
+        db.close()
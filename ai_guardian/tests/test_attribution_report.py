@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+import threading
+
+
+def _track_funds(collector, values):
+    fund_ids = []
+    for i, value in enumerate(values):
+        discovery_id = collector._register_discovery("black_box", "ascap", {"work": i}, confidence=0.9)
+        fund_ids.append(collector._track_potential_fund(discovery_id, "ascap", f"W{i}", f"${value:,.2f}", 0.9))
+    return fund_ids
+
+
+def test_report_statistics_match_the_registries(collector):
+    values = [120.0, 5000.0, 75.5, 5000.0, 1300.25, 980.0, 42.0]
+    _track_funds(collector, values)
+    collector._register_discovery("metadata", "bmi", {"work": "M"}, confidence=0.8)
+
+    report = collector.generate_attribution_report()
+
+    assert report["statistics"]["total_discoveries"] == len(values) + 1
+    assert report["statistics"]["total_potential_funds"] == len(values)
+    assert report["statistics"]["total_potential_value"] == f"${sum(values):,.2f}"
+    assert report["statistics"]["discovery_counts_by_type"] == {"black_box": len(values), "metadata": 1}
+
+
+def test_top_discoveries_match_a_stable_sort(collector):
+    values = [120.0, 5000.0, 75.5, 5000.0, 1300.25, 980.0, 42.0, 980.0]
+    _track_funds(collector, values)
+
+    expected = sorted(collector.fund_discoveries.values(), key=lambda f: f["numeric_value"], reverse=True)
+    assert collector._get_top_discoveries(5) == expected[:5]
+    assert collector._get_top_discoveries(3) == expected[:3]
+    # More than the heap tracks falls back to sorting every fund
+    assert collector._get_top_discoveries(7) == expected[:7]
+
+
+def test_repeated_funds_are_counted_once(collector):
+    fund_ids = _track_funds(collector, [100.0])
+    discovery_id = collector.fund_discoveries[fund_ids[0]]["discovery_id"]
+
+    collector._track_potential_fund(discovery_id, "ascap", "W0", "$100.00", 0.9)
+
+    report = collector.generate_attribution_report()
+    assert report["statistics"]["total_potential_value"] == "$100.00"
+
+
+def test_concurrent_registration_keeps_aggregates_consistent(collector):
+    def register(offset):
+        for i in range(50):
+            discovery_id = collector._register_discovery("black_box", "ascap", {"work": offset + i % 25},
+                                                         confidence=0.9)
+            collector._track_potential_fund(discovery_id, "ascap", f"W{i}", "$10.00", 0.9)
+
+    threads = [threading.Thread(target=register, args=(offset,)) for offset in (0, 0, 100, 100)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    report = collector.generate_attribution_report()
+    assert report["statistics"]["total_discoveries"] == 50
+    assert report["statistics"]["total_potential_funds"] == 50
+    assert report["statistics"]["total_potential_value"] == "$500.00"
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+
+import json
+
+import pytest
+
+from models.royalty_auditor import auditor as auditor_module
+from models.royalty_auditor.auditor import RoyaltyAuditor
+from models.royalty_auditor.pro_integration import PROIntegration
+
+
+class _FakePROIntegration:
+    """PRO client answering from a table of registrations"""
+
+    def __init__(self, credentials_path=None):
+        pass
+
+    def query_work_registration(self, work_id, pro):
+        if work_id == "BROKEN":
+            raise RuntimeError("connection reset")
+        if work_id == "FAILING":
+            return {"work_id": work_id, "pro": pro, "error": "503 from " + pro}
+        if work_id.startswith("NEW"):
+            return {"work_id": work_id, "pro": pro, "registration_status": "not_registered"}
+        return PROIntegration.mock_work_registration(work_id, pro)
+
+    def check_black_box_funds(self, identifier, pro):
+        return {"identifier": identifier, "pro": pro, "has_unclaimed_funds": False}
+
+
+def _auditor(workers=1, shard_size=500, **settings):
+    auditor = RoyaltyAuditor()
+    auditor.config["supported_pro_formats"] = ["ascap", "bmi"]
+    auditor.config["catalog_analysis"].update(workers=workers, shard_size=shard_size, **settings)
+    return auditor
+
+
+@pytest.fixture
+def fake_pros(monkeypatch):
+    monkeypatch.setattr(auditor_module, "PROIntegration", _FakePROIntegration)
+
+
+def test_unregistered_works_are_valued_per_pro(fake_pros):
+    catalog = {"works": [
+        {"id": "W1", "iswc": "NEW-1", "annual_royalties": "$2,000.00"},
+        {"id": "W2", "iswc": "NEW-2"},
+    ]}
+
+    result = _auditor().analyze_catalog(catalog)
+
+    values = {(o["work_id"], o["pro"]): o["estimated_value"] for o in result["recovery_opportunities"]}
+    assert values == {("W1", "ascap"): "$1,000.00", ("W1", "bmi"): "$1,000.00",
+                      ("W2", "ascap"): "$500.00", ("W2", "bmi"): "$500.00"}
+    assert result["summary"]["total_estimated_recovery"] == "$3,000.00"
+    assert result["summary"]["priority_actions"] == 4
+
+
+def test_failed_lookups_are_recorded_and_analysis_continues(fake_pros):
+    catalog = {"works": [
+        {"id": "W1", "iswc": "BROKEN"},
+        {"id": "W2", "iswc": "FAILING"},
+        {"id": "W3", "iswc": "NEW-3"},
+    ]}
+
+    result = _auditor().analyze_catalog(catalog)
+
+    assert [(e["work_id"], e["pro"], e["check"]) for e in result["failed_checks"]] == [
+        ("W1", "ascap", "registration"), ("W1", "bmi", "registration"),
+        ("W2", "ascap", "registration"), ("W2", "bmi", "registration")]
+    assert result["summary"]["failed_checks"] == 4
+    # A failed lookup is not reported as an unregistered work
+    assert {o["work_id"] for o in result["recovery_opportunities"]} == {"W3"}
+
+
+def test_metadata_mismatches_are_not_priority_below_priority_confidence(fake_pros):
+    catalog = {"works": [{"id": "W1", "iswc": "T-1", "title": "Another Song Title",
+                          "writers": ["John Smith"]}]}
+    auditor = _auditor()
+
+    result = auditor.analyze_catalog(catalog)
+
+    mismatches = [o for o in result["recovery_opportunities"] if o["issue"].startswith("Metadata mismatch")]
+    assert len(mismatches) == 2
+    assert all(o["confidence"] < 0.5 for o in mismatches)
+    assert result["summary"]["priority_actions"] == 0
+
+    auditor.config["catalog_analysis"]["priority_confidence"] = 0.0
+    assert auditor.analyze_catalog(catalog)["summary"]["priority_actions"] == 2
+
+
+def test_inline_analysis_leaves_worker_state_alone(fake_pros):
+    _auditor().analyze_catalog({"works": [{"id": "W1", "iswc": "T-1"}]})
+
+    assert auditor_module._worker_pro_integration is None
+    assert auditor_module._worker_matcher is None
+
+
+def test_process_pool_matches_inline_analysis():
+    catalog = {"works": [
+        {"id": f"W{i}", "iswc": f"T-{i}", "isrc": f"US-{i}", "title": "Example Song Title",
+         "writers": [{"name": "John Smith"}], "annual_royalties": 100 * i}
+        for i in range(1, 7)
+    ]}
+
+    inline = _auditor(workers=1, shard_size=2).analyze_catalog(catalog)
+    pooled = _auditor(workers=2, shard_size=2).analyze_catalog(catalog)
+
+    assert pooled["recovery_opportunities"] == inline["recovery_opportunities"]
+    assert pooled["summary"]["total_estimated_recovery"] == inline["summary"]["total_estimated_recovery"]
+    assert len(inline["recovery_opportunities"]) == 6 * 2 * 2
+
+
+def test_royalty_statement_audit(tmp_path):
+    rights_data = {"works": [
+        {"id": "W1", "title": "Example Song Title", "writers": [{"name": "John Smith"}], "iswc": "12345"},
+        {"id": "W2", "title": "Another Tune", "writers": [{"name": "Jane Doe"}]},
+        {"id": "W3", "title": "Never Played", "writers": [{"name": "Jane Doe"}]},
+    ]}
+    statement = tmp_path / "ascap_statement.jsonl"
+    entries = [
+        {"Work Title": "Example Song Title", "Writer": "John Smith", "ISWC": 12345, "Amount": "$10.00"},
+        {"Work Title": "Another Tune", "Writer": "Jane Doe", "Amount": "$5.00"},
+        {"Work Title": ["Another Tune"], "Amount": "$7.00"},
+        {"Work Title": "Completely Different", "Writer": "Nobody", "Amount": "$2.50"},
+        {"Work Title": "Example Song Title", "Writer": "Jon Smyth", "ISWC": "12345", "Amount": "$4.00"},
+    ]
+    statement.write_text("\n".join(json.dumps(entry) for entry in entries) + "\n")
+
+    result = RoyaltyAuditor().audit_royalty_statement(str(statement), rights_data)
+
+    summary = result["summary"]
+    assert summary["statement_lines_parsed"] == 4
+    assert summary["statement_lines_matched"] == 3
+    assert summary["unmatched_lines"] == 1
+    assert summary["total_paid"] == "$21.50"
+    assert summary["estimated_recovery_value"] == "$4.00"
+
+    by_type = {}
+    for discrepancy in result["discrepancies"]:
+        by_type.setdefault(discrepancy["type"], []).append(discrepancy)
+    assert [(d["work_id"], d["field"], d["statement_value"], d["line_numbers"])
+            for d in by_type["metadata_mismatch"]] == [("W1", "writer", "Jon Smyth", [5])]
+    assert [d["work_id"] for d in by_type["missing_work"]] == ["W3"]
+    assert [d["line_number"] for d in by_type["unmatched_line"]] == [4]
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+import json
+
+import pytest
+
+from collection_crawler import DiscogsCollectionCrawler, load_collection
+
+FOLDERS = [{"id": 1, "name": "Vinyl", "count": 3}, {"id": 2, "name": "CDs", "count": 1}]
+
+# Folder ID -> pages of releases
+PAGES = {
+    1: [[{"id": 10, "title": "A"}, {"id": 11, "title": "B"}], [{"id": 12, "title": "C"}]],
+    2: [[{"id": 20, "title": "D"}]],
+}
+
+
+@pytest.fixture
+def crawler(tmp_path, monkeypatch):
+    config_path = tmp_path / "config.json"
+    config_path.write_text(json.dumps({
+        "discogs": {"token": "token", "throttle": {"state_path": str(tmp_path / "rate_limit.db")}},
+        "output": {"directory": str(tmp_path / "out")},
+    }))
+    crawler = DiscogsCollectionCrawler(str(config_path), max_workers=3)
+
+    def get_folder_releases(username, folder_id, sort=None, sort_order="asc", page=1, per_page=100):
+        pages = PAGES[folder_id]
+        return [dict(release) for release in pages[page - 1]], page < len(pages)
+
+    monkeypatch.setattr(crawler, "verify_user", lambda username: True)
+    monkeypatch.setattr(crawler, "get_collection_folders", lambda username: [dict(f) for f in FOLDERS])
+    monkeypatch.setattr(crawler, "get_folder_releases", get_folder_releases)
+    monkeypatch.setattr(crawler, "get_release_instances",
+                        lambda username, release_id: [{"id": release_id * 100}])
+    monkeypatch.setattr(crawler, "get_collection_fields", lambda username: [])
+    monkeypatch.setattr(crawler, "get_collection_value", lambda username: None)
+    return crawler
+
+
+def _saved_collection(tmp_path):
+    path, = (tmp_path / "out").glob("collection_*.json")
+    return str(path)
+
+
+def test_releases_are_written_to_the_releases_file(crawler, tmp_path):
+    data = crawler.crawl_collection("someone")
+
+    assert data["total_releases"] == 4
+    assert [(f["id"], f["release_count"]) for f in data["folders"]] == [(1, 3), (2, 1)]
+    with open(data["releases_file"]) as f:
+        records = [json.loads(line) for line in f]
+    assert [(r["id"], r["folder_id"], r["instances"]) for r in records] == [
+        (10, 1, [{"id": 1000}]), (11, 1, [{"id": 1100}]), (12, 1, [{"id": 1200}]), (20, 2, [{"id": 2000}])]
+    assert load_collection(_saved_collection(tmp_path)) == data
+
+
+def test_loader_reassembles_the_embedded_shape(crawler, tmp_path):
+    crawler.crawl_collection("someone")
+
+    data = load_collection(_saved_collection(tmp_path), embed_releases=True)
+
+    assert "releases_file" not in data
+    assert data["folders"] == [
+        {"id": 1, "name": "Vinyl", "count": 3, "releases": [
+            {"id": 10, "title": "A", "instances": [{"id": 1000}]},
+            {"id": 11, "title": "B", "instances": [{"id": 1100}]},
+            {"id": 12, "title": "C", "instances": [{"id": 1200}]},
+        ]},
+        {"id": 2, "name": "CDs", "count": 1, "releases": [{"id": 20, "title": "D", "instances": [{"id": 2000}]}]},
+    ]
+
+
+def test_embed_releases_saves_the_embedded_shape(crawler, tmp_path):
+    data = crawler.crawl_collection("someone", embed_releases=True)
+
+    assert [len(folder["releases"]) for folder in data["folders"]] == [3, 1]
+    assert load_collection(_saved_collection(tmp_path)) == data
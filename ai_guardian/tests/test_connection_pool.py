@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+import sqlite3
+import threading
+
+import pytest
+
+from discogs_database import DiscogsDatabase
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = DiscogsDatabase(db_path=str(tmp_path / "discogs.db"), cache_cleanup_interval=0,
+                               api_log_flush_interval=0)
+    yield database
+    database.close()
+
+
+def _in_thread(target):
+    result = []
+    thread = threading.Thread(target=lambda: result.append(target()))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def _count_requests(db):
+    with db.transaction() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM api_requests")
+        return cursor.fetchone()[0]
+
+
+def test_each_thread_reuses_its_own_connection(db):
+    conn = db._get_connection()
+
+    assert db._get_connection() is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+    assert _in_thread(db._get_connection) is not conn
+
+
+def test_connections_of_exited_threads_are_closed(db):
+    db._get_connection()
+    thread_conn = _in_thread(db._get_connection)
+    assert db.connection_count() == 2
+
+    assert db.prune_connections() == 1
+    assert db.connection_count() == 1
+    with pytest.raises(sqlite3.ProgrammingError):
+        thread_conn.execute("SELECT 1")
+    assert db.prune_connections() == 0
+
+
+def test_opening_a_connection_prunes_exited_threads(db):
+    for _ in range(5):
+        _in_thread(db._get_connection)
+
+    # Each new connection closes those of the threads before it, so only
+    # the last thread's is left beside this thread's
+    assert db.connection_count() == 2
+
+
+def test_nested_transactions_commit_or_roll_back_together(db):
+    with db.transaction() as cursor:
+        cursor.execute("INSERT INTO api_requests (endpoint, timestamp) VALUES ('/a', 'now')")
+        with db.transaction() as inner:
+            inner.execute("INSERT INTO api_requests (endpoint, timestamp) VALUES ('/b', 'now')")
+    assert _count_requests(db) == 2
+
+    with pytest.raises(RuntimeError):
+        with db.transaction() as cursor:
+            cursor.execute("INSERT INTO api_requests (endpoint, timestamp) VALUES ('/c', 'now')")
+            with db.transaction() as inner:
+                inner.execute("INSERT INTO api_requests (endpoint, timestamp) VALUES ('/d', 'now')")
+            raise RuntimeError("abort")
+    assert _count_requests(db) == 2
+
+
+def test_close_releases_every_connection(tmp_path):
+    db = DiscogsDatabase(db_path=str(tmp_path / "discogs.db"), cache_cleanup_interval=0,
+                         api_log_flush_interval=0)
+    conn = db._get_connection()
+    db.close()
+
+    assert db.connection_count() == 0
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
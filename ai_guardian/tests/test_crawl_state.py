@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+from crawl_state import CrawlState
+
+
+def test_record_page_returns_only_new_releases(tmp_path):
+    state = CrawlState(str(tmp_path / "state.db"))
+
+    first = state.record_page("genre", "Rock", 1, 2, [(1, {"genre": "Rock"}), (2, {"genre": "Rock"})])
+    second = state.record_page("genre", "Jazz", 1, 2, [(2, {"genre": "Jazz"}), (3, {"genre": "Jazz"})])
+
+    assert first == [(1, {"genre": "Rock"}), (2, {"genre": "Rock"})]
+    assert second == [(3, {"genre": "Jazz"})]
+    # The first context recorded for a release is kept
+    assert state.pending_releases() == [(1, {"genre": "Rock"}), (2, {"genre": "Rock"}), (3, {"genre": "Jazz"})]
+    state.close()
+
+
+def test_replayed_page_is_idempotent(tmp_path):
+    state = CrawlState(str(tmp_path / "state.db"))
+    releases = [(1, {}), (2, {})]
+
+    state.record_page("artist", "A", 1, 2, releases)
+    state.mark_processed([1])
+
+    assert state.record_page("artist", "A", 1, 2, releases) == []
+    assert state.pending_releases() == [(2, {})]
+    assert state.processed_count() == 1
+    assert state.get_progress("artist", "A") == {"last_page": 1, "items": 2, "completed": False}
+    state.close()
+
+
+def test_state_survives_reopen(tmp_path):
+    path = str(tmp_path / "state.db")
+    state = CrawlState(path)
+    state.record_page("year", 1999, 3, 300, [(7, {"year": 1999}), (8, {"year": 1999})])
+    state.mark_processed([7])
+    state.complete("genre", "Rock", 50)
+    state.close()
+
+    reopened = CrawlState(path)
+    assert reopened.get_progress("year", "1999") == {"last_page": 3, "items": 300, "completed": False}
+    assert reopened.get_progress("genre", "Rock") == {"last_page": 0, "items": 50, "completed": True}
+    assert reopened.pending_releases() == [(8, {"year": 1999})]
+    assert reopened.processed_count() == 1
+    reopened.close()
+
+
+def test_processed_before_recorded_is_not_pending(tmp_path):
+    state = CrawlState(str(tmp_path / "state.db"))
+    state.mark_processed([5])
+
+    assert state.record_page("genre", "Rock", 1, 1, [(5, {})]) == []
+    assert state.pending_releases() == []
+    state.close()
+
+
+def test_reset_forgets_progress(tmp_path):
+    state = CrawlState(str(tmp_path / "state.db"))
+    state.record_page("genre", "Rock", 4, 400, [(1, {})])
+    state.reset()
+
+    assert state.get_progress("genre", "Rock") == {"last_page": 0, "items": 0, "completed": False}
+    assert state.pending_releases() == []
+    assert state.record_page("genre", "Rock", 1, 1, [(1, {})]) == [(1, {})]
+    state.close()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+import json
+import threading
+import time
+
+import pytest
+
+from discogs_connector import DiscogsConnector
+
+# Search query -> release IDs found, best first
+SEARCHES = {
+    "Blue Train": [1, 2],
+    "Kind of Blue": [3, 1],
+    "Nothing": [],
+}
+
+# Seconds each release takes to fetch, so they complete out of order
+FETCH_DELAYS = {1: 0.3, 2: 0.0, 3: 0.15}
+
+
+class _FakeDatabase:
+    def __init__(self, releases):
+        self.releases = dict(releases)
+        self.saved = []
+
+    def get_release(self, release_id):
+        return self.releases.get(release_id)
+
+    def save_release(self, release_data):
+        self.saved.append(release_data["id"])
+
+
+def _release(release_id):
+    return {"id": release_id, "title": f"Release {release_id}", "artists": [{"name": "Someone"}]}
+
+
+@pytest.fixture
+def connector(tmp_path, monkeypatch):
+    config_path = tmp_path / "config.json"
+    config_path.write_text(json.dumps({
+        "encryption_key": "k" * 32,
+        "rate_limit": {"state_path": str(tmp_path / "rate_limit.db")},
+    }))
+    monkeypatch.delenv("MESA_ENCRYPTION_KEY", raising=False)
+    connector = DiscogsConnector(user_token="token", config_path=str(config_path), max_workers=4)
+
+    fetched = []
+    fetched_lock = threading.Lock()
+
+    def search_releases(query, params=None):
+        if query not in SEARCHES:
+            raise RuntimeError("search failed")
+        ids = SEARCHES[query]
+        return {"results": [{"id": release_id} for release_id in ids], "pagination": {"items": len(ids) * 10}}
+
+    def get_release(release_id):
+        time.sleep(FETCH_DELAYS[release_id])
+        with fetched_lock:
+            fetched.append(release_id)
+        return _release(release_id)
+
+    monkeypatch.setattr(connector, "search_releases", search_releases)
+    monkeypatch.setattr(connector, "get_release", get_release)
+    connector.fetched = fetched
+    yield connector
+    connector.close()
+
+
+def _titles(result):
+    return [match["preview"]["title"] for match in result["results"]]
+
+
+def test_batch_keeps_input_and_rank_order(connector):
+    results = connector.find_rights_metadata_batch(
+        [{"title": "Blue Train"}, {"title": "Nothing"}, {"title": "Kind of Blue"}])
+
+    assert [result["query"] for result in results] == ["Blue Train", "Nothing", "Kind of Blue"]
+    assert [result["total_results"] for result in results] == [20, 0, 20]
+    assert _titles(results[0]) == ["Release 1", "Release 2"]
+    assert _titles(results[1]) == []
+    assert _titles(results[2]) == ["Release 3", "Release 1"]
+    # A release found by several searches is fetched once
+    assert sorted(connector.fetched) == [1, 2, 3]
+
+
+def test_failed_search_leaves_an_empty_result(connector):
+    results = connector.find_rights_metadata_batch([{"title": "Broken"}, {"title": "Blue Train"}])
+
+    assert results[0] == {"query": "Broken", "total_results": 0, "results": []}
+    assert _titles(results[1]) == ["Release 1", "Release 2"]
+
+
+def test_stream_yields_matches_as_releases_arrive(connector):
+    matches = list(connector.iter_rights_metadata([{"title": "Blue Train"}, {"title": "Kind of Blue"}]))
+
+    assert [(index, match["preview"]["title"]) for index, match in matches] == [
+        (0, "Release 2"), (1, "Release 3"), (0, "Release 1"), (1, "Release 1")]
+
+
+def test_database_releases_skip_the_api(connector):
+    connector.db = _FakeDatabase({1: _release(1)})
+
+    result = connector.find_rights_metadata({"title": "Blue Train"})
+
+    assert _titles(result) == ["Release 1", "Release 2"]
+    assert connector.fetched == [2]
+    # Releases fetched from the API are written to the database
+    assert connector.db.saved == [2]
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+import json
+
+import pytest
+
+from crawl_state import CrawlState
+from discogs_data_pull import DiscogsBulkDataPull, iter_rights_entries
+
+
+ARTIST_RELEASES = [
+    {"id": 10, "type": "master", "main_release": 200},
+    {"id": 300, "type": "release"},
+    {"id": 11, "type": "master"},
+    {"id": 12, "type": "artist"},
+]
+
+RELEASES = {
+    200: {"id": 200, "title": "Master Pressing", "artists": [{"name": "Test Artist"}],
+          "labels": [{"name": "Label A"}]},
+    # Merged releases are served under the ID they were merged into
+    300: {"id": 301, "title": "Merged Release", "artists": [{"name": "Test Artist"}],
+          "labels": [{"name": "Label B"}]},
+}
+
+
+def _make_puller(tmp_path, transform_workers=0):
+    config_path = tmp_path / "config.json"
+    config_path.write_text(json.dumps({
+        "discogs_token": "token",
+        "artists": ["Test Artist"],
+        "output_dir": str(tmp_path / "out"),
+        "crawl_state_path": str(tmp_path / "crawl_state.db"),
+        "rate_limit_state_path": str(tmp_path / "rate_limit.db"),
+        "pipeline": {"transform_workers": transform_workers, "sink_flush_interval": 0.01},
+    }))
+    puller = DiscogsBulkDataPull(str(config_path))
+
+    fetched = []
+
+    def fake_request(endpoint, params=None):
+        if endpoint == "/database/search":
+            return {"results": [{"id": 1}]}
+        if endpoint == "/artists/1/releases":
+            return {"releases": ARTIST_RELEASES if params["page"] == 1 else []}
+        release_id = int(endpoint.rsplit("/", 1)[1])
+        fetched.append(release_id)
+        return RELEASES.get(release_id)
+
+    puller._make_api_request = fake_request
+    return puller, fetched
+
+
+# 0 transforms on a thread, 1 in a spawned worker process
+@pytest.mark.parametrize("transform_workers", [0, 1])
+def test_artist_pull_marks_every_queued_release_processed(tmp_path, transform_workers):
+    puller, fetched = _make_puller(tmp_path, transform_workers)
+    stats = puller.pull_data()
+
+    # Masters are fetched as their main release; other listing types are skipped
+    assert sorted(fetched) == [200, 300]
+    assert stats["total_releases_processed"] == 2
+    assert stats["pipeline"]["transform_processes"] == transform_workers
+    assert {entry["workTitle"] for entry in iter_rights_entries(str(tmp_path / "out"))} == {
+        "Master Pressing", "Merged Release"}
+
+    state = CrawlState(str(tmp_path / "crawl_state.db"))
+    try:
+        assert state.pending_releases() == []
+        assert state.processed_count() == 2
+    finally:
+        state.close()
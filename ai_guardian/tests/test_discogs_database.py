@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+
+import json
+import sqlite3
+import zlib
+
+import pytest
+
+import discogs_database
+from discogs_database import DiscogsDatabase
+
+
+def _release(release_id, title, artist="Someone", label="Some Label", released="2000", tracks=()):
+    return {
+        "id": release_id,
+        "title": title,
+        "released": released,
+        "country": "US",
+        "artists": [{"id": release_id + 1000, "name": artist}],
+        "labels": [{"id": release_id + 2000, "name": label, "catno": f"CAT{release_id}"}],
+        "tracklist": [{"position": str(i + 1), "title": track} for i, track in enumerate(tracks)],
+    }
+
+
+def _open(path, **kwargs):
+    return DiscogsDatabase(db_path=str(path), cache_cleanup_interval=0, api_log_flush_interval=0, **kwargs)
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = _open(tmp_path / "discogs.db")
+    yield database
+    database.close()
+
+
+def test_title_matches_rank_above_track_matches(db):
+    db.save_releases([
+        _release(1, "Other Songs", tracks=["Blue Train"]),
+        _release(2, "Blue Train"),
+        _release(3, "Unrelated"),
+    ])
+    assert db.fts_enabled
+
+    assert [r["id"] for r in db.search_releases("blue train")] == [2, 1]
+
+
+def test_terms_match_as_prefixes(db):
+    db.save_release(_release(1, "Kind of Blue", artist="Miles Davis"))
+
+    assert [r["id"] for r in db.search_releases("kin blu")] == [1]
+    assert [a["name"] for a in db.search_artists("mile")] == ["Miles Davis"]
+    assert db.search_releases("kind of red") == []
+
+
+def test_index_follows_updates(db):
+    db.save_release(_release(1, "Old Title"))
+    db.save_release(_release(1, "New Title"))
+
+    assert db.search_releases("old") == []
+    assert [r["title"] for r in db.search_releases("new")] == ["New Title"]
+
+
+def test_entity_search_ranks_by_entities_matched(db):
+    db.save_releases([
+        _release(1, "Giant Steps", artist="Somebody Else", released="1960"),
+        _release(2, "Giant Steps", artist="John Coltrane", released="1959"),
+        _release(3, "Giant Steps", artist="John Coltrane", released="1960-02-00"),
+        _release(4, "Ballads", artist="John Coltrane", released="1962"),
+    ])
+
+    results = db.search_releases_by_entities(title="giant steps", artist="coltrane", year=1960)
+
+    assert [r["id"] for r in results] == [3, 2, 1, 4]
+    assert [r["matched"] for r in results] == [3, 2, 2, 1]
+    assert results[0]["artist"] == "John Coltrane"
+
+
+def test_repeated_release_in_a_batch_is_saved_once(db):
+    saved = db.save_releases([
+        _release(1, "First Take", tracks=["A", "B"]),
+        _release(2, "Other"),
+        _release(1, "Second Take", tracks=["C", "D"]),
+    ])
+
+    assert saved == 2
+    with db.transaction() as cursor:
+        cursor.execute("SELECT title FROM releases WHERE id = 1")
+        assert cursor.fetchone()["title"] == "Second Take"
+        cursor.execute("SELECT title FROM tracks WHERE release_id = 1 ORDER BY position")
+        assert [row["title"] for row in cursor.fetchall()] == ["C", "D"]
+
+
+def test_known_ids_are_bounded(db, monkeypatch):
+    monkeypatch.setattr(discogs_database, "KNOWN_ID_LIMIT", 3)
+
+    db.save_releases([_release(i, f"Release {i}") for i in range(1, 6)], batch_size=2)
+
+    assert len(db._known_artist_ids) <= 3 and len(db._known_label_ids) <= 3
+    # Forgotten artists are written again without replacing the stored rows
+    db.save_releases([_release(1, "Release 1", artist="Renamed")])
+    with db.transaction() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM artists")
+        assert cursor.fetchone()[0] == 5
+        cursor.execute("SELECT name FROM artists WHERE id = 1001")
+        assert cursor.fetchone()["name"] == "Someone"
+
+
+def test_changing_tokenizer_rebuilds_index(tmp_path):
+    database = _open(tmp_path / "discogs.db")
+    database.save_release(_release(1, "Kind of Blue"))
+    database.close()
+
+    database = _open(tmp_path / "discogs.db", fts_tokenizer="trigram")
+    try:
+        # Substrings inside words only match with the trigram tokenizer
+        assert [r["id"] for r in database.search_releases("nd of Bl")] == [1]
+    finally:
+        database.close()
+
+
+def _create_original_schema(path, release):
+    """Write a database as created before the schema migrations"""
+    conn = sqlite3.connect(str(path))
+    conn.executescript('''
+    CREATE TABLE releases (
+        id INTEGER PRIMARY KEY, title TEXT NOT NULL, released TEXT, country TEXT,
+        master_id INTEGER, data TEXT NOT NULL, imported_at TEXT NOT NULL, last_updated TEXT NOT NULL
+    );
+    CREATE TABLE artists (
+        id INTEGER PRIMARY KEY, name TEXT NOT NULL, realname TEXT, data TEXT NOT NULL,
+        imported_at TEXT NOT NULL, last_updated TEXT NOT NULL
+    );
+    CREATE TABLE release_artists (
+        release_id INTEGER NOT NULL, artist_id INTEGER NOT NULL, role TEXT,
+        PRIMARY KEY (release_id, artist_id, role)
+    );
+    CREATE TABLE ai_agent_cache (
+        query_hash TEXT PRIMARY KEY, query TEXT NOT NULL, result TEXT NOT NULL,
+        timestamp TEXT NOT NULL, expiration TEXT NOT NULL
+    );
+    ''')
+    conn.execute("INSERT INTO releases VALUES (?, ?, ?, ?, NULL, ?, ?, ?)",
+                 (release["id"], release["title"], release["released"], release["country"],
+                  json.dumps(release), "2020-01-01T00:00:00", "2020-01-01T00:00:00"))
+    conn.execute("INSERT INTO release_artists VALUES (?, ?, 'primary')",
+                 (release["id"], release["artists"][0]["id"]))
+    conn.execute("INSERT INTO ai_agent_cache VALUES ('hash', 'query', '{}', '2020-01-01', '2099-01-01')")
+    conn.commit()
+    conn.close()
+
+
+def test_original_schema_is_migrated_and_backfilled(tmp_path):
+    path = tmp_path / "discogs.db"
+    release = _release(7, "Mingus Ah Um", artist="Charles Mingus", released="1959-09-14",
+                       tracks=["Better Git It in Your Soul"])
+    _create_original_schema(path, release)
+
+    database = _open(path)
+    try:
+        assert database.get_release(7) == release
+        assert database.get_release_fields(7, ["title", "year"]) == {"id": 7, "title": "Mingus Ah Um", "year": 1959}
+        assert [r["id"] for r in database.search_releases("mingus")] == [7]
+        assert [r["id"] for r in database.search_releases("soul")] == [7]
+
+        results = database.search_releases_by_entities(artist="mingus")
+        assert [(r["id"], r["artist"]) for r in results] == [(7, "Charles Mingus")]
+
+        # Queries cached without an expiry time are treated as expired
+        assert database.get_cached_query("query", cache_key="hash") is None
+
+        with database.transaction() as cursor:
+            cursor.execute("SELECT data, imported_at FROM releases WHERE id = 7")
+            row = cursor.fetchone()
+        assert json.loads(zlib.decompress(row["data"])) == release
+        assert row["imported_at"] == "2020-01-01T00:00:00"
+    finally:
+        database.close()
+
+
+def test_migrated_database_reopens_unchanged(tmp_path):
+    path = tmp_path / "discogs.db"
+    _create_original_schema(path, _release(7, "Mingus Ah Um"))
+    _open(path).close()
+
+    database = _open(path)
+    try:
+        assert [r["id"] for r in database.search_releases("mingus")] == [7]
+        assert database.get_release_fields(7, ["year"]) == {"id": 7, "year": 2000}
+    finally:
+        database.close()
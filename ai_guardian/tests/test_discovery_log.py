@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+
+import json
+
+import pytest
+
+from models.royalty_auditor.discovery_log import INDEX_FILE, DiscoveryLog
+
+
+def _open_log(path, **kwargs):
+    options = {"flush_interval": 0, "batch_size": 1}
+    options.update(kwargs)
+    return DiscoveryLog(str(path), **options)
+
+
+def test_latest_version_wins_across_reopen(tmp_path):
+    log = _open_log(tmp_path)
+    log.append("a", {"v": 1})
+    log.append("b", {"v": 1})
+    log.append("a", {"v": 2})
+    log.close()
+
+    reopened = _open_log(tmp_path)
+    assert reopened.get("a") == {"v": 2}
+    assert reopened.get("b") == {"v": 1}
+    assert len(reopened) == 2
+    reopened.close()
+
+
+def test_reopen_replays_records_appended_after_index_save(tmp_path):
+    log = _open_log(tmp_path)
+    log.append("a", {"v": 1})
+    log.close()
+
+    # Appends flushed after the last index save, then a crash before close
+    log = _open_log(tmp_path)
+    log.append("b", {"v": 1})
+    log.append("a", {"v": 2})
+    log.flush(fsync=True)
+
+    reopened = _open_log(tmp_path)
+    assert reopened.get("a") == {"v": 2}
+    assert reopened.get("b") == {"v": 1}
+    reopened.close()
+
+
+def test_torn_tail_is_truncated(tmp_path):
+    log = _open_log(tmp_path)
+    log.append("a", {"v": 1})
+    log.close()
+
+    segment = next(tmp_path.glob("segment-*.jsonl"))
+    with open(segment, "ab") as f:
+        f.write(b'{"key": "b", "rec')
+
+    reopened = _open_log(tmp_path)
+    reopened.append("c", {"v": 1})
+    reopened.close()
+
+    final = _open_log(tmp_path)
+    assert final.get("a") == {"v": 1}
+    assert final.get("b") is None
+    assert final.get("c") == {"v": 1}
+    final.close()
+    assert sorted(record["v"] for record in DiscoveryLog.read_directory(str(tmp_path))) == [1, 1]
+
+
+def test_compaction_keeps_latest_versions(tmp_path):
+    log = _open_log(tmp_path, segment_size=200, compact_segments=3)
+    for version in range(20):
+        for key in ("a", "b", "c"):
+            log.append(key, {"key": key, "v": version, "pad": "x" * 40})
+    log.flush()
+
+    assert len(list(tmp_path.glob("segment-*.jsonl"))) <= 4
+    assert {record["key"]: record["v"] for record in log.iter_records()} == {"a": 19, "b": 19, "c": 19}
+    log.close()
+
+    reopened = _open_log(tmp_path, segment_size=200, compact_segments=3)
+    assert [reopened.get(key)["v"] for key in ("a", "b", "c")] == [19, 19, 19]
+    reopened.close()
+
+
+def test_stale_index_is_rebuilt(tmp_path):
+    log = _open_log(tmp_path)
+    log.append("a", {"v": 1})
+    log.close()
+
+    index_path = tmp_path / INDEX_FILE
+    saved = json.loads(index_path.read_text())
+    saved["segment_sizes"] = {name: size + 100 for name, size in saved["segment_sizes"].items()}
+    index_path.write_text(json.dumps(saved))
+
+    reopened = _open_log(tmp_path)
+    assert reopened.get("a") == {"v": 1}
+    reopened.close()
+
+
+def test_append_after_close_fails(tmp_path):
+    log = _open_log(tmp_path)
+    log.close()
+    assert log.closed
+    with pytest.raises(ValueError):
+        log.append("a", {})
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+import gzip
+import json
+
+import pytest
+
+from discogs_database import DiscogsDatabase
+from dump_importer import DiscogsDumpImporter
+
+
+def _write_artists_dump(path, count, missing_ids=()):
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write("<artists>\n")
+        for artist_id in range(1, count + 1):
+            id_element = "" if artist_id in missing_ids else f"<id>{artist_id}</id>"
+            f.write(f"<artist>{id_element}<name>Artist {artist_id}</name>"
+                    f"<aliases><name id=\"{artist_id + 1000}\">Alias</name></aliases></artist>\n")
+        f.write("</artists>\n")
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = DiscogsDatabase(db_path=str(tmp_path / "discogs.db"), cache_cleanup_interval=0)
+    yield database
+    database.close()
+
+
+def _artist_count(db):
+    with db.transaction() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM artists")
+        return cursor.fetchone()[0]
+
+
+def test_import_counts_saved_records_separately_from_parsed(db, tmp_path):
+    dump = tmp_path / "discogs_20240101_artists.xml.gz"
+    _write_artists_dump(dump, 25, missing_ids={3, 17})
+    importer = DiscogsDumpImporter(db, checkpoint_path=str(tmp_path / "checkpoint.json"), batch_size=10)
+    
+    imported = importer.import_dump(str(dump))
+    
+    checkpoint = json.loads((tmp_path / "checkpoint.json").read_text())[str(dump.resolve())]
+    assert imported == 23
+    assert checkpoint["parsed"] == 25
+    assert checkpoint["imported"] == 23
+    assert checkpoint["complete"]
+    assert _artist_count(db) == 23
+
+
+def test_import_resumes_after_interruption(db, tmp_path, monkeypatch):
+    dump = tmp_path / "discogs_20240101_artists.xml.gz"
+    _write_artists_dump(dump, 35, missing_ids={5})
+    checkpoint_path = str(tmp_path / "checkpoint.json")
+    
+    importer = DiscogsDumpImporter(db, checkpoint_path=checkpoint_path, batch_size=10)
+    save_artists = importer.savers["artists"]
+    calls = []
+    
+    def failing_saver(batch, batch_size):
+        calls.append(len(batch))
+        if len(calls) == 3:
+            raise KeyboardInterrupt
+        return save_artists(batch, batch_size=batch_size)
+    
+    importer.savers["artists"] = failing_saver
+    with pytest.raises(KeyboardInterrupt):
+        importer.import_dump(str(dump))
+    
+    # A new importer picks up after the last committed batch
+    resumed = DiscogsDumpImporter(db, checkpoint_path=checkpoint_path, batch_size=10)
+    parsed_before = resumed._checkpoint_for(str(dump))["parsed"]
+    imported = resumed.import_dump(str(dump))
+    
+    checkpoint = resumed._checkpoint_for(str(dump))
+    assert parsed_before == 20
+    assert imported == 15
+    assert checkpoint["parsed"] == 35
+    assert checkpoint["imported"] == 34
+    assert _artist_count(db) == 34
+    
+    # Completed dumps are not imported again
+    assert resumed.import_dump(str(dump)) == 0
+
+
+def test_saved_checkpoint_resumes_until_the_dump_changes(db, tmp_path):
+    dump = tmp_path / "discogs_20240101_artists.xml.gz"
+    _write_artists_dump(dump, 5)
+    checkpoint_path = tmp_path / "checkpoint.json"
+    stat = dump.stat()
+    checkpoint_path.write_text(json.dumps({
+        str(dump.resolve()): {
+            "size": stat.st_size, "mtime": stat.st_mtime, "parsed": 3, "imported": 3, "complete": False
+        }
+    }))
+    
+    importer = DiscogsDumpImporter(db, checkpoint_path=str(checkpoint_path), batch_size=10)
+    assert importer.import_dump(str(dump)) == 2
+    
+    _write_artists_dump(dump, 8)
+    assert importer.import_dump(str(dump)) == 8
+    assert _artist_count(db) == 8
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+from entity_extractor import EntityExtractor, Gazetteer, KeywordAutomaton
+
+
+def _tokens(text):
+    tokens = []
+    position = 0
+    for token in text.lower().split():
+        start = text.lower().index(token, position)
+        tokens.append((token, start, start + len(token)))
+        position = start + len(token)
+    return tokens
+
+
+def test_automaton_follows_failure_links():
+    automaton = KeywordAutomaton()
+    for keyword in ("he", "she", "his", "hers"):
+        automaton.add(keyword, keyword)
+
+    # "she" fails over into "he", which continues into "hers"
+    assert list(automaton.find("ushers")) == [(1, 4, "she"), (2, 4, "he"), (2, 6, "hers")]
+    assert list(automaton.find("ahishers")) == [
+        (1, 4, "his"), (3, 6, "she"), (4, 6, "he"), (4, 8, "hers")]
+
+
+def test_automaton_rebuilds_after_adding_keywords():
+    automaton = KeywordAutomaton()
+    automaton.add("abc", 1)
+    assert list(automaton.find("xabcd")) == [(1, 4, 1)]
+
+    automaton.add("bcd", 2)
+    assert list(automaton.find("xabcd")) == [(1, 4, 1), (2, 5, 2)]
+    assert list(automaton.find("")) == []
+
+
+def test_gazetteer_prefers_the_longest_name():
+    gazetteer = Gazetteer()
+    for name in ("Miles", "Miles Davis", "Miles Davis Quintet", "Davis"):
+        gazetteer.add(name)
+
+    assert gazetteer.match(_tokens("the miles davis quintet and davis")) == [
+        ("Miles Davis Quintet", 4, 23), ("Davis", 28, 33)]
+    # A longer prefix that isn't a name falls back to the longest name in it
+    assert gazetteer.match(_tokens("miles davis sextet")) == [("Miles Davis", 0, 11)]
+
+
+def test_gazetteer_skips_stopwords_short_names_and_suffixes():
+    gazetteer = Gazetteer()
+    for name in ("Rights", "The", "U2", "Queen (2)", "The The"):
+        gazetteer.add(name)
+
+    assert gazetteer.size == 2
+    assert gazetteer.match(_tokens("who owns the rights to queen by the the")) == [
+        ("Queen", 23, 28), ("The The", 32, 39)]
+
+
+def test_extractor_adds_known_names_outside_quoted_titles():
+    extractor = EntityExtractor(artists=["Miles Davis"], labels=["Blue Note"])
+
+    entities = extractor.extract('Who owns "Miles Davis Blues" recorded for Blue Note by Miles Davis?')
+
+    assert entities["titles"] == ["Miles Davis Blues"]
+    assert entities["artists"] == ["miles davis"]
+    assert entities["labels"] == ["Blue Note"]
+    assert extractor.query_type("who owns the rights and royalty details", entities) == "rights_verification"
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+from models.royalty_auditor import lru_cache
+from models.royalty_auditor.lru_cache import LRUCache
+
+CLOCK_MODULES = [lru_cache]
+
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = LRUCache(maxsize=10, ttl=60)
+    cache.put("default", 1)
+    cache.put("short", 2, ttl=5)
+    cache.put("long", 3, ttl=600)
+
+    clock.advance(10)
+    assert cache.get("short") is None
+    assert cache.get("default") == 1
+
+    clock.advance(60)
+    assert cache.get("default") is None
+    assert cache.get("long") == 3
+    assert cache.stats()["expirations"] == 2
+
+
+def test_put_without_ttl_clears_old_expiry(clock):
+    cache = LRUCache(maxsize=10)
+    cache.put("a", 1, ttl=5)
+    cache.put("a", 2)
+
+    clock.advance(10)
+    assert cache.get("a") == 2
+
+
+def test_prune_expired_keeps_live_entries(clock):
+    cache = LRUCache(maxsize=10)
+    cache.put("short", 1, ttl=5)
+    cache.put("long", 2, ttl=50)
+    cache.put("forever", 3)
+
+    clock.advance(10)
+    assert cache.prune_expired() == 1
+    assert len(cache) == 2
+    assert cache.stats()["expirations"] == 1
+
+
+def test_stats_count_hits_and_misses():
+    cache = LRUCache(maxsize=10)
+    cache.put("a", 1)
+    cache.get("a")
+    cache.get("b")
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+
+def test_zero_size_caches_nothing():
+    cache = LRUCache(maxsize=0)
+    cache.put("a", 1)
+    assert len(cache) == 0
+    assert cache.get("a", "missing") == "missing"
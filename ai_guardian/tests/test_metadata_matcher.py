@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+
+import random
+
+import pytest
+
+from models.royalty_auditor.metadata_matcher import MetadataMatcher
+
+FIELDS = ["title", "artist"]
+
+
+def _catalog(size: int, seed: int = 1):
+    rng = random.Random(seed)
+    return [
+        {"id": f"W{i}", "title": "".join(rng.choice("abcdefgh ") for _ in range(12)), "artist": "the band"}
+        for i in range(size)
+    ]
+
+
+def _brute_force(matcher, query, records):
+    scores = [matcher._calculate_record_similarity(query, record, FIELDS) for record in records]
+    best = max(range(len(records)), key=lambda position: (scores[position], -position))
+    return records[best], scores[best]
+
+
+@pytest.fixture
+def matcher():
+    # A tiny shortlist and block limit make the index miss often
+    return MetadataMatcher({
+        "similarity_threshold": 0.85,
+        "fuzzy_match_fields": FIELDS,
+        "index_shortlist_size": 1,
+        "index_max_block_size": 3
+    })
+
+
+def test_query_with_full_scan_fallback_matches_brute_force(matcher):
+    matcher.config["index_full_scan_fallback"] = True
+    records = _catalog(300)
+    matcher.build_index(records, FIELDS)
+    
+    for record in records[:50]:
+        query = {"title": record["title"][:-2] + "zz", "artist": "the band"}
+        expected, expected_score = _brute_force(matcher, query, records)
+        
+        (match, score), = matcher.query(query)
+        if expected_score >= 0.85:
+            # A shortlisted match above the threshold is good enough
+            assert score >= 0.85
+        else:
+            # Otherwise the full scan finds the exact best record
+            assert match is expected
+            assert score == pytest.approx(expected_score)
+
+
+def test_query_with_default_limits_equals_brute_force():
+    matcher = MetadataMatcher({"similarity_threshold": 0.85, "fuzzy_match_fields": FIELDS})
+    records = _catalog(200, seed=7)
+    matcher.build_index(records, FIELDS)
+    
+    for record in records[:40]:
+        query = {"title": record["title"][1:] + "q", "artist": "the band"}
+        _, expected_score = _brute_force(matcher, query, records)
+        
+        (_, score), = matcher.query(query)
+        assert score == pytest.approx(expected_score)
+
+
+def test_query_with_narrow_fallback_can_miss(matcher):
+    matcher.config["index_fallback_shortlist_size"] = 1
+    records = _catalog(300)
+    matcher.build_index(records, FIELDS)
+    
+    misses = 0
+    for record in records[:50]:
+        query = {"title": record["title"][:-2] + "zz", "artist": "the band"}
+        _, expected_score = _brute_force(matcher, query, records)
+        results = matcher.query(query)
+        if expected_score >= 0.85 and (not results or results[0][1] < expected_score):
+            misses += 1
+    
+    assert misses > 0
+
+
+def test_fallback_scores_a_wider_shortlist_not_the_catalog(matcher, monkeypatch):
+    matcher.config.update(index_max_block_size=10000, index_fallback_shortlist_size=20)
+    records = _catalog(300)
+    matcher.build_index(records, FIELDS)
+    calls = []
+    score = matcher._calculate_record_similarity
+    monkeypatch.setattr(matcher, "_calculate_record_similarity", lambda *args: calls.append(args) or score(*args))
+    
+    results = matcher.query({"title": "zzzz yyyy", "artist": "the band"})
+    
+    assert results and results[0][1] < 0.85
+    assert len(calls) == 20
+
+
+def test_query_exact_record_first(matcher):
+    records = _catalog(100)
+    matcher.build_index(records, FIELDS)
+    
+    (match, score), = matcher.query(dict(records[42]))
+    assert score == 1.0
+    assert match["title"] == records[42]["title"]
+
+
+def test_query_requires_index():
+    with pytest.raises(RuntimeError):
+        MetadataMatcher().query({"title": "x"})
+
+
+def test_match_many_agrees_with_find_matching_record():
+    matcher = MetadataMatcher({"similarity_threshold": 0.85, "fuzzy_match_fields": FIELDS})
+    records = _catalog(200, seed=3)
+    queries = [{"title": record["title"].upper(), "artist": "The Band"} for record in records[::10]]
+    queries.append({"title": "no such title", "artist": "nobody"})
+    
+    results = matcher.match_many(queries, records, FIELDS)
+    
+    assert len(results) == len(queries)
+    for query, (match, score) in zip(queries, results):
+        expected, expected_score = matcher.find_matching_record(query, records, FIELDS)
+        assert match is expected
+        if expected is not None:
+            assert score == pytest.approx(expected_score)
+
+
+def test_cluster_names_groups_variants_in_any_order():
+    names = ["John A. Smith", "Smith, John A.", "john a smith", "Jon A. Smith",
+             "Jane Doe", "Jane  Doe", "Maria Gonzalez"]
+    matcher = MetadataMatcher()
+    
+    clusters = matcher.cluster_names(names)
+    shuffled = list(reversed(names))
+    
+    assert clusters == MetadataMatcher().cluster_names(shuffled)
+    assert clusters[0]["size"] == 4
+    assert {frozenset(cluster["names"]) for cluster in clusters} == {
+        frozenset(names[:4]), frozenset(names[4:6]), frozenset(names[6:])
+    }
+
+
+def test_match_many_falls_back_like_query(matcher):
+    matcher.config["batch_shortlist_size"] = matcher.config["index_shortlist_size"]
+    records = _catalog(300)
+    matcher.build_index(records, FIELDS)
+    queries = [{"title": record["title"][:-2] + "zz", "artist": "the band"} for record in records[:50]]
+    
+    results = matcher.match_many(queries, records, FIELDS)
+    
+    recovered = 0
+    for query, (match, score) in zip(queries, results):
+        (expected, expected_score), = matcher.query(query)
+        assert score == pytest.approx(expected_score)
+        assert match is (expected if expected_score >= 0.85 else None)
+        shortlisted = matcher._shortlist(query, FIELDS, matcher._index["postings"], 1)
+        recovered += match is not None and records.index(match) not in shortlisted
+    # Some matches only come from the wider fallback shortlist
+    assert recovered > 0
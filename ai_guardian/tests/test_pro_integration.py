@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+
+import threading
+from http.server import ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+import pytest
+
+from models.royalty_auditor.pro_integration import PROIntegration
+from tools.mock_pro_server import MockPROHandler
+
+
+class _ScriptedHandler(MockPROHandler):
+    """Mock PRO server that answers scripted status codes for some identifiers"""
+
+    # Work ID or black box identifier value -> status codes returned
+    # before the mock response
+    statuses = {}
+    requests_seen = []
+
+    def do_GET(self):
+        self.requests_seen.append(self.path)
+        url = urlparse(self.path)
+        parts = [unquote(p) for p in url.path.strip("/").split("/")]
+        key = parts[2] if len(parts) == 4 else parse_qs(url.query).get("value", [""])[0]
+        pending = self.statuses.get(key)
+        if pending:
+            self._send_json({"error": "scripted"}, status=pending.pop(0))
+        else:
+            super().do_GET()
+
+
+@pytest.fixture
+def server():
+    _ScriptedHandler.statuses = {}
+    _ScriptedHandler.requests_seen = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _ScriptedHandler)
+    thread = threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _integration(server, **settings):
+    options = {"retry_backoff": 0, "cache_enabled": False}
+    options.update(settings)
+    return PROIntegration(mock_server_url=server, settings=options)
+
+
+def test_mock_server_serves_mock_responses(server):
+    pro = _integration(server)
+
+    assert pro.query_work_registration("T-1", "ascap") == PROIntegration.mock_work_registration("T-1", "ascap")
+    identifier = {"type": "isrc", "value": "US-123"}
+    assert pro.check_black_box_funds(identifier, "bmi") == PROIntegration.mock_black_box_funds(identifier, "bmi")
+
+
+def test_not_found_means_not_registered(server):
+    _ScriptedHandler.statuses = {"T-123": [404]}
+    pro = _integration(server)
+
+    assert pro.query_work_registration("T-123", "ascap") == {
+        "work_id": "T-123", "pro": "ascap", "registration_status": "not_registered"}
+
+
+def test_unknown_black_box_identifier_means_no_funds(server):
+    _ScriptedHandler.statuses = {"US-123": [404]}
+    pro = _integration(server)
+
+    identifier = {"type": "isrc", "value": "US-123"}
+    assert pro.check_black_box_funds(identifier, "bmi") == {
+        "identifier": identifier, "pro": "bmi", "has_unclaimed_funds": False}
+
+
+def test_server_errors_are_retried(server):
+    _ScriptedHandler.statuses = {"T-1": [503, 429]}
+    pro = _integration(server, max_retries=2)
+
+    assert pro.query_work_registration("T-1", "ascap")["registration_status"] == "registered"
+    assert len(_ScriptedHandler.requests_seen) == 3
+
+
+def test_failures_are_reported_and_not_cached(server):
+    _ScriptedHandler.statuses = {"T-1": [503, 503, 400]}
+    pro = _integration(server, max_retries=1, cache_enabled=True)
+
+    result = pro.query_work_registration("T-1", "ascap")
+    assert result["work_id"] == "T-1" and "503" in result["error"]
+    assert len(_ScriptedHandler.requests_seen) == 2
+
+    # Client errors other than 404 fail without retrying
+    result = pro.query_work_registration("T-1", "ascap")
+    assert "400" in result["error"]
+    assert len(_ScriptedHandler.requests_seen) == 3
+
+    assert pro.query_work_registration("T-1", "ascap")["registration_status"] == "registered"
+    assert pro.query_work_registration("T-1", "ascap")["registration_status"] == "registered"
+    assert len(_ScriptedHandler.requests_seen) == 4
+
+
+def test_query_many_is_work_major_and_reports_failures(server):
+    _ScriptedHandler.statuses = {"T-2": [400, 400]}
+    pro = _integration(server, max_concurrency_per_pro=2)
+
+    results = pro.query_many(["T-1", "T-2", "T-3"], ["ascap", "bmi"])
+
+    assert [(r["work_id"], r["pro"]) for r in results] == [
+        (work_id, name) for work_id in ("T-1", "T-2", "T-3") for name in ("ascap", "bmi")]
+    assert ["error" in r for r in results] == [False, False, True, True, False, False]
+
+
+def test_check_black_box_many_is_identifier_major(server):
+    pro = _integration(server)
+    identifiers = [{"type": "isrc", "value": "US-1"}, {"type": "iswc", "value": "T-9"}]
+
+    results = pro.check_black_box_many(identifiers, ["ascap", "bmi", "mlc"])
+
+    assert [(r["identifier"]["value"], r["pro"]) for r in results] == [
+        (identifier["value"], name) for identifier in identifiers for name in ("ascap", "bmi", "mlc")]
+    assert all(r["has_unclaimed_funds"] for r in results)
+
+
+def test_batches_without_api_use_mock_responses():
+    pro = PROIntegration(settings={"cache_enabled": False})
+
+    assert pro.query_many(["T-1"], ["ascap"]) == [PROIntegration.mock_work_registration("T-1", "ascap")]
+    assert pro.query_many([], ["ascap"]) == []
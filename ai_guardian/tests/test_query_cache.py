@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+import sys
+
+import pytest
+
+import discogs_database
+import query_cache
+from discogs_database import DiscogsDatabase
+from query_cache import QueryCache
+
+CLOCK_MODULES = [query_cache, sys.modules[query_cache.LRUCache.__module__], discogs_database]
+
+
+@pytest.fixture
+def db(tmp_path, clock):
+    database = DiscogsDatabase(db_path=str(tmp_path / "discogs.db"), query_cache_size=2,
+                               cache_cleanup_interval=0)
+    yield database
+    database.close()
+
+
+def test_entries_expire_at_their_time(clock):
+    cache = QueryCache(maxsize=10)
+    cache.put("a", 1, clock.now + 10)
+    cache.put("stale", 2, clock.now)
+
+    assert cache.get("stale") is None
+    assert cache.get("a") == 1
+    clock.advance(10)
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_evicts_least_recently_used(clock):
+    cache = QueryCache(maxsize=2)
+    cache.put("a", 1, clock.now + 60)
+    cache.put("b", 2, clock.now + 60)
+    cache.get("a")
+    cache.put("c", 3, clock.now + 60)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_prune_expired(clock):
+    cache = QueryCache(maxsize=10)
+    cache.put("a", 1, clock.now + 5)
+    cache.put("b", 2, clock.now + 50)
+
+    clock.advance(10)
+    assert cache.prune_expired() == 1
+    assert cache.stats()["size"] == 1
+
+
+def test_database_promotes_table_hits_into_hot_tier(db, clock):
+    for number in range(3):
+        db.cache_ai_query(f"query {number}", {"answer": number}, expiration_seconds=60)
+
+    # The first query was evicted from the hot tier but is still in the table
+    assert db.get_cached_query("query 0") == {"answer": 0}
+    assert db.get_query_cache_stats()["misses"] == 1
+    assert db.get_cached_query("query 0") == {"answer": 0}
+    assert db.get_query_cache_stats()["hits"] == 1
+
+    clock.advance(61)
+    assert db.get_cached_query("query 0") is None
+    assert db.cleanup_expired_cache() == 3
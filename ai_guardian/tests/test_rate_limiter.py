@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+import pytest
+
+import rate_limiter
+from rate_limiter import DiscogsRateLimiter, get_rate_limiter
+
+CLOCK_MODULES = [rate_limiter]
+
+
+def _limiter(tmp_path, **kwargs):
+    return DiscogsRateLimiter(str(tmp_path / "ratelimit.db"), **kwargs)
+
+
+def test_burst_then_refill_at_request_rate(tmp_path, clock):
+    limiter = _limiter(tmp_path, requests_per_minute=60, burst=3)
+
+    assert [limiter._try_acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter._try_acquire() == pytest.approx(1.0)
+
+    clock.advance(0.5)
+    assert limiter._try_acquire() == pytest.approx(0.5)
+    clock.advance(0.5)
+    assert limiter._try_acquire() == 0.0
+
+
+def test_acquire_paces_requests(tmp_path, clock):
+    limiter = _limiter(tmp_path, requests_per_minute=30, burst=1)
+    start = clock.now
+
+    waits = [limiter.acquire() for _ in range(4)]
+
+    assert waits[0] == 0.0
+    assert waits[1:] == pytest.approx([2.0, 2.0, 2.0])
+    assert clock.now - start == pytest.approx(6.0)
+
+
+def test_bucket_is_shared_through_the_state_file(tmp_path, clock):
+    first = _limiter(tmp_path, burst=2)
+    second = _limiter(tmp_path, burst=2)
+
+    assert first._try_acquire() == 0.0
+    assert second._try_acquire() == 0.0
+    assert first._try_acquire() > 0
+    assert _limiter(tmp_path, burst=2, bucket="other")._try_acquire() == 0.0
+
+
+def test_headers_set_rate_and_cap_tokens(tmp_path, clock):
+    limiter = _limiter(tmp_path, requests_per_minute=60, burst=5)
+    limiter.record_response(200, {"X-Discogs-Ratelimit": "25", "X-Discogs-Ratelimit-Remaining": "1"})
+
+    assert limiter._try_acquire() == 0.0
+    assert limiter._try_acquire() == pytest.approx(60 / 25)
+
+
+def test_429_blocks_until_retry_after(tmp_path, clock):
+    limiter = _limiter(tmp_path, burst=5)
+    limiter.record_response(429, {"Retry-After": "30"})
+
+    assert limiter._try_acquire() == pytest.approx(30)
+    clock.advance(30)
+    # The bucket starts refilling only once the block ends
+    assert limiter._try_acquire() == pytest.approx(1.0)
+    clock.advance(1)
+    assert limiter._try_acquire() == 0.0
+
+
+def test_responses_without_rate_headers_are_ignored(tmp_path, clock):
+    limiter = _limiter(tmp_path, burst=1)
+    limiter.record_response(200, {})
+    assert limiter._try_acquire() == 0.0
+
+
+def test_shared_limiter_per_state_file_and_bucket(tmp_path):
+    path = str(tmp_path / "ratelimit.db")
+    assert get_rate_limiter(path) is get_rate_limiter(path)
+    assert get_rate_limiter(path) is not get_rate_limiter(path, bucket="other")
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+
+from models.royalty_auditor import lru_cache, response_cache
+from models.royalty_auditor.response_cache import ResponseCache
+
+CLOCK_MODULES = [lru_cache, response_cache]
+TTLS = {"registration": 60, "black_box": 10}
+
+
+def test_ttl_depends_on_kind(clock):
+    cache = ResponseCache(TTLS)
+    cache.put("registration", "ASCAP", "work", "W1", {"registered": True})
+    cache.put("black_box", "ASCAP", "work", "W1", {"funds": 1})
+
+    clock.advance(30)
+    assert cache.get("registration", "ASCAP", "work", "W1") == {"registered": True}
+    assert cache.get("black_box", "ASCAP", "work", "W1") is None
+
+
+def test_kinds_without_ttl_are_not_cached():
+    cache = ResponseCache(TTLS)
+    cache.put("other", "ASCAP", "work", "W1", {"value": 1})
+    assert cache.get("other", "ASCAP", "work", "W1") is None
+
+
+def test_disk_cache_survives_restart_with_remaining_ttl(clock, tmp_path):
+    db_path = str(tmp_path / "cache.db")
+    cache = ResponseCache(TTLS, db_path=db_path)
+    cache.put("registration", "BMI", "isrc", "US123", {"registered": False})
+    cache.close()
+
+    clock.advance(50)
+    restarted = ResponseCache(TTLS, db_path=db_path)
+    assert restarted.get("registration", "BMI", "isrc", "US123") == {"registered": False}
+    assert restarted.stats()["disk"]["hits"] == 1
+
+    # Promoted to memory with the remaining time to live, not a fresh one
+    clock.advance(20)
+    assert restarted.get("registration", "BMI", "isrc", "US123") is None
+    restarted.close()
+
+
+def test_invalidate_drops_memory_and_disk(tmp_path):
+    cache = ResponseCache(TTLS, db_path=str(tmp_path / "cache.db"))
+    cache.put("registration", "ASCAP", "work", "W1", {"registered": True})
+    cache.put("black_box", "ASCAP", "work", "W1", {"funds": 1})
+    cache.put("registration", "ASCAP", "work", "W2", {"registered": True})
+
+    cache.invalidate("ASCAP", "W1", kind="registration")
+    assert cache.get("registration", "ASCAP", "work", "W1") is None
+    assert cache.get("black_box", "ASCAP", "work", "W1") == {"funds": 1}
+    assert cache.get("registration", "ASCAP", "work", "W2") == {"registered": True}
+    cache.close()
+
+
+def test_prune_expired_removes_disk_rows(clock, tmp_path):
+    cache = ResponseCache(TTLS, db_path=str(tmp_path / "cache.db"))
+    cache.put("registration", "ASCAP", "work", "W1", {"registered": True})
+    cache.put("black_box", "ASCAP", "work", "W1", {"funds": 1})
+
+    clock.advance(30)
+    assert cache.prune_expired() == 1
+    cache.close()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+
+def test_quick_scan_simulates_checks_without_identifiers(collector):
+    calls = []
+    collector.pro_integration.check_black_box_many = lambda *args: calls.append(args)
+
+    results = collector.run_quick_scan()
+
+    assert calls == []
+    assert sorted(collector.discovery_registry[d]["source"] for d in results["discoveries"]) == [
+        "ascap", "bmi", "soundexchange"]
+
+
+def test_quick_scan_batches_configured_identifiers(collector):
+    identifiers = [{"type": "isrc", "value": "US-1"}, {"type": "iswc", "value": "T-1"}]
+    collector.config["quick_scan_identifiers"] = identifiers
+    collector.config["monitored_pros"] = ["ascap", "bmi"]
+    calls = []
+
+    def check_black_box_many(batch_identifiers, pros):
+        calls.append((batch_identifiers, pros))
+        return [
+            {"has_unclaimed_funds": True, "estimated_amount": "$1.00"},
+            {"has_unclaimed_funds": False},
+            {"error": "timeout"},
+            {"has_unclaimed_funds": True, "estimated_amount": "$2.00"},
+        ]
+
+    collector.pro_integration.check_black_box_many = check_black_box_many
+    results = collector.run_quick_scan()
+
+    assert calls == [(identifiers, ["ascap", "bmi"])]
+    found = [collector.discovery_registry[d]["data"] for d in results["discoveries"]]
+    assert [(data["identifier"]["value"], data["pro"]) for data in found] == [("US-1", "ascap"), ("T-1", "bmi")]
+
+
+def test_discoveries_after_stop_are_kept_in_memory(collector):
+    collector.discovery_log.close()
+
+    discovery_id = collector._register_discovery("black_box", "ascap", {"pro": "ascap"}, confidence=0.9)
+
+    assert collector.discovery_registry[discovery_id]["source"] == "ascap"
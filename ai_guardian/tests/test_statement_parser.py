@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+
+import gzip
+import json
+
+import pytest
+
+from models.royalty_auditor.statement_parser import StatementParser, _JsonStream
+
+ITEMS = [
+    {"Work Title": f"Song {i}", "Writer": "John Smith", "Amount": f"${i}.50", "ISRC": "US-AB1-23-00001"}
+    for i in range(1, 6)
+]
+
+
+@pytest.fixture
+def parser():
+    return StatementParser()
+
+
+def _parse(parser, path):
+    return list(parser.iter_line_items(str(path)))
+
+
+def test_csv_statement(parser, tmp_path):
+    path = tmp_path / "ascap_2023q1.csv"
+    path.write_text("Work Title,Writer,Amount\nSong 1,John Smith,$1.50\nSong 2,Jane Doe,2\n")
+    
+    items = _parse(parser, path)
+    
+    assert [item["title"] for item in items] == ["Song 1", "Song 2"]
+    assert [item["amount"] for item in items] == [1.5, 2.0]
+    assert items[0]["pro"] == "ascap"
+    assert items[1]["line_number"] == 3
+
+
+@pytest.mark.parametrize("document", [
+    ITEMS,
+    {"payments": ITEMS},
+    {"meta": {"skipped": [1, {"a": "]"}]}, "line_items": ITEMS, "total": 12.5},
+    {"payments": [], "line_items": ITEMS},
+])
+def test_json_statement_layouts(parser, tmp_path, document):
+    path = tmp_path / "bmi_statement.json"
+    path.write_text(json.dumps(document, indent=1))
+    
+    items = _parse(parser, path)
+    
+    assert [item["title"] for item in items] == [entry["Work Title"] for entry in ITEMS]
+    assert [item["line_number"] for item in items] == list(range(1, len(ITEMS) + 1))
+
+
+def test_json_lines_statement(parser, tmp_path):
+    path = tmp_path / "bmi_statement.jsonl.gz"
+    with gzip.open(path, "wt") as f:
+        f.write("\n".join(json.dumps(entry) for entry in ITEMS) + "\n\n")
+    
+    items = _parse(parser, path)
+    
+    assert [item["amount"] for item in items] == [1.5, 2.5, 3.5, 4.5, 5.5]
+    assert items[-1]["line_number"] == 5
+
+
+def test_json_stream_refills_across_chunks(tmp_path):
+    values = [12345678, {"k": "v" * 10}, 3.14159, True, None, "a]b"] * 3
+    path = tmp_path / "values.json"
+    path.write_text(json.dumps(values))
+    
+    with open(path) as f:
+        stream = _JsonStream(f, chunk_size=3)
+        assert list(stream.items()) == values
+
+
+def test_single_line_json_statement(parser, tmp_path):
+    path = tmp_path / "soundexchange_big.json"
+    with open(path, "w") as f:
+        f.write('{"payments": [')
+        f.write(",".join(json.dumps({"title": f"Song {i}", "amount": "1.00"}) for i in range(5000)))
+        f.write("]}")
+    
+    count = 0
+    for item in parser.iter_line_items(str(path)):
+        count += 1
+    
+    assert count == 5000
+
+
+def test_json_values_of_any_type_are_normalized(parser, tmp_path):
+    path = tmp_path / "bmi_statement.jsonl"
+    entries = [
+        {"Work Title": "Song 1", "ISWC": 12345, "Amount": 1.5, "Plays": 10},
+        {"Work Title": {"nested": "Song 2"}, "Amount": 2},
+        {"Work Title": 1999, "ISRC": "us-ab1-23-00003", "Amount": "3"},
+    ]
+    path.write_text("\n".join(json.dumps(entry) for entry in entries) + "\n")
+
+    items = _parse(parser, path)
+
+    # The line with a nested object is skipped, not the whole statement
+    assert [item["line_number"] for item in items] == [1, 3]
+    assert [item["title"] for item in items] == ["Song 1", "1999"]
+    assert [item["iswc"] for item in items] == ["12345", None]
+    assert items[1]["isrc"] == "US-AB1-23-00003"
+    assert [item["amount"] for item in items] == [1.5, 3.0]
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+
+import threading
+import time
+
+import pytest
+
+from models.royalty_auditor.task_scheduler import TaskScheduler
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while not predicate():
+        if time.time() > deadline:
+            raise AssertionError("condition not reached in time")
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def scheduler():
+    schedulers = []
+
+    def make(workers=2):
+        schedulers.append(TaskScheduler(workers=workers))
+        return schedulers[-1]
+
+    yield make
+    for started in schedulers:
+        started.stop(timeout=2)
+
+
+def test_slow_job_is_not_queued_again_while_running(scheduler):
+    release = threading.Event()
+    tasks = scheduler()
+    tasks.register("slow", lambda: release.wait(5), interval=0.02)
+    tasks.start()
+
+    _wait_for(lambda: tasks.jobs["slow"].skipped_overlaps >= 3)
+    job = tasks.metrics()["jobs"]["slow"]
+    assert (job["running"], job["runs"]) == (True, 0)
+
+    release.set()
+    _wait_for(lambda: tasks.jobs["slow"].runs >= 2)
+    assert tasks.jobs["slow"].starts == tasks.jobs["slow"].runs + tasks.jobs["slow"].running
+
+
+def test_timed_out_job_releases_its_worker(scheduler):
+    release = threading.Event()
+    fast_runs = []
+    tasks = scheduler(workers=1)
+    tasks.register("stuck", lambda: release.wait(5), interval=0.01, priority=0, timeout=0.05)
+    tasks.register("fast", lambda: fast_runs.append(1), interval=0.02, priority=5)
+    tasks.start()
+
+    _wait_for(lambda: len(fast_runs) >= 3)
+    assert tasks.jobs["stuck"].timeouts == 1
+    # The timed-out run still counts as running until it returns
+    assert tasks.jobs["stuck"].running
+    release.set()
+    _wait_for(lambda: tasks.jobs["stuck"].runs >= 1)
+
+
+def test_waiting_jobs_run_in_priority_order(scheduler):
+    release = threading.Event()
+    order = []
+    tasks = scheduler(workers=1)
+    tasks.register("blocker", lambda: release.wait(5), interval=0.01, priority=0)
+    tasks.register("low", lambda: order.append("low"), interval=0.05, priority=20)
+    tasks.register("high", lambda: order.append("high"), interval=0.05, priority=1)
+    tasks.start()
+
+    _wait_for(lambda: tasks.metrics()["queue_size"] >= 2)
+    release.set()
+    _wait_for(lambda: len(order) >= 2)
+    assert order[:2] == ["high", "low"]
+
+
+def test_failures_are_counted_and_job_keeps_running(scheduler):
+    def fail():
+        raise RuntimeError("boom")
+
+    tasks = scheduler()
+    tasks.register("failing", fail, interval=0.01)
+    tasks.start()
+
+    _wait_for(lambda: tasks.jobs["failing"].failures >= 2)
+    assert tasks.jobs["failing"].runs >= tasks.jobs["failing"].failures
+
+
+def test_restart_after_stop(scheduler):
+    runs = []
+    tasks = scheduler()
+    tasks.register("job", lambda: runs.append(1), interval=0.01)
+    tasks.start()
+    _wait_for(lambda: runs)
+    tasks.stop(timeout=2)
+
+    count = len(runs)
+    tasks.start()
+    _wait_for(lambda: len(runs) > count)
+
+
+def test_stop_waits_for_running_jobs(scheduler):
+    started = threading.Event()
+    finished = []
+
+    def slow():
+        started.set()
+        time.sleep(0.2)
+        finished.append(1)
+
+    tasks = scheduler()
+    tasks.register("slow", slow, interval=0.01)
+    tasks.start()
+    started.wait(5)
+    tasks.stop(timeout=2)
+
+    assert finished == [1]
+    assert tasks.jobs["slow"].runs == 1
+    assert not tasks.jobs["slow"].running
@@ -7,6 +7,11 @@ import argparse
 import shutil
 from datetime import datetime
 
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.royalty_auditor.discovery_log import DiscoveryLog
+
 def load_session_data(session_dir):
     """Load session data from a specific session directory"""
     # Find the final report file
@@ -22,18 +27,9 @@ def load_session_data(session_dir):
     with open(report_path, 'r') as f:
         report_data = json.load(f)
     
-    # Load discovery files
+    # Load discoveries from the discovery log (or per-discovery files of older sessions)
     discoveries_dir = os.path.join(session_dir, "discoveries")
-    discovery_files = [f for f in os.listdir(discoveries_dir) if f.endswith(".json")]
-    
-    discoveries = []
-    for df in discovery_files:
-        with open(os.path.join(discoveries_dir, df), 'r') as f:
-            try:
-                discovery = json.load(f)
-                discoveries.append(discovery)
-            except json.JSONDecodeError:
-                print(f"Error parsing discovery file: {df}")
+    discoveries = list(DiscoveryLog.read_directory(discoveries_dir))
     
     # Create a complete session data object
     session_data = {
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, unquote
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.royalty_auditor.pro_integration import PROIntegration
+
+class MockPROHandler(BaseHTTPRequestHandler):
+    """
+    Serves the PROIntegration mock responses over HTTP
+    
+    Routes:
+        GET /<pro>/works/<work_id>/registration
+        GET /<pro>/black-box?type=<id type>&value=<id value>
+    """
+    
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [unquote(p) for p in url.path.strip("/").split("/")]
+        
+        if len(parts) == 4 and parts[1] == "works" and parts[3] == "registration":
+            self._send_json(PROIntegration.mock_work_registration(parts[2], parts[0]))
+        elif len(parts) == 2 and parts[1] == "black-box":
+            query = parse_qs(url.query)
+            identifier = {
+                "type": query.get("type", ["unknown"])[0],
+                "value": query.get("value", [""])[0]
+            }
+            self._send_json(PROIntegration.mock_black_box_funds(identifier, parts[0]))
+        else:
+            self._send_json({"error": "not found"}, status=404)
+    
+    def _send_json(self, data, status=200):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        # Keep the console quiet under load
+        pass
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local mock PRO API server for PROIntegration")
+    parser.add_argument("--host", default="127.0.0.1", help="Host to bind (default: 127.0.0.1)")
+    parser.add_argument("--port", "-p", type=int, default=8765, help="Port to listen on (default: 8765)")
+    
+    args = parser.parse_args()
+    
+    server = ThreadingHTTPServer((args.host, args.port), MockPROHandler)
+    print(f"Mock PRO server listening on http://{args.host}:{args.port}")
+    print(f"Use PROIntegration(mock_server_url=\"http://{args.host}:{args.port}\")")
+    
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()